@@ -1,16 +1,19 @@
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 import json
+import redis.asyncio as aioredis
 from main import generate_product_description
-from celery_tasks import generate_product_description_task, batch_generate_descriptions
+from celery_tasks import generate_product_description_task, submit_batch
 from celery.result import AsyncResult
 from celery_app import celery_app
 from core.cache import cache
+from services.image_buffer import image_buffers
 from core.rate_limiter import rate_limiter
-from core.config import ASYNC_MODE
+from core.config import ASYNC_MODE, REDIS_URL, BATCH_MAX_ITEMS, BATCH_SSE_HEARTBEAT_SECONDS
+from core.batch_store import batch_store, BATCH_COMPLETED, BATCH_CANCELLED
 
 app = FastAPI(
     title="AI Product Description Generator API",
@@ -113,7 +116,7 @@ async def root():
     }
 
 @app.get("/health", tags=["Health"])
-async def health_check():
+def health_check():
     """Detailed health check"""
     cache_stats = cache.get_cache_stats()
     
@@ -132,6 +135,8 @@ async def health_check():
             "generate_async": "/api/generate-description-async",
             "job_status": "/api/job-status/{job_id}",
             "batch": "/api/batch-generate",
+            "batch_status": "/api/batches/{batch_id}",
+            "batch_events": "/api/batches/{batch_id}/events",
             "docs": "/docs",
             "health": "/health"
         }
@@ -144,7 +149,7 @@ async def health_check():
     summary="Generate AI-powered product description",
     description="Analyzes product images and generates comprehensive descriptions, SEO metadata, and specifications"
 )
-async def generate_description(request: ProductDescriptionRequest):
+def generate_description(request: ProductDescriptionRequest):
     """
     Generate complete product description using AI.
     
@@ -242,14 +247,14 @@ async def generate_description(request: ProductDescriptionRequest):
     summary="Generate description with simplified response",
     description="Returns only the essential fields for direct database insertion"
 )
-async def generate_description_simple(request: ProductDescriptionRequest):
+def generate_description_simple(request: ProductDescriptionRequest):
     """
     Simplified endpoint that returns only database-ready fields.
     Perfect for direct insertion into your database.
     """
     try:
         # Get full response
-        full_response = await generate_description(request)
+        full_response = generate_description(request)
         
         # Return simplified version matching database schema
         return {
@@ -286,7 +291,7 @@ async def generate_description_simple(request: ProductDescriptionRequest):
     summary="Generate description asynchronously (recommended)",
     description="Submits a job for async processing. Returns job ID immediately."
 )
-async def generate_description_async(request: ProductDescriptionRequest):
+def generate_description_async(request: ProductDescriptionRequest):
     """
     Generate product description asynchronously using Celery task queue.
     Returns job ID for status checking.
@@ -326,7 +331,7 @@ async def generate_description_async(request: ProductDescriptionRequest):
     summary="Check job status",
     description="Get the status and result of an async job"
 )
-async def get_job_status(job_id: str):
+def get_job_status(job_id: str):
     """
     Check the status of an async product description generation job.
     
@@ -399,20 +404,28 @@ async def get_job_status(job_id: str):
 
 @app.post(
     "/api/batch-generate",
-    tags=["Product Description"],
+    tags=["Batch"],
     summary="Generate descriptions for multiple products",
-    description="Submit multiple products for batch processing"
+    description="Submit multiple products as one batch job. Returns a batch ID immediately."
 )
-async def batch_generate(products: List[ProductDescriptionRequest]):
+def batch_generate(products: List[ProductDescriptionRequest], write_to_db: bool = False):
     """
     Generate descriptions for multiple products in batch.
-    Returns list of job IDs.
+    
+    Workflow:
+    1. Submit the products → Get batch_id
+    2. Stream per-product results from /api/batches/{batch_id}/events
+       (or poll /api/batches/{batch_id})
+    3. With write_to_db=true, finished results are written to
+       products/product_meta in bulk when the batch completes
     """
     try:
-        if len(products) > 100:
+        if not products:
+            raise HTTPException(status_code=400, detail="At least one product is required")
+        if len(products) > BATCH_MAX_ITEMS:
             raise HTTPException(
                 status_code=400,
-                detail="Maximum 100 products allowed per batch"
+                detail=f"Maximum {BATCH_MAX_ITEMS} products allowed per batch"
             )
         
         # Convert to list of dicts
@@ -426,15 +439,15 @@ async def batch_generate(products: List[ProductDescriptionRequest]):
             for p in products
         ]
         
-        # Submit batch task
-        task_ids = batch_generate_descriptions(product_list)
+        batch_id = submit_batch(product_list, write_to_db=write_to_db)
         
         return {
-            "batch_id": f"batch_{len(task_ids)}_{int(__import__('time').time())}",
-            "total_jobs": len(task_ids),
-            "jobs": task_ids,
-            "message": f"Submitted {len(task_ids)} jobs for processing",
-            "status_check_url": "/api/job-status/{job_id}"
+            "batch_id": batch_id,
+            "status": "submitted",
+            "total_jobs": len(product_list),
+            "message": f"Submitted {len(product_list)} products for processing",
+            "status_url": f"/api/batches/{batch_id}",
+            "events_url": f"/api/batches/{batch_id}/events"
         }
         
     except HTTPException:
@@ -445,13 +458,97 @@ async def batch_generate(products: List[ProductDescriptionRequest]):
             detail=f"Failed to submit batch: {str(e)}"
         )
 
+@app.get(
+    "/api/batches/{batch_id}",
+    tags=["Batch"],
+    summary="Check batch status",
+    description="Aggregate progress of a batch job, optionally with every item's outcome"
+)
+def get_batch_status(batch_id: str, include_items: bool = False):
+    """Get batch status, counters and (optionally) per-item results"""
+    batch = batch_store.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found or expired")
+    if include_items:
+        batch["items"] = batch_store.results(batch_id)
+    return batch
+
+def _sse(event: str, data: str, event_id: Optional[str] = None) -> str:
+    message = f"event: {event}\ndata: {data}\n\n"
+    return f"id: {event_id}\n{message}" if event_id else message
+
+async def batch_event_stream(batch_id: str, last_event_id: str = "0", redis_client=None):
+    """
+    Yield the batch's events as Server-Sent Events until its 'done' event.
+    
+    Events already in the stream are replayed from `last_event_id`, so a
+    reconnecting client (Last-Event-ID header) picks up where it left off.
+    """
+    client = redis_client or aioredis.from_url(REDIS_URL, decode_responses=True)
+    events_key = batch_store.events_key(batch_id)
+    try:
+        while True:
+            response = await client.xread(
+                {events_key: last_event_id}, count=100, block=BATCH_SSE_HEARTBEAT_SECONDS * 1000
+            )
+            if not response:
+                # Nothing new: keep the connection alive, and stop if the batch is gone
+                if not await client.exists(batch_store.meta_key(batch_id)):
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            for event_id, fields in response[0][1]:
+                last_event_id = event_id
+                yield _sse(fields["event"], fields["data"], event_id)
+                if fields["event"] == "done":
+                    return
+    finally:
+        if redis_client is None:
+            await client.close()
+
+@app.get(
+    "/api/batches/{batch_id}/events",
+    tags=["Batch"],
+    summary="Stream batch results",
+    description="Server-Sent Events: one 'item' event per finished product, then a 'done' event"
+)
+def stream_batch_events(batch_id: str, request: Request):
+    """Stream per-product results of a batch as they finish"""
+    batch = batch_store.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found or expired")
+    return StreamingResponse(
+        batch_event_stream(batch_id, request.headers.get("last-event-id") or "0"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete(
+    "/api/batches/{batch_id}",
+    tags=["Batch"],
+    summary="Cancel a batch",
+    description="Products that have not started yet are skipped; finished results are kept"
+)
+def cancel_batch(batch_id: str):
+    """Cancel a batch job"""
+    batch = batch_store.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found or expired")
+    if batch["status"] != BATCH_COMPLETED:
+        batch_store.update(batch_id, status=BATCH_CANCELLED)
+    return {
+        "batch_id": batch_id,
+        "status": batch_store.get(batch_id)["status"],
+        "message": "Batch cancelled" if batch["status"] != BATCH_COMPLETED else "Batch already completed"
+    }
+
 @app.delete(
     "/api/job/{job_id}",
     tags=["Job Status"],
     summary="Cancel a job",
     description="Revoke/cancel a pending or running job"
 )
-async def cancel_job(job_id: str):
+def cancel_job(job_id: str):
     """Cancel an async job"""
     try:
         celery_app.control.revoke(job_id, terminate=True)
@@ -472,17 +569,30 @@ async def cancel_job(job_id: str):
     summary="Get cache statistics",
     description="Get cache hit rate and other metrics"
 )
-async def get_cache_stats():
+def get_cache_stats():
     """Get cache statistics"""
     return cache.get_cache_stats()
 
+@app.get(
+    "/api/cache/image-analysis/stats",
+    tags=["Cache"],
+    summary="Get image analysis cache statistics",
+    description="Hits per tier (in-process LRU, Redis, near-duplicate), misses and image buffer usage"
+)
+def get_image_cache_stats():
+    """Get image analysis cache statistics"""
+    return {
+        **cache.get_image_cache_stats(),
+        "image_buffers": image_buffers.stats()
+    }
+
 @app.delete(
     "/api/cache/clear",
     tags=["Cache"],
     summary="Clear cache",
     description="Clear all cached data (admin only)"
 )
-async def clear_cache():
+def clear_cache():
     """Clear all cache (use with caution)"""
     try:
         cache.clear_all()
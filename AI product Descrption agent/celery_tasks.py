@@ -2,13 +2,27 @@
 Celery Tasks for AI Product Description Generation
 Handles asynchronous processing of product descriptions
 """
-from celery import Task
+from celery import Task, chord, group
 from celery_app import celery_app
 from main import generate_product_description
 from core.cache import cache
+from core.batch_store import batch_store, BATCH_COMPLETED, BATCH_CANCELLED
+from core.token_bucket import TokenBucket
+from core.config import (
+    BATCH_ITEM_MAX_ATTEMPTS, GEMINI_BUDGET_CALLS_PER_MINUTE, GEMINI_BUDGET_BURST, IMAGE_ANALYSIS_MODE
+)
+from services import product_writer
 import time
 import traceback
 
+# Gemini calls per minute shared by every batch worker
+gemini_budget = TokenBucket("gemini_budget", GEMINI_BUDGET_CALLS_PER_MINUTE, GEMINI_BUDGET_BURST)
+
+def estimate_gemini_calls(product: dict) -> int:
+    """Upper bound of Gemini calls for one product (image analyses + description generation)"""
+    per_image = 1 if IMAGE_ANALYSIS_MODE == "combined" else 3
+    return len(set(product.get('image_urls') or [])) * per_image + 2
+
 class CallbackTask(Task):
     """Custom task class with callbacks"""
     def on_success(self, retval, task_id, args, kwargs):
@@ -136,11 +150,118 @@ def generate_product_description_task(
         # Re-raise for Celery to handle retries
         raise
 
+@celery_app.task(name='celery_tasks.generate_batch_item', bind=True, acks_late=True)
+def generate_batch_item(self, batch_id: str, index: int, product: dict, attempt: int = 1):
+    """
+    Generate the description for one product of a batch
+    
+    Waits for the shared Gemini budget before calling the pipeline and
+    retries failures with backoff. Never raises, so one bad product cannot
+    fail the batch's chord; the outcome is recorded in the batch store.
+    
+    Args:
+        self: Task instance (bound)
+        batch_id: Batch the product belongs to
+        index: Position of the product in the batch
+        product: Dict with product_id, product_name, image_urls, tone
+        attempt: Generation attempt number (1-based)
+    
+    Returns:
+        Dictionary with the item index and status
+    """
+    if batch_store.is_cancelled(batch_id):
+        return {'index': index, 'status': 'cancelled'}
+    
+    product_name = product['product_name']
+    image_urls = product['image_urls']
+    tone = product.get('tone') or 'professional and informative'
+    
+    cached_result = cache.get_product_description(product_name, image_urls, tone)
+    if cached_result:
+        batch_store.record_item(batch_id, index, product, 'succeeded', result=cached_result)
+        return {'index': index, 'status': 'succeeded', 'cached': True}
+    
+    # Out of budget: come back when enough calls have refilled (not counted as an attempt)
+    allowed, wait_seconds = gemini_budget.acquire(estimate_gemini_calls(product))
+    if not allowed:
+        raise self.retry(countdown=wait_seconds, max_retries=None,
+                         args=(batch_id, index, product), kwargs={'attempt': attempt})
+    
+    try:
+        result = generate_product_description(
+            product_id=product['product_id'],
+            product_name=product_name,
+            image_urls=image_urls,
+            optional_prompt=tone
+        )
+        if "error" in result.get("generated_content", {}):
+            raise Exception(f"AI generation error: {result['generated_content'].get('error')}")
+    except Exception as e:
+        print(f"❌ Batch {batch_id} item {index} attempt {attempt} failed: {str(e)}")
+        if attempt < BATCH_ITEM_MAX_ATTEMPTS:
+            raise self.retry(countdown=2 ** attempt * 5, max_retries=None,
+                             args=(batch_id, index, product), kwargs={'attempt': attempt + 1})
+        batch_store.record_item(batch_id, index, product, 'failed', error=str(e))
+        return {'index': index, 'status': 'failed'}
+    
+    cache.set_product_description(
+        product_name=product_name,
+        image_urls=image_urls,
+        tone=tone,
+        description=result
+    )
+    batch_store.record_item(batch_id, index, product, 'succeeded', result=result)
+    return {'index': index, 'status': 'succeeded', 'cached': False}
+
+@celery_app.task(name='celery_tasks.finalize_batch')
+def finalize_batch(item_results: list, batch_id: str):
+    """
+    Chord callback: write the batch's successful results to the product
+    database in bulk (when requested and configured) and close the batch
+    """
+    batch = batch_store.get(batch_id) or {}
+    db_write = None
+    if batch.get('write_to_db') and product_writer.is_enabled():
+        try:
+            db_write = product_writer.write_results(batch_store.results(batch_id))
+        except Exception as e:
+            print(f"❌ Batch {batch_id} database write failed: {str(e)}")
+            db_write = {'error': str(e)}
+    
+    fields = {'finished_at': time.time()}
+    if db_write is not None:
+        fields['db_write'] = db_write
+    if batch.get('status') != BATCH_CANCELLED:
+        fields['status'] = BATCH_COMPLETED
+    batch_store.update(batch_id, **fields)
+    
+    summary = batch_store.get(batch_id)
+    batch_store.publish(batch_id, 'done', summary)
+    print(f"✅ Batch {batch_id} finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+    return summary
+
+def submit_batch(products: list, write_to_db: bool = False) -> str:
+    """
+    Persist a batch and fan it out as a chord (one task per product,
+    finalize_batch once all of them have finished)
+    
+    Returns:
+        Batch ID
+    """
+    batch_id = batch_store.create(products, write_to_db=write_to_db)
+    chord(
+        group(generate_batch_item.s(batch_id, index, product) for index, product in enumerate(products))
+    )(finalize_batch.s(batch_id))
+    return batch_id
+
 @celery_app.task(name='celery_tasks.batch_generate_descriptions')
 def batch_generate_descriptions(products: list):
     """
     Generate descriptions for multiple products in batch
     
+    Legacy fan-out with one independent job per product; /api/batch-generate
+    uses submit_batch instead.
+    
     Args:
         products: List of dicts with product_id, product_name, image_urls, tone
     
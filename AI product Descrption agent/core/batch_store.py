@@ -0,0 +1,161 @@
+"""
+Redis-backed state for batch description jobs
+
+A batch is stored as:
+- batch:<id>          hash with status, counters and timestamps
+- batch:<id>:items    hash of item index -> submitted product (JSON)
+- batch:<id>:results  hash of item index -> outcome (JSON), written once per item
+- batch:<id>:events   stream of item/done events, read by the SSE endpoint
+
+Every key expires after CACHE_TTL_JOBS.
+"""
+import json
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import redis
+
+from core.config import REDIS_URL, CACHE_TTL_JOBS
+
+BATCH_PENDING = "pending"
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_CANCELLED = "cancelled"
+
+# Records an item outcome exactly once (a redelivered task is a no-op) and
+# publishes it. Returns {recorded, succeeded, failed, total}.
+RECORD_ITEM_SCRIPT = """
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2]) == 0 then
+    return {0, 0, 0, 0}
+end
+local succeeded = redis.call('HINCRBY', KEYS[1], 'succeeded', ARGV[3] == 'succeeded' and 1 or 0)
+local failed = redis.call('HINCRBY', KEYS[1], 'failed', ARGV[3] == 'succeeded' and 0 or 1)
+if redis.call('HGET', KEYS[1], 'status') == 'pending' then
+    redis.call('HSET', KEYS[1], 'status', 'running')
+end
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[5])
+redis.call('XADD', KEYS[3], '*', 'event', 'item', 'data', ARGV[4])
+return {1, succeeded, failed, tonumber(redis.call('HGET', KEYS[1], 'total'))}
+"""
+
+
+class BatchStore:
+    """Create batches, record per-item outcomes and read them back"""
+
+    def __init__(self, client: redis.Redis = None):
+        self._client = client
+        self._record_script = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+        return self._client
+
+    @staticmethod
+    def meta_key(batch_id: str) -> str:
+        return f"batch:{batch_id}"
+
+    @staticmethod
+    def events_key(batch_id: str) -> str:
+        return f"batch:{batch_id}:events"
+
+    def _keys(self, batch_id: str) -> List[str]:
+        return [self.meta_key(batch_id), f"batch:{batch_id}:items", f"batch:{batch_id}:results", self.events_key(batch_id)]
+
+    def create(self, products: List[Dict], write_to_db: bool = False) -> str:
+        """Persist a new batch of products and return its id"""
+        batch_id = uuid.uuid4().hex
+        meta_key, items_key, _, _ = self._keys(batch_id)
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.hset(meta_key, mapping={
+            "batch_id": batch_id,
+            "status": BATCH_PENDING,
+            "total": len(products),
+            "succeeded": 0,
+            "failed": 0,
+            "write_to_db": int(write_to_db),
+            "created_at": now,
+            "updated_at": now
+        })
+        pipe.hset(items_key, mapping={str(index): json.dumps(product) for index, product in enumerate(products)})
+        pipe.expire(meta_key, CACHE_TTL_JOBS)
+        pipe.expire(items_key, CACHE_TTL_JOBS)
+        pipe.execute()
+        return batch_id
+
+    def update(self, batch_id: str, **fields):
+        fields["updated_at"] = time.time()
+        self.redis.hset(self.meta_key(batch_id), mapping={
+            key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in fields.items()
+        })
+
+    def record_item(self, batch_id: str, index: int, product: Dict, status: str,
+                    result: Optional[Dict] = None, error: Optional[str] = None) -> Dict:
+        """Store one item's outcome and publish it to the event stream (only the first time)"""
+        if self._record_script is None:
+            self._record_script = self.redis.register_script(RECORD_ITEM_SCRIPT)
+        outcome = {
+            "index": index,
+            "product_id": product.get("product_id"),
+            "product_name": product.get("product_name"),
+            "status": status,
+            "result": result,
+            "error": error,
+            "finished_at": time.time()
+        }
+        event = {key: value for key, value in outcome.items() if key != "result"}
+        if result is not None:
+            event["result"] = result.get("generated_content")
+        meta_key, _, results_key, events_key = self._keys(batch_id)
+        recorded, succeeded, failed, total = self._record_script(
+            keys=[meta_key, results_key, events_key],
+            args=[index, json.dumps(outcome), status, json.dumps(event), time.time()]
+        )
+        pipe = self.redis.pipeline()
+        pipe.expire(results_key, CACHE_TTL_JOBS)
+        pipe.expire(events_key, CACHE_TTL_JOBS)
+        pipe.execute()
+        return {"recorded": bool(recorded), "succeeded": succeeded, "failed": failed, "total": total}
+
+    def publish(self, batch_id: str, event: str, data: Dict):
+        events_key = self.events_key(batch_id)
+        pipe = self.redis.pipeline()
+        pipe.xadd(events_key, {"event": event, "data": json.dumps(data)})
+        pipe.expire(events_key, CACHE_TTL_JOBS)
+        pipe.execute()
+
+    def get(self, batch_id: str) -> Optional[Dict]:
+        """Batch status and counters, or None if unknown/expired"""
+        meta = self.redis.hgetall(self.meta_key(batch_id))
+        if not meta:
+            return None
+        for key in ("total", "succeeded", "failed", "write_to_db"):
+            meta[key] = int(meta.get(key, 0))
+        for key in ("created_at", "updated_at", "finished_at"):
+            if key in meta:
+                meta[key] = float(meta[key])
+        if "db_write" in meta:
+            meta["db_write"] = json.loads(meta["db_write"])
+        meta["completed"] = meta["succeeded"] + meta["failed"]
+        meta["progress"] = round(meta["completed"] / max(meta["total"], 1) * 100, 1)
+        return meta
+
+    def items(self, batch_id: str) -> Dict[int, Dict]:
+        """Submitted products by item index"""
+        raw = self.redis.hgetall(f"batch:{batch_id}:items")
+        return {int(index): json.loads(value) for index, value in raw.items()}
+
+    def results(self, batch_id: str) -> List[Dict]:
+        """Recorded outcomes, in item order"""
+        raw = self.redis.hgetall(f"batch:{batch_id}:results")
+        return [json.loads(raw[index]) for index in sorted(raw, key=int)]
+
+    def is_cancelled(self, batch_id: str) -> bool:
+        return self.redis.hget(self.meta_key(batch_id), "status") == BATCH_CANCELLED
+
+
+# Global batch store instance
+batch_store = BatchStore()
@@ -2,25 +2,82 @@
 Redis Cache Layer for AI Product Description Generator
 Provides caching for:
 - Complete product descriptions
-- Image analysis results
+- Image analysis results (keyed by image content, with an in-process LRU tier)
 - Job statuses
 """
 import redis
 import json
 import hashlib
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, List
 from datetime import timedelta
 from core.config import (
     REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD,
-    CACHE_ENABLED, CACHE_TTL_DESCRIPTIONS, CACHE_TTL_IMAGE_ANALYSIS, CACHE_TTL_JOBS
+    CACHE_ENABLED, CACHE_TTL_DESCRIPTIONS, CACHE_TTL_IMAGE_ANALYSIS, CACHE_TTL_JOBS,
+    CACHE_IMAGE_LRU_SIZE, IMAGE_PHASH_MAX_DISTANCE, IMAGE_PHASH_BAND_MAX_ENTRIES
 )
 
+IMAGE_STATS_KEY = "image_analysis:stats"
+IMAGE_STATS_FIELDS = ("lru_hits", "redis_hits", "near_duplicate_hits", "misses", "writes")
+
+class LRUCache:
+    """Small thread-safe in-process LRU"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: str):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+def _phash_band_key(band: str) -> str:
+    """Sorted set of the hashes in one band, scored by when each expires"""
+    return f"image_phash_zband:{band}"
+
+def _phash_bands(phash: str) -> List[str]:
+    """
+    Split a 64-bit hash into IMAGE_PHASH_MAX_DISTANCE + 1 bands. Two hashes
+    within that Hamming distance always share at least one whole band, so
+    looking up the bands finds every near duplicate.
+    """
+    bands = min(max(IMAGE_PHASH_MAX_DISTANCE, 0) + 1, 16)
+    width = 64 // bands
+    bits = int(phash, 16)
+    return [f"{i}:{(bits >> (64 - (i + 1) * width)) & ((1 << width) - 1):x}" for i in range(bands)]
+
 class RedisCache:
     """Redis cache manager with type-specific TTLs"""
     
     def __init__(self):
         """Initialize Redis connection"""
         self.enabled = CACHE_ENABLED
+        # The in-process tier keeps working while Redis is unreachable
+        self.local = LRUCache(CACHE_IMAGE_LRU_SIZE if CACHE_ENABLED else 0)
+        self.image_stats = {field: 0 for field in IMAGE_STATS_FIELDS}
+        self._stats_lock = threading.Lock()
         if not self.enabled:
             print("⚠️  Cache is disabled")
             return
@@ -56,9 +113,13 @@ class RedisCache:
         sorted_urls = sorted(image_urls)
         return self._generate_cache_key("product_desc", product_name, "|".join(sorted_urls), tone)
     
-    def _generate_image_key(self, image_url: str, analysis_type: str = "detailed") -> str:
-        """Generate cache key for image analysis"""
-        return self._generate_cache_key("image_analysis", image_url, analysis_type)
+    def _generate_image_url_key(self, image_url: str) -> str:
+        """Generate cache key pointing from an image URL to its content digest"""
+        return self._generate_cache_key("image_url", image_url)
+    
+    def _generate_image_key(self, digest: str, analysis_type: str = "detailed") -> str:
+        """Generate cache key for image analysis (by SHA-256 of the image bytes)"""
+        return f"image_analysis:{digest}:{analysis_type}"
     
     def get_product_description(self, product_name: str, image_urls: List[str], tone: str) -> Optional[Dict]:
         """
@@ -115,35 +176,114 @@ class RedisCache:
         except Exception as e:
             print(f"⚠️  Cache set error: {str(e)}")
     
-    def get_image_analysis(self, image_url: str, analysis_type: str = "detailed") -> Optional[str]:
+    def _count(self, field: str):
+        """Record an image cache event locally and in the shared Redis counters"""
+        with self._stats_lock:
+            self.image_stats[field] += 1
+        if self.enabled:
+            try:
+                self.redis.hincrby(IMAGE_STATS_KEY, field, 1)
+            except Exception:
+                pass
+    
+    def get_image_digest(self, image_url: str) -> Optional[str]:
+        """Content digest last downloaded from this URL, if known"""
+        key = self._generate_image_url_key(image_url)
+        digest = self.local.get(key)
+        if digest or not self.enabled:
+            return digest
+        try:
+            digest = self.redis.get(key)
+            if digest:
+                self.local.set(key, digest)
+            return digest
+        except Exception as e:
+            print(f"⚠️  Cache get error: {str(e)}")
+            return None
+    
+    def _find_near_duplicate(self, phash: str, analysis_type: str) -> Optional[str]:
+        """Analysis of the closest stored image within IMAGE_PHASH_MAX_DISTANCE bits of `phash`"""
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for band in _phash_bands(phash):
+            pipe.zrangebyscore(_phash_band_key(band), now, "+inf")
+        candidates = set().union(*pipe.execute())
+        target = int(phash, 16)
+        nearby = sorted((bin(int(candidate, 16) ^ target).count("1"), candidate) for candidate in candidates)
+        for distance, candidate in nearby:
+            if distance > IMAGE_PHASH_MAX_DISTANCE:
+                break
+            digest = self.redis.get(f"image_phash:{candidate}")
+            if not digest:
+                continue
+            cached = self.redis.get(self._generate_image_key(digest, analysis_type))
+            if cached:
+                return cached
+        return None
+    
+    def get_image_analysis(self, image_url: str, analysis_type: str = "detailed",
+                           digest: Optional[str] = None, phash: Optional[str] = None) -> Optional[str]:
         """
         Get cached image analysis
         
+        Lookup order: in-process LRU, Redis by content digest, then (with a
+        perceptual hash) the analysis of a near-duplicate image.
+        
         Args:
             image_url: URL of the image
             analysis_type: Type of analysis (detailed, attributes, caption)
+            digest: SHA-256 of the image bytes; looked up from the URL if omitted
+            phash: Perceptual hash of the image, for near-duplicate matches
             
         Returns:
             Cached analysis text or None
         """
+        if not self.local.max_size and not self.enabled:
+            return None
+        
+        # Only lookups with the downloaded image's digest count as misses; a miss there means a Gemini call
+        count_miss = digest is not None
+        digest = digest or self.get_image_digest(image_url)
+        if not digest:
+            return None
+        
+        key = self._generate_image_key(digest, analysis_type)
+        cached = self.local.get(key)
+        if cached:
+            self._count("lru_hits")
+            return cached
         if not self.enabled:
+            if count_miss:
+                self._count("misses")
             return None
             
         try:
-            key = self._generate_image_key(image_url, analysis_type)
             cached = self.redis.get(key)
+            if cached:
+                self._count("redis_hits")
+            elif phash:
+                cached = self._find_near_duplicate(phash, analysis_type)
+                if cached:
+                    print(f"✅ Cache HIT: Near-duplicate image analysis for {image_url[:50]}...")
+                    self._count("near_duplicate_hits")
+                    # Remember it under this image's own digest too
+                    self.redis.setex(key, CACHE_TTL_IMAGE_ANALYSIS, cached)
             if cached:
                 print(f"✅ Cache HIT: Image analysis for {image_url[:50]}...")
+                self.local.set(key, cached)
                 return cached
             else:
                 print(f"❌ Cache MISS: Image analysis for {image_url[:50]}...")
+                if count_miss:
+                    self._count("misses")
                 return None
         except Exception as e:
             print(f"⚠️  Cache get error: {str(e)}")
             return None
     
     def set_image_analysis(self, image_url: str, analysis_type: str, 
-                          analysis_result: str, ttl: Optional[int] = None):
+                          analysis_result: str, ttl: Optional[int] = None,
+                          digest: Optional[str] = None, phash: Optional[str] = None):
         """
         Cache image analysis result
         
@@ -152,18 +292,58 @@ class RedisCache:
             analysis_type: Type of analysis
             analysis_result: Analysis text to cache
             ttl: Time to live in seconds (default: CACHE_TTL_IMAGE_ANALYSIS)
+            digest: SHA-256 of the image bytes (required to cache anything)
+            phash: Perceptual hash, indexed so near duplicates can reuse the result
         """
+        if not digest or (not self.local.max_size and not self.enabled):
+            return
+        url_key = self._generate_image_url_key(image_url)
+        key = self._generate_image_key(digest, analysis_type)
+        self.local.set(url_key, digest)
+        self.local.set(key, analysis_result)
+        self._count("writes")
         if not self.enabled:
             return
             
         try:
-            key = self._generate_image_key(image_url, analysis_type)
             ttl = ttl or CACHE_TTL_IMAGE_ANALYSIS
-            self.redis.setex(key, ttl, analysis_result)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(key, ttl, analysis_result)
+            pipe.setex(url_key, ttl, digest)
+            if phash:
+                pipe.setex(f"image_phash:{phash}", ttl, digest)
+                now = time.time()
+                for band in _phash_bands(phash):
+                    # Expired hashes are dropped on every write and a band keeps only its newest entries,
+                    # so refreshing the key's TTL cannot let it grow without bound
+                    band_key = _phash_band_key(band)
+                    pipe.zadd(band_key, {phash: now + ttl})
+                    pipe.zremrangebyscore(band_key, "-inf", now)
+                    pipe.zremrangebyrank(band_key, 0, -IMAGE_PHASH_BAND_MAX_ENTRIES - 1)
+                    pipe.expire(band_key, ttl)
+            pipe.execute()
             print(f"💾 Cached image analysis (TTL: {ttl}s)")
         except Exception as e:
             print(f"⚠️  Cache set error: {str(e)}")
     
+    def get_image_cache_stats(self) -> Dict:
+        """Image analysis hit/miss counters: this process, and all workers via Redis"""
+        with self._stats_lock:
+            local = dict(self.image_stats)
+        stats = {"process": local, "lru_entries": len(self.local)}
+        if self.enabled:
+            try:
+                shared = self.redis.hgetall(IMAGE_STATS_KEY)
+                stats["all_workers"] = {field: int(shared.get(field, 0)) for field in IMAGE_STATS_FIELDS}
+            except Exception as e:
+                stats["all_workers"] = {"error": str(e)}
+        totals = stats.get("all_workers", local)
+        if "error" in totals:
+            totals = local
+        hits = totals["lru_hits"] + totals["redis_hits"] + totals["near_duplicate_hits"]
+        stats["hit_rate"] = round(hits / max(hits + totals["misses"], 1) * 100, 2)
+        return stats
+    
     def get_job_status(self, job_id: str) -> Optional[Dict]:
         """Get cached job status"""
         if not self.enabled:
@@ -205,7 +385,7 @@ class RedisCache:
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
         if not self.enabled:
-            return {"enabled": False}
+            return {"enabled": False, "image_analysis": self.get_image_cache_stats()}
             
         try:
             info = self.redis.info('stats')
@@ -219,13 +399,15 @@ class RedisCache:
                     info.get('keyspace_hits', 0) / 
                     max(info.get('keyspace_hits', 0) + info.get('keyspace_misses', 0), 1) * 100,
                     2
-                )
+                ),
+                "image_analysis": self.get_image_cache_stats()
             }
         except Exception as e:
             return {"enabled": True, "error": str(e)}
     
     def clear_all(self):
         """Clear all cached data (use with caution!)"""
+        self.local.clear()
         if not self.enabled:
             return
             
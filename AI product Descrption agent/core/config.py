@@ -5,9 +5,18 @@ load_dotenv()
 # Gemini AI Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = "gemini-2.5-flash"
-GEMINI_ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_NAME}:generateContent"
+GEMINI_ENDPOINT = os.getenv("GEMINI_ENDPOINT", f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_NAME}:generateContent")  # point at stub_gemini.py for offline runs
 TEMPERATURE = 0.8
 MAX_TOKENS = 8000
+GEMINI_TIMEOUT = int(os.getenv("GEMINI_TIMEOUT", "60"))  # seconds
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "10"))  # keep-alive connections per process
+GEMINI_REQUESTS_PER_SECOND = float(os.getenv("GEMINI_REQUESTS_PER_SECOND", "5"))  # per API key; 0 = unlimited
+
+# Image Analysis Pipeline
+IMAGE_ANALYSIS_MODE = os.getenv("IMAGE_ANALYSIS_MODE", "separate")  # "separate" (3 calls per image) or "combined" (1 call)
+IMAGE_ANALYSIS_WORKERS = int(os.getenv("IMAGE_ANALYSIS_WORKERS", "6"))  # concurrent downloads / Gemini calls
+IMAGE_DOWNLOAD_TIMEOUT = int(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "10"))  # seconds
+IMAGE_BUFFER_CACHE_MB = int(os.getenv("IMAGE_BUFFER_CACHE_MB", "64"))  # encoded images kept in memory per process
 
 # Redis Configuration
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -21,6 +30,10 @@ CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
 CACHE_TTL_DESCRIPTIONS = int(os.getenv("CACHE_TTL_DESCRIPTIONS", "2592000"))  # 30 days
 CACHE_TTL_IMAGE_ANALYSIS = int(os.getenv("CACHE_TTL_IMAGE_ANALYSIS", "604800"))  # 7 days
 CACHE_TTL_JOBS = int(os.getenv("CACHE_TTL_JOBS", "86400"))  # 24 hours
+CACHE_IMAGE_LRU_SIZE = int(os.getenv("CACHE_IMAGE_LRU_SIZE", "2048"))  # image analyses kept in-process in front of Redis
+IMAGE_PHASH_ENABLED = os.getenv("IMAGE_PHASH_ENABLED", "false").lower() == "true"  # reuse analyses of near-duplicate images
+IMAGE_PHASH_MAX_DISTANCE = int(os.getenv("IMAGE_PHASH_MAX_DISTANCE", "4"))  # differing bits (of 64) still treated as one image
+IMAGE_PHASH_BAND_MAX_ENTRIES = int(os.getenv("IMAGE_PHASH_BAND_MAX_ENTRIES", "1000"))  # newest hashes kept per near-duplicate band
 
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
@@ -36,6 +49,14 @@ RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))  # seconds (1 minu
 RATE_LIMIT_PREMIUM_REQUESTS = int(os.getenv("RATE_LIMIT_PREMIUM_REQUESTS", "100"))
 RATE_LIMIT_PREMIUM_WINDOW = int(os.getenv("RATE_LIMIT_PREMIUM_WINDOW", "60"))
 
+# Batch Jobs
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))  # products per batch
+BATCH_ITEM_MAX_ATTEMPTS = int(os.getenv("BATCH_ITEM_MAX_ATTEMPTS", "3"))  # generation attempts per product
+GEMINI_BUDGET_CALLS_PER_MINUTE = int(os.getenv("GEMINI_BUDGET_CALLS_PER_MINUTE", "60"))  # shared by all batch workers
+GEMINI_BUDGET_BURST = int(os.getenv("GEMINI_BUDGET_BURST", "30"))  # calls that may be spent at once
+BATCH_SSE_HEARTBEAT_SECONDS = int(os.getenv("BATCH_SSE_HEARTBEAT_SECONDS", "15"))
+PRODUCT_DATABASE_URI = os.getenv("PRODUCT_DATABASE_URI")  # store DB; finished batches are written to products/product_meta
+
 # API Configuration
 ASYNC_MODE = os.getenv("ASYNC_MODE", "true").lower() == "true"  # Enable async task queue
 JOB_STATUS_POLL_INTERVAL = int(os.getenv("JOB_STATUS_POLL_INTERVAL", "2"))  # seconds
\ No newline at end of file
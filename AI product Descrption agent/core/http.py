@@ -0,0 +1,31 @@
+"""
+Shared HTTP session for outbound calls (Gemini API, image downloads).
+
+One keep-alive connection pool per process instead of a new TCP/TLS
+handshake for every request.
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.config import GEMINI_POOL_SIZE
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session (rebuilt after a fork, e.g. in Celery workers)"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GEMINI_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
@@ -0,0 +1,68 @@
+"""
+Redis token bucket shared by every API process and Celery worker
+
+Used as the global Gemini budget for batch jobs: each product costs the
+number of Gemini calls it is expected to make, and a worker that finds the
+bucket empty is told how long to wait instead of calling the API anyway.
+"""
+import time
+from typing import Tuple
+
+import redis
+
+from core.config import REDIS_URL
+
+# Refill, then take `cost` tokens if there are enough. Returns {allowed, wait_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) / 1000 * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = math.ceil((cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, wait}
+"""
+
+
+class TokenBucket:
+    """Distributed token bucket: `per_minute` tokens a minute, at most `burst` saved up"""
+
+    def __init__(self, key: str, per_minute: float, burst: int, client: redis.Redis = None):
+        self.key = key
+        self.rate = max(per_minute, 0.001) / 60.0
+        self.capacity = max(burst, 1)
+        self._client = client
+        self._script = None
+
+    def _get_script(self):
+        if self._script is None:
+            if self._client is None:
+                self._client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=5)
+            self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+    def acquire(self, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Try to take `cost` tokens.
+
+        Returns (allowed, seconds to wait before there would be enough).
+        A cost above the burst size is capped so it can always be paid.
+        """
+        cost = min(max(cost, 1), self.capacity)
+        allowed, wait_ms = self._get_script()(
+            keys=[self.key],
+            args=[self.rate, self.capacity, int(time.time() * 1000), cost]
+        )
+        return bool(allowed), wait_ms / 1000.0
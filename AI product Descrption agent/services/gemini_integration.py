@@ -1,25 +1,87 @@
-import requests
 import json
-import base64
-from typing import Optional, Union, List
-from io import BytesIO
-from PIL import Image
-from core.config import GEMINI_API_KEY, GEMINI_ENDPOINT, TEMPERATURE, MAX_TOKENS
+import time
+import threading
+from typing import Optional, Union, List, Dict
+from core.config import (
+    GEMINI_API_KEY, GEMINI_ENDPOINT, TEMPERATURE, MAX_TOKENS,
+    GEMINI_TIMEOUT, GEMINI_REQUESTS_PER_SECOND
+)
+from core.http import get_session
+from services.image_buffer import image_buffers, EncodedImage
 
-def download_and_encode_image(image_url: str) -> tuple[str, str]:
-    """Download image from URL and convert to base64."""
-    response = requests.get(image_url, timeout=10)
-    response.raise_for_status()
+ANALYSIS_TYPES = ("detailed", "attributes", "caption")
+
+ANALYSIS_PROMPTS = {
+    "detailed": """Analyze this product image in detail. Describe:
+1. The main product and its visible features
+2. Colors, materials, and textures you can see
+3. Any text or branding visible in the image
+4. Product condition and quality indicators
+5. Any technical specifications visible
+
+Be specific and factual.""",
     
-    # Detect mime type from content-type header
-    content_type = response.headers.get('content-type', 'image/jpeg')
+    "attributes": """Extract all visible product attributes from this image. List:
+- Colors
+- Materials
+- Dimensions or size indicators
+- Brand/model information
+- Technical specifications
+- Condition
+- Style/design features
+
+Output as a structured list.""",
     
-    # Convert to base64
-    image_data = base64.b64encode(response.content).decode('utf-8')
+    "caption": """Generate a concise, descriptive caption for this product image. 
+Focus on the main product features visible in the image. Be specific and factual."""
+}
+
+COMBINED_ANALYSIS_PROMPT = """Analyze this product image and answer three tasks at once.
+Return a JSON object with exactly these string fields:
+
+"detailed": {detailed}
+
+"attributes": {attributes}
+
+"caption": {caption}""".format(**{key: json.dumps(value) for key, value in ANALYSIS_PROMPTS.items()})
+
+
+class KeyRateLimiter:
+    """
+    Spaces out Gemini calls per API key (thread-safe).
+    
+    Each caller reserves the next free slot for its key and sleeps until then,
+    so concurrent workers never exceed `requests_per_second` for one key.
+    """
     
-    return image_data, content_type
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, key: str) -> float:
+        """Wait for a slot; returns the seconds waited"""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, 0.0))
+            self._next_slot[key] = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+# Global per-key limiter for outbound Gemini calls
+gemini_limiter = KeyRateLimiter(GEMINI_REQUESTS_PER_SECOND)
 
-def call_gemini(prompt: str, images: Optional[List[str]] = None, return_raw: bool = False) -> Union[dict, str]:
+def download_and_encode_image(image_url: str) -> tuple[str, str]:
+    """Download image from URL and convert to base64 (once per image, see image_buffer)."""
+    image = image_buffers.get(image_url)
+    return image.data, image.mime_type
+
+def call_gemini(prompt: str, images: Optional[List[str]] = None, return_raw: bool = False,
+                encoded_images: Optional[List[EncodedImage]] = None) -> Union[dict, str]:
     """
     Call Gemini API with support for text and vision (multimodal) inputs.
     
@@ -27,6 +89,7 @@ def call_gemini(prompt: str, images: Optional[List[str]] = None, return_raw: boo
         prompt: The text prompt
         images: Optional list of image URLs to analyze
         return_raw: If True, returns raw text response instead of parsing JSON
+        encoded_images: Optional images that were already downloaded
     
     Returns:
         Parsed JSON dict or raw text response
@@ -37,6 +100,13 @@ def call_gemini(prompt: str, images: Optional[List[str]] = None, return_raw: boo
     parts = [{"text": prompt}]
     
     # Add images if provided
+    for image in encoded_images or []:
+        parts.append({
+            "inline_data": {
+                "mime_type": image.mime_type,
+                "data": image.data
+            }
+        })
     if images:
         for image_url in images:
             try:
@@ -66,7 +136,8 @@ def call_gemini(prompt: str, images: Optional[List[str]] = None, return_raw: boo
         payload["generationConfig"]["responseMimeType"] = "application/json"
     
     headers = {"Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json=payload, timeout=60)
+    gemini_limiter.acquire(GEMINI_API_KEY or "")
+    resp = get_session().post(url, headers=headers, json=payload, timeout=GEMINI_TIMEOUT)
     resp.raise_for_status()
     
     response_data = resp.json()
@@ -85,64 +156,109 @@ def call_gemini(prompt: str, images: Optional[List[str]] = None, return_raw: boo
     except json.JSONDecodeError as e:
         return {"error": f"Failed to parse JSON: {str(e)}", "raw_text": generated_text}
 
-def analyze_image_with_gemini(image_url: str, analysis_type: str = "detailed") -> str:
+def get_cached_analysis(image_url: str, analysis_type: str,
+                        image: Optional[EncodedImage] = None) -> Optional[str]:
+    """Cached analysis by image content; without `image` only URLs downloaded before can hit"""
+    try:
+        from core.cache import cache
+        if image is None:
+            return cache.get_image_analysis(image_url, analysis_type)
+        return cache.get_image_analysis(image_url, analysis_type, digest=image.digest, phash=image.phash)
+    except Exception as e:
+        print(f"Cache check failed: {str(e)}")
+        return None
+
+def _cache_analysis(image_url: str, analysis_type: str, result: str, image: EncodedImage):
+    try:
+        from core.cache import cache
+        cache.set_image_analysis(image_url, analysis_type, result, digest=image.digest, phash=image.phash)
+    except Exception as e:
+        print(f"Cache set failed: {str(e)}")
+
+def analyze_image_with_gemini(image_url: str, analysis_type: str = "detailed",
+                              image: Optional[EncodedImage] = None) -> str:
     """
     Analyze an image using Gemini's vision capabilities with caching.
     
+    Results are cached by the image's content, so the same picture under
+    another URL (or, with IMAGE_PHASH_ENABLED, a resized copy) is not
+    analysed again.
+    
     Args:
         image_url: URL of the image to analyze
         analysis_type: Type of analysis - "detailed", "attributes", or "caption"
+        image: The already downloaded image, if the caller has it
     
     Returns:
         Analysis text
     """
     # Try to get from cache first
-    try:
-        from core.cache import cache
-        cached_analysis = cache.get_image_analysis(image_url, analysis_type)
+    if image is None:
+        cached_analysis = get_cached_analysis(image_url, analysis_type)
         if cached_analysis:
             return cached_analysis
-    except Exception as e:
-        print(f"Cache check failed: {str(e)}")
     
-    prompts = {
-        "detailed": """Analyze this product image in detail. Describe:
-1. The main product and its visible features
-2. Colors, materials, and textures you can see
-3. Any text or branding visible in the image
-4. Product condition and quality indicators
-5. Any technical specifications visible
-
-Be specific and factual.""",
-        
-        "attributes": """Extract all visible product attributes from this image. List:
-- Colors
-- Materials
-- Dimensions or size indicators
-- Brand/model information
-- Technical specifications
-- Condition
-- Style/design features
-
-Output as a structured list.""",
-        
-        "caption": """Generate a concise, descriptive caption for this product image. 
-Focus on the main product features visible in the image. Be specific and factual."""
-    }
-    
-    prompt = prompts.get(analysis_type, prompts["detailed"])
+    prompt = ANALYSIS_PROMPTS.get(analysis_type, ANALYSIS_PROMPTS["detailed"])
     
     try:
-        response = call_gemini(prompt, images=[image_url], return_raw=True)
+        if image is None:
+            image = image_buffers.get(image_url)
+        cached_analysis = get_cached_analysis(image_url, analysis_type, image)
+        if cached_analysis:
+            return cached_analysis
+        
+        response = call_gemini(prompt, encoded_images=[image], return_raw=True)
         result = response if isinstance(response, str) else str(response)
         
         # Cache the result
-        try:
-            from core.cache import cache
-            cache.set_image_analysis(image_url, analysis_type, result)
-        except Exception as e:
-            print(f"Cache set failed: {str(e)}")
+        _cache_analysis(image_url, analysis_type, result, image)
         
         return result
     except Exception as e:
         return f"Error analyzing image: {str(e)}"
+
+def analyze_image_combined(image_url: str, image: Optional[EncodedImage] = None) -> Dict[str, str]:
+    """
+    All three analyses of an image from a single multimodal request.
+    
+    Cached analyses are reused; the combined request is only made when more
+    than one is missing. Falls back to one call per analysis type when the
+    combined answer cannot be parsed.
+    
+    Returns:
+        Dict with "detailed", "attributes" and "caption" texts
+    """
+    try:
+        if image is None:
+            image = image_buffers.get(image_url)
+    except Exception as e:
+        return {analysis_type: f"Error analyzing image: {str(e)}" for analysis_type in ANALYSIS_TYPES}
+    
+    results = {}
+    for analysis_type in ANALYSIS_TYPES:
+        cached_analysis = get_cached_analysis(image_url, analysis_type, image)
+        if cached_analysis:
+            results[analysis_type] = cached_analysis
+    missing = [analysis_type for analysis_type in ANALYSIS_TYPES if analysis_type not in results]
+    if len(missing) < 2:
+        for analysis_type in missing:
+            results[analysis_type] = analyze_image_with_gemini(image_url, analysis_type, image=image)
+        return results
+    
+    try:
+        response = call_gemini(COMBINED_ANALYSIS_PROMPT, encoded_images=[image])
+    except Exception as e:
+        return {analysis_type: f"Error analyzing image: {str(e)}" for analysis_type in ANALYSIS_TYPES}
+    
+    if not isinstance(response, dict) or "error" in response or not all(
+            isinstance(response.get(analysis_type), str) for analysis_type in ANALYSIS_TYPES):
+        print(f"Combined analysis unusable for {image_url[:50]}..., analysing separately")
+        return {
+            analysis_type: analyze_image_with_gemini(image_url, analysis_type, image=image)
+            for analysis_type in ANALYSIS_TYPES
+        }
+    
+    for analysis_type in missing:
+        results[analysis_type] = response[analysis_type]
+        _cache_analysis(image_url, analysis_type, results[analysis_type], image)
+    return results
@@ -0,0 +1,134 @@
+"""
+Content-addressed buffer cache for downloaded product images.
+
+Every image is downloaded and base64-encoded once per process and shared by
+all the Gemini calls that need it. Buffers are keyed by the SHA-256 of the
+image bytes, so the same picture behind different URLs is stored once.
+Concurrent requests for the same URL wait for the one download in flight.
+With IMAGE_PHASH_ENABLED each image also gets a perceptual hash, so resized
+or re-encoded copies can be recognised.
+"""
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional
+
+from PIL import Image
+
+from core.config import IMAGE_BUFFER_CACHE_MB, IMAGE_DOWNLOAD_TIMEOUT, IMAGE_PHASH_ENABLED
+from core.http import get_session
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """A downloaded image, ready to be sent as Gemini inline_data"""
+    digest: str
+    mime_type: str
+    data: str  # base64
+    size: int  # raw bytes
+    phash: Optional[str] = None  # 64-bit difference hash, hex
+
+
+def perceptual_hash(content: bytes) -> Optional[str]:
+    """
+    Difference hash (dHash) of an image: 64 bits, one per horizontally
+    adjacent pixel pair of a 9x8 grayscale thumbnail. Resizing and
+    re-compression barely change it. None if the bytes are not a raster image.
+    """
+    try:
+        with Image.open(BytesIO(content)) as image:
+            image.draft("L", (64, 64))  # lets JPEG decode at reduced size
+            pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+class ImageBufferCache:
+    """Thread-safe LRU of EncodedImage, bounded by total encoded size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._buffers: "OrderedDict[str, EncodedImage]" = OrderedDict()
+        self._url_digests: Dict[str, str] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.hits = 0
+
+    def _lookup(self, url: str) -> Optional[EncodedImage]:
+        digest = self._url_digests.get(url)
+        image = self._buffers.get(digest) if digest else None
+        if image is not None:
+            self._buffers.move_to_end(digest)
+        return image
+
+    def _store(self, url: str, image: EncodedImage):
+        if image.digest not in self._buffers:
+            self._buffers[image.digest] = image
+            self._bytes += len(image.data)
+        self._url_digests[url] = image.digest
+        while self._bytes > self.max_bytes and len(self._buffers) > 1:
+            digest, evicted = self._buffers.popitem(last=False)
+            self._bytes -= len(evicted.data)
+            for stale_url in [u for u, d in self._url_digests.items() if d == digest]:
+                del self._url_digests[stale_url]
+
+    def _download(self, url: str) -> EncodedImage:
+        response = get_session().get(url, timeout=IMAGE_DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        content = response.content
+        return EncodedImage(
+            digest=hashlib.sha256(content).hexdigest(),
+            mime_type=response.headers.get("content-type", "image/jpeg"),
+            data=base64.b64encode(content).decode("utf-8"),
+            size=len(content),
+            phash=perceptual_hash(content) if IMAGE_PHASH_ENABLED else None
+        )
+
+    def get(self, url: str) -> EncodedImage:
+        """Encoded image for `url`, downloading it only if no buffer exists yet"""
+        while True:
+            with self._lock:
+                image = self._lookup(url)
+                if image is not None:
+                    self.hits += 1
+                    return image
+                waiter = self._in_flight.get(url)
+                if waiter is None:
+                    self._in_flight[url] = threading.Event()
+                    break
+            # Someone else is downloading this URL; use their result (or retry if it failed)
+            waiter.wait()
+
+        try:
+            image = self._download(url)
+            with self._lock:
+                self.downloads += 1
+                self._store(url, image)
+            return image
+        finally:
+            with self._lock:
+                self._in_flight.pop(url).set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "images": len(self._buffers),
+                "urls": len(self._url_digests),
+                "bytes": self._bytes,
+                "downloads": self.downloads,
+                "hits": self.hits
+            }
+
+
+# Global buffer cache instance
+image_buffers = ImageBufferCache(IMAGE_BUFFER_CACHE_MB * 1024 * 1024)
@@ -1,42 +1,104 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
-from services.gemini_integration import analyze_image_with_gemini
+from core.config import IMAGE_ANALYSIS_MODE, IMAGE_ANALYSIS_WORKERS
+from services.image_buffer import image_buffers
+from services.gemini_integration import (
+    ANALYSIS_TYPES, get_cached_analysis, analyze_image_with_gemini, analyze_image_combined
+)
+
+# Shared by all pipelines in this process; bounds concurrent downloads and Gemini calls
+_executor = ThreadPoolExecutor(max_workers=max(IMAGE_ANALYSIS_WORKERS, 1), thread_name_prefix="image-analysis")
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
 
 def process_images(image_urls: List[str]) -> Dict:
     """
     Process product images using Gemini's vision API for comprehensive analysis.
-    
+
+    Each distinct image is downloaded and encoded once; its analyses then run
+    concurrently, either as three calls ("separate") or one ("combined"),
+    depending on IMAGE_ANALYSIS_MODE.
+
     Args:
         image_urls: List of image URLs to analyze
-    
+
     Returns:
-        Dictionary with detailed image analysis, extracted text, and captions
+        Dictionary with detailed image analysis, extracted text, captions
+        and per-stage timings in milliseconds
     """
+    started = time.perf_counter()
+    unique_urls = list(dict.fromkeys(image_urls))
+
+    # Stage 1: analyses already in the Redis cache
+    analyses = {url: {} for url in unique_urls}
+    for url in unique_urls:
+        for analysis_type in ANALYSIS_TYPES:
+            cached = get_cached_analysis(url, analysis_type)
+            if cached:
+                analyses[url][analysis_type] = cached
+    pending = [url for url in unique_urls if len(analyses[url]) < len(ANALYSIS_TYPES)]
+    cache_done = time.perf_counter()
+
+    # Stage 2: download and encode every image that still needs analysis, once each
+    images, errors = {}, {}
+    for url, future in [(url, _executor.submit(image_buffers.get, url)) for url in pending]:
+        try:
+            images[url] = future.result()
+        except Exception as e:
+            print(f"Error processing image {url}: {str(e)}")
+            errors[url] = e
+    download_done = time.perf_counter()
+
+    # Stage 3: Gemini calls for everything missing, all in flight together
+    combined = IMAGE_ANALYSIS_MODE == "combined"
+    futures = []
+    for url, image in images.items():
+        missing = [analysis_type for analysis_type in ANALYSIS_TYPES if analysis_type not in analyses[url]]
+        if combined and len(missing) > 1:
+            futures.append((url, None, _executor.submit(analyze_image_combined, url, image)))
+        else:
+            for analysis_type in missing:
+                futures.append((url, analysis_type, _executor.submit(analyze_image_with_gemini, url, analysis_type, image)))
+    for url, analysis_type, future in futures:
+        result = future.result()
+        if analysis_type is None:
+            for key, value in result.items():
+                analyses[url].setdefault(key, value)
+        else:
+            analyses[url][analysis_type] = result
+    analysis_done = time.perf_counter()
+
     detailed_analyses = []
     attribute_extractions = []
     captions = []
-    
+
     for url in image_urls:
-        try:
-            # Get detailed analysis
-            detailed = analyze_image_with_gemini(url, "detailed")
-            detailed_analyses.append(detailed)
-            
-            # Get attribute extraction
-            attributes = analyze_image_with_gemini(url, "attributes")
-            attribute_extractions.append(attributes)
-            
-            # Get caption
-            caption = analyze_image_with_gemini(url, "caption")
-            captions.append(caption)
-            
-        except Exception as e:
-            print(f"Error processing image {url}: {str(e)}")
-            detailed_analyses.append(f"Error: {str(e)}")
+        if url in errors:
+            detailed_analyses.append(f"Error: {str(errors[url])}")
             attribute_extractions.append("")
             captions.append("Unable to generate caption")
-    
+        else:
+            detailed_analyses.append(analyses[url]["detailed"])
+            attribute_extractions.append(analyses[url]["attributes"])
+            captions.append(analyses[url]["caption"])
+
+    timings = {
+        "images": len(unique_urls),
+        "downloaded": len(images),
+        "analysis_requests": len(futures),
+        "mode": "combined" if combined else "separate",
+        "cache_lookup_ms": _ms(cache_done - started),
+        "download_ms": _ms(download_done - cache_done),
+        "analysis_ms": _ms(analysis_done - download_done),
+        "total_ms": _ms(analysis_done - started)
+    }
+    print(f"⏱️  Image pipeline: {timings}")
+
     return {
         "detailed_analysis": " | ".join(detailed_analyses),
         "extracted_attributes": " | ".join(attribute_extractions),
-        "image_captions": " | ".join(captions)
+        "image_captions": " | ".join(captions),
+        "timings": timings
     }
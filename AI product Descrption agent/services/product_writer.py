@@ -0,0 +1,125 @@
+"""
+Bulk write-back of generated descriptions into the store's database
+
+When PRODUCT_DATABASE_URI points at the e-commerce database, finished
+batches update products.product_description and upsert product_meta with
+one executemany per table instead of a round trip per product.
+
+The written products get a new updated_at, which is how the store notices
+the change: its search index sync and catalog translation sweep both pick up
+products edited since they last processed them.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from core.config import PRODUCT_DATABASE_URI
+
+_engine = None
+
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+        _engine = create_engine(PRODUCT_DATABASE_URI, pool_pre_ping=True, pool_size=2)
+    return _engine
+
+
+def is_enabled() -> bool:
+    return bool(PRODUCT_DATABASE_URI)
+
+
+def build_product_meta(product_id: int, product_name: str, generated: Dict) -> Dict:
+    """product_meta row for a generated description (same mapping as /api/generate-description)"""
+    short_desc = generated.get("short_description", "") or ""
+    return {
+        "product_id": product_id,
+        "short_desc": short_desc[:255],
+        "full_desc": generated.get("long_description", "") or "",
+        "meta_title": (generated.get("title") or product_name or "")[:100],
+        "meta_desc": short_desc[:255],
+        "meta_keywords": ", ".join(generated.get("seo_keywords", []) or [])[:255]
+    }
+
+
+def write_results(results: List[Dict], engine=None) -> Dict:
+    """
+    Write successful batch results to products and product_meta.
+
+    Args:
+        results: Batch outcomes (see BatchStore.results)
+        engine: SQLAlchemy engine to use instead of PRODUCT_DATABASE_URI
+
+    Returns:
+        Counts of rows written and items skipped
+    """
+    from sqlalchemy import MetaData, Table, Column, DateTime, Integer, String, Text, bindparam, func
+
+    rows = []
+    for outcome in results:
+        generated = (outcome.get("result") or {}).get("generated_content") or {}
+        product_id = str(outcome.get("product_id", ""))
+        if outcome.get("status") != "succeeded" or "error" in generated or not product_id.isdigit():
+            continue
+        rows.append(build_product_meta(int(product_id), outcome.get("product_name"), generated))
+    if not rows:
+        return {"products": 0, "product_meta": 0, "skipped": len(results)}
+
+    engine = engine or _get_engine()
+    metadata = MetaData()
+    products = Table("products", metadata, Column("product_id", Integer, primary_key=True),
+                     Column("product_description", Text), Column("updated_at", DateTime))
+    product_meta = Table("product_meta", metadata, Column("product_id", Integer, primary_key=True),
+                         Column("short_desc", String(255)), Column("full_desc", Text),
+                         Column("meta_title", String(100)), Column("meta_desc", String(255)),
+                         Column("meta_keywords", String(255)))
+
+    if engine.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        upsert = insert(product_meta)
+        upsert = upsert.on_duplicate_key_update({
+            column: upsert.inserted[column] for column in ("short_desc", "full_desc", "meta_title", "meta_desc", "meta_keywords")
+        })
+    else:
+        insert = _dialect_insert(engine.dialect.name)
+        upsert = insert(product_meta)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={column: upsert.excluded[column] for column in ("short_desc", "full_desc", "meta_title", "meta_desc", "meta_keywords")}
+        )
+
+    # Every written product is marked as edited; an empty description keeps the current one
+    product_update = (
+        products.update()
+        .where(products.c.product_id == bindparam("target_id"))
+        .values(
+            product_description=func.coalesce(bindparam("description", type_=Text), products.c.product_description),
+            updated_at=bindparam("edited_at")
+        )
+    )
+    with engine.begin() as connection:
+        # Only products that still exist; product_meta has a foreign key to products
+        existing = {
+            row[0] for row in connection.execute(
+                products.select().with_only_columns(products.c.product_id)
+                .where(products.c.product_id.in_([row["product_id"] for row in rows]))
+            )
+        }
+        rows = [row for row in rows if row["product_id"] in existing]
+        # Naive UTC, like the store's own updated_at values
+        edited_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        if rows:
+            connection.execute(product_update, [
+                {"target_id": row["product_id"], "description": row["full_desc"] or None, "edited_at": edited_at}
+                for row in rows
+            ])
+            connection.execute(upsert, rows)
+    return {"products": len(rows), "product_meta": len(rows), "skipped": len(results) - len(rows)}
+
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
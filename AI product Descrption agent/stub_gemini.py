@@ -0,0 +1,131 @@
+"""
+Stub Gemini server for running the pipeline offline
+
+Answers generateContent calls with canned text (or JSON when the request
+asks for it) and serves fake product images, so the whole description
+pipeline can run without network access or an API key:
+
+    python stub_gemini.py --port 8765 --latency 0.5
+    GEMINI_ENDPOINT=http://localhost:8765/v1beta/models/stub:generateContent python main.py
+
+Images are served from http://localhost:8765/images/<name> (add ?size=N
+for a resized copy of the same picture); GET /stats returns how many calls
+and downloads were made.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image, ImageDraw
+
+_stats = {"generate_calls": 0, "image_downloads": 0, "inline_images": 0}
+_stats_lock = threading.Lock()
+
+
+def _canned_answer(payload: dict) -> str:
+    parts = payload["contents"][0]["parts"]
+    prompt = parts[0].get("text", "")
+    images = [part["inline_data"] for part in parts[1:] if "inline_data" in part]
+    digest = hashlib.sha256("".join(image["data"] for image in images).encode()).hexdigest()[:8]
+    text = f"Stub analysis of image {digest}: a product with visible features."
+
+    if payload.get("generationConfig", {}).get("responseMimeType") != "application/json":
+        return text
+    if '"long_description"' in prompt:
+        return json.dumps({
+            "title": f"Stub product {digest}",
+            "short_description": f"Stub tagline {digest}",
+            "long_description": f"Stub description {digest}. {text}",
+            "seo_keywords": ["stub", digest]
+        })
+    if '"detailed"' in prompt and '"caption"' in prompt:
+        return json.dumps({
+            "detailed": text,
+            "attributes": f"- Colors: stub-{digest}\n- Materials: plastic",
+            "caption": f"Stub caption {digest}"
+        })
+    return json.dumps({"description": text, "attributes": {"color": f"stub-{digest}"}})
+
+
+def _fake_image(name: str, size: int) -> bytes:
+    """A PNG picture determined by `name`, rendered at `size` x `size`"""
+    seed = hashlib.sha256(name.encode()).digest()
+    image = Image.new("RGB", (256, 256), tuple(seed[:3]))
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 24, 3):
+        x, y = seed[i] % 200, seed[i + 1] % 200
+        draw.ellipse((x, y, x + 40 + seed[i + 2] % 60, y + 40 + seed[i + 2] % 50), fill=tuple(seed[i:i + 3]))
+    if size != 256:
+        image = image.resize((size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path == "/stats":
+            with _stats_lock:
+                return self._send(200, json.dumps(_stats).encode())
+        if path.startswith("/images/"):
+            with _stats_lock:
+                _stats["image_downloads"] += 1
+            size = int(parse_qs(parsed.query).get("size", ["256"])[0])
+            return self._send(200, _fake_image(path[len("/images/"):], size), "image/png")
+        self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not urlparse(self.path).path.endswith(":generateContent"):
+            return self._send(404, b'{"error": "not found"}')
+        with _stats_lock:
+            _stats["generate_calls"] += 1
+            _stats["inline_images"] += sum(1 for part in payload["contents"][0]["parts"] if "inline_data" in part)
+        time.sleep(self.latency)
+        answer = {"candidates": [{"content": {"parts": [{"text": _canned_answer(payload)}]}}]}
+        self._send(200, json.dumps(answer).encode())
+
+
+def serve(port: int = 8765, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub in a background thread and return the server"""
+    StubGeminiHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Gemini API for offline runs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per generateContent call")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency)
+    print(f"🧪 Stub Gemini listening on http://127.0.0.1:{server.server_address[1]}")
+    print(f"   GEMINI_ENDPOINT=http://127.0.0.1:{server.server_address[1]}/v1beta/models/stub:generateContent")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,47 @@
+"""
+Runs the pipeline against stub_gemini.py, so no network access or API key is
+needed. Run from this directory: `python -m pytest`.
+"""
+import os
+
+# Before the agent's config is imported: no Redis, no request pacing, a dummy key
+os.environ["CACHE_ENABLED"] = "false"
+os.environ["GEMINI_API_KEY"] = "test-key"
+os.environ["GEMINI_REQUESTS_PER_SECOND"] = "0"
+
+import pytest  # noqa: E402
+
+import stub_gemini  # noqa: E402
+import services.gemini_integration as gemini_integration  # noqa: E402
+import services.image_processing as image_processing  # noqa: E402
+from services.image_buffer import ImageBufferCache  # noqa: E402
+
+
+class StubGemini:
+    def __init__(self, server):
+        self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def image_url(self, name):
+        return f"{self.base_url}/images/{name}"
+
+    def stats(self):
+        with stub_gemini._stats_lock:
+            return dict(stub_gemini._stats)
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    server = stub_gemini.serve(0)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def gemini_stub(stub_server, monkeypatch):
+    """The stub as the Gemini endpoint, with an empty image buffer cache."""
+    stub = StubGemini(stub_server)
+    monkeypatch.setattr(gemini_integration, "GEMINI_ENDPOINT", f"{stub.base_url}/v1beta/models/stub:generateContent")
+    buffers = ImageBufferCache(16 * 1024 * 1024)
+    monkeypatch.setattr(image_processing, "image_buffers", buffers)
+    monkeypatch.setattr(gemini_integration, "image_buffers", buffers)
+    return stub
@@ -0,0 +1,110 @@
+"""
+A batch runs end to end: submit_batch fans the products out as a chord
+(Celery in eager mode), generate_batch_item records each outcome,
+finalize_batch closes the batch and product_writer writes the successful
+results to a SQLite stand-in for the store's database.
+"""
+from datetime import datetime
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine, text
+
+import celery_tasks
+from celery_app import celery_app
+from core.batch_store import BatchStore, BATCH_COMPLETED
+from core.token_bucket import TokenBucket
+from services import product_writer
+
+
+@pytest.fixture
+def store_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'store.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE products (product_id INTEGER PRIMARY KEY, product_name VARCHAR(255),"
+            " product_description TEXT, updated_at DATETIME)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE product_meta (product_id INTEGER PRIMARY KEY REFERENCES products(product_id),"
+            " short_desc VARCHAR(255), full_desc TEXT, meta_title VARCHAR(100), meta_desc VARCHAR(255),"
+            " meta_keywords VARCHAR(255))"
+        ))
+        connection.execute(text(
+            "INSERT INTO products VALUES (1, 'Desk lamp', 'Old lamp text', '2020-01-01 00:00:00'),"
+            " (2, 'Mug', 'Old mug text', '2020-01-01 00:00:00'), (3, 'Chair', 'Old chair text', '2020-01-01 00:00:00')"
+        ))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def batch_env(gemini_stub, store_db, monkeypatch):
+    """Eager Celery, batch state and Gemini budget in fakeredis, write-back to `store_db`."""
+    server = fakeredis.FakeServer()
+    store = BatchStore(fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(celery_tasks, "batch_store", store)
+    monkeypatch.setattr(celery_tasks, "gemini_budget",
+                        TokenBucket("gemini_budget", 6000, 1000, client=fakeredis.FakeRedis(server=server)))
+    monkeypatch.setattr(product_writer, "PRODUCT_DATABASE_URI", "sqlite://")
+    monkeypatch.setattr(product_writer, "_engine", store_db)
+    monkeypatch.setitem(celery_app.conf, "task_always_eager", True)
+    return store
+
+
+def _products(gemini_stub, ids):
+    return [
+        {"product_id": product_id, "product_name": f"Product {product_id}",
+         "image_urls": [gemini_stub.image_url(f"batch-{product_id}.png")], "tone": "friendly"}
+        for product_id in ids
+    ]
+
+
+def test_batch_results_are_written_to_the_store(gemini_stub, batch_env, store_db, monkeypatch):
+    calls = {}
+    generate = celery_tasks.generate_product_description
+
+    def flaky_generate(**kwargs):
+        # Product 2 fails once and then succeeds; product 3 always fails
+        calls[kwargs["product_id"]] = calls.get(kwargs["product_id"], 0) + 1
+        if kwargs["product_id"] == "3" or (kwargs["product_id"] == "2" and calls["2"] == 1):
+            raise RuntimeError("generation failed")
+        return generate(**kwargs)
+
+    monkeypatch.setattr(celery_tasks, "generate_product_description", flaky_generate)
+    started = datetime.utcnow()
+
+    batch_id = celery_tasks.submit_batch(_products(gemini_stub, ["1", "2", "3"]), write_to_db=True)
+
+    batch = batch_env.get(batch_id)
+    assert batch["status"] == BATCH_COMPLETED
+    assert (batch["succeeded"], batch["failed"]) == (2, 1)
+    assert batch["db_write"] == {"products": 2, "product_meta": 2, "skipped": 1}
+    assert calls == {"1": 1, "2": 2, "3": celery_tasks.BATCH_ITEM_MAX_ATTEMPTS}
+
+    with store_db.connect() as connection:
+        products = {row.product_id: row for row in connection.execute(text("SELECT * FROM products"))}
+        meta = {row.product_id: row for row in connection.execute(text("SELECT * FROM product_meta"))}
+    for product_id in (1, 2):
+        assert products[product_id].product_description == meta[product_id].full_desc
+        assert products[product_id].product_description.startswith("Stub description")
+        assert meta[product_id].meta_keywords.startswith("stub, ")
+        # A new updated_at is what makes the store re-index and re-translate the product
+        assert datetime.fromisoformat(str(products[product_id].updated_at)) >= started.replace(microsecond=0)
+    assert products[3].product_description == "Old chair text"
+    assert str(products[3].updated_at).startswith("2020-01-01")
+    assert 3 not in meta
+
+    # One 'item' event per product, then 'done'
+    events = [fields["event"] for _, fields in batch_env.redis.xrange(batch_env.events_key(batch_id))]
+    assert events == ["item", "item", "item", "done"]
+
+
+def test_batch_without_write_back_leaves_the_store_alone(gemini_stub, batch_env, store_db):
+    batch_id = celery_tasks.submit_batch(_products(gemini_stub, ["1"]), write_to_db=False)
+
+    batch = batch_env.get(batch_id)
+    assert (batch["status"], batch["succeeded"]) == (BATCH_COMPLETED, 1)
+    assert "db_write" not in batch
+    with store_db.connect() as connection:
+        assert connection.execute(text("SELECT product_description FROM products WHERE product_id = 1")).scalar() == "Old lamp text"
@@ -0,0 +1,107 @@
+"""
+Image analysis cache: an in-process LRU in front of Redis, analyses keyed by
+the image's content digest so every URL of one image shares them, and
+near-duplicate lookups through perceptual-hash bands that stay bounded.
+"""
+import fakeredis
+import pytest
+
+import api
+import core.cache as cache_module
+from core.cache import LRUCache, RedisCache, _phash_band_key, _phash_bands
+
+PHASH = "f0f0f0f0f0f0f0f0"
+# Two bits away from PHASH
+NEAR_PHASH = "f0f0f0f0f0f0f0f3"
+# Half the bits flipped
+FAR_PHASH = "0f0f0f0f0f0f0f0f"
+
+
+@pytest.fixture
+def image_cache(monkeypatch):
+    """A RedisCache on fakeredis, with the stats endpoint pointed at it."""
+    image_cache = RedisCache()
+    # The suite runs with CACHE_ENABLED=false, which also turns the LRU tier off
+    image_cache.enabled = True
+    image_cache.local = LRUCache(16)
+    image_cache.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(api, "cache", image_cache)
+    return image_cache
+
+
+def test_lru_evicts_the_least_recently_used():
+    lru = LRUCache(2)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    assert lru.get("a") == "1"
+    lru.set("c", "3")
+
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == ("1", None, "3")
+    assert len(lru) == 2
+
+    disabled = LRUCache(0)
+    disabled.set("a", "1")
+    assert disabled.get("a") is None and len(disabled) == 0
+
+
+def test_urls_of_one_image_share_its_analysis(image_cache):
+    image_cache.set_image_analysis("https://cdn.example.com/a.jpg", "detailed", "A red mug", digest="d1")
+
+    # Another URL serving the same bytes finds it by digest, the first URL by its remembered digest
+    assert image_cache.get_image_analysis("https://mirror.example.com/a.jpg", "detailed", digest="d1") == "A red mug"
+    image_cache.local.clear()
+    assert image_cache.get_image_analysis("https://cdn.example.com/a.jpg", "detailed") == "A red mug"
+    assert image_cache.get_image_analysis("https://cdn.example.com/a.jpg", "caption") is None
+    assert image_cache.get_image_analysis("https://cdn.example.com/b.jpg", "detailed", digest="d2") is None
+
+    assert image_cache.image_stats == {
+        "lru_hits": 1, "redis_hits": 1, "near_duplicate_hits": 0, "misses": 1, "writes": 1
+    }
+
+
+def test_near_duplicates_reuse_an_analysis(image_cache):
+    image_cache.set_image_analysis("https://cdn.example.com/a.jpg", "detailed", "A red mug", digest="d1", phash=PHASH)
+
+    assert image_cache.get_image_analysis(
+        "https://cdn.example.com/a-resized.jpg", "detailed", digest="d2", phash=NEAR_PHASH
+    ) == "A red mug"
+    assert image_cache.get_image_analysis(
+        "https://cdn.example.com/other.jpg", "detailed", digest="d3", phash=FAR_PHASH
+    ) is None
+    assert image_cache.image_stats["near_duplicate_hits"] == 1
+
+
+def test_phash_bands_stay_bounded(image_cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "IMAGE_PHASH_BAND_MAX_ENTRIES", 3)
+    band_key = _phash_band_key(_phash_bands(PHASH)[0])
+    # Same first band, different everywhere else
+    phashes = [f"{PHASH[:3]}{i:013x}" for i in range(5)]
+    for i, phash in enumerate(phashes):
+        image_cache.set_image_analysis(f"https://cdn.example.com/{i}.jpg", "detailed", f"Image {i}", digest=f"d{i}", phash=phash)
+
+    assert image_cache.redis.zrange(band_key, 0, -1) == phashes[2:]
+
+    # Expired hashes are skipped by lookups and pruned by the next write to their band
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 2)
+    image_cache.set_image_analysis("https://cdn.example.com/new.jpg", "detailed", "New", digest="dn", phash=PHASH, ttl=1)
+    assert image_cache._find_near_duplicate(NEAR_PHASH, "detailed") == "New"
+
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 10)
+    assert image_cache._find_near_duplicate(NEAR_PHASH, "detailed") is None
+    image_cache.set_image_analysis("https://cdn.example.com/last.jpg", "detailed", "Last", digest="dl", phash=phashes[0])
+    assert PHASH not in image_cache.redis.zrange(band_key, 0, -1)
+
+
+def test_stats_endpoint_reports_every_tier(image_cache):
+    image_cache.set_image_analysis("https://cdn.example.com/a.jpg", "detailed", "A red mug", digest="d1")
+    image_cache.get_image_analysis("https://cdn.example.com/a.jpg", "detailed", digest="d1")
+    image_cache.get_image_analysis("https://cdn.example.com/b.jpg", "detailed", digest="d2")
+
+    route = next(route for route in api.app.routes if getattr(route, "path", None) == "/api/cache/image-analysis/stats")
+    stats = route.endpoint()
+
+    assert stats["all_workers"]["lru_hits"] == 1 and stats["all_workers"]["misses"] == 1
+    assert stats["hit_rate"] == 50.0
+    assert stats["lru_entries"] == 2
+    assert {"images", "bytes"} <= set(stats["image_buffers"])
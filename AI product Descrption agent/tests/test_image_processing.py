@@ -0,0 +1,45 @@
+"""
+process_images downloads and encodes each distinct image once, however often
+its URL is repeated, then makes three Gemini calls per image in "separate"
+mode or one in "combined" mode.
+"""
+import pytest
+
+import services.image_processing as image_processing
+from services.image_processing import process_images
+
+
+def _delta(before, after):
+    return {key: after[key] - before[key] for key in after}
+
+
+@pytest.mark.parametrize("mode,calls_per_image", [("separate", 3), ("combined", 1)])
+def test_duplicate_urls_are_downloaded_and_analysed_once(gemini_stub, monkeypatch, mode, calls_per_image):
+    monkeypatch.setattr(image_processing, "IMAGE_ANALYSIS_MODE", mode)
+    front, back = gemini_stub.image_url(f"{mode}-front.png"), gemini_stub.image_url(f"{mode}-back.png")
+
+    before = gemini_stub.stats()
+    result = process_images([front, back, front, front, back])
+    made = _delta(before, gemini_stub.stats())
+
+    assert made["image_downloads"] == 2
+    assert made["generate_calls"] == 2 * calls_per_image
+    # Every call carries exactly one inline image
+    assert made["inline_images"] == made["generate_calls"]
+    # One caption per URL given, repeated URLs sharing their image's analysis
+    captions = result["image_captions"].split(" | ")
+    assert len(captions) == 5
+    assert captions[0] == captions[2] == captions[3] != captions[1] == captions[4]
+    assert "Error" not in result["detailed_analysis"]
+
+
+def test_modes_give_the_same_analysis_per_image(gemini_stub, monkeypatch):
+    url = gemini_stub.image_url("same.png")
+    results = {}
+    for mode in ("separate", "combined"):
+        monkeypatch.setattr(image_processing, "IMAGE_ANALYSIS_MODE", mode)
+        # A fresh URL per mode, so the buffered download does not carry over
+        results[mode] = process_images([f"{url}?mode={mode}"])
+
+    assert results["separate"]["detailed_analysis"] == results["combined"]["detailed_analysis"]
+    assert results["separate"]["detailed_analysis"].startswith("Stub analysis of image")
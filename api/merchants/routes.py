@@ -7,6 +7,7 @@ from datetime import datetime
 import logging
 
 from auth.utils import merchant_role_required
+from auth.principal import invalidate_principal
 from common.decorators import rate_limit, cache_response
 from auth.models import User, MerchantProfile
 from auth.models.merchant_document import VerificationStatus, DocumentType, MerchantDocument
@@ -283,6 +284,7 @@ def create_profile():
         )
         
         merchant_profile.save()
+        invalidate_principal(merchant_id)
         
         return jsonify({
             "message": "Merchant profile created successfully",
@@ -10,6 +10,17 @@ import cloudinary.api
 from config import get_config
 from common.database import db
 from common.cache import cache
+from common.metrics import request_metrics
+from common.redis_registry import redis_registry
+from cli import register_commands
+from common.scheduler import app_scheduler
+from services.trending_service import TrendingService
+from services.stock_reservation_service import StockReservationService
+from services.catalog_translation_service import CatalogTranslationService
+from services.exchange_rate_service import exchange_rates
+from services.merchant_sales_rollup_service import MerchantSalesRollupService
+from services.effective_price_service import EffectivePriceService
+from services.search import ProductSearchService
 from auth.routes import auth_bp
 from auth.document_route import document_bp
 from auth.country_route import country_bp
@@ -178,10 +189,12 @@ def create_app(config_name='default'):
 
     # Initialize extensions
     db.init_app(app)
+    redis_registry.init_app(app)  # before the cache, which shares its pool
     cache.init_app(app)
     jwt = JWTManager(app)
     email_init.init_app(app)
     migrate = Migrate(app, db)
+    register_commands(app)
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -258,37 +271,42 @@ def create_app(config_name='default'):
     # Add custom headers to every response
     app.after_request(add_headers)
 
+    # Periodic maintenance jobs (scheduled per worker on the first request, each run claimed in Redis)
+    app_scheduler.init_app(app)
+    app_scheduler.add_interval_job('trending_refresh', TrendingService.refresh,
+                                   app.config.get('TRENDING_REFRESH_MINUTES', 15) * 60)
+    app_scheduler.add_interval_job('release_expired_stock', StockReservationService.release_expired,
+                                   app.config.get('STOCK_RESERVATION_SWEEP_SECONDS', 60))
+    app_scheduler.add_interval_job('exchange_rate_refresh', exchange_rates.refresh,
+                                   app.config.get('EXCHANGE_RATE_REFRESH_SECONDS', 3600))
+    app_scheduler.add_interval_job('sales_rollup_reconcile', MerchantSalesRollupService.reconcile,
+                                   app.config.get('SALES_ROLLUP_RECONCILE_SECONDS', 900))
+    app_scheduler.add_interval_job('effective_price_refresh', EffectivePriceService.refresh,
+                                   app.config.get('EFFECTIVE_PRICE_REFRESH_SECONDS', 300))
+    app_scheduler.add_interval_job('search_index_sync', ProductSearchService.sync_changed,
+                                   app.config.get('SEARCH_INDEX_SYNC_SECONDS', 60))
+    if app.config.get('FEATURE_TRANSLATION') and app.config.get('TRANSLATION_LOCALES'):
+        app_scheduler.add_interval_job('catalog_translation', CatalogTranslationService.sweep,
+                                       app.config.get('CATALOG_TRANSLATION_SWEEP_SECONDS', 600))
+
     # Add monitoring middleware
+    request_metrics.init_app(app)
+
     @app.before_request
     def before_request():
         request.start_time = time.time()
+        request_metrics.ensure_started()
+        app_scheduler.ensure_started()
 
     @app.after_request
     def after_request(response):
         if hasattr(request, 'start_time'):
             response_time = (time.time() - request.start_time) * 1000  # Convert to milliseconds
-            
-            # Get system metrics
-            process = psutil.Process()
-            memory_usage = process.memory_info().rss / 1024 / 1024  # Convert to MB
-            
-            # Get CPU usage with interval
-            try:
-                # Get CPU usage with a small interval to ensure accurate reading
-                cpu_usage = process.cpu_percent(interval=0.1)
-                if cpu_usage == 0:
-                    # If still 0, try getting system-wide CPU usage
-                    cpu_usage = psutil.cpu_percent(interval=0.1)
-            except Exception as e:
-                print(f"Error getting CPU usage: {str(e)}")
-                cpu_usage = 0
-            
-            # Determine status based on response status code
-            status = 'up'
-            if response.status_code >= 400:
-                status = 'error'
-                # Create error monitoring record for API errors
-                monitoring = SystemMonitoring.create_error_record(
+            request_metrics.record_request(request.endpoint, response_time, response.status_code)
+
+            if response.status_code >= 400 and not getattr(request, 'error_recorded', False):
+                # Error records are queued and written by the metrics flusher
+                request_metrics.record_error(
                     service_name=request.endpoint or 'unknown',
                     error_type=f'HTTP_{response.status_code}',
                     error_message=response.get_data(as_text=True),
@@ -296,24 +314,7 @@ def create_app(config_name='default'):
                     http_method=request.method,
                     http_status=response.status_code
                 )
-                db.session.add(monitoring)
-            else:
-                # Create normal service status record
-                monitoring = SystemMonitoring.create_service_status(
-                    service_name=request.endpoint or 'unknown',
-                    status=status,
-                    response_time=response_time,
-                    memory_usage=memory_usage,
-                    cpu_usage=cpu_usage
-                )
-                db.session.add(monitoring)
-            
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"Error saving monitoring data: {str(e)}")
-            
+
         return response
 
     @app.errorhandler(Exception)
@@ -323,8 +324,9 @@ def create_app(config_name='default'):
         error_message = str(error)
         error_stack = traceback.format_exc()
         
-        # Create error monitoring record
-        monitoring = SystemMonitoring.create_error_record(
+        # Queue error monitoring record
+        request.error_recorded = True
+        request_metrics.record_error(
             service_name=request.endpoint or 'unknown',
             error_type=error_type,
             error_message=error_message,
@@ -333,12 +335,6 @@ def create_app(config_name='default'):
             http_method=request.method,
             http_status=getattr(error, 'code', 500)
         )
-        try:
-            db.session.add(monitoring)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error saving error monitoring data: {str(e)}")
         
         # Return error response
         return jsonify({
@@ -370,35 +366,24 @@ def create_app(config_name='default'):
             SystemMonitoring.response_time.isnot(None)
         ).scalar() or 0
 
-        # Get error count for last hour
+        # Get error count for last hour (records of dropped errors carry their count)
         error_count = db.session.query(
-            db.func.count(SystemMonitoring.monitoring_id)
+            db.func.sum(db.func.coalesce(db.func.nullif(SystemMonitoring.request_count, 0), 1))
         ).filter(
             SystemMonitoring.timestamp >= one_hour_ago,
             SystemMonitoring.status == 'error'
         ).scalar() or 0
 
-        # Get current system metrics
-        process = psutil.Process()
-        memory_usage = process.memory_info().rss / 1024 / 1024
-        
-        # Get CPU usage with interval
-        try:
-            # Get CPU usage with a small interval to ensure accurate reading
-            cpu_usage = process.cpu_percent(interval=0.1)
-            if cpu_usage == 0:
-                # If still 0, try getting system-wide CPU usage
-                cpu_usage = psutil.cpu_percent(interval=0.1)
-        except Exception as e:
-            print(f"Error getting CPU usage: {str(e)}")
-            cpu_usage = 0
-
+        # Latest readings from the metrics sampler thread (no blocking interval here)
         return jsonify({
             'avg_response_time': round(avg_response, 2),
-            'error_count_last_hour': error_count,
-            'memory_usage_mb': round(memory_usage, 2),
-            'cpu_usage_percent': round(cpu_usage, 2),
-            'uptime_seconds': time.time() - psutil.boot_time()
+            'error_count_last_hour': int(error_count),
+            'memory_usage_mb': round(request_metrics.memory_usage, 2),
+            'cpu_usage_percent': round(request_metrics.cpu_usage, 2),
+            'uptime_seconds': time.time() - psutil.boot_time(),
+            'endpoints': request_metrics.snapshot(),
+            'dropped_error_records': request_metrics.dropped_error_count,
+            'redis_pools': redis_registry.stats()
         })
 
     # Test Redis cache endpoint
@@ -9,6 +9,7 @@ from authlib.integrations.flask_client import OAuth
 from common.database import db
 from auth.models import User, MerchantProfile, RefreshToken, EmailVerification, UserRole, AuthProvider
 from auth.utils import validate_google_token
+from auth.principal import principal_claims, revoke_principal
 from common.cache import cached, get_redis_client
 from auth.email_utils import send_verification_email, send_password_reset_email
 
@@ -140,8 +141,7 @@ def login_user(data):
         if not user_to_check.is_email_verified:
             return {"error_code": "EMAIL_NOT_VERIFIED", "message": "Please verify your email address to log in.", "email": user_to_check.email}, 403
         user_to_check.update_last_login()
-        additional_claims = {"role": user_to_check.role.value}
-        access_token = create_access_token(identity=str(user_to_check.id), additional_claims=additional_claims)
+        access_token = create_access_token(identity=str(user_to_check.id), additional_claims=principal_claims(user_to_check))
         refresh_expires = datetime.utcnow() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
         refresh_token_str = RefreshToken.create_token(user_to_check.id, refresh_expires)
         login_message = "Merchant login successful" if is_business_login and user_to_check.role == UserRole.MERCHANT else "Login successful"
@@ -173,8 +173,12 @@ def refresh_access_token(token):
             refresh_token.revoke()
             return {"error": "Refresh token expired"}, 401
         
+        user = User.get_by_id(refresh_token.user_id)
+        if not user:
+            return {"error": "Invalid refresh token"}, 401
+        
         # Generate new access token
-        access_token = create_access_token(identity=str(refresh_token.user_id))
+        access_token = create_access_token(identity=str(user.id), additional_claims=principal_claims(user))
         
         return {
             "access_token": access_token
@@ -281,8 +285,7 @@ def google_auth(token_data):
         # Update last login timestamp
         user.update_last_login()
         # Generate tokens
-        access_token = create_access_token(identity=str(user.id))
-        access_token = create_access_token(identity=str(user.id))        
+        access_token = create_access_token(identity=str(user.id), additional_claims=principal_claims(user))
         refresh_expires = datetime.utcnow() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
         refresh_token = RefreshToken.create_token(user.id, refresh_expires)
         return {
@@ -389,6 +392,7 @@ def reset_password(token, new_password):
         RefreshToken.revoke_all_for_user(user.id)
         
         db.session.commit()
+        revoke_principal(user.id)
         
         return {"message": "Password reset successfully"}, 200
     except Exception as e:
@@ -584,6 +588,7 @@ def change_password(user_id, old_password, new_password):
         RefreshToken.revoke_all_for_user(user.id)
         
         db.session.commit()
+        revoke_principal(user.id)
         
         return {"message": "Password changed successfully"}, 200
         
@@ -0,0 +1,192 @@
+"""
+Request principal: who is calling, resolved once per request.
+
+Access tokens carry the user's role and merchant profile id as signed claims
+(see principal_claims). On each authenticated request the claims are checked
+against a short-lived per-user status entry in Redis (active flag, role and
+merchant id, loaded from the database on a miss) plus a revocation stamp, and
+the result is kept on `g.principal` for the decorators and handlers that run
+after it. With a warm status entry, resolving the caller costs no queries.
+
+Call invalidate_principal() after changing a user's role, active flag or
+merchant profile, and revoke_principal() to reject every access token issued
+to the user so far (deactivation, password reset).
+"""
+import json
+import time
+import logging
+
+import redis
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from auth.models.models import MerchantProfile, User
+from common.cache import get_redis_client
+from common.database import db
+
+logger = logging.getLogger(__name__)
+
+STATUS_KEY = 'principal:status:{}'
+REVOKED_KEY = 'principal:revoked:{}'
+
+
+class PrincipalError(Exception):
+    """The request's token can't be turned into a principal; carries the HTTP status."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class Principal:
+    """The authenticated caller: user id, role value and merchant profile id (if any)."""
+
+    __slots__ = ('user_id', 'role', 'merchant_id', '_user')
+
+    def __init__(self, user_id, role, merchant_id=None):
+        self.user_id = user_id
+        self.role = role
+        self.merchant_id = merchant_id
+        self._user = None
+
+    def has_role(self, roles):
+        return self.role in roles
+
+    @property
+    def user(self):
+        """The User row, loaded on first access for handlers that need more than the ids."""
+        if self._user is None:
+            self._user = db.session.get(User, self.user_id)
+        return self._user
+
+    def __repr__(self):
+        return f"<Principal user_id={self.user_id} role='{self.role}' merchant_id={self.merchant_id}>"
+
+
+def principal_claims(user):
+    """Additional JWT claims for an access token issued to `user`."""
+    merchant = MerchantProfile.query.with_entities(MerchantProfile.id).filter_by(user_id=user.id).first()
+    return {
+        'role': user.role.value,
+        'merchant_id': merchant.id if merchant else None
+    }
+
+
+def _load_status(user_id):
+    row = db.session.query(
+        User.role, User.is_active, MerchantProfile.id
+    ).outerjoin(
+        MerchantProfile, MerchantProfile.user_id == User.id
+    ).filter(
+        User.id == user_id
+    ).first()
+    if row is None:
+        return {'missing': True}
+    role, is_active, merchant_id = row
+    return {'role': role.value, 'active': bool(is_active), 'merchant_id': merchant_id}
+
+
+def get_user_status(user_id):
+    """
+    (status, not_before) for a user: the cached status entry and the time
+    before which its tokens are revoked (0 if never). Falls back to the
+    database, without revocation, while Redis is unavailable.
+    """
+    client = get_redis_client(current_app)
+    if client is None:
+        return _load_status(user_id), 0
+    status_key = STATUS_KEY.format(user_id)
+    try:
+        raw_status, raw_revoked = client.mget([status_key, REVOKED_KEY.format(user_id)])
+    except redis.RedisError as e:
+        logger.warning(f"Could not read principal status from Redis: {str(e)}")
+        return _load_status(user_id), 0
+    not_before = int(raw_revoked) if raw_revoked else 0
+    if raw_status:
+        return json.loads(raw_status), not_before
+
+    status = _load_status(user_id)
+    try:
+        client.setex(status_key, current_app.config.get('PRINCIPAL_STATUS_TTL_SECONDS', 60), json.dumps(status))
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache principal status: {str(e)}")
+    return status, not_before
+
+
+def invalidate_principal(user_id):
+    """Drop the cached status so the next request reloads it."""
+    client = get_redis_client(current_app)
+    if client is None:
+        return
+    try:
+        client.delete(STATUS_KEY.format(user_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not invalidate principal status for user {user_id}: {str(e)}")
+
+
+def revoke_principal(user_id):
+    """Reject every access token issued to the user before now."""
+    client = get_redis_client(current_app)
+    if client is None:
+        logger.warning(f"Redis unavailable; access tokens of user {user_id} were not revoked")
+        return
+    expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    ttl = int(expires.total_seconds()) if hasattr(expires, 'total_seconds') else int(expires or 3600)
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.setex(REVOKED_KEY.format(user_id), max(ttl, 1), int(time.time()))
+        pipe.delete(STATUS_KEY.format(user_id))
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not revoke access tokens of user {user_id}: {str(e)}")
+
+
+def get_principal():
+    """
+    The current request's Principal, resolving and caching it on first use.
+
+    Raises PrincipalError when the token is revoked or out of date, or the
+    user no longer exists or is disabled; JWT errors propagate as usual.
+    """
+    principal = g.get('principal')
+    if principal is not None:
+        return principal
+
+    verify_jwt_in_request()
+    try:
+        user_id = int(get_jwt_identity())
+    except (TypeError, ValueError):
+        raise PrincipalError('Invalid user ID in token', 401)
+    claims = get_jwt()
+
+    status, not_before = get_user_status(user_id)
+    if status.get('missing'):
+        raise PrincipalError('User not found', 404)
+    if not status.get('active'):
+        raise PrincipalError('Account is disabled', 403)
+    if not_before and int(claims.get('iat', 0)) < not_before:
+        raise PrincipalError('Token has been revoked', 401)
+    # Tokens issued before a role or merchant change must be replaced. Tokens
+    # without the claims, or issued before the merchant profile existed, take
+    # them from the status.
+    if claims.get('role') is not None and claims['role'] != status['role']:
+        raise PrincipalError('Token is out of date, please sign in again', 401)
+    if claims.get('merchant_id') is not None and claims['merchant_id'] != status['merchant_id']:
+        raise PrincipalError('Token is out of date, please sign in again', 401)
+
+    principal = Principal(user_id, status['role'], status['merchant_id'])
+    g.principal = principal
+    return principal
+
+
+def current_merchant_id(user_id):
+    """
+    Merchant profile id of `user_id`: from the request principal when it is
+    that user, otherwise looked up.
+    """
+    principal = g.get('principal')
+    if principal is not None and principal.user_id == int(user_id):
+        return principal.merchant_id
+    merchant = MerchantProfile.query.with_entities(MerchantProfile.id).filter_by(user_id=user_id).first()
+    return merchant.id if merchant else None
@@ -9,6 +9,7 @@ from auth.controllers import (
     resend_verification_email_controller
 )
 from auth.utils import user_role_required, merchant_role_required, admin_role_required
+from auth.principal import principal_claims
 from auth.models import User, MerchantProfile
 from auth.models.merchant_document import MerchantDocument
 from auth.models.country_config import CountryConfig, CountryCode
@@ -621,10 +622,7 @@ def verify_email_route(token):
             return jsonify({"error": "User not found"}), 404
             
         # Generate tokens
-        access_token = create_access_token(identity=str(user.id))
-        refresh_token = create_refresh_token(identity=str(user.id))
-        # after
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(identity=str(user.id), additional_claims=principal_claims(user))
 
         refresh_token = create_refresh_token(identity=str(user.id))
         
@@ -4,6 +4,7 @@ from functools import wraps
 from flask import request, jsonify, current_app
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from auth.models import User, UserRole, RefreshToken
+from auth.principal import PrincipalError, get_principal
 import cloudinary.uploader
 import cloudinary.api
 from werkzeug.utils import secure_filename
@@ -57,19 +58,14 @@ def role_required(required_roles):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            # Verify JWT token
-            verify_jwt_in_request()
-            
-            # Get current user identity
-            current_user_id = get_jwt_identity()
-            
-            # Get user from database
-            user = User.get_by_id(current_user_id)
-            if not user:
-                return jsonify({"error": "User not found"}), 404
+            # Verify the JWT and resolve the caller (cached status, no user query)
+            try:
+                principal = get_principal()
+            except PrincipalError as e:
+                return jsonify({"error": e.message}), e.status_code
             
             # Check if user has required role
-            if user.role.value not in required_roles:
+            if not principal.has_role(required_roles):
                 return jsonify({"error": "Insufficient permissions"}), 403
             
             return fn(*args, **kwargs)
@@ -0,0 +1,104 @@
+"""
+Flask CLI commands for maintenance jobs.
+
+Registered in create_app(); run with e.g. `flask --app app reconcile-ratings`.
+"""
+
+import click
+
+
+def register_commands(app):
+    """Attach maintenance commands to the Flask CLI."""
+
+    @app.cli.command('reconcile-ratings')
+    @click.option('--batch-size', default=500, show_default=True, help='Products processed per batch.')
+    def reconcile_ratings(batch_size):
+        """Backfill/reconcile product rating aggregates from the reviews table."""
+        from services.product_rating_service import ProductRatingService
+
+        written = ProductRatingService.reconcile(batch_size=batch_size)
+        click.echo(f"Reconciled rating aggregates for {written} products.")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Rebuild the product search index from the products table."""
+        from services.search import ProductSearchService
+
+        count = ProductSearchService.rebuild()
+        click.echo(f"Indexed {count} products.")
+
+    @app.cli.command('refresh-trending')
+    @click.option('--window-days', default=None, type=int, help='Ranking window (defaults to TRENDING_WINDOW_DAYS).')
+    def refresh_trending(window_days):
+        """Recompute the global and per-category trending product leaderboards."""
+        from services.trending_service import TrendingService
+
+        count = TrendingService.refresh(window_days=window_days)
+        click.echo(f"Wrote {count} trending leaderboard rows.")
+
+    @app.cli.command('rebuild-sales-rollup')
+    @click.option('--since', default=None, type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='First day to rebuild (defaults to the first order).')
+    @click.option('--chunk-days', default=31, show_default=True, help='Days rebuilt per transaction.')
+    def rebuild_sales_rollup(since, chunk_days):
+        """Rebuild the merchant daily sales rollup from the order tables."""
+        from services.merchant_sales_rollup_service import MerchantSalesRollupService
+
+        count = MerchantSalesRollupService.backfill(since=since.date() if since else None, chunk_days=chunk_days)
+        click.echo(f"Wrote {count} merchant daily sales rows.")
+
+    @app.cli.command('refresh-effective-prices')
+    @click.option('--full', is_flag=True, help='Check every product, not only windows crossed since the last run.')
+    def refresh_effective_prices(full):
+        """Recompute stored effective prices whose special-price window opened or closed."""
+        from services.effective_price_service import EffectivePriceService
+
+        count = EffectivePriceService.refresh(full=full)
+        click.echo(f"Updated effective prices of {count} products.")
+
+    @app.cli.command('hash-variant-attributes')
+    @click.option('--batch-size', default=500, show_default=True, help='Variants hashed per transaction.')
+    def hash_variant_attributes(batch_size):
+        """Set the attribute-combination hash on shop variants created before it existed."""
+        from services.shop_variant_matrix_service import ShopVariantMatrixService
+
+        hashed, duplicates = ShopVariantMatrixService.backfill_hashes(batch_size=batch_size)
+        click.echo(f"Hashed {hashed} variants.")
+        if duplicates:
+            click.echo(f"Left {len(duplicates)} duplicate combinations unhashed (variant ids: {duplicates}).")
+
+    @app.cli.command('release-expired-reservations')
+    def release_expired_reservations():
+        """Cancel unpaid orders whose stock hold expired and restock their items."""
+        from services.stock_reservation_service import StockReservationService
+
+        count = StockReservationService.release_expired()
+        click.echo(f"Released stock for {count} expired orders.")
+
+    @app.cli.command('translate-catalog')
+    @click.option('--batch-size', default=100, show_default=True, help='Products translated per batch.')
+    def translate_catalog(batch_size):
+        """Pre-translate approved/published catalog text into TRANSLATION_LOCALES."""
+        from services.catalog_translation_service import CatalogTranslationService
+
+        if not CatalogTranslationService.is_enabled():
+            click.echo("Set FEATURE_TRANSLATION and TRANSLATION_LOCALES first.")
+            return
+        total = 0
+        while True:
+            processed = CatalogTranslationService.sweep(batch_size=batch_size)
+            if not processed:
+                break
+            total += processed
+        click.echo(f"Brought {total} products up to date in {', '.join(CatalogTranslationService.locales())}.")
+
+    @app.cli.command('refresh-exchange-rates')
+    def refresh_exchange_rates():
+        """Fetch the latest exchange rates into Redis now."""
+        from services.exchange_rate_service import exchange_rates
+
+        count = exchange_rates.refresh(force=True)
+        if count:
+            click.echo(f"Stored exchange rates for {count} currencies.")
+        else:
+            click.echo("Exchange rate refresh failed; the last known good rates are kept.")
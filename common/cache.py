@@ -1,20 +1,28 @@
 import json
+import time
+import uuid
+import logging
 import functools
+import threading
+from flask import current_app
 from flask_caching import Cache
-import redis
+
+from common.redis_registry import redis_registry
+
+logger = logging.getLogger(__name__)
 
 # Initialize Flask-Caching extension
 cache = Cache()
 
 def get_redis_client(app=None):
-    """Get Redis client based on app config or environment variables."""
-    if app and app.config.get('REDIS_URL'):
-        redis_url = app.config.get('REDIS_URL')
-    else:
-        # Fallback to default local Redis
-        redis_url = 'redis://localhost:6379/0'
-    
-    return redis.from_url(redis_url)
+    """
+    Pooled Redis client from the shared registry (see common.redis_registry).
+
+    Returns None while the circuit breaker for Redis is open, so callers skip
+    Redis instead of waiting on a connect timeout.
+    """
+    redis_url = app.config.get('REDIS_URL') if app else None
+    return redis_registry.get_client(redis_url)
 
 def cache_key_prefix(key_prefix):
     """Create a cache key prefix for differentiating cached data types."""
@@ -59,4 +67,71 @@ def cached(timeout=300, key_prefix='default'):
             
             return result
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
+
+class VersionedLocalCache:
+    """
+    Per-process cached value kept coherent across workers by a version stamp.
+
+    `loader(version)` builds the value from the database. invalidate() drops the
+    local copy and writes a new stamp under `version_key` in the shared cache;
+    other workers compare stamps at most every `check_seconds` and reload when
+    it changed. `max_age` bounds staleness when the shared cache is unreachable.
+    Both intervals are read from the app config under the given keys.
+    """
+
+    def __init__(self, version_key, loader, check_seconds_config, max_age_config):
+        self.version_key = version_key
+        self.loader = loader
+        self.check_seconds_config = check_seconds_config
+        self.max_age_config = max_age_config
+        self._value = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _shared_version(self):
+        try:
+            return cache.get(self.version_key)
+        except Exception as e:
+            logger.warning(f"Could not read cache version {self.version_key}: {str(e)}")
+            return None
+
+    def _is_fresh(self, now, check_every, max_age):
+        return (
+            self._value is not None
+            and now - self._checked_at < check_every
+            and now - self._loaded_at < max_age
+        )
+
+    def get(self):
+        config = current_app.config
+        check_every = config.get(self.check_seconds_config, 5)
+        max_age = config.get(self.max_age_config, 300)
+        if self._is_fresh(time.monotonic(), check_every, max_age):
+            return self._value
+
+        with self._lock:
+            now = time.monotonic()
+            if self._is_fresh(now, check_every, max_age):
+                return self._value
+            version = self._shared_version()
+            if (self._value is not None and now - self._loaded_at < max_age
+                    and (version is None or version == self._version)):
+                self._checked_at = now
+                return self._value
+            value = self.loader(version)
+            now = time.monotonic()
+            self._value, self._version = value, version
+            self._loaded_at = self._checked_at = now
+            return value
+
+    def invalidate(self):
+        """Drop this worker's copy and tell the other workers to reload theirs."""
+        with self._lock:
+            self._value = None
+        try:
+            cache.set(self.version_key, uuid.uuid4().hex, timeout=0)
+        except Exception as e:
+            logger.warning(f"Could not publish cache version {self.version_key}: {str(e)}")
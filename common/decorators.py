@@ -1,85 +1,63 @@
-import time
+import math
 import functools
 import json
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, make_response
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from functools import wraps
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 from auth.models.models import User, UserRole
-import jwt
+from auth.principal import PrincipalError, get_principal
+import redis
 
 from common.cache import get_redis_client
+from common.rate_limit import rate_limiter
 
-def rate_limit(limit=100, per=60, key_prefix='rl'):
+def rate_limit(limit=100, per=60, key_prefix='rl', tiers=None):
     """
-    Rate limiting decorator.
+    Rate limiting decorator (sliding window, see common.rate_limit).
     
     Args:
         limit (int): Maximum number of requests allowed within time period
         per (int): Time period in seconds
         key_prefix (str): Redis key prefix for rate limit counters
+        tiers (dict): Optional per-tier overrides, e.g. {'anonymous': (20, 60), 'admin': None};
+            other tiers get `limit` scaled by RATE_LIMIT_TIER_MULTIPLIERS
     """
     def decorator(f):
         @functools.wraps(f)
         def wrapped(*args, **kwargs):
-            # Get client IP or use JWT identity if available
-            try:
-                verify_jwt_in_request(optional=True)
-                user_id = get_jwt_identity()
-                if user_id:
-                    key = f"{key_prefix}:user:{user_id}"
-                else:
-                    key = f"{key_prefix}:ip:{request.remote_addr}"
-            except:
-                key = f"{key_prefix}:ip:{request.remote_addr}"
-            
-            # Get Redis client
-            redis_client = get_redis_client(current_app)
-            if not redis_client:
-                # If Redis is not available, skip rate limiting
+            if not current_app.config.get('RATE_LIMIT_ENABLED', True):
                 return f(*args, **kwargs)
-            
-            # Get current counter and timestamp
-            current = time.time()
-            p = redis_client.pipeline()
-            p.get(key)
-            p.get(f"{key}:ts")
-            count, timestamp = p.execute()
-            
-            # Initialize counter if not exists
-            if not count:
-                count = 0
-            else:
-                count = int(count)
-            
-            # Initialize timestamp if not exists
-            if not timestamp:
-                timestamp = current
-            else:
-                timestamp = float(timestamp)
-            
-            # Reset counter if outside time window
-            time_passed = current - float(timestamp)
-            if time_passed > per:
-                count = 0
-                timestamp = current
-            
+
+            # JWT identity (and its role tier) if available, client IP otherwise
+            tier, identity = rate_limiter.current_identity()
+            policy = rate_limiter.policy_for(tier, limit, per, tiers)
+            if policy is None:
+                return f(*args, **kwargs)
+
+            # Counters are per route, so each endpoint has its own window
+            key = f"{key_prefix}:{request.endpoint}:{identity}"
+            result = rate_limiter.hit(key, policy.limit, policy.per)
+            headers = {
+                'X-RateLimit-Limit': str(result.limit),
+                'X-RateLimit-Remaining': str(result.remaining),
+            }
+
             # Check if limit exceeded
-            if count >= limit:
+            if not result.allowed:
+                retry_after = max(int(math.ceil(result.retry_after)), 1)
+                headers['Retry-After'] = str(retry_after)
                 response = {
                     "error": "Rate limit exceeded",
-                    "retry_after": int(per - time_passed)
+                    "retry_after": retry_after
                 }
-                return jsonify(response), 429
-            
-            # Increment counter
-            p = redis_client.pipeline()
-            p.incr(key)
-            p.setex(key, per, count + 1)
-            p.setex(f"{key}:ts", per, timestamp)
-            p.execute()
-            
+                return jsonify(response), 429, headers
+
             # Continue with request
-            return f(*args, **kwargs)
+            response = make_response(f(*args, **kwargs))
+            response.headers.extend(headers)
+            return response
         return wrapped
     return decorator
 
@@ -98,7 +76,7 @@ def cache_response(timeout=300, key_prefix='cache'):
             if request.method != 'GET':
                 return f(*args, **kwargs)
             
-            # Get Redis client
+            # Pooled client; None while the Redis circuit is open
             redis_client = get_redis_client(current_app)
             if not redis_client:
                 # If Redis is not available, skip caching
@@ -110,7 +88,11 @@ def cache_response(timeout=300, key_prefix='cache'):
             key = f"{key_prefix}:{path}:{query}"
             
             # Try to get from cache
-            cached_response = redis_client.get(key)
+            try:
+                cached_response = redis_client.get(key)
+            except redis.RedisError:
+                # Redis went away mid-request; serve uncached
+                return f(*args, **kwargs)
             if cached_response:
                 return jsonify(json.loads(cached_response)), 200
             
@@ -120,7 +102,10 @@ def cache_response(timeout=300, key_prefix='cache'):
             # Cache response if status code is 200
             if status_code == 200:
                 data_to_cache = response_obj.get_json()
-                redis_client.setex(key, timeout, json.dumps(data_to_cache))
+                try:
+                    redis_client.setex(key, timeout, json.dumps(data_to_cache))
+                except redis.RedisError:
+                    pass
             
             return response_obj, status_code
         return wrapped
@@ -129,9 +114,11 @@ def cache_response(timeout=300, key_prefix='cache'):
 def merchant_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or user.role != UserRole.MERCHANT:
+        try:
+            principal = get_principal()
+        except PrincipalError:
+            return jsonify({"error": "Merchant access required"}), 403
+        if principal.role != UserRole.MERCHANT.value:
             return jsonify({"error": "Merchant access required"}), 403
         return fn(*args, **kwargs)
     return wrapper
@@ -139,41 +126,21 @@ def merchant_required(fn):
 def super_admin_role_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Invalid token format'}), 401
-
-        if not token:
+        if 'Authorization' not in request.headers:
             return jsonify({'message': 'Token is missing'}), 401
 
+        # The caller is available to handlers as g.principal
         try:
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            # The identity is stored in the 'sub' claim by default in JWT
-            user_id = data.get('sub')
-            if not user_id:
-                return jsonify({'message': 'Invalid token: missing user ID'}), 401
-
-            current_user = User.query.filter_by(id=int(user_id)).first()
-
-            if not current_user:
-                return jsonify({'message': 'User not found'}), 404
-
-            if current_user.role != UserRole.SUPER_ADMIN:
-                return jsonify({'message': 'Unauthorized access'}), 403
-
-            # Add the current user to the request context
-            request.current_user = current_user
-
-        except jwt.ExpiredSignatureError:
+            principal = get_principal()
+        except PrincipalError as e:
+            return jsonify({'message': e.message}), e.status_code
+        except ExpiredSignatureError:
             return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
+        except (InvalidTokenError, JWTExtendedException):
             return jsonify({'message': 'Invalid token'}), 401
-        except ValueError:
-            return jsonify({'message': 'Invalid user ID format'}), 401
+
+        if principal.role != UserRole.SUPER_ADMIN.value:
+            return jsonify({'message': 'Unauthorized access'}), 403
 
         return f(*args, **kwargs)
 
@@ -0,0 +1,77 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from common.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class AppContextExecutor:
+    """
+    Bounded thread pool for fanning work out of a request.
+
+    Every task runs inside its own application context and therefore gets its
+    own database session, which is rolled back on error and removed when the
+    task finishes. The pool is created lazily in each process and sized from
+    the `workers_setting` config key.
+    """
+
+    def __init__(self, name, workers_setting, default_workers=4):
+        self.name = name
+        self.workers_setting = workers_setting
+        self.default_workers = default_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def max_workers(self):
+        return max(int(current_app.config.get(self.workers_setting, self.default_workers)), 1)
+
+    def _get_executor(self):
+        # Worker threads do not survive a fork, so each process builds its own pool
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers(),
+                        thread_name_prefix=self.name
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    @staticmethod
+    def _run(app, func, args, kwargs):
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def submit(self, func, *args, **kwargs):
+        """Run `func` on the pool in a copy of the current app's context; returns a Future."""
+        app = current_app._get_current_object()
+        return self._get_executor().submit(self._run, app, func, args, kwargs)
+
+    def map_settled(self, func, items):
+        """
+        Call `func(item)` for every item concurrently and wait for all of them.
+
+        Returns the results in order; a call that raised gets its exception in
+        place of a result, so one failure never hides the others.
+        """
+        items = list(items)
+        futures = [self.submit(func, item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
@@ -0,0 +1,290 @@
+import os
+import random
+import logging
+import threading
+from collections import deque
+
+import psutil
+
+from common.database import db
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open ended.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Error records over METRICS_MAX_ERROR_RECORDS are counted per kind and
+# written as one record carrying the count in request_count
+DROPPED_ERROR_FIELDS = ('service_name', 'error_type', 'endpoint', 'http_method', 'http_status')
+
+
+class EndpointStats:
+    """Aggregated latency/count statistics for one endpoint in one flush window."""
+
+    __slots__ = ('count', 'error_count', 'total_ms', 'success_ms', 'min_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.total_ms = 0.0
+        self.success_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, duration_ms, is_error, weight=1):
+        self.count += weight
+        if is_error:
+            self.error_count += weight
+        else:
+            self.success_ms += duration_ms * weight
+        self.total_ms += duration_ms * weight
+        self.min_ms = duration_ms if self.min_ms is None else min(self.min_ms, duration_ms)
+        self.max_ms = duration_ms if self.max_ms is None else max(self.max_ms, duration_ms)
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                index = i
+                break
+        self.buckets[index] += weight
+
+    def merge(self, other):
+        self.count += other.count
+        self.error_count += other.error_count
+        self.total_ms += other.total_ms
+        self.success_ms += other.success_ms
+        if other.min_ms is not None:
+            self.min_ms = other.min_ms if self.min_ms is None else min(self.min_ms, other.min_ms)
+        if other.max_ms is not None:
+            self.max_ms = other.max_ms if self.max_ms is None else max(self.max_ms, other.max_ms)
+        for i, value in enumerate(other.buckets):
+            self.buckets[i] += value
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    @property
+    def success_avg_ms(self):
+        success_count = self.count - self.error_count
+        return self.success_ms / success_count if success_count > 0 else 0.0
+
+    def percentile(self, pct):
+        """Approximate percentile from the histogram (upper bound of the bucket)."""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100.0
+        seen = 0
+        for i, value in enumerate(self.buckets):
+            seen += value
+            if seen >= target:
+                if i < len(LATENCY_BUCKETS_MS):
+                    return float(min(LATENCY_BUCKETS_MS[i], self.max_ms))
+                return float(self.max_ms)
+        return float(self.max_ms)
+
+    def serialize(self):
+        return {
+            'request_count': int(round(self.count)),
+            'error_count': int(round(self.error_count)),
+            'avg_ms': round(self.avg_ms, 2),
+            'min_ms': round(self.min_ms or 0, 2),
+            'max_ms': round(self.max_ms or 0, 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99)
+        }
+
+
+class RequestMetricsCollector:
+    """
+    In-process request metrics pipeline.
+
+    Request hooks only append a tuple to a deque (atomic under the GIL, no lock
+    on the hot path). A flusher thread drains the deque every
+    METRICS_FLUSH_INTERVAL seconds, aggregates it per endpoint and writes one
+    SystemMonitoring row per endpoint plus any queued error records in a single
+    commit; errors past METRICS_MAX_ERROR_RECORDS in a window are counted
+    rather than queued and written as one record per kind. A sampler thread keeps the latest CPU/RSS readings so requests never
+    block on psutil.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.flush_interval = 30
+        self.sample_interval = 5
+        self.max_error_records = 200
+        self._events = deque()
+        self._errors = deque()
+        self._dropped = {}
+        self._dropped_lock = threading.Lock()
+        self.dropped_error_count = 0
+        self._totals = {}
+        self._totals_lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+        self._process = None
+        self.cpu_usage = 0.0
+        self.memory_usage = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.sample_rate = float(app.config.get('METRICS_SAMPLE_RATE', 1.0))
+        self.flush_interval = float(app.config.get('METRICS_FLUSH_INTERVAL', 30))
+        self.sample_interval = float(app.config.get('METRICS_CPU_SAMPLE_INTERVAL', 5))
+        self.max_error_records = int(app.config.get('METRICS_MAX_ERROR_RECORDS', 200))
+        app.extensions['request_metrics'] = self
+
+    def ensure_started(self):
+        """Start the background threads once per worker process (safe after fork)."""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._totals_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._events = deque()
+            self._errors = deque()
+            self._dropped = {}
+            self._stop = threading.Event()
+            self._process = psutil.Process()
+            # Prime cpu_percent so the first sample is meaningful
+            self._process.cpu_percent(interval=None)
+            threading.Thread(target=self._sample_loop, name='metrics-sampler', daemon=True).start()
+            threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def record_request(self, endpoint, duration_ms, status_code):
+        """Record one request. Errors are always recorded, successes are sampled."""
+        if not self.enabled:
+            return
+        is_error = status_code >= 400
+        if not is_error and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                return
+            weight = 1.0 / self.sample_rate
+        else:
+            weight = 1
+        self._events.append((endpoint or 'unknown', duration_ms, is_error, weight))
+
+    def record_error(self, **fields):
+        """Queue a SystemMonitoring error record to be written by the flusher."""
+        if not self.enabled:
+            return
+        if len(self._errors) < self.max_error_records:
+            self._errors.append(fields)
+            return
+        key = tuple(fields.get(name) for name in DROPPED_ERROR_FIELDS)
+        with self._dropped_lock:
+            self._dropped[key] = self._dropped.get(key, 0) + 1
+            self.dropped_error_count += 1
+
+    def snapshot(self):
+        """Cumulative per-endpoint stats for this worker since start-up."""
+        with self._totals_lock:
+            return {endpoint: stats.serialize() for endpoint, stats in self._totals.items()}
+
+    def _sample_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.memory_usage = self._process.memory_info().rss / 1024 / 1024  # MB
+                self.cpu_usage = self._process.cpu_percent(interval=None)
+            except Exception as e:
+                logger.warning(f"Error sampling process metrics: {str(e)}")
+            self._stop.wait(self.sample_interval)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _drain(self):
+        window = {}
+        events = self._events
+        while True:
+            try:
+                endpoint, duration_ms, is_error, weight = events.popleft()
+            except IndexError:
+                break
+            stats = window.get(endpoint)
+            if stats is None:
+                stats = window[endpoint] = EndpointStats()
+            stats.add(duration_ms, is_error, weight)
+
+        errors = []
+        while True:
+            try:
+                errors.append(self._errors.popleft())
+            except IndexError:
+                break
+
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, {}
+        return window, errors, dropped
+
+    def flush(self):
+        """Aggregate pending events and write them in one batch."""
+        window, errors, dropped = self._drain()
+        if not window and not errors and not dropped:
+            return 0
+
+        with self._totals_lock:
+            for endpoint, stats in window.items():
+                total = self._totals.get(endpoint)
+                if total is None:
+                    total = self._totals[endpoint] = EndpointStats()
+                total.merge(stats)
+
+        if self.app is None:
+            return 0
+
+        # Imported here to avoid a circular import with models at start-up
+        from models.system_monitoring import SystemMonitoring
+
+        rows = []
+        for endpoint, stats in window.items():
+            # Failed requests are persisted as individual error records below, so
+            # the 'up' row only carries the successful requests and their latency
+            success_count = int(round(stats.count - stats.error_count))
+            if success_count <= 0:
+                continue
+            row = SystemMonitoring.create_service_status(
+                service_name=endpoint,
+                status='up',
+                response_time=round(stats.success_avg_ms, 2),
+                memory_usage=round(self.memory_usage, 2),
+                cpu_usage=round(self.cpu_usage, 2)
+            )
+            row.request_count = success_count
+            rows.append(row)
+        for fields in errors:
+            row = SystemMonitoring.create_error_record(**fields)
+            row.request_count = 1
+            rows.append(row)
+        for key, count in dropped.items():
+            fields = dict(zip(DROPPED_ERROR_FIELDS, key))
+            row = SystemMonitoring.create_error_record(
+                error_message=f"{count} errors not recorded individually (METRICS_MAX_ERROR_RECORDS reached)",
+                **fields
+            )
+            row.request_count = count
+            rows.append(row)
+
+        with self.app.app_context():
+            try:
+                db.session.add_all(rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error saving monitoring data: {str(e)}")
+                return 0
+            finally:
+                db.session.remove()
+        return len(rows)
+
+
+request_metrics = RequestMetricsCollector()
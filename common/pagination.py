@@ -0,0 +1,205 @@
+"""
+Keyset (cursor) pagination.
+
+Offset paging makes the database read and discard every row before the
+requested page, so deep pages and long admin lists get slower linearly.
+paginate_keyset() instead orders on a set of sort keys ending in a unique
+column (normally the primary key) and continues from the last row of the
+previous page, which an index on those keys answers directly at any depth.
+
+Cursors are opaque URL-safe strings holding the last row's key values and the
+sort they belong to; a cursor from a different sort is rejected. NULL sort
+values follow MySQL ordering (first ascending, last descending). The total
+is optional: exact, capped at PAGINATION_COUNT_CAP, or skipped.
+
+Endpoints keep their page-number API and switch to keyset paging when the
+request carries `cursor` (an empty value asks for the first page).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+
+from flask import current_app, request
+from sqlalchemy import and_, false, func, or_, true
+
+from common.database import db
+
+COUNT_NONE = 'none'
+COUNT_EXACT = 'exact'
+COUNT_CAPPED = 'capped'
+
+
+class CursorError(ValueError):
+    """The cursor is malformed or belongs to a different sort."""
+
+
+class SortKey:
+    """One ORDER BY key: a name (part of the cursor signature), a column or expression and a direction."""
+
+    def __init__(self, name, column, descending=False, nullable=False):
+        self.name = name
+        self.column = column
+        self.descending = descending
+        self.nullable = nullable
+
+    def ordering(self):
+        return self.column.desc() if self.descending else self.column.asc()
+
+    def _after(self, value):
+        """Rows strictly after `value` on this key alone."""
+        if value is None:
+            # NULLs sort first ascending (everything non-null follows) and last descending
+            return self.column.isnot(None) if not self.descending else false()
+        beyond = self.column < value if self.descending else self.column > value
+        if self.nullable and self.descending:
+            beyond = or_(beyond, self.column.is_(None))
+        return beyond
+
+    def _equal(self, value):
+        return self.column.is_(None) if value is None else self.column == value
+
+    def _at_or_after(self, value):
+        """Rows at or after `value` on this key, as a plain range the index can seek on (None: no bound)."""
+        if value is None:
+            return None if not self.descending else self.column.is_(None)
+        bound = self.column <= value if self.descending else self.column >= value
+        if self.nullable and self.descending:
+            bound = or_(bound, self.column.is_(None))
+        return bound
+
+
+def _signature(keys):
+    return ','.join(f"{'-' if key.descending else ''}{key.name}" for key in keys)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+    return value
+
+
+def encode_cursor(keys, values):
+    payload = json.dumps({'s': _signature(keys), 'v': [_encode_value(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(keys, cursor):
+    """Key values stored in `cursor`; raises CursorError if it is invalid for `keys`."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(value) for value in payload['v']]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise CursorError('Invalid cursor') from e
+    if payload.get('s') != _signature(keys) or len(values) != len(keys):
+        raise CursorError('Cursor does not match the requested sort order')
+    return values
+
+
+def keyset_filter(keys, values):
+    """Condition selecting the rows that sort after `values`."""
+    clauses = []
+    for index, key in enumerate(keys):
+        ties = [keys[i]._equal(values[i]) for i in range(index)]
+        clauses.append(and_(*ties, key._after(values[index])))
+    if not clauses:
+        return true()
+    condition = or_(*clauses)
+    # Redundant range on the leading key, so the database seeks instead of scanning the OR
+    bound = keys[0]._at_or_after(values[0])
+    return condition if bound is None else and_(bound, condition)
+
+
+class CursorPage:
+    """One page of keyset results."""
+
+    def __init__(self, items, per_page, next_cursor, total=None, total_is_capped=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.total = total
+        self.total_is_capped = total_is_capped
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def pagination(self):
+        data = {
+            'mode': 'cursor',
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'has_next': self.has_next
+        }
+        if self.total is not None:
+            data['total'] = self.total
+            data['total_is_capped'] = self.total_is_capped
+        return data
+
+
+def count_rows(query, mode=COUNT_CAPPED):
+    """(total, capped) for `query` under the given count mode; (None, False) for COUNT_NONE."""
+    if mode == COUNT_NONE:
+        return None, False
+    query = query.order_by(None)
+    if mode == COUNT_EXACT:
+        return query.count(), False
+    cap = current_app.config.get('PAGINATION_COUNT_CAP', 10000)
+    total = db.session.query(func.count()).select_from(query.limit(cap + 1).subquery()).scalar()
+    return min(total, cap), total > cap
+
+
+def paginate_keyset(query, keys, per_page, cursor=None, count=COUNT_NONE):
+    """
+    Page through `query` (a single-entity ORM query) ordered by `keys`, whose
+    last key must be unique. Any ORDER BY already on the query is replaced.
+    Returns a CursorPage; raises CursorError for an invalid cursor.
+    """
+    total, capped = count_rows(query, count)
+    query = query.order_by(None).order_by(*[key.ordering() for key in keys])
+    if cursor:
+        query = query.filter(keyset_filter(keys, decode_cursor(keys, cursor)))
+    # Key values ride along as extra columns so expression keys (joined or computed) work too
+    rows = query.add_columns(*[key.column.label(f'_keyset_{index}') for index, key in enumerate(keys)])\
+        .limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(keys, list(rows[-1])[1:])
+    return CursorPage([row[0] for row in rows], per_page, next_cursor, total, capped)
+
+
+def cursor_requested():
+    """Whether the request asks for keyset paging (a `cursor` argument, possibly empty)."""
+    return 'cursor' in request.args
+
+
+def requested_count_mode():
+    """
+    The `count` query argument (none, exact or capped). Defaults to a capped
+    count on the first page and none on later pages, whose total clients keep.
+    """
+    default = COUNT_NONE if request.args.get('cursor') else COUNT_CAPPED
+    mode = request.args.get('count', default)
+    return mode if mode in (COUNT_NONE, COUNT_EXACT, COUNT_CAPPED) else default
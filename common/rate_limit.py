@@ -0,0 +1,193 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+import redis
+from flask import current_app, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
+
+from common.redis_registry import redis_registry
+
+logger = logging.getLogger(__name__)
+
+RateLimitPolicy = namedtuple('RateLimitPolicy', ['limit', 'per'])
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'limit', 'remaining', 'retry_after'])
+
+TIER_ANONYMOUS = 'anonymous'
+TIER_USER = 'user'
+TIER_MERCHANT = 'merchant'
+TIER_ADMIN = 'admin'
+
+# JWT 'role' claim -> tier
+ROLE_TIERS = {
+    'user': TIER_USER,
+    'merchant': TIER_MERCHANT,
+    'admin': TIER_ADMIN,
+    'super_admin': TIER_ADMIN,
+}
+
+# Sliding-window log: one sorted-set member per accepted request, scored by its
+# timestamp in ms. Returns {allowed, remaining, retry_after_ms}.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local retry_after = window
+if oldest[2] then
+    retry_after = tonumber(oldest[2]) + window - now
+end
+return {0, 0, retry_after}
+"""
+
+
+def parse_tier_multipliers(value):
+    """'anonymous:1,user:2' -> {'anonymous': 1.0, 'user': 2.0}; dicts are passed through."""
+    if isinstance(value, dict):
+        return {tier: float(multiplier) for tier, multiplier in value.items()}
+    multipliers = {}
+    for part in (value or '').split(','):
+        tier, _, multiplier = part.partition(':')
+        if tier.strip() and multiplier.strip():
+            multipliers[tier.strip()] = float(multiplier)
+    return multipliers
+
+
+class _LocalSlidingWindow:
+    """
+    Thread-safe in-process sliding-window log, used while Redis is unreachable.
+
+    Limits are per worker in this mode. At most `max_keys` clients are tracked;
+    the least recently seen ones are dropped first.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, per):
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = deque()
+                while len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+            while window and window[0] <= now - per:
+                window.popleft()
+            if len(window) < limit:
+                window.append(now)
+                return RateLimitResult(True, limit, limit - len(window), 0)
+            return RateLimitResult(False, limit, 0, max(window[0] + per - now, 0))
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter backed by a single atomic Lua script in Redis.
+
+    Every check is one EVALSHA on a connection from the shared Redis registry,
+    so concurrent requests from any number of workers can never over-admit.
+    When Redis errors (or its circuit is open) the limiter falls back to an
+    in-process window and retries Redis after RATE_LIMIT_REDIS_RETRY_SECONDS.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._local = _LocalSlidingWindow()
+        self._lock = threading.Lock()
+
+    def _get_script(self):
+        if self._script is None:
+            with self._lock:
+                if self._script is None:
+                    config = current_app.config
+                    timeout = config.get('RATE_LIMIT_REDIS_TIMEOUT', 0.5)
+                    self.use_client(redis_registry.client(
+                        config.get('RATE_LIMIT_REDIS_URL'),
+                        socket_timeout=timeout,
+                        socket_connect_timeout=timeout
+                    ))
+        return self._script
+
+    def use_client(self, client):
+        """Use an existing Redis client (shared pool, tests)."""
+        self._client = client
+        self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._redis_down_until = 0.0
+
+    def hit(self, key, limit, per):
+        """Record one request against `key`; returns a RateLimitResult."""
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                now_ms = int(time.time() * 1000)
+                allowed, remaining, retry_after_ms = self._get_script()(
+                    keys=[key],
+                    args=[now_ms, int(per * 1000), limit, f"{now_ms}-{uuid.uuid4().hex[:12]}"]
+                )
+                return RateLimitResult(bool(allowed), limit, int(remaining), int(retry_after_ms) / 1000.0)
+            except redis.RedisError as e:
+                retry_seconds = current_app.config.get('RATE_LIMIT_REDIS_RETRY_SECONDS', 5)
+                self._redis_down_until = time.monotonic() + retry_seconds
+                logger.warning(f"Rate limiter falling back to in-process windows for {retry_seconds}s: {str(e)}")
+        return self._local.hit(key, limit, per)
+
+    def acquire(self, key, limit, per, timeout):
+        """
+        Block until `key` admits one more request or `timeout` seconds have
+        passed, waiting as long as each refusal's retry_after. Returns the
+        last RateLimitResult (not allowed when the deadline passed).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            result = self.hit(key, limit, per)
+            remaining = deadline - time.monotonic()
+            if result.allowed or remaining <= 0:
+                return result
+            time.sleep(min(max(result.retry_after, 0.01), remaining))
+
+    @staticmethod
+    def current_identity():
+        """(tier, identity) for the current request, from the JWT when one is present."""
+        try:
+            verify_jwt_in_request(optional=True)
+            user_id = get_jwt_identity()
+            if user_id:
+                return ROLE_TIERS.get(get_jwt().get('role'), TIER_USER), f"user:{user_id}"
+        except Exception:
+            pass
+        return TIER_ANONYMOUS, f"ip:{request.remote_addr}"
+
+    @staticmethod
+    def policy_for(tier, limit, per, tiers=None):
+        """
+        Effective policy for a tier.
+
+        An explicit `tiers[tier]` (limit, per) wins; otherwise `limit` is scaled
+        by RATE_LIMIT_TIER_MULTIPLIERS. None means the tier is not limited.
+        """
+        if tiers and tier in tiers:
+            policy = tiers[tier]
+            return RateLimitPolicy(*policy) if policy is not None else None
+        multipliers = parse_tier_multipliers(current_app.config.get('RATE_LIMIT_TIER_MULTIPLIERS'))
+        multiplier = multipliers.get(tier, 1)
+        if multiplier <= 0:
+            return None
+        return RateLimitPolicy(max(int(limit * multiplier), 1), per)
+
+
+rate_limiter = RateLimiter()
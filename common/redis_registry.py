@@ -0,0 +1,207 @@
+import time
+import logging
+import threading
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REDIS_URL = 'redis://localhost:6379/0'
+
+# Pool exhaustion is a ConnectionError too, but says nothing about the server's health
+_POOL_EXHAUSTED = getattr(redis.exceptions, 'MaxConnectionsError', ())
+
+
+class CircuitOpenError(redis.ConnectionError):
+    """Raised instead of connecting while the circuit for a Redis server is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one Redis server.
+
+    After `failure_threshold` connection failures in a row the circuit opens and
+    callers fail fast for `reset_seconds`. Then a single trial connection is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_until = 0.0
+        self.open_count = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.failures < self.failure_threshold:
+            return self.CLOSED
+        return self.OPEN if time.monotonic() < self.opened_until else self.HALF_OPEN
+
+    def is_open(self):
+        return self.failures >= self.failure_threshold and time.monotonic() < self.opened_until
+
+    def allow(self):
+        if self.failures < self.failure_threshold:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.failures >= self.failure_threshold and now < self.opened_until:
+                self.rejected += 1
+                return False
+            # Half open: let this caller try and keep the others out until it reports back
+            self.opened_until = now + self.reset_seconds
+            return True
+
+    def record_success(self):
+        if self.failures:
+            with self._lock:
+                if self.failures >= self.failure_threshold:
+                    logger.info("Redis circuit closed")
+                self.failures = 0
+                self.opened_until = 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.failures == self.failure_threshold:
+                    self.open_count += 1
+                    logger.warning(f"Redis circuit opened for {self.reset_seconds}s after {self.failures} failures")
+                self.opened_until = time.monotonic() + self.reset_seconds
+
+
+class RegistryConnectionPool(redis.ConnectionPool):
+    """ConnectionPool that consults a circuit breaker and counts checkouts."""
+
+    def __init__(self, *args, circuit=None, **kwargs):
+        self.circuit = circuit or CircuitBreaker()
+        self.checkouts = 0
+        self.connect_failures = 0
+        self.exhausted = 0
+        super().__init__(*args, **kwargs)
+
+    def get_connection(self, *args, **kwargs):
+        if not self.circuit.allow():
+            raise CircuitOpenError("Redis circuit is open")
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except _POOL_EXHAUSTED:
+            self.exhausted += 1
+            raise
+        except (redis.ConnectionError, redis.TimeoutError, OSError):
+            self.connect_failures += 1
+            self.circuit.record_failure()
+            raise
+        self.checkouts += 1
+        self.circuit.record_success()
+        return connection
+
+    def stats(self):
+        return {
+            'max_connections': self.max_connections,
+            'created_connections': getattr(self, '_created_connections', None),
+            'in_use_connections': len(getattr(self, '_in_use_connections', ())),
+            'available_connections': len(getattr(self, '_available_connections', ())),
+            'checkouts': self.checkouts,
+            'connect_failures': self.connect_failures,
+            'exhausted': self.exhausted,
+            'circuit_state': self.circuit.state,
+            'circuit_open_count': self.circuit.open_count,
+            'circuit_rejected': self.circuit.rejected
+        }
+
+
+class RedisRegistry:
+    """
+    Process-wide registry of pooled Redis clients, one pool per server URL.
+
+    Initialised in create_app(). Pools are created lazily and are fork safe
+    (redis-py resets a pool in a child process), idle connections are PINGed
+    every REDIS_HEALTH_CHECK_INTERVAL seconds before reuse, and each pool has a
+    circuit breaker so an unreachable Redis costs callers one fast error
+    instead of a connect timeout per request.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['redis_registry'] = self
+        # Flask-Caching's redis backend ignores REDIS_URL; hand it the shared client
+        if app.config.get('CACHE_TYPE') in ('redis', 'RedisCache') and not (
+                app.config.get('CACHE_REDIS_URL') or app.config.get('CACHE_REDIS_HOST')):
+            app.config['CACHE_REDIS_HOST'] = self.client()
+
+    def _config(self, key, default):
+        if self.app is None:
+            return default
+        return self.app.config.get(key, default)
+
+    def _default_url(self):
+        return self._config('REDIS_URL', None) or DEFAULT_REDIS_URL
+
+    def pool(self, url=None, **options):
+        """The pool for `url` (REDIS_URL by default); `options` override the pool defaults."""
+        url = url or self._default_url()
+        key = (url, tuple(sorted(options.items())))
+        pool = self._pools.get(key)
+        if pool is not None:
+            return pool
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                settings = {
+                    'max_connections': self._config('REDIS_MAX_CONNECTIONS', 50),
+                    'socket_timeout': self._config('REDIS_SOCKET_TIMEOUT', 2.0),
+                    'socket_connect_timeout': self._config('REDIS_SOCKET_TIMEOUT', 2.0),
+                    'health_check_interval': self._config('REDIS_HEALTH_CHECK_INTERVAL', 30),
+                }
+                settings.update(options)
+                circuit = CircuitBreaker(
+                    failure_threshold=self._config('REDIS_CIRCUIT_FAILURE_THRESHOLD', 5),
+                    reset_seconds=self._config('REDIS_CIRCUIT_RESET_SECONDS', 30)
+                )
+                pool = RegistryConnectionPool.from_url(url, circuit=circuit, **settings)
+                self._pools[key] = pool
+        return pool
+
+    def client(self, url=None, **options):
+        """Redis client on the shared pool. Commands raise CircuitOpenError while the circuit is open."""
+        return redis.Redis(connection_pool=self.pool(url, **options))
+
+    def get_client(self, url=None, **options):
+        """Like client(), but None while the circuit is open so callers can skip Redis."""
+        pool = self.pool(url, **options)
+        if pool.circuit.is_open():
+            return None
+        return redis.Redis(connection_pool=pool)
+
+    def ping(self, url=None):
+        """Health check for the monitoring endpoints."""
+        try:
+            return bool(self.client(url).ping())
+        except redis.RedisError as e:
+            logger.warning(f"Redis health check failed: {str(e)}")
+            return False
+
+    def stats(self):
+        """Usage and circuit state of every pool in this process."""
+        stats = {}
+        for (url, options), pool in list(self._pools.items()):
+            name = url.rsplit('@', 1)[-1]  # never expose credentials
+            if options:
+                name += ' (' + ', '.join(f"{key}={value}" for key, value in options) + ')'
+            stats[name] = pool.stats()
+        return stats
+
+redis_registry = RedisRegistry()
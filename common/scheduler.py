@@ -0,0 +1,101 @@
+import os
+import socket
+import logging
+import threading
+import time
+from datetime import datetime
+
+import redis
+
+from common.cache import get_redis_client
+from common.database import db
+
+logger = logging.getLogger(__name__)
+
+JOB_LOCK_KEY = 'job:{}:{}'
+
+
+class AppScheduler:
+    """
+    Per-process APScheduler for periodic maintenance jobs.
+
+    Jobs are registered in create_app() and the scheduler is started from the
+    request hooks (once per worker, safe after fork), so CLI commands never run
+    them. Every job runs inside an app context with its own session.
+
+    Each worker schedules every job, but a run first claims `job:<id>:<slot>`
+    in Redis (SET NX), where the slot is the current wall-clock interval
+    (epoch seconds // interval). Exactly one worker runs each slot however
+    the workers' timers drift, and a slow run never blocks the next slot.
+    Without Redis every worker runs its jobs, as before. SCHEDULER_ENABLED=false keeps a process from scheduling anything,
+    e.g. to run the jobs only in one designated process.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._jobs = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['app_scheduler'] = self
+
+    def add_interval_job(self, job_id, func, seconds):
+        """Run `func()` every `seconds` (first run right after start-up). 0 disables the job."""
+        if seconds:
+            self._jobs[job_id] = (func, seconds)
+
+    def _claim(self, job_id, seconds, now=None):
+        """Whether this worker runs this interval's `job_id`; True when Redis is unavailable."""
+        client = get_redis_client(self.app)
+        if client is None:
+            return True
+        slot = int((time.time() if now is None else now) // seconds)
+        try:
+            owner = f"{socket.gethostname()}:{os.getpid()}"
+            # The claim only has to outlive its slot; two intervals covers clock skew between hosts
+            return bool(client.set(JOB_LOCK_KEY.format(job_id, slot), owner, nx=True, ex=int(seconds * 2)))
+        except redis.RedisError as e:
+            logger.warning(f"Could not claim scheduled job {job_id}, running it here: {str(e)}")
+            return True
+
+    def _wrap(self, job_id, func, seconds):
+        app = self.app
+
+        def run():
+            with app.app_context():
+                try:
+                    if not self._claim(job_id, seconds):
+                        logger.debug(f"Scheduled job {job_id} skipped, another worker claimed this interval")
+                        return
+                    result = func()
+                    logger.info(f"Scheduled job {job_id} finished: {result}")
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Scheduled job {job_id} failed: {str(e)}")
+                finally:
+                    db.session.remove()
+        return run
+
+    def ensure_started(self):
+        if not self._jobs or self.app is None or self._pid == os.getpid():
+            return
+        if not self.app.config.get('SCHEDULER_ENABLED', True):
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            scheduler = BackgroundScheduler(daemon=True)
+            for job_id, (func, seconds) in self._jobs.items():
+                scheduler.add_job(
+                    self._wrap(job_id, func, seconds), 'interval', seconds=seconds, id=job_id,
+                    next_run_time=datetime.now(), coalesce=True, max_instances=1
+                )
+            scheduler.start()
+
+
+app_scheduler = AppScheduler()
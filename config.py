@@ -20,6 +20,7 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt_dev_key_not_for_production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)  # Increased from 1 hour to 7 days to reduce token expiration issues during API testing
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    PRINCIPAL_STATUS_TTL_SECONDS = int(os.getenv('PRINCIPAL_STATUS_TTL_SECONDS', '60'))  # cached user status behind every authenticated request
 
     # Google OAuth
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
@@ -28,9 +29,72 @@ class Config:
 
     # Redis Cache
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-    CACHE_TYPE = 'redis'
+    CACHE_TYPE = 'RedisCache'  # backend client comes from the shared Redis registry
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
 
+    # Shared Redis connection pools (common/redis_registry.py)
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))  # per pool, per worker
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2.0'))  # seconds
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))  # PING idle connections before reuse
+    REDIS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('REDIS_CIRCUIT_FAILURE_THRESHOLD', '5'))  # failures before failing fast
+    REDIS_CIRCUIT_RESET_SECONDS = int(os.getenv('REDIS_CIRCUIT_RESET_SECONDS', '30'))  # then one trial connection
+
+    # Request metrics (aggregated in-process, flushed to system_monitoring in batches)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))  # fraction of successful requests recorded
+    METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', '30'))  # seconds
+    METRICS_CPU_SAMPLE_INTERVAL = int(os.getenv('METRICS_CPU_SAMPLE_INTERVAL', '5'))  # seconds
+    METRICS_MAX_ERROR_RECORDS = int(os.getenv('METRICS_MAX_ERROR_RECORDS', '200'))  # per flush window
+
+    # API rate limiting (sliding window in Redis, in-process fallback while Redis is down)
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL')  # defaults to REDIS_URL
+    RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv('RATE_LIMIT_REDIS_TIMEOUT', '0.5'))  # seconds
+    RATE_LIMIT_REDIS_RETRY_SECONDS = int(os.getenv('RATE_LIMIT_REDIS_RETRY_SECONDS', '5'))  # fallback period after an error
+    RATE_LIMIT_TIER_MULTIPLIERS = os.getenv(
+        'RATE_LIMIT_TIER_MULTIPLIERS', 'anonymous:1,user:2,merchant:5,admin:0'
+    )  # scales each route's limit per JWT role; 0 = not limited
+
+    # Product search: 'mysql' (FULLTEXT) or 'memory' (in-process index); auto-detected when unset
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND')
+    SEARCH_MYSQL_MIN_TOKEN_SIZE = int(os.getenv('SEARCH_MYSQL_MIN_TOKEN_SIZE', '3'))  # the server's innodb_ft_min_token_size; shorter terms use LIKE
+    SEARCH_INDEX_REFRESH_SECONDS = int(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', '300'))  # memory backend only
+    SEARCH_INDEX_SYNC_SECONDS = int(os.getenv('SEARCH_INDEX_SYNC_SECONDS', '60'))  # mysql backend: re-index products edited outside the app; 0 disables
+
+    # Category tree cache: version stamp in the shared cache, re-checked every N seconds per worker
+    CATEGORY_TREE_VERSION_CHECK_SECONDS = int(os.getenv('CATEGORY_TREE_VERSION_CHECK_SECONDS', '5'))
+    CATEGORY_TREE_MAX_AGE = int(os.getenv('CATEGORY_TREE_MAX_AGE', '300'))  # reload even without a version bump
+
+    # Compiled GST rule table: version stamp re-checked every N seconds per worker
+    GST_RULES_VERSION_CHECK_SECONDS = int(os.getenv('GST_RULES_VERSION_CHECK_SECONDS', '5'))
+    GST_RULES_MAX_AGE = int(os.getenv('GST_RULES_MAX_AGE', '300'))
+
+    # Periodic maintenance jobs; each run is claimed in Redis so one worker per interval does it
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # false: this process schedules nothing
+
+    # Stock held for orders awaiting online payment; expired holds are released by a periodic sweep
+    STOCK_RESERVATION_TTL_MINUTES = int(os.getenv('STOCK_RESERVATION_TTL_MINUTES', '30'))
+    STOCK_RESERVATION_SWEEP_SECONDS = int(os.getenv('STOCK_RESERVATION_SWEEP_SECONDS', '60'))  # 0 disables the sweep
+
+    # Trending products leaderboard (global and per category)
+    TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', '30'))  # falls back to all time when empty
+    TRENDING_LEADERBOARD_SIZE = int(os.getenv('TRENDING_LEADERBOARD_SIZE', '200'))  # products per board
+    TRENDING_REFRESH_MINUTES = int(os.getenv('TRENDING_REFRESH_MINUTES', '15'))  # 0 disables the scheduler
+
+    # Merchant daily sales rollup: kept current on order changes, recent days re-derived periodically
+    SALES_ROLLUP_RECONCILE_DAYS = int(os.getenv('SALES_ROLLUP_RECONCILE_DAYS', '2'))  # today and the day before
+    SALES_ROLLUP_RECONCILE_SECONDS = int(os.getenv('SALES_ROLLUP_RECONCILE_SECONDS', '900'))  # 0 disables the scheduler
+
+    # Stored effective prices: recomputed on edits and when special-price windows open or close
+    EFFECTIVE_PRICE_REFRESH_SECONDS = int(os.getenv('EFFECTIVE_PRICE_REFRESH_SECONDS', '300'))  # 0 disables the scheduler
+    EFFECTIVE_PRICE_LOOKBACK_SECONDS = int(os.getenv('EFFECTIVE_PRICE_LOOKBACK_SECONDS', '86400'))  # window boundaries re-checked when the last run is unknown
+
+    # Per-parent shop variant attribute matrix (values, combinations, default variant), cached in Redis
+    SHOP_VARIANT_MATRIX_TTL_SECONDS = int(os.getenv('SHOP_VARIANT_MATRIX_TTL_SECONDS', '300'))  # dropped on variant writes
+
+    # Keyset (cursor) pagination: first-page totals are counted up to this many rows
+    PAGINATION_COUNT_CAP = int(os.getenv('PAGINATION_COUNT_CAP', '10000'))  # reported with total_is_capped
+
     # Cloudinary
     CLOUDINARY_CLOUD_NAME = os.getenv('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY')
@@ -48,16 +112,51 @@ class Config:
     FRONTEND_URL = 'https://aoinstore.com'
 
     EXCHANGE_RATE_API_KEY = os.getenv('EXCHANGE_RATE_API_KEY', 'f60545f362ec1fdd1e5e7338')
+    FREECURRENCY_API_KEY = os.getenv('FREECURRENCY_API_KEY')  # unset: exchange rates are not refreshed
+    FREECURRENCY_API_URL = os.getenv('FREECURRENCY_API_URL', 'https://api.freecurrencyapi.com/v1/latest')
+    EXCHANGE_RATE_PIVOT = os.getenv('EXCHANGE_RATE_PIVOT', 'USD')  # fetched base; other bases are derived locally
+    EXCHANGE_RATE_CURRENCIES = os.getenv('EXCHANGE_RATE_CURRENCIES', '')  # comma-separated; empty = all upstream currencies
+    EXCHANGE_RATE_REFRESH_SECONDS = int(os.getenv('EXCHANGE_RATE_REFRESH_SECONDS', '3600'))  # 0 disables the scheduler
+    EXCHANGE_RATE_STALE_SECONDS = int(os.getenv('EXCHANGE_RATE_STALE_SECONDS', str(6 * 3600)))  # responses flagged stale after this
+    EXCHANGE_RATE_CONNECT_TIMEOUT = float(os.getenv('EXCHANGE_RATE_CONNECT_TIMEOUT', '3'))  # seconds
+    EXCHANGE_RATE_READ_TIMEOUT = float(os.getenv('EXCHANGE_RATE_READ_TIMEOUT', '10'))  # seconds
+    EXCHANGE_RATE_VERSION_CHECK_SECONDS = int(os.getenv('EXCHANGE_RATE_VERSION_CHECK_SECONDS', '30'))
+    EXCHANGE_RATE_MAX_AGE = int(os.getenv('EXCHANGE_RATE_MAX_AGE', '900'))  # reload from Redis even without a version bump
     CARD_ENCRYPTION_KEY = os.getenv('CARD_ENCRYPTION_KEY')
     
     # ShipRocket Configuration
     SHIPROCKET_EMAIL = os.getenv('SHIPROCKET_EMAIL')
     SHIPROCKET_PASSWORD = os.getenv('SHIPROCKET_PASSWORD')
     SHIPROCKET_BASE_URL = 'https://apiv2.shiprocket.in/v1/external'
+    SHIPROCKET_CONNECT_TIMEOUT = float(os.getenv('SHIPROCKET_CONNECT_TIMEOUT', '5'))  # seconds
+    SHIPROCKET_READ_TIMEOUT = float(os.getenv('SHIPROCKET_READ_TIMEOUT', '30'))  # seconds
+    SHIPROCKET_MAX_RETRIES = int(os.getenv('SHIPROCKET_MAX_RETRIES', '3'))  # connection errors; 429/5xx on GET only
+    SHIPROCKET_POOL_SIZE = int(os.getenv('SHIPROCKET_POOL_SIZE', '10'))  # keep-alive connections per worker
+    SHIPROCKET_TOKEN_TTL_SECONDS = int(os.getenv('SHIPROCKET_TOKEN_TTL_SECONDS', str(23 * 3600)))  # shared via Redis
+    SHIPROCKET_QUOTE_TTL_SECONDS = int(os.getenv('SHIPROCKET_QUOTE_TTL_SECONDS', '900'))  # serviceability quotes are fresh this long
+    SHIPROCKET_QUOTE_STALE_SECONDS = int(os.getenv('SHIPROCKET_QUOTE_STALE_SECONDS', '3600'))  # then served while refreshing
+    SHIPROCKET_QUOTE_WEIGHT_BAND_KG = float(os.getenv('SHIPROCKET_QUOTE_WEIGHT_BAND_KG', '0.5'))  # weights rounded up to this
+    SHIPROCKET_QUOTE_COD_BAND = int(os.getenv('SHIPROCKET_QUOTE_COD_BAND', '500'))  # COD amounts rounded up to this
+    SHIPROCKET_QUOTE_WORKERS = int(os.getenv('SHIPROCKET_QUOTE_WORKERS', '8'))  # parallel quote fetches per worker
+    SHIPROCKET_SHIPMENT_WORKERS = int(os.getenv('SHIPROCKET_SHIPMENT_WORKERS', '4'))  # merchants of one order shipped concurrently
+    SHIPROCKET_SHIPMENT_CLAIM_SECONDS = int(os.getenv('SHIPROCKET_SHIPMENT_CLAIM_SECONDS', '300'))  # one call creates an order's shipment at a time
 
     # AWS / Translate
     AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
     FEATURE_TRANSLATION = os.getenv('FEATURE_TRANSLATION', 'false').lower() in ('1', 'true', 'yes')
+    TRANSLATE_CACHE_TTL_SECONDS = int(os.getenv('TRANSLATE_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+    TRANSLATE_REQUESTS_PER_SECOND = int(os.getenv('TRANSLATE_REQUESTS_PER_SECOND', '20'))  # shared by all workers
+    TRANSLATE_RATE_LIMIT_WAIT_SECONDS = float(os.getenv('TRANSLATE_RATE_LIMIT_WAIT_SECONDS', '10'))  # longest wait for a request slot before the text fails
+    TRANSLATE_WORKERS = int(os.getenv('TRANSLATE_WORKERS', '4'))  # concurrent Translate requests per batch
+    TRANSLATE_MAX_REQUEST_BYTES = int(os.getenv('TRANSLATE_MAX_REQUEST_BYTES', '5000'))  # packed request size (API limit 10000)
+    TRANSLATE_MAX_SEGMENTS = int(os.getenv('TRANSLATE_MAX_SEGMENTS', '50'))  # short texts packed per request
+    TRANSLATION_SOURCE_LANG = os.getenv('TRANSLATION_SOURCE_LANG', 'en')
+    TRANSLATION_LOCALES = os.getenv('TRANSLATION_LOCALES', '')  # comma-separated, e.g. 'hi,ta,fr'; catalog is pre-translated into these
+    CATALOG_TRANSLATION_WORKERS = int(os.getenv('CATALOG_TRANSLATION_WORKERS', '2'))  # background translation jobs per worker
+    CATALOG_TRANSLATION_BATCH_SIZE = int(os.getenv('CATALOG_TRANSLATION_BATCH_SIZE', '100'))  # products per sweep and catalog
+    CATALOG_TRANSLATION_SWEEP_SECONDS = int(os.getenv('CATALOG_TRANSLATION_SWEEP_SECONDS', '600'))  # 0 disables the scheduler
+    CATALOG_TRANSLATION_RETRY_SECONDS = int(os.getenv('CATALOG_TRANSLATION_RETRY_SECONDS', '3600'))  # first retry of a failed product, doubling per attempt
+    CATALOG_TRANSLATION_RETRY_MAX_SECONDS = int(os.getenv('CATALOG_TRANSLATION_RETRY_MAX_SECONDS', str(7 * 24 * 3600)))  # longest retry delay
     
     # Razorpay Configuration
     RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID', 'rzp_test_1DP5mmOlF5G5ag')
@@ -3,15 +3,18 @@ from models.product_placement import ProductPlacement, PlacementTypeEnum
 from models.product import Product
 from models.product_media import ProductMedia, MediaType
 from common.database import db
+from common.pagination import COUNT_NONE, CursorError, SortKey, paginate_keyset
 from datetime import datetime, timezone
 from sqlalchemy import desc, and_, or_
 
 class FeatureProductController:
     @staticmethod
-    def get_featured_products(page=1, per_page=12, category_id=None, brand_id=None, min_price=None, max_price=None, search=None):
+    def get_featured_products(page=1, per_page=12, category_id=None, brand_id=None, min_price=None, max_price=None, search=None,
+                              cursor=None, count=COUNT_NONE):
         """
         Get all featured products with pagination and filters.
         Returns products that are currently active in featured placements.
+        With `cursor` (empty for the first page) pages by keyset instead of page number.
         """
         try:
             now_utc = datetime.now(timezone.utc)
@@ -37,21 +40,11 @@ class FeatureProductController:
             if brand_id:
                 query = query.filter(Product.brand_id == brand_id)
 
-            # Apply price range filter (use special_price if available, otherwise selling_price)
+            # Apply price range filter on the current listed price (special price while its window is open)
             if min_price is not None:
-                query = query.filter(
-                    or_(
-                        and_(Product.special_price != None, Product.special_price >= min_price),
-                        and_(Product.special_price == None, Product.selling_price >= min_price)
-                    )
-                )
+                query = query.filter(Product.effective_price >= min_price)
             if max_price is not None:
-                query = query.filter(
-                    or_(
-                        and_(Product.special_price != None, Product.special_price <= max_price),
-                        and_(Product.special_price == None, Product.selling_price <= max_price)
-                    )
-                )
+                query = query.filter(Product.effective_price <= max_price)
 
             # Apply search filter
             if search:
@@ -69,11 +62,20 @@ class FeatureProductController:
                 ProductPlacement.added_at.desc()
             )
 
-            # Get total count for pagination
-            total = query.count()
+            if cursor is not None:
+                # Keyset paging in the same order, placement_id breaking ties
+                page_result = paginate_keyset(query, [
+                    SortKey('sort_order', ProductPlacement.sort_order, nullable=True),
+                    SortKey('added_at', ProductPlacement.added_at, descending=True, nullable=True),
+                    SortKey('placement_id', ProductPlacement.placement_id)
+                ], per_page, cursor=cursor, count=count)
+                products = page_result.items
+            else:
+                # Get total count for pagination
+                total = query.count()
 
-            # Apply pagination
-            products = query.offset((page - 1) * per_page).limit(per_page).all()
+                # Apply pagination
+                products = query.offset((page - 1) * per_page).limit(per_page).all()
 
             # Serialize products with their placement details and media
             serialized_products = []
@@ -137,6 +139,12 @@ class FeatureProductController:
                 
                 serialized_products.append(product_data)
 
+            if cursor is not None:
+                return {
+                    'products': serialized_products,
+                    'pagination': page_result.pagination()
+                }
+
             return {
                 'products': serialized_products,
                 'pagination': {
@@ -147,6 +155,8 @@ class FeatureProductController:
                 }
             }
 
+        except CursorError:
+            raise
         except Exception as e:
             current_app.logger.error(f"Error getting featured products: {str(e)}")
             raise RuntimeError("Failed to retrieve featured products") from e
@@ -5,25 +5,26 @@ from flask import abort
 from common.database import db
 from models.brand_request import BrandRequest, BrandRequestStatus
 from auth.models.models import MerchantProfile 
+from auth.principal import current_merchant_id
 
 class MerchantBrandRequestController:
     @staticmethod
     def list_all():
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, description="Merchant profile not found")
-        return BrandRequest.query.filter_by(merchant_id=merchant.id).all()
+        return BrandRequest.query.filter_by(merchant_id=merchant_id).all()
 
     @staticmethod
     def create(data):
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, description="Merchant profile not found")
 
         br = BrandRequest(
-            merchant_id=merchant.id,
+            merchant_id=merchant_id,
             name=data['brand_name'],
             status=BrandRequestStatus.PENDING
         )
@@ -6,7 +6,10 @@ from common.database import db
 from models.order import Order, OrderItem
 from models.product import Product
 from models.category import Category
+from models.merchant_daily_sales import MerchantDailySales
+from services.merchant_sales_rollup_service import MerchantSalesRollupService, month_start
 from auth.models.models import MerchantProfile, User
+from auth.principal import current_merchant_id
 from models.enums import OrderStatusEnum, PaymentStatusEnum
 import calendar
 
@@ -19,8 +22,8 @@ class MerchantDashboardController:
     def get_recent_orders(user_id):
         try:
             # Step 1: Get the merchant profile using user_id
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             # Step 2: Join Order -> OrderItem -> User, filter by OrderItem.merchant_id
@@ -28,7 +31,7 @@ class MerchantDashboardController:
                 db.session.query(Order, User)
                 .join(OrderItem, Order.order_id == OrderItem.order_id)   # use order_id here
                 .join(User, Order.user_id == User.id)
-                .filter(OrderItem.merchant_id == merchant.id)
+                .filter(OrderItem.merchant_id == merchant_id)
                 .order_by(Order.order_date.desc())  # Changed from created_at to order_date
                 .limit(5)
                 .all()
@@ -60,8 +63,8 @@ class MerchantDashboardController:
     def get_monthly_summary(user_id):
         try:
             # Get the merchant
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             now = datetime.now()
@@ -70,23 +73,14 @@ class MerchantDashboardController:
             prev_month = current_month - 1 if current_month > 1 else 12
             prev_year = current_year if current_month > 1 else current_year - 1
 
+            # Both months' daily totals from the sales rollup in one query
+            totals = MerchantSalesRollupService.month_totals(merchant_id, date(prev_year, prev_month, 1))
+
             def fetch_monthly_data(month, year):
-                stats = (
-                    db.session.query(
-                        func.coalesce(func.sum(OrderItem.line_item_total_inclusive_gst), 0).label("total_sales"),
-                        func.count(func.distinct(Order.order_id)).label("total_orders")
-                    )
-                    .join(Order, Order.order_id == OrderItem.order_id)
-                    .filter(
-                        OrderItem.merchant_id == merchant.id,
-                        extract('month', Order.order_date) == month,
-                        extract('year', Order.order_date) == year,
-                    )
-                    .first()
-                )
+                stats = totals[(year, month)]
 
-                total_sales = float(Decimal(str(stats.total_sales or 0)).quantize(Decimal('0.01')))
-                total_orders = stats.total_orders or 0
+                total_sales = float(Decimal(str(stats['revenue'])).quantize(Decimal('0.01')))
+                total_orders = stats['orders']
                 avg_order_value = float(Decimal(str(total_sales / total_orders if total_orders > 0 else 0)).quantize(Decimal('0.01')))
 
                 return {
@@ -128,8 +122,8 @@ class MerchantDashboardController:
     @staticmethod
     def get_sales_data(user_id):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             today = date.today()
@@ -140,24 +134,8 @@ class MerchantDashboardController:
                 year = today.year if (today.month - i) > 0 else today.year - 1
                 last_7_months.append((month, year))
 
-            rows = (
-                db.session.query(
-                    extract('month', Order.order_date).label('month'),
-                    extract('year', Order.order_date).label('year'),
-                    func.count(func.distinct(Order.order_id)).label('orders'),
-                    func.sum(OrderItem.line_item_total_inclusive_gst).label('sales')
-                )
-                .join(OrderItem, Order.order_id == OrderItem.order_id)
-                .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    tuple_(
-                        extract('month', Order.order_date),
-                        extract('year', Order.order_date)
-                    ).in_(last_7_months)
-                )
-                .group_by(extract('month', Order.order_date), extract('year', Order.order_date))
-                .all()
-            )
+            # Daily totals from the sales rollup, summed per month
+            totals = MerchantSalesRollupService.month_totals(merchant_id, month_start(today, 6))
 
             # Create a default dictionary for the past 7 months
             result_map = {
@@ -165,13 +143,13 @@ class MerchantDashboardController:
                 for m, y in last_7_months
             }
 
-            for row in rows:
-                key = (int(row.month), int(row.year))
-                result_map[key] = {
-                    'sales': float(row.sales or 0),
-                    'orders': row.orders,
-                    'visitors': 2000  # dummy visitors for now
-                }
+            for (year, month), row in totals.items():
+                if (month, year) in result_map:
+                    result_map[(month, year)] = {
+                        'sales': float(row['revenue']),
+                        'orders': row['orders'],
+                        'visitors': 2000  # dummy visitors for now
+                    }
 
             # Format final result with proper month labels
             formatted_result = []
@@ -194,22 +172,22 @@ class MerchantDashboardController:
     @staticmethod
     def get_top_products(user_id, limit=5):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
-            # Join order_items and products
+            # Per-product days from the sales rollup
             results = (
                 db.session.query(
-                    OrderItem.product_id,
+                    MerchantDailySales.product_id,
                     Product.product_name,
-                    func.sum(OrderItem.quantity).label("sold"),
-                    func.sum(OrderItem.line_item_total_inclusive_gst).label("revenue")  # Changed from unit_price_inclusive_gst to line_item_total_inclusive_gst for total revenue
+                    func.sum(MerchantDailySales.units).label("sold"),
+                    func.sum(MerchantDailySales.revenue).label("revenue")
                 )
-                .join(Product, Product.product_id == OrderItem.product_id)
-                .filter(OrderItem.merchant_id == merchant.id)
-                .group_by(OrderItem.product_id, Product.product_name)
-                .order_by(func.sum(OrderItem.quantity).desc())
+                .join(Product, Product.product_id == MerchantDailySales.product_id)
+                .filter(MerchantDailySales.merchant_id == merchant_id)
+                .group_by(MerchantDailySales.product_id, Product.product_name)
+                .order_by(func.sum(MerchantDailySales.units).desc())
                 .limit(limit)
                 .all()
             )
@@ -97,35 +97,19 @@ class MerchantReviewController:
             if product_id:
                 query = query.filter(Product.product_id == product_id)
 
-            # Get all products
-            products = query.all()
+            # Get all products with their materialized rating aggregates
+            products = query.options(db.selectinload(Product.rating_stats)).all()
             
             stats = []
             for product in products:
-                # Get review stats for each product
-                product_stats = db.session.query(
-                    func.avg(Review.rating).label('average_rating'),
-                    func.count(Review.review_id).label('total_reviews')
-                ).filter(Review.product_id == product.product_id).first()
-
-                # Get rating distribution
-                rating_distribution = db.session.query(
-                    Review.rating,
-                    func.count(Review.review_id)
-                ).filter(Review.product_id == product.product_id)\
-                .group_by(Review.rating)\
-                .all()
-
-                # Format rating distribution
-                rating_dist = {str(i): 0 for i in range(1, 6)}
-                for rating, count in rating_distribution:
-                    rating_dist[str(rating)] = count
+                product_stats = product.rating_stats
+                rating_dist = product_stats.distribution if product_stats else {str(i): 0 for i in range(1, 6)}
 
                 stats.append({
                     'product_id': product.product_id,
                     'product_name': product.product_name,
-                    'average_rating': round(float(product_stats.average_rating or 0), 1),
-                    'total_reviews': product_stats.total_reviews,
+                    'average_rating': round(float(product_stats.rating_avg or 0), 1) if product_stats else 0.0,
+                    'total_reviews': product_stats.rating_count if product_stats else 0,
                     'rating_distribution': rating_dist
                 })
 
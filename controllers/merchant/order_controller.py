@@ -1,4 +1,6 @@
 from common.database import db
+from common.pagination import COUNT_NONE
+from services.order_history_service import OrderHistoryService
 from models.order import Order, OrderItem
 from models.enums import OrderStatusEnum, PaymentStatusEnum
 from sqlalchemy import and_, or_, distinct
@@ -11,9 +13,12 @@ logger = logging.getLogger(__name__)
 class MerchantOrderController:
     @staticmethod
     def get_merchant_orders(user_id: int, page: int = 1, per_page: int = 50, status: str = None, 
-                          payment_status: str = None, start_date: str = None, end_date: str = None):
+                          payment_status: str = None, start_date: str = None, end_date: str = None,
+                          cursor: str = None, count: str = COUNT_NONE):
         """
-        Get all orders for a merchant's products with pagination and filtering
+        Get all orders for a merchant's products with pagination and filtering.
+        With `cursor` (empty for the first page) pages by keyset on
+        (order_date, order_id) instead of page number.
         """
         try:
             # First get the merchant profile from user_id
@@ -24,15 +29,15 @@ class MerchantOrderController:
             merchant_id = merchant.id
             logger.info(f"Fetching orders for merchant: {merchant.business_name} (ID: {merchant_id})")
             
-            # Base query to get orders with merchant's products
-            query = Order.query.join(OrderItem).filter(OrderItem.merchant_id == merchant_id).distinct()
+            # Orders with merchant's products (EXISTS, so no join row multiplication or DISTINCT)
+            filters = [OrderHistoryService.merchant_filter(merchant_id)]
             
             
             # Apply order status filter if provided
             if status:
                 try:
                     order_status = OrderStatusEnum(status.lower())
-                    query = query.filter(Order.order_status == order_status)
+                    filters.append(Order.order_status == order_status)
                     logger.info(f"Filtering by order status: {status}")
                 except ValueError:
                     logger.error(f"Invalid order status: {status}")
@@ -42,7 +47,7 @@ class MerchantOrderController:
             if payment_status:
                 try:
                     payment_status_enum = PaymentStatusEnum(payment_status.lower())
-                    query = query.filter(Order.payment_status == payment_status_enum)
+                    filters.append(Order.payment_status == payment_status_enum)
                     logger.info(f"Filtering by payment status: {payment_status}")
                 except ValueError:
                     logger.error(f"Invalid payment status: {payment_status}")
@@ -52,7 +57,7 @@ class MerchantOrderController:
             if start_date:
                 try:
                     start = datetime.fromisoformat(start_date)
-                    query = query.filter(Order.order_date >= start)
+                    filters.append(Order.order_date >= start)
                     logger.info(f"Filtering by start date: {start_date}")
                 except ValueError:
                     logger.error(f"Invalid start date format: {start_date}")
@@ -61,40 +66,32 @@ class MerchantOrderController:
             if end_date:
                 try:
                     end = datetime.fromisoformat(end_date)
-                    query = query.filter(Order.order_date <= end)
+                    filters.append(Order.order_date <= end)
                     logger.info(f"Filtering by end date: {end_date}")
                 except ValueError:
                     logger.error(f"Invalid end date format: {end_date}")
                     raise ValueError(f"Invalid end date format: {end_date}")
 
-            # Get total count for pagination
-            total = query.count()
-            logger.info(f"Total orders found: {total}")
-
-            # Apply pagination
-            orders = query.order_by(Order.order_date.desc())\
-                         .offset((page - 1) * per_page)\
-                         .limit(per_page)\
-                         .all()
+            if cursor is not None:
+                page_result = OrderHistoryService.cursor_order_ids(filters, per_page, cursor=cursor, count=count)
+                return {
+                    'orders': OrderHistoryService.summaries(page_result.items, merchant_id=merchant_id, include_history=True),
+                    'pagination': page_result.pagination()
+                }
 
-            logger.info(f"Retrieved {len(orders)} orders for page {page}")
+            # Page order ids first, then load the page's orders, items and history in bulk
+            order_ids, total = OrderHistoryService.page_order_ids(filters, page, per_page)
+            logger.info(f"Total orders found: {total}")
+            logger.info(f"Retrieved {len(order_ids)} orders for page {page}")
 
             # Calculate pagination info
             total_pages = (total + per_page - 1) // per_page
             has_next = page < total_pages
             has_prev = page > 1
 
-            # Serialize orders with only the items belonging to this merchant
-            serialized_orders = []
-            for order in orders:
-                order_data = order.serialize(include_items=False, include_history=True)
-                # Filter items to only include those from this merchant
-                merchant_items = [item.serialize() for item in order.items if item.merchant_id == merchant_id]
-                order_data['items'] = merchant_items
-                serialized_orders.append(order_data)
-
             return {
-                'orders': serialized_orders,
+                # Only the items belonging to this merchant
+                'orders': OrderHistoryService.summaries(order_ids, merchant_id=merchant_id, include_history=True),
                 'pagination': {
                     'total': total,
                     'page': page,
@@ -5,42 +5,45 @@ from flask import abort
 from common.database import db
 from models.product import Product
 from auth.models.models import MerchantProfile
+from auth.principal import current_merchant_id
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, timezone
+from services.search import ProductSearchService
+from services.catalog_translation_service import CatalogTranslationService, CATALOG_PRODUCT
 
 class MerchantProductController:
     @staticmethod
     def list_all():
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
         return Product.query.filter_by(
-            merchant_id=merchant.id,
+            merchant_id=merchant_id,
             deleted_at=None
         ).all()
 
     @staticmethod
     def get(pid):
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
         return Product.query.filter_by(
             product_id=pid,
-            merchant_id=merchant.id
+            merchant_id=merchant_id
         ).first_or_404()
 
     @staticmethod
     def create(data):
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
 
         # selling_price and special_price from data are GST-inclusive
         p = Product(
-            merchant_id=merchant.id,
+            merchant_id=merchant_id,
             category_id=data['category_id'],
             brand_id=data['brand_id'],
             sku=data['sku'],
@@ -57,18 +60,19 @@ class MerchantProductController:
         # NO call to p.update_base_price_and_gst_details() here
         db.session.add(p)
         db.session.commit()
+        ProductSearchService.index_product(p)
         return p
 
     @staticmethod
     def update(pid, data):
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
 
         p = Product.query.filter_by(
             product_id=pid,
-            merchant_id=merchant.id
+            merchant_id=merchant_id
         ).first_or_404()
 
         # If product is approved, changing certain fields will require re-approval
@@ -96,22 +100,25 @@ class MerchantProductController:
                 setattr(p, field, value_to_set)
         
         db.session.commit()
+        ProductSearchService.index_product(p)
+        CatalogTranslationService.schedule_product(CATALOG_PRODUCT, p)
         return p
 
     @staticmethod
     def delete(pid):
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
 
         p = Product.query.filter_by(
             product_id=pid,
-            merchant_id=merchant.id
+            merchant_id=merchant_id
         ).first_or_404()
 
         p.deleted_at = db.func.current_timestamp()
         db.session.commit()
+        ProductSearchService.index_product(p)
         return p
 
     @staticmethod
@@ -123,6 +130,8 @@ class MerchantProductController:
         p.approved_by = admin_id
         p.rejection_reason = None
         db.session.commit()
+        ProductSearchService.index_product(p)
+        CatalogTranslationService.schedule_product(CATALOG_PRODUCT, p)
         return p
 
     @staticmethod
@@ -134,6 +143,7 @@ class MerchantProductController:
         p.approved_by = None
         p.rejection_reason = reason
         db.session.commit()
+        ProductSearchService.index_product(p)
         return p
 
     @staticmethod
@@ -173,14 +183,14 @@ class MerchantProductController:
         - attributes: dictionary of attribute values
         """
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
 
         # Get parent product
         parent_product = Product.query.filter_by(
             product_id=parent_id,
-            merchant_id=merchant.id,
+            merchant_id=merchant_id,
             deleted_at=None
         ).first_or_404()
 
@@ -199,7 +209,7 @@ class MerchantProductController:
 
             # Create variant product inheriting most fields from parent
             variant = Product(
-                merchant_id=merchant.id,
+                merchant_id=merchant_id,
                 category_id=parent_product.category_id,
                 brand_id=parent_product.brand_id,
                 parent_product_id=parent_id,
@@ -283,6 +293,8 @@ class MerchantProductController:
 
             # Commit the transaction
             db.session.commit()
+            ProductSearchService.index_product(variant)
+            CatalogTranslationService.schedule_product(CATALOG_PRODUCT, variant)
             return variant
 
         except Exception as e:
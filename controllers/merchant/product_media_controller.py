@@ -4,6 +4,7 @@ from models.product_media import ProductMedia
 from models.enums import MediaType
 from models.product import Product
 from auth.models.models import MerchantProfile 
+from auth.principal import current_merchant_id
 from common.database import db
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone
@@ -13,11 +14,10 @@ class MerchantProductMediaController:
     @staticmethod
     def _get_merchant_id_from_jwt(): 
         """Gets the merchant_id associated with the current JWT user."""
-        user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id) 
-        if not merchant:
+        merchant_id = current_merchant_id(get_jwt_identity())
+        if not merchant_id:
             raise FileNotFoundError("Merchant profile not found for the current user.") 
-        return merchant.id 
+        return merchant_id 
 
     @staticmethod
     def list(pid):
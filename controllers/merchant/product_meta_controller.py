@@ -3,6 +3,7 @@ from common.database import db
 from models.product_meta import ProductMeta
 from models.product import Product
 from auth.models.models import MerchantProfile
+from auth.principal import current_merchant_id
 from flask_jwt_extended import get_jwt_identity
 
 class MerchantProductMetaController:
@@ -10,14 +11,14 @@ class MerchantProductMetaController:
     def get(pid):
         """Get meta data for a product."""
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
 
         # Check if product exists and belongs to merchant
         product = Product.query.filter_by(
             product_id=pid,
-            merchant_id=merchant.id,
+            merchant_id=merchant_id,
             deleted_at=None
         ).first_or_404()
 
@@ -34,14 +35,14 @@ class MerchantProductMetaController:
     def upsert(pid, data):
         """Create or update meta data for a product."""
         user_id = get_jwt_identity()
-        merchant = MerchantProfile.get_by_user_id(user_id)
-        if not merchant:
+        merchant_id = current_merchant_id(user_id)
+        if not merchant_id:
             abort(404, "Merchant profile not found")
 
         # Check if product exists and belongs to merchant
         product = Product.query.filter_by(
             product_id=pid,
-            merchant_id=merchant.id,
+            merchant_id=merchant_id,
             deleted_at=None
         ).first_or_404()
 
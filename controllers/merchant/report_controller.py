@@ -8,7 +8,10 @@ from models.product import Product
 from models.category import Category
 from models.product_stock import ProductStock
 from models.recently_viewed import RecentlyViewed
+from models.merchant_daily_sales import MerchantDailySales
+from services.merchant_sales_rollup_service import MerchantSalesRollupService, month_start, TOTAL_PRODUCT_ID
 from auth.models.models import MerchantProfile, User
+from auth.principal import current_merchant_id
 from models.enums import OrderStatusEnum, PaymentStatusEnum
 import calendar
 from models.wishlist_item import WishlistItem
@@ -22,8 +25,8 @@ class MerchantReportController:
     @staticmethod
     def get_monthly_sales_analytics(user_id):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             today = date.today()
@@ -34,26 +37,8 @@ class MerchantReportController:
                 year = today.year if (today.month - i) > 0 else today.year - 1
                 last_5_months.append((month, year))
 
-            rows = (
-                db.session.query(
-                    extract('month', Order.order_date).label('month'),
-                    extract('year', Order.order_date).label('year'),
-                    func.sum(OrderItem.quantity).label('units'),
-                    func.sum(OrderItem.line_item_total_inclusive_gst).label('revenue')
-                )
-                .join(OrderItem, Order.order_id == OrderItem.order_id)
-                .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    tuple_(
-                        extract('month', Order.order_date),
-                        extract('year', Order.order_date)
-                    ).in_(last_5_months)
-                )
-                .group_by(extract('month', Order.order_date), extract('year', Order.order_date))
-                .all()
-            )
+            # Daily totals from the sales rollup, summed per month
+            totals = MerchantSalesRollupService.month_totals(merchant_id, month_start(today, 4))
 
             # Build results map with default values
             result_map = {
@@ -61,12 +46,12 @@ class MerchantReportController:
                 for m, y in last_5_months
             }
 
-            for row in rows:
-                key = (int(row.month), int(row.year))
-                result_map[key] = {
-                    'revenue': float(row.revenue or 0),
-                    'units': int(row.units or 0)
-                }
+            for (year, month), row in totals.items():
+                if (month, year) in result_map:
+                    result_map[(month, year)] = {
+                        'revenue': float(row['revenue']),
+                        'units': int(row['units'])
+                    }
 
             # Format for frontend
             formatted_result = []
@@ -88,8 +73,8 @@ class MerchantReportController:
     @staticmethod
     def get_detailed_monthly_sales(user_id):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             today = date.today()
@@ -99,37 +84,32 @@ class MerchantReportController:
                 year = today.year if (today.month - i) > 0 else today.year - 1
                 last_5_months.append((month, year))
 
-            # Modified query to include year in SELECT and GROUP BY
+            # Per-product days from the sales rollup, selected by date range
             rows = (
                 db.session.query(
-                    extract('month', Order.order_date).label('month'),
-                    extract('year', Order.order_date).label('year'),  # ADDED
+                    extract('month', MerchantDailySales.sale_date).label('month'),
+                    extract('year', MerchantDailySales.sale_date).label('year'),
                     Product.product_name,
                     Category.name.label('category'),
                     Product.selling_price,
-                    func.sum(OrderItem.quantity).label('quantity'),
-                    func.sum(OrderItem.line_item_total_inclusive_gst).label('revenue')
+                    func.sum(MerchantDailySales.units).label('quantity'),
+                    func.sum(MerchantDailySales.revenue).label('revenue')
                 )
-                .join(OrderItem, Order.order_id == OrderItem.order_id)
-                .join(Product, Product.product_id == OrderItem.product_id)
+                .join(Product, Product.product_id == MerchantDailySales.product_id)
+                # Like the product's name and price, its category is the current one
                 .join(Category, Category.category_id == Product.category_id)
                 .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    tuple_(
-                        extract('month', Order.order_date),
-                        extract('year', Order.order_date)
-                    ).in_(last_5_months)
+                    MerchantDailySales.merchant_id == merchant_id,
+                    MerchantDailySales.sale_date >= month_start(today, 4)
                 )
                 .group_by(
-                    extract('year', Order.order_date),  # ADDED
-                    extract('month', Order.order_date),
+                    extract('year', MerchantDailySales.sale_date),
+                    extract('month', MerchantDailySales.sale_date),
                     Product.product_name,
                     Category.name,
                     Product.selling_price
                 )
-                .order_by('year', 'month')  # Now valid
+                .order_by('year', 'month')
                 .all()
             )
 
@@ -156,8 +136,8 @@ class MerchantReportController:
     @staticmethod
     def get_product_performance(user_id, months=3, limit=3):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             # Calculate start date without relativedelta
@@ -177,18 +157,15 @@ class MerchantReportController:
             products = (
                 db.session.query(
                     Product.product_name.label('name'),
-                    func.sum(OrderItem.line_item_total_inclusive_gst).label('revenue')
+                    func.sum(MerchantDailySales.revenue).label('revenue')
                 )
-                .join(OrderItem, OrderItem.product_id == Product.product_id)
-                .join(Order, Order.order_id == OrderItem.order_id)
+                .join(MerchantDailySales, MerchantDailySales.product_id == Product.product_id)
                 .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    Order.order_date >= start_date
+                    MerchantDailySales.merchant_id == merchant_id,
+                    MerchantDailySales.sale_date >= start_date
                 )
                 .group_by(Product.product_name)
-                .order_by(func.sum(OrderItem.line_item_total_inclusive_gst).desc())
+                .order_by(func.sum(MerchantDailySales.revenue).desc())
                 .limit(limit)
                 .all()
             )
@@ -208,8 +185,8 @@ class MerchantReportController:
     @staticmethod
     def get_revenue_by_category(user_id, months=3, limit=3):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             # Calculate start date
@@ -224,23 +201,19 @@ class MerchantReportController:
                 
             start_date = date(year, month, 1)
             
-            # Query category revenue
+            # Query category revenue, by each product's category when its sales were rolled up
             category_revenues = (
                 db.session.query(
                     Category.name.label('category'),
-                    func.sum(OrderItem.line_item_total_inclusive_gst).label('revenue')
+                    func.sum(MerchantDailySales.revenue).label('revenue')
                 )
-                .join(Product, Product.category_id == Category.category_id)
-                .join(OrderItem, OrderItem.product_id == Product.product_id)
-                .join(Order, Order.order_id == OrderItem.order_id)
+                .join(MerchantDailySales, MerchantDailySales.category_id == Category.category_id)
                 .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    Order.order_date >= start_date
+                    MerchantDailySales.merchant_id == merchant_id,
+                    MerchantDailySales.sale_date >= start_date
                 )
                 .group_by(Category.name)
-                .order_by(func.sum(OrderItem.line_item_total_inclusive_gst).desc())
+                .order_by(func.sum(MerchantDailySales.revenue).desc())
                 .all()
             )
 
@@ -283,8 +256,8 @@ class MerchantReportController:
     @staticmethod
     def get_dashboard_summary(user_id):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             today = date.today()
@@ -313,46 +286,27 @@ class MerchantReportController:
 
             # 1. Total Products
             total_products = db.session.query(func.count(Product.product_id)) \
-                .filter(Product.merchant_id == merchant.id) \
+                .filter(Product.merchant_id == merchant_id) \
                 .scalar() or 0
             
             # Total products at end of previous month
             total_products_prev = db.session.query(func.count(Product.product_id)) \
                 .filter(
-                    Product.merchant_id == merchant.id,
+                    Product.merchant_id == merchant_id,
                     func.date(Product.created_at) <= date(prev_year, prev_month, 1)
                 ) \
                 .scalar() or 0
             
-            # 2. Products Sold - current month
-            products_sold = db.session.query(func.sum(OrderItem.quantity)) \
-                .join(Order, Order.order_id == OrderItem.order_id) \
-                .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    extract('year', Order.order_date) == current_year,
-                    extract('month', Order.order_date) == current_month
-                ) \
-                .scalar() or 0
-            
-            # Products Sold - previous month
-            products_sold_prev = db.session.query(func.sum(OrderItem.quantity)) \
-                .join(Order, Order.order_id == OrderItem.order_id) \
-                .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    extract('year', Order.order_date) == prev_year,
-                    extract('month', Order.order_date) == prev_month
-                ) \
-                .scalar() or 0
+            # 2. Products Sold - current and previous month, from the sales rollup
+            sold_by_month = MerchantSalesRollupService.month_totals(merchant_id, date(prev_year, prev_month, 1))
+            products_sold = int(sold_by_month[(current_year, current_month)]['units'])
+            products_sold_prev = int(sold_by_month[(prev_year, prev_month)]['units'])
             
             # 3. Wishlisted Products (current month, not deleted)
             wishlisted_products = db.session.query(func.count(db.distinct(WishlistItem.product_id))) \
                 .join(Product, WishlistItem.product_id == Product.product_id) \
                 .filter(
-                    Product.merchant_id == merchant.id,
+                    Product.merchant_id == merchant_id,
                     WishlistItem.is_deleted == False
                 ).scalar() or 0
 
@@ -361,7 +315,7 @@ class MerchantReportController:
             wishlisted_products_prev = db.session.query(func.count(db.distinct(WishlistItem.product_id))) \
                 .join(Product, WishlistItem.product_id == Product.product_id) \
                 .filter(
-                    Product.merchant_id == merchant.id,
+                    Product.merchant_id == merchant_id,
                     WishlistItem.is_deleted == False,
                     WishlistItem.added_at < first_day_of_current_month
                 ).scalar() or 0
@@ -370,7 +324,7 @@ class MerchantReportController:
             out_of_stock = db.session.query(func.count(Product.product_id)) \
                 .join(ProductStock, Product.product_id == ProductStock.product_id) \
                 .filter(
-                    Product.merchant_id == merchant.id,
+                    Product.merchant_id == merchant_id,
                     ProductStock.stock_qty <= 0
                 ) \
                 .scalar() or 0
@@ -379,7 +333,7 @@ class MerchantReportController:
             out_of_stock_prev = db.session.query(func.count(Product.product_id)) \
                 .join(ProductStock, Product.product_id == ProductStock.product_id) \
                 .filter(
-                    Product.merchant_id == merchant.id,
+                    Product.merchant_id == merchant_id,
                     ProductStock.stock_qty <= 0,
                     func.date(Product.created_at) <= date(prev_year, prev_month, 1)
                 ) \
@@ -418,8 +372,8 @@ class MerchantReportController:
     @staticmethod
     def get_daily_sales_data(user_id):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             today = date.today()
@@ -448,17 +402,15 @@ class MerchantReportController:
             # Query daily sales data
             sales_data = (
                 db.session.query(
-                    func.date(Order.order_date).label('date'),
-                    func.sum(OrderItem.quantity).label('quantity')
+                    MerchantDailySales.sale_date.label('date'),
+                    MerchantDailySales.units.label('quantity')
                 )
-                .join(OrderItem, Order.order_id == OrderItem.order_id)
                 .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    func.date(Order.order_date).in_(date_range)
+                    MerchantDailySales.merchant_id == merchant_id,
+                    MerchantDailySales.product_id == TOTAL_PRODUCT_ID,
+                    MerchantDailySales.sale_date >= date_range[0],
+                    MerchantDailySales.sale_date <= date_range[-1]
                 )
-                .group_by(func.date(Order.order_date))
                 .all()
             )
             
@@ -500,8 +452,8 @@ class MerchantReportController:
     @staticmethod
     def get_top_selling_products(user_id, days=30, limit=4):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             today = date.today()
@@ -526,19 +478,16 @@ class MerchantReportController:
             products = (
                 db.session.query(
                     Product.product_name.label('name'),
-                    func.sum(OrderItem.quantity).label('sold'),
-                    func.sum(OrderItem.line_item_total_inclusive_gst * OrderItem.quantity).label('revenue')
+                    func.sum(MerchantDailySales.units).label('sold'),
+                    func.sum(MerchantDailySales.revenue).label('revenue')
                 )
-                .join(OrderItem, OrderItem.product_id == Product.product_id)
-                .join(Order, Order.order_id == OrderItem.order_id)
+                .join(MerchantDailySales, MerchantDailySales.product_id == Product.product_id)
                 .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED,
-                    Order.order_date >= start_date
+                    MerchantDailySales.merchant_id == merchant_id,
+                    MerchantDailySales.sale_date >= start_date
                 )
                 .group_by(Product.product_name)
-                .order_by(func.sum(OrderItem.quantity).desc())
+                .order_by(func.sum(MerchantDailySales.units).desc())
                 .limit(limit)
                 .all()
             )
@@ -565,8 +514,8 @@ class MerchantReportController:
     @staticmethod
     def get_most_viewed_products(user_id, limit=4):
         try:
-            merchant = MerchantProfile.get_by_user_id(user_id)
-            if not merchant:
+            merchant_id = current_merchant_id(user_id)
+            if not merchant_id:
                 raise Exception("Merchant profile not found")
 
             # Step 1: Count product views
@@ -576,7 +525,7 @@ class MerchantReportController:
                     func.count(RecentlyViewed.id).label("views")
                 )
                 .join(Product, Product.product_id == RecentlyViewed.product_id)
-                .filter(Product.merchant_id == merchant.id)
+                .filter(Product.merchant_id == merchant_id)
                 .group_by(RecentlyViewed.product_id)
                 .subquery()
             )
@@ -584,16 +533,14 @@ class MerchantReportController:
             # Step 2: Count successful purchases (for conversion rate)
             order_counts = (
                 db.session.query(
-                    OrderItem.product_id,
-                    func.count(OrderItem.order_item_id).label("orders")
+                    MerchantDailySales.product_id,
+                    func.sum(MerchantDailySales.orders).label("orders")
                 )
-                .join(Order, Order.order_id == OrderItem.order_id)
                 .filter(
-                    OrderItem.merchant_id == merchant.id,
-                    # Order.payment_status == PaymentStatusEnum.SUCCESSFUL,
-                    # Order.order_status == OrderStatusEnum.DELIVERED
+                    MerchantDailySales.merchant_id == merchant_id,
+                    MerchantDailySales.product_id != TOTAL_PRODUCT_ID
                 )
-                .group_by(OrderItem.product_id)
+                .group_by(MerchantDailySales.product_id)
                 .subquery()
             )
 
@@ -10,7 +10,11 @@ from decimal import Decimal, ROUND_HALF_UP
 from sqlalchemy import desc, func 
 from models.product import Product
 from models.product_media import ProductMedia
-from models.gst_rule import GSTRule 
+from services.gst_rule_engine import gst_rule_engine
+from services.stock_reservation_service import StockReservationService, InsufficientStockError
+from services.merchant_sales_rollup_service import MerchantSalesRollupService
+from services.product_listing_service import ProductListingService
+from services.order_history_service import OrderHistoryService
 from models.shipment import Shipment, ShipmentItem
 
 import json
@@ -65,17 +69,46 @@ class OrderController:
             # For item-specific discounts, we don't need to prorate order-level discounts
             # because each item already has its specific discount applied
             
-            for cart_item_data in order_data.get('items', []):
-                product = Product.query.get(cart_item_data['product_id'])
+            order_items_data = order_data.get('items', [])
+            products_by_id = {
+                product.product_id: product for product in Product.query.filter(
+                    Product.product_id.in_([int(item['product_id']) for item in order_items_data])
+                ).all()
+            } if order_items_data else {}
+
+            cart_lines = []
+            for cart_item_data in order_items_data:
+                product = products_by_id.get(int(cart_item_data['product_id']))
                 if not product: 
                     raise ValueError(f"Product with ID {cart_item_data['product_id']} not found.")
-                
                 quantity = int(cart_item_data['quantity'])
                 if quantity <= 0:
                     raise ValueError(f"Quantity for product {product.product_name} must be positive.")
-
                 current_listed_inclusive_price_per_unit, _ = product.get_current_listed_inclusive_price()
-                
+                cart_lines.append((cart_item_data, product, quantity, current_listed_inclusive_price_per_unit))
+
+            # Lock and decrement the stock of every line in one batch
+            reserved_quantities = [(product.product_id, quantity) for _, product, quantity, _ in cart_lines]
+            try:
+                StockReservationService.reserve(reserved_quantities)
+            except InsufficientStockError as e:
+                product = products_by_id.get(e.product_id)
+                if product is None:
+                    raise ValueError(str(e))
+                if e.available is None:
+                    raise ValueError(f"Stock record not found for product {product.product_name} (ID: {product.product_id}).")
+                raise ValueError(f"Insufficient stock for product {product.product_name}. Available: {e.available}, Requested: {e.requested}")
+
+            # Thumbnails to snapshot onto the order items, in one query
+            thumbnails = ProductListingService.get_primary_media_map(list(products_by_id))
+
+            # Resolve GST rules for the whole cart from the compiled rule table,
+            # based on the original listed price of each line
+            applicable_gst_rules = gst_rule_engine.resolve_rules(
+                (product.category_id, listed_price) for _, product, _, listed_price in cart_lines
+            )
+
+            for (cart_item_data, product, quantity, current_listed_inclusive_price_per_unit), applicable_gst_rule in zip(cart_lines, applicable_gst_rules):
                 # Get item-specific discount from the cart (promo discount already applied to specific items)
                 item_specific_discount_inclusive_per_unit = Decimal(cart_item_data.get('item_discount_inclusive', "0.00"))
                 
@@ -85,13 +118,6 @@ class OrderController:
                 if final_customer_pays_for_item_inclusive_per_unit < Decimal("0.00"):
                     final_customer_pays_for_item_inclusive_per_unit = Decimal("0.00") # Cannot be negative
 
-                # Find GST rule based on original listed price for rate determination
-                applicable_gst_rule = GSTRule.find_applicable_rule(
-                    db_session=db.session,
-                    product_category_id=product.category_id,
-                    product_inclusive_price=current_listed_inclusive_price_per_unit 
-                )
-
                 item_gst_rate_percentage = Decimal("0.00")
                 if applicable_gst_rule:
                     item_gst_rate_percentage = Decimal(applicable_gst_rule.gst_rate_percentage)
@@ -107,14 +133,6 @@ class OrderController:
                 else:
                     final_base_price_for_gst_calc_unit = final_customer_pays_for_item_inclusive_per_unit
 
-                # Stock check
-                product_stock = ProductStock.query.filter_by(product_id=product.product_id).first()
-                if not product_stock:
-                     raise ValueError(f"Stock record not found for product {product.product_name} (ID: {product.product_id}).")
-                if product_stock.stock_qty < quantity:
-                    raise ValueError(f"Insufficient stock for product {product.product_name}. Available: {product_stock.stock_qty}, Requested: {quantity}")
-                product_stock.stock_qty -= quantity
-
                 order_item = OrderItem(
                     product_id=product.product_id,
                     merchant_id=product.merchant_id,
@@ -128,7 +146,8 @@ class OrderController:
                     line_item_total_inclusive_gst=(final_customer_pays_for_item_inclusive_per_unit * quantity).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
                     original_listed_inclusive_price_per_unit=current_listed_inclusive_price_per_unit,
                     discount_amount_per_unit_applied=item_specific_discount_inclusive_per_unit, # Only item-specific discount
-                    selected_attributes=json.dumps(cart_item_data.get('selected_attributes', {}))
+                    selected_attributes=json.dumps(cart_item_data.get('selected_attributes', {})),
+                    product_image_url=thumbnails[product.product_id].url if product.product_id in thumbnails else None
                 )
                 new_order_items.append(order_item)
 
@@ -222,18 +241,21 @@ class OrderController:
                     db.session.add(payment_success_history)
                 else: 
                     new_order.payment_status = PaymentStatusEnum.FAILED
-                    new_order.order_status = OrderStatusEnum.PAYMENT_FAILED
+                    new_order.order_status = OrderStatusEnum.CANCELLED_BY_ADMIN
                     payment_failure_history = OrderStatusHistory(
-                        order_id=new_order.order_id, status=OrderStatusEnum.PAYMENT_FAILED,
+                        order_id=new_order.order_id, status=OrderStatusEnum.CANCELLED_BY_ADMIN,
                         changed_by_user_id=user_id, notes=f"Payment failed for card ending in {payment_card.last_four_digits}."
                     )
                     db.session.add(payment_failure_history)
-                    for item_in_order in new_order.items:
-                        stock_to_revert = ProductStock.query.filter_by(product_id=item_in_order.product_id).first()
-                        if stock_to_revert: stock_to_revert.stock_qty += item_in_order.quantity
+                    StockReservationService.restock(reserved_quantities)
                     current_app.logger.info(f"Stock reverted for failed payment on order attempt by user {user_id}.")
             
+            # Orders still waiting on an online payment keep their stock only for a limited time
+            if new_order.order_status == OrderStatusEnum.PENDING_PAYMENT and payment_method_enum != PaymentMethodEnum.COD:
+                StockReservationService.hold(new_order.order_id, reserved_quantities)
+
             db.session.commit()
+            MerchantSalesRollupService.refresh_order(new_order)
             return new_order.serialize(include_items=True, include_history=True)
 
         except ValueError as ve:
@@ -274,32 +296,20 @@ class OrderController:
 
     @staticmethod
     def get_user_orders(user_id, page=1, per_page=10, status_filter_str=None): # Renamed status to status_filter_str
-        query = Order.query.filter_by(user_id=user_id)
+        filters = [Order.user_id == user_id]
         
         if status_filter_str:
             try:
                 status_enum = OrderStatusEnum(status_filter_str.lower()) # Convert to lower for case-insensitivity
-                query = query.filter(Order.order_status == status_enum)
+                filters.append(Order.order_status == status_enum)
             except ValueError:
                 current_app.logger.warning(f"Invalid order status filter: {status_filter_str}")
                 # Optionally, raise an error or return empty if status is invalid
                 # For now, it ignores invalid status
                 pass 
         
-        # Eager load items and product media for efficiency in serialization loop
-        paginated_orders = query.options(
-            db.joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.media)
-        ).order_by(Order.order_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        
-        return {
-            'orders': [order.serialize(include_items=True) for order in paginated_orders.items], # include_items=True
-            'total': paginated_orders.total,
-            'pages': paginated_orders.pages,
-            'current_page': paginated_orders.page,
-            'per_page': paginated_orders.per_page,
-            'has_next': paginated_orders.has_next,
-            'has_prev': paginated_orders.has_prev,
-        }
+        # Page order ids first, then load the page's orders and items in bulk
+        return OrderController._order_history_page(filters, page, per_page)
 
     @staticmethod
     def update_order_status(order_id, new_status_enum: OrderStatusEnum, user_id_performing_action, notes=None):
@@ -333,6 +343,7 @@ class OrderController:
 
         try:
             db.session.commit()
+            MerchantSalesRollupService.refresh_order(order)
             return order.serialize(include_items=True, include_history=True)
         except Exception as e:
             db.session.rollback()
@@ -356,23 +367,26 @@ class OrderController:
         if transaction_id: history_notes += f" Txn ID: {transaction_id}."
 
         # Automatically adjust order status based on payment status
-        current_order_status_is_payment_related = order.order_status in [
-            OrderStatusEnum.PENDING_PAYMENT, OrderStatusEnum.PAYMENT_FAILED
-        ]
+        current_order_status_is_payment_related = order.order_status == OrderStatusEnum.PENDING_PAYMENT
+
+        if payment_status_enum == PaymentStatusEnum.SUCCESSFUL:
+            StockReservationService.confirm(order.order_id)
 
         if payment_status_enum == PaymentStatusEnum.SUCCESSFUL and current_order_status_is_payment_related:
             order.order_status = OrderStatusEnum.PROCESSING # Or AWAITING_FULFILLMENT
             history_notes += f" Order status changed to {order.order_status.value}."
         elif payment_status_enum == PaymentStatusEnum.FAILED and current_order_status_is_payment_related:
-            order.order_status = OrderStatusEnum.PAYMENT_FAILED
+            # There is no payment-failed order status: the order is cancelled and its stock
+            # released, the same as an order whose payment hold expires
+            order.order_status = OrderStatusEnum.CANCELLED_BY_ADMIN
             history_notes += f" Order status changed to {order.order_status.value}."
             # Stock should be reverted here if not done immediately upon gateway failure response
             # This depends on your payment flow. If payment is attempted, fails, and this method is called,
             # then stock revert here is appropriate.
-            for item_in_order in order.items:
-                stock_to_revert = ProductStock.query.filter_by(product_id=item_in_order.product_id).first()
-                if stock_to_revert:
-                    stock_to_revert.stock_qty += item_in_order.quantity
+            StockReservationService.release(
+                order.order_id,
+                [(item.product_id, item.quantity) for item in order.items if item.product_id]
+            )
             current_app.logger.info(f"Stock reverted due to payment status update to FAILED for order {order_id}.")
 
 
@@ -386,6 +400,7 @@ class OrderController:
         
         try:
             db.session.commit()
+            MerchantSalesRollupService.refresh_order(order)
             return order.serialize(include_items=True, include_history=True)
         except Exception as e:
             db.session.rollback()
@@ -428,14 +443,14 @@ class OrderController:
         db.session.add(status_history)
         
         # Restore stock quantities
-        for item in order.items:
-            if item.product_id:
-                product_stock = ProductStock.query.filter_by(product_id=item.product_id).first()
-                if product_stock:
-                    product_stock.stock_qty += item.quantity
+        StockReservationService.release(
+            order.order_id,
+            [(item.product_id, item.quantity) for item in order.items if item.product_id]
+        )
         
         try:
             db.session.commit()
+            MerchantSalesRollupService.refresh_order(order)
             return order.serialize(include_items=True, include_history=True)
         except Exception as e:
             db.session.rollback()
@@ -444,32 +459,35 @@ class OrderController:
 
     @staticmethod
     def get_all_orders(page=1, per_page=10, status_filter_str=None, merchant_id_filter=None): # Renamed params
-        query = Order.query
+        filters = []
         
         if status_filter_str:
             try:
                 status_enum = OrderStatusEnum(status_filter_str.lower())
-                query = query.filter(Order.order_status == status_enum)
+                filters.append(Order.order_status == status_enum)
             except ValueError:
                 current_app.logger.warning(f"Admin/Merchant: Invalid order status filter: {status_filter_str}")
                 pass
                 
         if merchant_id_filter:
-            # Ensure distinct orders if a merchant has multiple items in one order
-            query = query.join(OrderItem).filter(OrderItem.merchant_id == merchant_id_filter).distinct(Order.order_id)
-        
-        paginated_orders = query.options(
-            db.joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.media)
-        ).order_by(Order.order_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            # EXISTS rather than a join, so an order with several of the merchant's items is counted once
+            filters.append(OrderHistoryService.merchant_filter(merchant_id_filter))
         
+        return OrderController._order_history_page(filters, page, per_page)
+
+    @staticmethod
+    def _order_history_page(filters, page, per_page):
+        page, per_page = max(page, 1), max(per_page, 1)
+        order_ids, total = OrderHistoryService.page_order_ids(filters, page, per_page)
+        pages = (total + per_page - 1) // per_page
         return {
-            'orders': [order.serialize(include_items=True) for order in paginated_orders.items],
-            'total': paginated_orders.total,
-            'pages': paginated_orders.pages,
-            'current_page': paginated_orders.page,
-            'per_page': paginated_orders.per_page,
-            'has_next': paginated_orders.has_next,
-            'has_prev': paginated_orders.has_prev,
+            'orders': OrderHistoryService.summaries(order_ids),
+            'total': total,
+            'pages': pages,
+            'current_page': page,
+            'per_page': per_page,
+            'has_next': page < pages,
+            'has_prev': page > 1,
         }
 
     @staticmethod
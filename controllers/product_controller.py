@@ -1,18 +1,28 @@
 from flask import request, jsonify
 from common.database import db
+from common.pagination import CursorError, SortKey, cursor_requested, paginate_keyset, requested_count_mode
 from models.product import Product
 from models.category import Category
 from models.brand import Brand
 from models.product_media import ProductMedia
 from models.enums import MediaType
-from sqlalchemy import desc, or_, func
+from sqlalchemy import desc, or_, func, literal
 from flask_jwt_extended import get_jwt_identity
 from models.product_meta import ProductMeta
 from models.product_attribute import ProductAttribute
 from datetime import datetime, timedelta
 from models.order import OrderItem, Order
 from models.review import Review
+from models.product_rating_stats import ProductRatingStats
+from services.product_listing_service import ProductListingService
+from services.product_rating_service import ProductRatingService
+from services.search import ProductSearchService
+from services.trending_service import TrendingService
+from services.category_tree_service import category_tree
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 class ProductController:
     @staticmethod
@@ -91,20 +101,10 @@ class ProductController:
                 try:
                     category_id = int(category_id)
                     if include_children:
-                        # Get the category and all its child categories
-                        category = Category.query.get(category_id)
-                        if category:
-                            # Get all child category IDs recursively
-                            def get_child_category_ids(parent_id):
-                                child_ids = []
-                                children = Category.query.filter_by(parent_id=parent_id).all()
-                                for child in children:
-                                    child_ids.append(child.category_id)
-                                    child_ids.extend(get_child_category_ids(child.category_id))
-                                return child_ids
-                            
-                            child_category_ids = get_child_category_ids(category_id)
-                            category_ids = [category_id] + child_category_ids
+                        # Filter on the category and all of its descendants
+                        tree = category_tree.get_tree()
+                        if category_id in tree:
+                            category_ids = tree.descendant_ids(category_id)
                             query = query.filter(Product.category_id.in_(category_ids))
                     else:
                         # Only include products from the selected category
@@ -128,9 +128,9 @@ class ProductController:
 
             # Apply price range filter
             if min_price is not None:
-                query = query.filter(Product.selling_price >= min_price)
+                query = query.filter(Product.effective_price >= min_price)
             if max_price is not None:
-                query = query.filter(Product.selling_price <= max_price)
+                query = query.filter(Product.effective_price <= max_price)
 
             # Apply discount filter
             if min_discount is not None:
@@ -138,187 +138,68 @@ class ProductController:
 
             # Apply rating filter
             if min_rating is not None:
-                # Join with reviews table and filter by average rating
-                query = query.join(Review, Product.product_id == Review.product_id, isouter=True)\
-                    .group_by(Product.product_id)\
-                    .having(func.coalesce(func.avg(Review.rating), 0) >= min_rating)
+                # Filter on the materialized average rating
+                query = query.outerjoin(ProductRatingStats, Product.product_id == ProductRatingStats.product_id)\
+                    .filter(ProductRatingService.average_rating_column() >= min_rating)
 
             # Apply search filter
             if search:
-                search_terms = search.lower().split()
-                search_conditions = []
-                
-                for term in search_terms:
-                    term = f"%{term}%"
-                    search_conditions.extend([
-                        Product.product_name.ilike(term),
-                        Product.product_description.ilike(term),
-                        Product.sku.ilike(term),
-                        Category.name.ilike(term),
-                        Brand.name.ilike(term)
-                    ])
-                
-                # Join with category and brand tables for searching
-                query = query.outerjoin(Category).outerjoin(Brand)
-                
-                # Apply the search conditions
-                query = query.filter(or_(*search_conditions))
-                
-                # Add relevance scoring
-                from sqlalchemy import case, literal_column
-                
-                relevance = case(
-                    (Product.product_name.ilike(f"%{search}%"), 3),  # Exact match in name
-                    (Product.product_name.ilike(f"%{search}%"), 2),  # Partial match in name
-                    (Product.sku.ilike(f"%{search}%"), 2),          # Match in SKU
-                    (Category.name.ilike(f"%{search}%"), 1),        # Match in category
-                    (Brand.name.ilike(f"%{search}%"), 1),           # Match in brand
-                    else_=0
-                ).label('relevance')
-                
-                # Execute paginated query with relevance
-                pagination = query.add_columns(relevance).paginate(page=page, per_page=per_page, error_out=False)
+                # Filtered, counted and paged by relevance against the search index
+                pagination = ProductSearchService.paginate(
+                    query, search, page, per_page, options=ProductListingService.eager_load_options()
+                )
                 
                 # Prepare response
                 products = pagination.items
                 total = pagination.total
                 pages = pagination.pages
                 
-                # Get product data with media and reviews
-                product_data = []
-                for product, relevance_score in products:  # Unpack the tuple containing product and relevance score
-                    product_dict = product.serialize()
-                    
-                    # Calculate average rating
-                    avg_rating = db.session.query(func.avg(Review.rating))\
-                        .filter(Review.product_id == product.product_id)\
-                        .scalar() or 0
-                    
-                    # Get product reviews
-                    reviews = Review.query.filter_by(
-                        product_id=product.product_id,
-                        deleted_at=None
-                    ).order_by(Review.created_at.desc()).all()
-                    
-                    # Add frontend-specific fields
-                    product_dict.update({
-                        'id': str(product.product_id),  # Convert to string for frontend
-                        'name': product.product_name,
-                        'description': product.product_description,
-                        'stock': product.stock.stock_qty if product.stock else 0,  # TODO: Add stock tracking
-                        'isNew': True,  # TODO: Add logic for new products
-                        'isBuiltIn': False,  # TODO: Add logic for built-in products
-                        'rating': round(float(avg_rating), 1),  # Add average rating
-                        'discount_pct': float(product.discount_pct),  # Add discount percentage
-                        'relevance_score': relevance_score,  # Add relevance score
-                        'reviews': [{
-                            "id": review.review_id,
-                            "user": {
-                                "id": review.user.id,
-                                "first_name": review.user.first_name if hasattr(review.user, 'first_name') else 'Anonymous',
-                                "last_name": review.user.last_name if hasattr(review.user, 'last_name') else '',
-                                "email": review.user.email if hasattr(review.user, 'email') else None,
-                                "avatar": review.user.avatar_url if hasattr(review.user, 'avatar_url') else None
-                            },
-                            "rating": review.rating,
-                            "title": review.title,
-                            "body": review.body,
-                            "created_at": review.created_at.isoformat(),
-                            "images": [img.serialize() for img in review.images] if review.images else []
-                        } for review in reviews]
-                    })
-                    
-                    # Get primary media
-                    media = ProductController.get_product_media(product.product_id)
-                    if media:
-                        product_dict['primary_image'] = media['url']
-                        product_dict['image'] = media['url']  # For backward compatibility
-                    else:
-                        # As a final fallback, pick any image if available
-                        any_img = ProductMedia.query.filter_by(
-                            product_id=product.product_id,
-                            deleted_at=None,
-                            type=MediaType.IMAGE
-                        ).order_by(ProductMedia.sort_order.asc(), ProductMedia.created_at.asc()).first()
-                        if any_img:
-                            product_dict['primary_image'] = any_img.url
-                            product_dict['image'] = any_img.url
-                    
-                    product_data.append(product_dict)
+                # Get product data with media and reviews (fixed number of queries per page)
+                product_data = ProductListingService.build_product_cards(products, include_reviews=True, lang=request.args.get('lang'))
+                for product, product_dict in zip(products, product_data):
+                    product_dict['relevance_score'] = round(pagination.scores.get(product.product_id, 0.0), 4)
 
             else:
-                if sort_by and hasattr(Product, sort_by):
+                sort_key = None
+                if sort_by == 'rating':
+                    if min_rating is None:
+                        query = query.outerjoin(ProductRatingStats, Product.product_id == ProductRatingStats.product_id)
+                    rating_column = ProductRatingService.average_rating_column()
+                    query = query.order_by(rating_column if order == 'asc' else desc(rating_column))
+                    sort_key = SortKey('rating', rating_column, descending=order != 'asc', nullable=True)
+                elif sort_by and hasattr(Product, sort_by):
                     if order == 'asc':
                         query = query.order_by(getattr(Product, sort_by))
                     else:
                         query = query.order_by(desc(getattr(Product, sort_by)))
+                    if sort_by in Product.__table__.columns:
+                        sort_key = SortKey(sort_by, getattr(Product, sort_by), descending=order != 'asc', nullable=True)
+
+                if cursor_requested():
+                    # Keyset paging on (sort column, product_id); deep pages cost the same as the first
+                    keys = [sort_key] if sort_key else []
+                    keys.append(SortKey('product_id', Product.product_id, descending=order != 'asc'))
+                    page_result = paginate_keyset(
+                        query.options(*ProductListingService.eager_load_options()),
+                        keys, per_page, cursor=request.args.get('cursor'), count=requested_count_mode()
+                    )
+                    product_data = ProductListingService.build_product_cards(page_result.items, include_reviews=True, lang=request.args.get('lang'))
+                    return jsonify({
+                        'products': product_data,
+                        'pagination': page_result.pagination()
+                    })
+
                 # Execute paginated query without relevance
-                pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+                pagination = query.options(*ProductListingService.eager_load_options())\
+                    .paginate(page=page, per_page=per_page, error_out=False)
                 
                 # Prepare response
                 products = pagination.items
                 total = pagination.total
                 pages = pagination.pages
                 
-                # Get product data with media and reviews
-                product_data = []
-                for product in products:
-                    product_dict = product.serialize()
-                    
-                    # Calculate average rating
-                    avg_rating = db.session.query(func.avg(Review.rating))\
-                        .filter(Review.product_id == product.product_id)\
-                        .scalar() or 0
-                    
-                    # Get product reviews
-                    reviews = Review.query.filter_by(
-                        product_id=product.product_id,
-                        deleted_at=None
-                    ).order_by(Review.created_at.desc()).all()
-                    
-                    # Add frontend-specific fields
-                    product_dict.update({
-                        'id': str(product.product_id),  # Convert to string for frontend
-                        'name': product.product_name,
-                        'description': product.product_description,
-                        'stock': product.stock.stock_qty if product.stock else 0,  # TODO: Add stock tracking
-                        'isNew': True,  # TODO: Add logic for new products
-                        'isBuiltIn': False,  # TODO: Add logic for built-in products
-                        'rating': round(float(avg_rating), 1),  # Add average rating
-                        'discount_pct': float(product.discount_pct),  # Add discount percentage
-                        'reviews': [{
-                            "id": review.review_id,
-                            "user": {
-                                "id": review.user.id,
-                                "first_name": review.user.first_name if hasattr(review.user, 'first_name') else 'Anonymous',
-                                "last_name": review.user.last_name if hasattr(review.user, 'last_name') else '',
-                                "email": review.user.email if hasattr(review.user, 'email') else None,
-                                "avatar": review.user.avatar_url if hasattr(review.user, 'avatar_url') else None
-                            },
-                            "rating": review.rating,
-                            "title": review.title,
-                            "body": review.body,
-                            "created_at": review.created_at.isoformat(),
-                            "images": [img.serialize() for img in review.images] if review.images else []
-                        } for review in reviews]
-                    })
-                    
-                    # Get primary media
-                    media = ProductController.get_product_media(product.product_id)
-                    if media:
-                        product_dict['primary_image'] = media['url']
-                        product_dict['image'] = media['url']  # For backward compatibility
-                    else:
-                        any_img = ProductMedia.query.filter_by(
-                            product_id=product.product_id,
-                            deleted_at=None,
-                            type=MediaType.IMAGE
-                        ).order_by(ProductMedia.sort_order.asc(), ProductMedia.created_at.asc()).first()
-                        if any_img:
-                            product_dict['primary_image'] = any_img.url
-                            product_dict['image'] = any_img.url
-                    
-                    product_data.append(product_dict)
+                # Get product data with media and reviews (fixed number of queries per page)
+                product_data = ProductListingService.build_product_cards(products, include_reviews=True, lang=request.args.get('lang'))
 
             return jsonify({
                 'products': product_data,
@@ -331,6 +212,8 @@ class ProductController:
                     'has_prev': pagination.has_prev
                 }
             })
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             print(f"Error in get_all_products: {str(e)}")
             return jsonify({
@@ -630,10 +513,9 @@ class ProductController:
                 deleted_at=None
             ).order_by(Review.created_at.desc()).all()
             
-            # Calculate average rating
-            avg_rating = db.session.query(func.avg(Review.rating))\
-                .filter(Review.product_id == product_id)\
-                .scalar() or 0
+            # Average rating from the materialized aggregates
+            rating_stats = ProductRatingService.get_stats(product_id)
+            avg_rating = rating_stats.rating_avg if rating_stats else 0
 
             # Prepare response data - start with serialized product data
             response_data = product.serialize()
@@ -761,9 +643,9 @@ class ProductController:
             
             # Apply other filters
             if min_price is not None:
-                query = query.filter(Product.selling_price >= min_price)
+                query = query.filter(Product.effective_price >= min_price)
             if max_price is not None:
-                query = query.filter(Product.selling_price <= max_price)
+                query = query.filter(Product.effective_price <= max_price)
             if search:
                 search_term = f"%{search}%"
                 query = query.filter(
@@ -775,9 +657,8 @@ class ProductController:
 
             # Apply rating filter
             if min_rating is not None:
-                query = query.join(Review, Product.product_id == Review.product_id)\
-                    .group_by(Product.product_id)\
-                    .having(func.avg(Review.rating) >= min_rating)
+                query = query.outerjoin(ProductRatingStats, Product.product_id == ProductRatingStats.product_id)\
+                    .filter(ProductRatingService.average_rating_column() >= min_rating)
 
             # Apply discount filter
             if min_discount is not None:
@@ -790,7 +671,8 @@ class ProductController:
                 query = query.order_by(desc(getattr(Product, sort_by)))
                 
             # Execute paginated query
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = query.options(*ProductListingService.eager_load_options())\
+                .paginate(page=page, per_page=per_page, error_out=False)
             
             # Prepare response
             products = pagination.items
@@ -798,34 +680,7 @@ class ProductController:
             pages = pagination.pages
             
             # Get product data with media
-            product_data = []
-            for product in products:
-                product_dict = product.serialize()
-                
-                # Calculate average rating
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter(Review.product_id == product.product_id)\
-                    .scalar() or 0
-                
-                # Add frontend-specific fields
-                product_dict.update({
-                    'id': str(product.product_id),
-                    'name': product.product_name,
-                    'description': product.product_description,
-                    'stock': product.stock.stock_qty if product.stock else 0,
-                    'isNew': True,
-                    'isBuiltIn': False,
-                    'rating': round(float(avg_rating), 1),
-                    'discount_pct': float(product.discount_pct),
-                })
-                
-                # Get primary media
-                media = ProductController.get_product_media(product.product_id)
-                if media:
-                    product_dict['primary_image'] = media['url']
-                    product_dict['image'] = media['url']
-                
-                product_data.append(product_dict)
+            product_data = ProductListingService.build_product_cards(products, lang=request.args.get('lang'))
             
             return jsonify({
                 'products': product_data,
@@ -888,17 +743,8 @@ class ProductController:
             
             # Apply category filter with child categories
             if include_children:
-                # Get all child category IDs recursively
-                def get_child_category_ids(parent_id):
-                    child_ids = []
-                    children = Category.query.filter_by(parent_id=parent_id).all()
-                    for child in children:
-                        child_ids.append(child.category_id)
-                        child_ids.extend(get_child_category_ids(child.category_id))
-                    return child_ids
-                
-                child_category_ids = get_child_category_ids(category_id)
-                category_ids = [category_id] + child_category_ids
+                # The category and all of its descendants
+                category_ids = category_tree.descendant_ids(category_id)
                 query = query.filter(Product.category_id.in_(category_ids))
             else:
                 # Only include products from the selected category
@@ -906,9 +752,9 @@ class ProductController:
             
             # Apply other filters
             if min_price is not None:
-                query = query.filter(Product.selling_price >= min_price)
+                query = query.filter(Product.effective_price >= min_price)
             if max_price is not None:
-                query = query.filter(Product.selling_price <= max_price)
+                query = query.filter(Product.effective_price <= max_price)
             if search:
                 search_term = f"%{search}%"
                 query = query.filter(
@@ -920,9 +766,8 @@ class ProductController:
 
             # Apply rating filter
             if min_rating is not None:
-                query = query.join(Review, Product.product_id == Review.product_id)\
-                    .group_by(Product.product_id)\
-                    .having(func.avg(Review.rating) >= min_rating)
+                query = query.outerjoin(ProductRatingStats, Product.product_id == ProductRatingStats.product_id)\
+                    .filter(ProductRatingService.average_rating_column() >= min_rating)
 
             # Apply discount filter
             if min_discount is not None:
@@ -935,7 +780,8 @@ class ProductController:
                 query = query.order_by(desc(getattr(Product, sort_by)))
                 
             # Execute paginated query
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = query.options(*ProductListingService.eager_load_options())\
+                .paginate(page=page, per_page=per_page, error_out=False)
             
             # Prepare response
             products = pagination.items
@@ -943,34 +789,7 @@ class ProductController:
             pages = pagination.pages
             
             # Get product data with media
-            product_data = []
-            for product in products:
-                product_dict = product.serialize()
-                
-                # Calculate average rating
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter(Review.product_id == product.product_id)\
-                    .scalar() or 0
-                
-                # Add frontend-specific fields
-                product_dict.update({
-                    'id': str(product.product_id),
-                    'name': product.product_name,
-                    'description': product.product_description,
-                    'stock': product.stock.stock_qty if product.stock else 0,
-                    'isNew': True,
-                    'isBuiltIn': False,
-                    'rating': round(float(avg_rating), 1),
-                    'discount_pct': float(product.discount_pct),
-                })
-                
-                # Get primary media
-                media = ProductController.get_product_media(product.product_id)
-                if media:
-                    product_dict['primary_image'] = media['url']
-                    product_dict['image'] = media['url']
-                
-                product_data.append(product_dict)
+            product_data = ProductListingService.build_product_cards(products, lang=request.args.get('lang'))
             
             return jsonify({
                 'products': product_data,
@@ -1102,7 +921,8 @@ class ProductController:
             )
             
             # Execute paginated query
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            pagination = query.options(*ProductListingService.eager_load_options())\
+                .paginate(page=page, per_page=per_page, error_out=False)
             
             # Prepare response
             products = pagination.items
@@ -1110,26 +930,7 @@ class ProductController:
             pages = pagination.pages
             
             # Get product data with media
-            product_data = []
-            for product in products:
-                product_dict = product.serialize()
-                # Add frontend-specific fields
-                product_dict.update({
-                    'id': str(product.product_id),
-                    'name': product.product_name,
-                    'description': product.product_description,
-                    'stock': product.stock.stock_qty if product.stock else 0,  # TODO: Add stock tracking
-                    'isNew': True,  # These are new products
-                    'isBuiltIn': False,
-                })
-                
-                # Get primary media
-                media = ProductController.get_product_media(product.product_id)
-                if media:
-                    product_dict['primary_image'] = media['url']
-                    product_dict['image'] = media['url']
-                
-                product_data.append(product_dict)
+            product_data = ProductListingService.build_product_cards(products, include_rating=False, lang=request.args.get('lang'))
             
             return jsonify({
                 'products': product_data,
@@ -1180,45 +981,6 @@ class ProductController:
             min_rating = request.args.get('min_rating', type=float)
             min_discount = request.args.get('min_discount', type=float)
             
-            # Calculate the date one month ago for recent orders
-            one_month_ago = datetime.utcnow() - timedelta(days=30)
-            
-            # Query to get products ordered the most in the last month
-            from sqlalchemy import func, desc
-            
-            # First, get all completed orders from the last month
-            recent_orders = db.session.query(Order).filter(
-                Order.order_status == 'completed',
-                Order.order_date >= one_month_ago
-            ).all()
-            
-            if not recent_orders:
-                # If no recent orders, get all completed orders
-                recent_orders = db.session.query(Order).filter(
-                    Order.order_status == 'completed'
-                ).all()
-            
-            # Get order IDs
-            order_ids = [order.order_id for order in recent_orders]
-            
-            # Get product IDs and their order counts
-            product_counts = db.session.query(
-                OrderItem.product_id,
-                func.sum(OrderItem.quantity).label('total_ordered')
-            ).filter(
-                OrderItem.order_id.in_(order_ids),
-                OrderItem.product_id.isnot(None)
-            ).group_by(
-                OrderItem.product_id
-            ).order_by(
-                desc('total_ordered')
-            ).all()
-            
-            print(f"Found {len(product_counts)} products with orders")
-            
-            # Get the product IDs
-            product_ids = [pc[0] for pc in product_counts]
-            
             # Base query for products
             query = Product.query.filter(
                 Product.deleted_at.is_(None),
@@ -1232,26 +994,16 @@ class ProductController:
                 try:
                     category_id = int(category_id)
                     if include_children:
-                        # Get the category and all its child categories
-                        category = Category.query.get(category_id)
-                        if category:
-                            # Get all child category IDs recursively
-                            def get_child_category_ids(parent_id):
-                                child_ids = []
-                                children = Category.query.filter_by(parent_id=parent_id).all()
-                                for child in children:
-                                    child_ids.append(child.category_id)
-                                    child_ids.extend(get_child_category_ids(child.category_id))
-                                return child_ids
-                            
-                            child_category_ids = get_child_category_ids(category_id)
-                            category_ids = [category_id] + child_category_ids
+                        # Filter on the category and all of its descendants
+                        tree = category_tree.get_tree()
+                        if category_id in tree:
+                            category_ids = tree.descendant_ids(category_id)
                             query = query.filter(Product.category_id.in_(category_ids))
                     else:
                         # Only include products from the selected category
                         query = query.filter(Product.category_id == category_id)
                 except ValueError:
-                    print(f"Invalid category_id: {category_id}")
+                    logger.warning(f"Invalid category_id: {category_id}")
             
             # Apply brand filter
             if brand_id:
@@ -1264,113 +1016,81 @@ class ProductController:
                         brand_id = int(brand_id)
                         query = query.filter(Product.brand_id == brand_id)
                 except ValueError:
-                    print(f"Invalid brand_id: {brand_id}")
+                    logger.warning(f"Invalid brand_id: {brand_id}")
 
             # Apply price range filter
             if min_price is not None:
-                query = query.filter(Product.selling_price >= min_price)
+                query = query.filter(Product.effective_price >= min_price)
             if max_price is not None:
-                query = query.filter(Product.selling_price <= max_price)
+                query = query.filter(Product.effective_price <= max_price)
 
             # Apply search filter
             if search:
-                search_terms = search.lower().split()
-                search_conditions = []
-                
-                for term in search_terms:
-                    term = f"%{term}%"
-                    search_conditions.extend([
-                        Product.product_name.ilike(term),
-                        Product.product_description.ilike(term),
-                        Product.sku.ilike(term),
-                        Category.name.ilike(term),
-                        Brand.name.ilike(term)
-                    ])
-                
-                # Join with category and brand tables for searching
-                query = query.outerjoin(Category).outerjoin(Brand)
-                
-                # Apply the search conditions
-                query = query.filter(or_(*search_conditions))
+                query = ProductSearchService.filter_query(query, search)
 
             # Apply rating filter
             if min_rating is not None:
-                query = query.join(Review, Product.product_id == Review.product_id)\
-                    .group_by(Product.product_id)\
-                    .having(func.avg(Review.rating) >= min_rating)
+                query = query.outerjoin(ProductRatingStats, Product.product_id == ProductRatingStats.product_id)\
+                    .filter(ProductRatingService.average_rating_column() >= min_rating)
 
             # Apply discount filter
             if min_discount is not None:
                 query = query.filter(Product.discount_pct >= min_discount)
 
-            # Filter by trendy products
-            if product_ids:
-                query = query.filter(Product.product_id.in_(product_ids))
-            
-            # Get the filtered products
-            products = query.all()
-            
-            # Create a dictionary to store order counts
-            order_counts = {pc[0]: pc[1] for pc in product_counts}
-            
-            # Sort products based on order counts
-            products.sort(key=lambda p: order_counts.get(p.product_id, 0), reverse=True)
-            
-            # Apply pagination
-            total = len(products)
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            paginated_products = products[start_idx:end_idx]
-            
+            # Rank by units ordered: leaderboard for the category scope (or the
+            # global board), falling back to the live grouped aggregate
+            ranking_scope = category_id if isinstance(category_id, int) else None
+            ranking = TrendingService.ranking_subquery(ranking_scope)
+            pagination = query.join(
+                ranking, ranking.c.product_id == Product.product_id
+            ).add_columns(
+                ranking.c.total_ordered
+            ).options(
+                *ProductListingService.eager_load_options()
+            ).order_by(
+                ranking.c.total_ordered.desc(),
+                Product.product_id
+            ).paginate(page=page, per_page=per_page, error_out=False)
+
+            if pagination.total == 0:
+                # No trending products for these filters: list the filtered catalogue instead
+                pagination = query.add_columns(
+                    literal(0).label('total_ordered')
+                ).options(
+                    *ProductListingService.eager_load_options()
+                ).order_by(
+                    Product.product_id
+                ).paginate(page=page, per_page=per_page, error_out=False)
+
+            paginated_products = [product for product, _ in pagination.items]
+            order_counts = {product.product_id: int(total or 0) for product, total in pagination.items}
+
             # Prepare response
-            product_data = []
-            for product in paginated_products:
-                product_dict = product.serialize()
-                
-                # Calculate average rating
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter(Review.product_id == product.product_id)\
-                    .scalar() or 0
-                
-                # Add frontend-specific fields
+            product_data = ProductListingService.build_product_cards(paginated_products, lang=request.args.get('lang'))
+            brands = ProductListingService.serialize_brands(product.brand for product in paginated_products)
+            for product, product_dict in zip(paginated_products, product_data):
                 product_dict.update({
-                    'id': str(product.product_id),
-                    'name': product.product_name,
-                    'description': product.product_description,
-                    'stock': product.stock.stock_qty if product.stock else 0,
-                    'isNew': True,
-                    'isBuiltIn': False,
-                    'rating': round(float(avg_rating), 1),
-                    'discount_pct': float(product.discount_pct),
                     'orderCount': order_counts.get(product.product_id, 0),
                     'category': product.category.serialize() if product.category else None,
-                    'brand': product.brand.serialize() if product.brand else None
+                    'brand': brands.get(product.brand_id)
                 })
-                
-                # Get primary media
-                media = ProductController.get_product_media(product.product_id)
-                if media:
-                    product_dict['primary_image'] = media['url']
-                    product_dict['image'] = media['url']
-                
-                product_data.append(product_dict)
             
-            print(f"Returning {len(product_data)} products")
+            logger.debug(f"Returning {len(product_data)} trendy deals")
             
             return jsonify({
                 'products': product_data,
                 'pagination': {
-                    'total': total,
-                    'pages': (total + per_page - 1) // per_page,
+                    'total': pagination.total,
+                    'pages': pagination.pages,
                     'current_page': page,
                     'per_page': per_page,
-                    'has_next': end_idx < total,
-                    'has_prev': page > 1
+                    'has_next': pagination.has_next,
+                    'has_prev': pagination.has_prev
                 }
             })
             
         except Exception as e:
-            print(f"Error in get_trendy_deals: {str(e)}")
+            logger.error(f"Error in get_trendy_deals: {str(e)}", exc_info=True)
             return jsonify({
                 'error': str(e),
                 'products': [],
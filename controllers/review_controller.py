@@ -4,6 +4,7 @@ from models.order import Order, OrderItem
 from models.product import Product
 from models.enums import OrderStatusEnum, MediaType
 from common.database import db
+from services.product_rating_service import ProductRatingService
 import cloudinary
 import cloudinary.uploader
 from datetime import datetime, timezone
@@ -93,8 +94,9 @@ class ReviewController:
                 body=review_data['body']
             )
             
-            # Save review first to get review_id
-            review.save()
+            # Flush first to get review_id for the image folder
+            db.session.add(review)
+            db.session.flush()
             
             # Handle images if provided
             if 'images' in review_data and review_data['images']:
@@ -125,6 +127,10 @@ class ReviewController:
                         # Continue with other images even if one fails
                         continue
             
+            # Rating aggregates last, so the product's stats row is only locked
+            # between this UPDATE and the commit, not across the uploads
+            ProductRatingService.review_added(review.product_id, review.rating)
+
             # Commit all changes
             db.session.commit()
             
@@ -244,6 +250,8 @@ class ReviewController:
                         current_app.logger.error(f"Failed to delete image {image.public_id} from Cloudinary: {e}")
                     
             # Delete review
+            if review.deleted_at is None:
+                ProductRatingService.review_removed(review.product_id, review.rating)
             db.session.delete(review)
             db.session.commit()
             
@@ -251,4 +259,42 @@ class ReviewController:
             
         except Exception as e:
             logger.error(f"Error deleting review: {str(e)}")
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def update_review(review_id, user_id, review_data):
+        """Edit the rating, title or body of a user's review."""
+        try:
+            review = Review.query.filter_by(
+                review_id=review_id,
+                user_id=user_id,
+                deleted_at=None
+            ).first()
+            
+            if not review:
+                raise ValueError("Review not found or does not belong to user")
+                
+            if 'rating' in review_data and review_data['rating'] != review.rating:
+                ProductRatingService.review_rating_changed(
+                    review.product_id, review.rating, review_data['rating']
+                )
+                review.rating = review_data['rating']
+            if 'title' in review_data:
+                review.title = review_data['title']
+            if 'body' in review_data:
+                review.body = review_data['body']
+                
+            db.session.commit()
+            
+            review_data = review.serialize(include_images=True)
+            
+            # Add user details
+            review_data['user'] = ReviewController._get_user_info(review.user)
+            
+            return review_data
+            
+        except Exception as e:
+            logger.error(f"Error updating review: {str(e)}")
+            db.session.rollback()
             raise 
\ No newline at end of file
@@ -1,6 +1,8 @@
 import requests
 import json
 import os
+import uuid
+import redis
 from datetime import datetime, timezone, timedelta
 from flask import current_app
 from common.database import db
@@ -12,6 +14,20 @@ from auth.models.models import User, MerchantProfile
 from models.enums import ShipmentStatusEnum
 from decimal import Decimal
 from urllib.parse import urlencode
+from services.shiprocket_client import shiprocket_client, ShipRocketAuthError
+from services.serviceability_quote_cache import serviceability_quotes
+from common.executor import AppContextExecutor
+from common.cache import get_redis_client
+
+# Held while one call drives a merchant's shipment through ShipRocket
+SHIPMENT_CLAIM_KEY = 'shiprocket:shipment:{}:{}'
+# Deletes the claim only while it still holds this call's token
+RELEASE_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
 class ShipRocketController:
     """Controller for ShipRocket shipping integration"""
@@ -19,60 +35,33 @@ class ShipRocketController:
     BASE_URL = "https://apiv2.shiprocket.in/v1/external"
     
     def __init__(self):
-        self.email = os.getenv('SHIPROCKET_EMAIL')
-        self.password = os.getenv('SHIPROCKET_PASSWORD')
-        self.token = None
-        self.token_expiry = None
+        # HTTP session and auth token live in the shared per-worker client
+        self.client = shiprocket_client
+        # Bounded pool for creating the shipments of multi-merchant orders concurrently
+        self.shipment_executor = AppContextExecutor('shiprocket-shipment', 'SHIPROCKET_SHIPMENT_WORKERS', 4)
     
     def _get_auth_token(self):
-        """Get authentication token from ShipRocket"""
+        """Get authentication token from ShipRocket (shared across workers, see ShipRocketClient)"""
         try:
-            if self.token and self.token_expiry and datetime.now(timezone.utc) < self.token_expiry:
-                return self.token
-            
-            url = f"{self.BASE_URL}/auth/login"
-            payload = {
-                "email": self.email,
-                "password": self.password
-            }
-            
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            
-            data = response.json()
-            self.token = data.get('token')
-            # Token typically expires in 24 h. Use timedelta to avoid hour overflow.
-            self.token_expiry = datetime.now(timezone.utc) + timedelta(hours=23)
-            
-            return self.token
-            
-        except requests.exceptions.RequestException as e:
+            return self.client.get_token()
+        except ShipRocketAuthError as e:
             current_app.logger.error(f"ShipRocket authentication failed: {str(e)}")
             raise Exception("Failed to authenticate with ShipRocket")
     
     def _make_request(self, method, endpoint, data=None, params=None):
         """Make authenticated request to ShipRocket API"""
         try:
-            token = self._get_auth_token()
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.BASE_URL}/{endpoint}"
-            
-            current_app.logger.info(f"Making {method} request to {url}")
+            current_app.logger.info(f"Making {method} request to {self.BASE_URL}/{endpoint}")
             if params:
                 current_app.logger.info(f"Request params: {params}")
             if data:
                 current_app.logger.info(f"Request data: {data}")
             
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, params=params)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            try:
+                response = self.client.request(method, endpoint, data=data, params=params)
+            except ShipRocketAuthError as e:
+                current_app.logger.error(f"ShipRocket authentication failed: {str(e)}")
+                raise Exception("Failed to authenticate with ShipRocket")
             
             # Log response status only, not the full content
             current_app.logger.info(f"ShipRocket API response status: {response.status_code}")
@@ -127,10 +116,74 @@ class ShipRocketController:
             current_app.logger.warning(f"Error formatting phone number {phone}: {str(e)}")
             return 0
     
+    def _serviceability_query(self, pickup_pincode, delivery_pincode, weight, cod=0):
+        """Validate serviceability arguments and return the normalised (banded) QuoteQuery"""
+        if not pickup_pincode or not delivery_pincode:
+            raise Exception("Pickup and delivery pincodes are required")
+        
+        # Ensure pincodes are strings and valid
+        pickup_pincode = str(pickup_pincode).strip()
+        delivery_pincode = str(delivery_pincode).strip()
+        
+        if len(pickup_pincode) != 6 or len(delivery_pincode) != 6:
+            raise Exception("Pincodes must be 6 digits")
+        
+        # Validate weight
+        if weight <= 0 or weight > 50:  # ShipRocket typically has weight limits
+            raise Exception("Weight must be between 0.1 and 50 kg")
+        
+        # COD amount (0 for prepaid)
+        cod_amount = float(cod) if cod else 0
+        return serviceability_quotes.normalize(pickup_pincode, delivery_pincode, weight, cod_amount)
+    
+    def _fetch_serviceability(self, query):
+        """Live serviceability call for a QuoteQuery (raises on failure)"""
+        is_cod = query.cod_amount > 0  # True if COD amount > 0, False for prepaid
+
+        # Always include cod parameter as integer (0 for prepaid, 1 for COD)
+        params = {
+            'pickup_postcode': query.pickup_pincode,
+            'delivery_postcode': query.delivery_pincode,
+            'weight': query.weight,
+            'cod': 1 if is_cod else 0,
+        }
+        
+        # Add COD amount if it's a COD order
+        if is_cod:
+            params['cod_amount'] = query.cod_amount
+        
+        current_app.logger.info(f"ShipRocket serviceability GET request: {params}")
+        
+        try:
+            response = self._make_request('GET', 'courier/serviceability/', params=params)
+            
+            # Log only essential information instead of full response
+            data_section = response.get('data') if isinstance(response, dict) else None
+            companies = []
+            if isinstance(data_section, dict) and data_section.get('available_courier_companies'):
+                companies = data_section.get('available_courier_companies') or []
+            if companies:
+                couriers_count = len(companies)
+                current_app.logger.info(f"ShipRocket serviceability successful: {couriers_count} couriers available")
+                # Clean up the response to return only essential courier information
+                cleaned_couriers = [self._clean_courier_data(courier) for courier in companies]
+                response.setdefault('data', {})['available_courier_companies'] = cleaned_couriers
+            else:
+                current_app.logger.info("ShipRocket serviceability response: No couriers available")
+                response.setdefault('data', {})['available_courier_companies'] = []
+            
+            return response
+        except Exception as e:
+            current_app.logger.error(f"Serviceability GET failed: {str(e)}")
+            raise
+    
     def check_serviceability(self, pickup_pincode, delivery_pincode, weight, cod=0, order_id=None):
         """
         Check courier serviceability and get shipping charges
         
+        Quotes are cached per (pickup, delivery, weight band, COD band); see
+        ServiceabilityQuoteCache.
+        
         Args:
             pickup_pincode (str): Pickup location pincode
             delivery_pincode (str): Delivery location pincode
@@ -142,68 +195,86 @@ class ShipRocketController:
             dict: Serviceability response with available couriers and charges
         """
         try:
-            # Validate and format parameters
-            if not pickup_pincode or not delivery_pincode:
-                raise Exception("Pickup and delivery pincodes are required")
-            
-            # Ensure pincodes are strings and valid
-            pickup_pincode = str(pickup_pincode).strip()
-            delivery_pincode = str(delivery_pincode).strip()
-            
-            if len(pickup_pincode) != 6 or len(delivery_pincode) != 6:
-                raise Exception("Pincodes must be 6 digits")
-            
-            # Validate weight
-            if weight <= 0 or weight > 50:  # ShipRocket typically has weight limits
-                raise Exception("Weight must be between 0.1 and 50 kg")
-            
-            # Convert COD amount to boolean and separate amount
-            cod_amount = float(cod) if cod else 0
-            is_cod = cod_amount > 0  # True if COD amount > 0, False for prepaid
-
-            # Always include cod parameter as integer (0 for prepaid, 1 for COD)
-            params = {
-                'pickup_postcode': pickup_pincode,
-                'delivery_postcode': delivery_pincode,
-                'weight': round(weight, 2),
-                'cod': 1 if is_cod else 0,  # Try integer format
-            }
-            
-            # Add COD amount if it's a COD order
-            if is_cod:
-                params['cod_amount'] = int(cod_amount)
-            
-            # Don't include order_id for serviceability checks
-            
-            current_app.logger.info(f"ShipRocket serviceability GET request: {params}")
-            
-            try:
-                response = self._make_request('GET', 'courier/serviceability/', params=params)
-                
-                # Log only essential information instead of full response
-                data_section = response.get('data') if isinstance(response, dict) else None
-                companies = []
-                if isinstance(data_section, dict) and data_section.get('available_courier_companies'):
-                    companies = data_section.get('available_courier_companies') or []
-                if companies:
-                    couriers_count = len(companies)
-                    current_app.logger.info(f"ShipRocket serviceability successful: {couriers_count} couriers available")
-                    # Clean up the response to return only essential courier information
-                    cleaned_couriers = [self._clean_courier_data(courier) for courier in companies]
-                    response.setdefault('data', {})['available_courier_companies'] = cleaned_couriers
-                else:
-                    current_app.logger.info("ShipRocket serviceability response: No couriers available")
-                    response.setdefault('data', {})['available_courier_companies'] = []
-                
-                return response
-            except Exception as e:
-                current_app.logger.error(f"Serviceability GET failed: {str(e)}")
-                raise
-            
+            query = self._serviceability_query(pickup_pincode, delivery_pincode, weight, cod)
+            return serviceability_quotes.get_quote(query, self._fetch_serviceability)
         except Exception as e:
             current_app.logger.error(f"Serviceability check failed: {str(e)}")
             return {'data': {'available_courier_companies': []}, 'message': str(e)}
     
+    def check_serviceability_bulk(self, requests_list):
+        """
+        Check serviceability for several shipments at once (cache first, misses in parallel)
+        
+        Args:
+            requests_list (list): dicts with pickup_pincode, delivery_pincode, weight and optional cod
+        
+        Returns:
+            list: One check_serviceability-style response per request, in order
+        """
+        responses = [None] * len(requests_list)
+        queries = []
+        for index, item in enumerate(requests_list):
+            try:
+                query = self._serviceability_query(
+                    item.get('pickup_pincode'), item.get('delivery_pincode'),
+                    float(item.get('weight') or 0), item.get('cod', 0)
+                )
+                queries.append((index, query))
+            except Exception as e:
+                responses[index] = {'data': {'available_courier_companies': []}, 'message': str(e)}
+        
+        results = serviceability_quotes.get_quotes([query for _, query in queries], self._fetch_serviceability)
+        for (index, _), result in zip(queries, results):
+            if isinstance(result, Exception):
+                current_app.logger.error(f"Serviceability check failed: {str(result)}")
+                result = {'data': {'available_courier_companies': []}, 'message': str(result)}
+            responses[index] = result
+        return responses
+    
+    def check_cart_serviceability(self, user_id, delivery_pincode, cod=False):
+        """
+        Courier quotes for every merchant in a user's cart, resolved in one batch
+        
+        Args:
+            user_id (int): Cart owner
+            delivery_pincode (str): Delivery pincode
+            cod (bool): Whether the order will be cash on delivery
+        
+        Returns:
+            dict: {merchant_id: serviceability response} for each merchant in the cart
+        """
+        from models.cart import Cart
+        
+        cart = Cart.query.filter_by(user_id=user_id).first()
+        if not cart:
+            return {}
+        
+        packages = {}
+        for item in cart.items:
+            if item.is_deleted:
+                continue
+            package = packages.setdefault(item.merchant_id, {'weight': Decimal('0'), 'amount': Decimal('0')})
+            package['weight'] += (item.shipping_weight_kg or Decimal('0.5')) * item.quantity
+            package['amount'] += (item.product_price or Decimal('0')) * item.quantity  # price stored with special price applied
+        if not packages:
+            return {}
+        
+        merchants = {
+            merchant.id: merchant for merchant in
+            MerchantProfile.query.filter(MerchantProfile.id.in_(list(packages))).all()
+        }
+        merchant_ids = list(packages)
+        responses = self.check_serviceability_bulk([
+            {
+                'pickup_pincode': merchants[merchant_id].postal_code if merchant_id in merchants else None,
+                'delivery_pincode': delivery_pincode,
+                'weight': float(packages[merchant_id]['weight']),
+                'cod': float(packages[merchant_id]['amount']) if cod else 0
+            }
+            for merchant_id in merchant_ids
+        ])
+        return dict(zip(merchant_ids, responses))
+    
     def create_order(self, order_data):
         """
         Create order in ShipRocket
@@ -268,6 +339,57 @@ class ShipRocketController:
             current_app.logger.error(f"Pickup generation failed: {str(e)}")
             raise
     
+    def _completed_shipment_response(self, shipment):
+        """Response for a shipment whose ShipRocket order, AWB and pickup already exist"""
+        return {
+            "success": True,
+            "shiprocket_order_id": shipment.shiprocket_order_id,
+            "shipment_id": shipment.shiprocket_shipment_id,
+            "awb_code": shipment.awb_code,
+            "courier_name": shipment.carrier_name,
+            "tracking_number": shipment.tracking_number or shipment.awb_code,
+            "serviceability": None,
+            "db_shipment": shipment.serialize(),
+            "courier_data": {
+                'courier_company_id': shipment.courier_id,
+                'courier_name': shipment.carrier_name
+            },
+            "already_created": True
+        }
+    
+    def _claim_shipment(self, order_id, merchant_id):
+        """
+        Claim the (order, merchant) shipment so only one call creates it in ShipRocket.
+
+        Returns the claim token, or None when Redis is unavailable; raises while
+        another call holds the claim.
+        """
+        client = get_redis_client(current_app)
+        if client is None:
+            current_app.logger.warning(f"Redis unavailable, creating shipment for order {order_id}, merchant {merchant_id} unclaimed")
+            return None
+        token = uuid.uuid4().hex
+        try:
+            claimed = client.set(
+                SHIPMENT_CLAIM_KEY.format(order_id, merchant_id), token, nx=True,
+                ex=int(current_app.config.get('SHIPROCKET_SHIPMENT_CLAIM_SECONDS', 300))
+            )
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Could not claim shipment for order {order_id}, merchant {merchant_id}: {str(e)}")
+            return None
+        if not claimed:
+            raise Exception(f"Shipment for order {order_id}, merchant {merchant_id} is already being created")
+        return token
+
+    def _release_shipment(self, order_id, merchant_id, token):
+        client = get_redis_client(current_app)
+        if token is None or client is None:
+            return
+        try:
+            client.eval(RELEASE_CLAIM_SCRIPT, 1, SHIPMENT_CLAIM_KEY.format(order_id, merchant_id), token)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Could not release shipment claim for order {order_id}, merchant {merchant_id}: {str(e)}")
+
     def create_shiprocket_order_from_db_order(self, order_id, merchant_id, pickup_address_id, delivery_address_id, courier_id=None):
         """
         Create ShipRocket order from database order
@@ -282,6 +404,7 @@ class ShipRocketController:
         Returns:
             dict: Complete shipping process response
         """
+        claim = None
         try:
             # Get order details
             order = Order.query.filter_by(order_id=order_id).first()
@@ -292,7 +415,20 @@ class ShipRocketController:
             merchant = MerchantProfile.query.filter_by(id=merchant_id).first()
             if not merchant:
                 raise Exception(f"Merchant {merchant_id} not found")
-            
+
+            # One call at a time drives this shipment, so a concurrent retry cannot create the ShipRocket order twice
+            claim = self._claim_shipment(order_id, merchant_id)
+
+            # Retries are idempotent: a shipment that already finished every ShipRocket step is returned as is.
+            # The locking read sees what the previous claim holder committed, not this transaction's snapshot
+            existing_shipment = Shipment.query.filter_by(
+                order_id=order_id,
+                merchant_id=merchant_id
+            ).populate_existing().with_for_update().first()
+            if existing_shipment and existing_shipment.awb_code and existing_shipment.pickup_generated:
+                current_app.logger.info(f"Shipment {existing_shipment.shipment_id} for order {order_id}, merchant {merchant_id} already created")
+                return self._completed_shipment_response(existing_shipment)
+
             # Get addresses
             pickup_address = None
             if pickup_address_id:
@@ -424,17 +560,13 @@ class ShipRocketController:
             current_app.logger.info(f"Creating shipment record for order {order_id}, merchant {merchant_id}")
             
             # Create or update shipment record in database
-            existing_shipment = Shipment.query.filter_by(
-                order_id=order_id, 
-                merchant_id=merchant_id
-            ).first()
-            
             if existing_shipment:
                 current_app.logger.info(f"Updating existing shipment {existing_shipment.shipment_id}")
-                # Update existing shipment
-                existing_shipment.carrier_name = selected_courier.get('courier_name', 'Unknown')
-                existing_shipment.shipment_status = ShipmentStatusEnum.PENDING_PICKUP
-                existing_shipment.courier_id = selected_courier.get('courier_company_id')
+                # Update existing shipment; an assigned AWB keeps the courier it was issued for
+                if not existing_shipment.awb_code:
+                    existing_shipment.carrier_name = selected_courier.get('courier_name', 'Unknown')
+                    existing_shipment.courier_id = selected_courier.get('courier_company_id')
+                    existing_shipment.shipment_status = ShipmentStatusEnum.PENDING_PICKUP
                 existing_shipment.pickup_address_id = pickup_address_id
                 existing_shipment.delivery_address_id = delivery_address_id
                 shipment = existing_shipment
@@ -460,133 +592,140 @@ class ShipRocketController:
                 db.session.rollback()
                 raise
             
-            # Try to create ShipRocket order (but don't fail if it doesn't work)
-            shiprocket_order_id = None
-            shipment_id = None
-            awb_code = None
-            courier_name = selected_courier.get('courier_name', 'Unknown')
+            # Drive the ShipRocket steps (but don't fail if they don't work). Each step is saved as soon as it
+            # succeeds, so a retry resumes where the last attempt stopped instead of creating the order twice
+            shiprocket_order_id = shipment.shiprocket_order_id
+            shipment_id = shipment.shiprocket_shipment_id
+            awb_code = shipment.awb_code
+            courier_name = shipment.carrier_name or selected_courier.get('courier_name', 'Unknown')
             
             try:
-                # Split customer name into first and last name
-                customer_name = delivery_address.contact_name or f"{order.user.first_name} {order.user.last_name}"
-                name_parts = customer_name.strip().split(' ', 1)
-                billing_first_name = name_parts[0] if name_parts else ""
-                billing_last_name = name_parts[1] if len(name_parts) > 1 else ""
+                if not shipment_id:
+                    # Split customer name into first and last name
+                    customer_name = delivery_address.contact_name or f"{order.user.first_name} {order.user.last_name}"
+                    name_parts = customer_name.strip().split(' ', 1)
+                    billing_first_name = name_parts[0] if name_parts else ""
+                    billing_last_name = name_parts[1] if len(name_parts) > 1 else ""
                 
-                # Get or create merchant's pickup location
-                pickup_location_name = self.get_or_create_merchant_pickup_location(merchant_id)
-                current_app.logger.info(f"Using pickup location '{pickup_location_name}' for merchant {merchant_id}")
+                    # Get or create merchant's pickup location
+                    pickup_location_name = self.get_or_create_merchant_pickup_location(merchant_id)
+                    current_app.logger.info(f"Using pickup location '{pickup_location_name}' for merchant {merchant_id}")
                 
-                # Prepare order data for ShipRocket according to official API requirements
-                order_data = {
-                    "order_id": order_id,
-                    "order_date": order.order_date.strftime("%Y-%m-%d %H:%M"),  # Include time
-                    "pickup_location": pickup_location_name,
-                    "comment": "",
-                    "reseller_name": merchant.business_name,
-                    "company_name": merchant.business_name,
-                    "billing_customer_name": billing_first_name,
-                    "billing_last_name": billing_last_name,
-                    "billing_address": delivery_address.address_line1,
-                    "billing_address_2": delivery_address.address_line2 or "",
-                    "billing_isd_code": "",
-                    "billing_city": delivery_address.city,
-                    "billing_pincode": delivery_address.postal_code,
-                    "billing_state": delivery_address.state_province,
-                    "billing_country": delivery_address.country_code,
-                    "billing_email": order.user.email,
-                    "billing_phone": self._format_phone_number(delivery_address.contact_phone or order.user.phone),
-                    "billing_alternate_phone": "",
-                    "shipping_is_billing": "1",
-                    "shipping_customer_name": "",  # Empty when shipping_is_billing is True
-                    "shipping_last_name": "",  # Empty when shipping_is_billing is True
-                    "shipping_address": "",  # Empty when shipping_is_billing is True
-                    "shipping_address_2": "",  # Empty when shipping_is_billing is True
-                    "shipping_city": "",  # Empty when shipping_is_billing is True
-                    "shipping_pincode": "",  # Empty when shipping_is_billing is True
-                    "shipping_country": "",  # Empty when shipping_is_billing is True
-                    "shipping_state": "",  # Empty when shipping_is_billing is True
-                    "shipping_email": "",  # Empty when shipping_is_billing is True
-                    "shipping_phone": "",  # Empty when shipping_is_billing is True
-                    "order_items": order_items,
-                    "payment_method": "Prepaid" if str(order.payment_status.value).lower() == 'successful' else "COD",
-                    "shipping_charges": str(int(float(order.shipping_amount or 0))),
-                    "giftwrap_charges": "",
-                    "transaction_charges": "",
-                    "total_discount": "",
-                    "sub_total": str(int(float(order.total_amount))),
-                    "length": str(float(total_length)),
-                    "breadth": str(float(total_breadth)),
-                    "height": str(float(total_height)),
-                    "weight": str(float(total_weight)),
-                    "ewaybill_no": "",
-                    "customer_gstin": "",
-                    "invoice_number": "",
-                    "order_type": ""
-                }
+                    # Prepare order data for ShipRocket according to official API requirements
+                    order_data = {
+                        "order_id": order_id,
+                        "order_date": order.order_date.strftime("%Y-%m-%d %H:%M"),  # Include time
+                        "pickup_location": pickup_location_name,
+                        "comment": "",
+                        "reseller_name": merchant.business_name,
+                        "company_name": merchant.business_name,
+                        "billing_customer_name": billing_first_name,
+                        "billing_last_name": billing_last_name,
+                        "billing_address": delivery_address.address_line1,
+                        "billing_address_2": delivery_address.address_line2 or "",
+                        "billing_isd_code": "",
+                        "billing_city": delivery_address.city,
+                        "billing_pincode": delivery_address.postal_code,
+                        "billing_state": delivery_address.state_province,
+                        "billing_country": delivery_address.country_code,
+                        "billing_email": order.user.email,
+                        "billing_phone": self._format_phone_number(delivery_address.contact_phone or order.user.phone),
+                        "billing_alternate_phone": "",
+                        "shipping_is_billing": "1",
+                        "shipping_customer_name": "",  # Empty when shipping_is_billing is True
+                        "shipping_last_name": "",  # Empty when shipping_is_billing is True
+                        "shipping_address": "",  # Empty when shipping_is_billing is True
+                        "shipping_address_2": "",  # Empty when shipping_is_billing is True
+                        "shipping_city": "",  # Empty when shipping_is_billing is True
+                        "shipping_pincode": "",  # Empty when shipping_is_billing is True
+                        "shipping_country": "",  # Empty when shipping_is_billing is True
+                        "shipping_state": "",  # Empty when shipping_is_billing is True
+                        "shipping_email": "",  # Empty when shipping_is_billing is True
+                        "shipping_phone": "",  # Empty when shipping_is_billing is True
+                        "order_items": order_items,
+                        "payment_method": "Prepaid" if str(order.payment_status.value).lower() == 'successful' else "COD",
+                        "shipping_charges": str(int(float(order.shipping_amount or 0))),
+                        "giftwrap_charges": "",
+                        "transaction_charges": "",
+                        "total_discount": "",
+                        "sub_total": str(int(float(order.total_amount))),
+                        "length": str(float(total_length)),
+                        "breadth": str(float(total_breadth)),
+                        "height": str(float(total_height)),
+                        "weight": str(float(total_weight)),
+                        "ewaybill_no": "",
+                        "customer_gstin": "",
+                        "invoice_number": "",
+                        "order_type": ""
+                    }
                 
-                current_app.logger.info(f"Final shipping dimensions for order {order_id}: length={total_length}cm, breadth={total_breadth}cm, height={total_height}cm, weight={total_weight}kg")
+                    current_app.logger.info(f"Final shipping dimensions for order {order_id}: length={total_length}cm, breadth={total_breadth}cm, height={total_height}cm, weight={total_weight}kg")
                 
-                # Ensure minimum dimensions and weight if no shipping info was found
-                if total_weight <= 0:
-                    total_weight = Decimal('0.5')  # Minimum 0.5kg
-                    current_app.logger.warning(f"No shipping weight found for order {order_id}, using default 0.5kg")
-                if total_length <= 0:
-                    total_length = Decimal('10')  # Minimum 10cm
-                    current_app.logger.warning(f"No shipping length found for order {order_id}, using default 10cm")
-                if total_breadth <= 0:
-                    total_breadth = Decimal('10')  # Minimum 10cm
-                    current_app.logger.warning(f"No shipping breadth found for order {order_id}, using default 10cm")
-                if total_height <= 0:
-                    total_height = Decimal('10')  # Minimum 10cm
-                    current_app.logger.warning(f"No shipping height found for order {order_id}, using default 10cm")
+                    # Ensure minimum dimensions and weight if no shipping info was found
+                    if total_weight <= 0:
+                        total_weight = Decimal('0.5')  # Minimum 0.5kg
+                        current_app.logger.warning(f"No shipping weight found for order {order_id}, using default 0.5kg")
+                    if total_length <= 0:
+                        total_length = Decimal('10')  # Minimum 10cm
+                        current_app.logger.warning(f"No shipping length found for order {order_id}, using default 10cm")
+                    if total_breadth <= 0:
+                        total_breadth = Decimal('10')  # Minimum 10cm
+                        current_app.logger.warning(f"No shipping breadth found for order {order_id}, using default 10cm")
+                    if total_height <= 0:
+                        total_height = Decimal('10')  # Minimum 10cm
+                        current_app.logger.warning(f"No shipping height found for order {order_id}, using default 10cm")
                 
-                # Validate required fields before sending to ShipRocket
-                required_fields = ['order_id', 'billing_customer_name', 'billing_address', 'billing_city', 'billing_pincode', 'billing_state', 'billing_country', 'billing_email', 'billing_phone']
-                for field in required_fields:
-                    if not order_data.get(field):
-                        current_app.logger.warning(f"Missing required field for ShipRocket order: {field}")
+                    # Validate required fields before sending to ShipRocket
+                    required_fields = ['order_id', 'billing_customer_name', 'billing_address', 'billing_city', 'billing_pincode', 'billing_state', 'billing_country', 'billing_email', 'billing_phone']
+                    for field in required_fields:
+                        if not order_data.get(field):
+                            current_app.logger.warning(f"Missing required field for ShipRocket order: {field}")
                 
-                if not order_items:
-                    current_app.logger.warning("No order items found for ShipRocket order")
+                    if not order_items:
+                        current_app.logger.warning("No order items found for ShipRocket order")
 
-                # Create order in ShipRocket
-                order_response = self.create_order(order_data)
-                
-                if order_response.get('status') == 200:
-                    shiprocket_order_id = order_response['data']['order_id']
-                    shipment_id = order_response['data']['shipment_id']
+                    # Create order in ShipRocket
+                    order_response = self.create_order(order_data)
                     
+                    if order_response.get('status') == 200:
+                        shiprocket_order_id = order_response['data']['order_id']
+                        shipment_id = order_response['data']['shipment_id']
+                        shipment.shiprocket_order_id = shiprocket_order_id
+                        shipment.shiprocket_shipment_id = shipment_id
+                        db.session.commit()
+                    else:
+                        current_app.logger.warning(f"ShipRocket order creation failed: {order_response.get('message', 'Unknown error')}")
+                else:
+                    current_app.logger.info(f"Resuming ShipRocket shipment {shipment_id} for merchant {merchant_id}")
+                
+                if shipment_id and not awb_code:
                     # Assign AWB
                     awb_response = self.assign_awb(shipment_id, selected_courier['courier_company_id'])
                     
                     if awb_response.get('status') == 200:
                         awb_code = awb_response['data']['awb_code']
                         courier_name = awb_response['data']['courier_name']
-                        
-                        # Generate pickup
-                        pickup_response = self.generate_pickup(shipment_id)
-                        
-                        if pickup_response.get('status') == 200:
-                            # Update shipment with ShipRocket details
-                            shipment.shiprocket_order_id = shiprocket_order_id
-                            shipment.shiprocket_shipment_id = shipment_id
-                            shipment.awb_code = awb_code
-                            shipment.tracking_number = awb_code
-                            shipment.carrier_name = courier_name
-                            shipment.shipment_status = ShipmentStatusEnum.LABEL_CREATED
-                            shipment.shipped_date = datetime.now(timezone.utc)
-                            shipment.pickup_generated = True
-                            shipment.pickup_generated_at = datetime.now(timezone.utc)
-                            db.session.commit()
-                            
-                            current_app.logger.info(f"ShipRocket order created successfully for merchant {merchant_id}")
-                        else:
-                            current_app.logger.warning(f"Pickup generation failed: {pickup_response.get('message', 'Unknown error')}")
+                        shipment.awb_code = awb_code
+                        shipment.tracking_number = awb_code
+                        shipment.carrier_name = courier_name
+                        db.session.commit()
                     else:
                         current_app.logger.warning(f"AWB assignment failed: {awb_response.get('message', 'Unknown error')}")
-                else:
-                    current_app.logger.warning(f"ShipRocket order creation failed: {order_response.get('message', 'Unknown error')}")
+                
+                if awb_code and not shipment.pickup_generated:
+                    # Generate pickup
+                    pickup_response = self.generate_pickup(shipment_id)
+                    
+                    if pickup_response.get('status') == 200:
+                        shipment.shipment_status = ShipmentStatusEnum.LABEL_CREATED
+                        shipment.shipped_date = datetime.now(timezone.utc)
+                        shipment.pickup_generated = True
+                        shipment.pickup_generated_at = datetime.now(timezone.utc)
+                        db.session.commit()
+                        
+                        current_app.logger.info(f"ShipRocket order created successfully for merchant {merchant_id}")
+                    else:
+                        current_app.logger.warning(f"Pickup generation failed: {pickup_response.get('message', 'Unknown error')}")
                     
             except Exception as shiprocket_error:
                 current_app.logger.warning(f"ShipRocket order creation failed for merchant {merchant_id}: {str(shiprocket_error)}")
@@ -608,6 +747,8 @@ class ShipRocketController:
             current_app.logger.error(f"ShipRocket order creation failed: {str(e)}")
             db.session.rollback()
             raise
+        finally:
+            self._release_shipment(order_id, merchant_id, claim)
     
     def get_tracking_details(self, awb_code):
         """
@@ -766,36 +907,47 @@ class ShipRocketController:
             if not merchant_items:
                 raise Exception("No merchant items found in order")
             
-            # Create ShipRocket orders for each merchant
+            # Each merchant's pipeline (quote, order, AWB, pickup) runs concurrently with its own app context
+            # and DB session, so the whole order takes about as long as the slowest merchant. The quotes are
+            # already looked up in parallel this way, so no separate prefetch batch runs first
+            merchant_ids = list(merchant_items)
+            
+            def create_for_merchant(merchant_id):
+                current_app.logger.info(f"Creating ShipRocket order for merchant {merchant_id} in order {order_id} with {len(merchant_items[merchant_id])} items")
+                return self.create_shiprocket_order_from_db_order(
+                    order_id=order_id,
+                    merchant_id=merchant_id,
+                    pickup_address_id=None,  # Will use merchant's address
+                    delivery_address_id=delivery_address_id,
+                    courier_id=courier_id
+                )
+            
+            if len(merchant_ids) > 1:
+                results = self.shipment_executor.map_settled(create_for_merchant, merchant_ids)
+            else:
+                results = []
+                for merchant_id in merchant_ids:
+                    try:
+                        results.append(create_for_merchant(merchant_id))
+                    except Exception as e:
+                        results.append(e)
+            
             merchant_responses = {}
             successful_merchants = []
             failed_merchants = []
             
-            for merchant_id, items in merchant_items.items():
-                try:
-                    current_app.logger.info(f"Creating ShipRocket order for merchant {merchant_id} in order {order_id} with {len(items)} items")
-                    
-                    # Create ShipRocket order for this merchant
-                    response = self.create_shiprocket_order_from_db_order(
-                        order_id=order_id,
-                        merchant_id=merchant_id,
-                        pickup_address_id=None,  # Will use merchant's address
-                        delivery_address_id=delivery_address_id,
-                        courier_id=courier_id
-                    )
-                    
-                    merchant_responses[merchant_id] = response
-                    successful_merchants.append(merchant_id)
-                    
-                    current_app.logger.info(f"Successfully created ShipRocket order for merchant {merchant_id}")
-                    
-                except Exception as e:
-                    current_app.logger.error(f"Failed to create ShipRocket order for merchant {merchant_id}: {str(e)}")
+            for merchant_id, response in zip(merchant_ids, results):
+                if isinstance(response, Exception):
+                    current_app.logger.error(f"Failed to create ShipRocket order for merchant {merchant_id}: {str(response)}")
                     merchant_responses[merchant_id] = {
                         "success": False,
-                        "error": str(e)
+                        "error": str(response)
                     }
                     failed_merchants.append(merchant_id)
+                else:
+                    merchant_responses[merchant_id] = response
+                    successful_merchants.append(merchant_id)
+                    current_app.logger.info(f"Successfully created ShipRocket order for merchant {merchant_id}")
             
             current_app.logger.info(f"Bulk ShipRocket order creation completed. Successful: {len(successful_merchants)}, Failed: {len(failed_merchants)}")
             
@@ -1434,4 +1586,8 @@ class ShipRocketController:
                 
         except Exception as e:
             current_app.logger.error(f"Error getting pickup location for shop {shop_id}: {str(e)}")
-            return "Aoin" 
\ No newline at end of file
+            return "Aoin" 
+
+
+# Stateless apart from the shared client, so one instance serves every request
+shiprocket_controller = ShipRocketController()
@@ -8,7 +8,8 @@ from models.shop.shop_order import ShopOrder, ShopOrderItem, ShopOrderStatusHist
 from models.shop.shop_product import ShopProduct
 from models.shop.shop_product_stock import ShopProductStock
 from models.shop.shop_cart import ShopCartItem
-from models.shop.shop_gst_rule import ShopGSTRule
+from services.gst_rule_engine import gst_rule_engine
+from services.stock_reservation_service import StockReservationService, InsufficientStockError
 from models.enums import OrderStatusEnum, PaymentStatusEnum, OrderItemStatusEnum
 from models.user_address import UserAddress
 from models.shop.shop import Shop
@@ -86,26 +87,16 @@ class PublicShopOrderController:
                 if not product or not product.active_flag or not product.is_published:
                     return error_response(f"Product '{product.product_name if product else 'Unknown'}' is not available", 400)
 
-                # Check stock availability
-                stock = product.stock
-                if not stock or stock.stock_qty < cart_item.quantity:
-                    available_qty = stock.stock_qty if stock else 0
-                    return error_response(
-                        f"Insufficient stock for '{product.product_name}'. Available: {available_qty}, Requested: {cart_item.quantity}", 
-                        400
-                    )
-
                 # Calculate pricing with GST
                 # Use current listed inclusive price (special or regular)
                 unit_price, _is_special = product.get_current_listed_inclusive_price()
                 unit_price = Decimal(unit_price)
                 
                 # Find applicable GST rule for this product
-                applicable_gst_rule = ShopGSTRule.find_applicable_rule(
-                    db_session=db.session,
+                applicable_gst_rule = gst_rule_engine.resolve_shop_rule(
                     shop_id=shop_id,
-                    product_category_id=product.category_id,
-                    product_inclusive_price=unit_price
+                    shop_category_id=product.category_id,
+                    inclusive_price=unit_price
                 )
                 
                 item_gst_rate_percentage = Decimal("0.00")
@@ -142,6 +133,22 @@ class PublicShopOrderController:
                 }
                 order_items.append(order_item_data)
 
+            # Lock and decrement the stock of every line in one batch
+            try:
+                StockReservationService.reserve(
+                    [(cart_item.shop_product.product_id, cart_item.quantity) for cart_item in cart_items],
+                    stock_model=ShopProductStock
+                )
+            except InsufficientStockError as e:
+                db.session.rollback()
+                product = next((item.shop_product for item in cart_items if item.shop_product.product_id == e.product_id), None)
+                if product is None:
+                    return error_response(str(e), 409)
+                return error_response(
+                    f"Insufficient stock for '{product.product_name}'. Available: {e.available or 0}, Requested: {e.requested}",
+                    400
+                )
+
             # Calculate totals
             discount_amount = Decimal('0.00')
             shipping_amount = Decimal('0.00')  # Global shipping rules
@@ -169,7 +176,7 @@ class PublicShopOrderController:
             db.session.add(shop_order)
             db.session.flush()  # Get the order_id
 
-            # Create order items and update stock
+            # Create order items (stock was reserved above)
             for item_data in order_items:
                 order_item = ShopOrderItem(
                     order_id=shop_order.order_id,
@@ -177,11 +184,6 @@ class PublicShopOrderController:
                 )
                 db.session.add(order_item)
 
-                # Update stock quantity
-                product = ShopProduct.query.get(item_data['product_id'])
-                if product and product.stock:
-                    product.stock.stock_qty -= item_data['quantity']
-
             # Create initial status history
             status_history = ShopOrderStatusHistory(
                 order_id=shop_order.order_id,
@@ -10,6 +10,8 @@ from models.shop.shop_product_stock import ShopProductStock
 from models.shop.shop_product_meta import ShopProductMeta
 from models.shop.shop_product_variant import ShopProductVariant, ShopVariantAttributeValue
 from models.enums import MediaType
+from services.catalog_translation_service import CatalogTranslationService, CATALOG_SHOP_PRODUCT
+from services.shop_variant_matrix_service import ShopVariantMatrixService
 from sqlalchemy import desc, or_, func, and_
 from datetime import datetime, timezone
 
@@ -156,6 +158,27 @@ class PublicShopProductController:
         
         return product_dict
 
+    @staticmethod
+    def apply_translations(product_data, lang):
+        """Overlay pre-translated text for `lang` onto serialized products (one query per page)"""
+        translation_map = CatalogTranslationService.get_translation_map(
+            CATALOG_SHOP_PRODUCT, [product_dict['product_id'] for product_dict in product_data], lang
+        )
+        for product_dict in product_data:
+            translation = translation_map.get(product_dict['product_id'])
+            if translation is None:
+                continue
+            # Same precedence as enhance_product_with_meta: short description first
+            translated = {
+                'product_name': translation.name,
+                'product_description': translation.short_desc or translation.description,
+                'short_description': translation.short_desc,
+                'full_description': translation.full_desc or translation.description,
+            }
+            product_dict.update({key: value for key, value in translated.items() if value})
+            product_dict['lang'] = lang
+        return product_data
+
     @staticmethod
     def get_products_by_shop(shop_id):
         """Get all published products for a specific shop with pagination and filtering"""
@@ -203,54 +226,12 @@ class PublicShopProductController:
             if brand_id:
                 query = query.filter(ShopProduct.brand_id == brand_id)
 
-            # Price filtering based on current selling price or special price
+            # Price filtering on the current listed price (special price while its window is open)
             if min_price is not None:
-                query = query.filter(
-                    or_(
-                        and_(
-                            ShopProduct.special_price.is_(None),
-                            ShopProduct.selling_price >= min_price
-                        ),
-                        and_(
-                            ShopProduct.special_price.isnot(None),
-                            ShopProduct.special_start <= datetime.now(timezone.utc).date(),
-                            ShopProduct.special_end >= datetime.now(timezone.utc).date(),
-                            ShopProduct.special_price >= min_price
-                        ),
-                        and_(
-                            ShopProduct.special_price.isnot(None),
-                            or_(
-                                ShopProduct.special_start > datetime.now(timezone.utc).date(),
-                                ShopProduct.special_end < datetime.now(timezone.utc).date()
-                            ),
-                            ShopProduct.selling_price >= min_price
-                        )
-                    )
-                )
+                query = query.filter(ShopProduct.effective_price >= min_price)
 
             if max_price is not None:
-                query = query.filter(
-                    or_(
-                        and_(
-                            ShopProduct.special_price.is_(None),
-                            ShopProduct.selling_price <= max_price
-                        ),
-                        and_(
-                            ShopProduct.special_price.isnot(None),
-                            ShopProduct.special_start <= datetime.now(timezone.utc).date(),
-                            ShopProduct.special_end >= datetime.now(timezone.utc).date(),
-                            ShopProduct.special_price <= max_price
-                        ),
-                        and_(
-                            ShopProduct.special_price.isnot(None),
-                            or_(
-                                ShopProduct.special_start > datetime.now(timezone.utc).date(),
-                                ShopProduct.special_end < datetime.now(timezone.utc).date()
-                            ),
-                            ShopProduct.selling_price <= max_price
-                        )
-                    )
-                )
+                query = query.filter(ShopProduct.effective_price <= max_price)
 
             # Discount filtering (COALESCE to 0)
             if discount_min is not None:
@@ -286,7 +267,7 @@ class PublicShopProductController:
                             )
 
             # Sorting
-            valid_sort_fields = ['created_at', 'product_name', 'selling_price', 'special_price']
+            valid_sort_fields = ['created_at', 'product_name', 'selling_price', 'special_price', 'effective_price', 'effective_discount']
             if sort_by in valid_sort_fields and hasattr(ShopProduct, sort_by):
                 if order == 'asc':
                     query = query.order_by(getattr(ShopProduct, sort_by))
@@ -327,6 +308,8 @@ class PublicShopProductController:
                 
                 product_data.append(product_dict)
 
+            PublicShopProductController.apply_translations(product_data, request.args.get('lang'))
+
             return jsonify({
                 'success': True,
                 'shop': shop.serialize(),
@@ -419,47 +402,21 @@ class PublicShopProductController:
             # Get variant information if this product has variants or is a variant
             parent_id = product.parent_product_id if product.parent_product_id else product_id
             
-            # Check if this product has variants
-            variants = ShopProductVariant.query.filter(
-                ShopProductVariant.parent_product_id == parent_id,
-                ShopProductVariant.is_active.is_(True)
-            ).join(
-                ShopProduct, ShopProductVariant.variant_product_id == ShopProduct.product_id
-            ).filter(
-                ShopProduct.shop_id == shop_id,
-                ShopProduct.deleted_at.is_(None),
-                ShopProduct.active_flag.is_(True),
-                ShopProduct.is_published.is_(True)
-            ).order_by(ShopProductVariant.sort_order, ShopProductVariant.created_at).all()
+            # Variant selection data from the parent's cached attribute matrix
+            matrix = ShopVariantMatrixService.get_matrix(parent_id)
 
             # Add variant information to product response
-            if variants:
-                # Get available attributes for variant selection
-                attributes_map = {}
-                for variant in variants:
-                    if variant.attribute_combination:
-                        for attr_name, attr_value in variant.attribute_combination.items():
-                            if attr_name not in attributes_map:
-                                attributes_map[attr_name] = set()
-                            attributes_map[attr_name].add(attr_value)
-
-                attributes_list = []
-                for attr_name, values in attributes_map.items():
-                    attributes_list.append({
-                        'name': attr_name,
-                        'values': sorted(list(values))
-                    })
-
+            if matrix['variants']:
                 product_dict['has_variants'] = True
-                product_dict['variant_attributes'] = attributes_list
-                product_dict['total_variants'] = len(variants)
+                product_dict['variant_attributes'] = matrix['attributes']
+                product_dict['total_variants'] = matrix['total_variants']
                 product_dict['is_parent_product'] = parent_id == product_id
                 
                 # If this is a variant, include the current variant's attributes
                 if product.parent_product_id:
-                    current_variant = next((v for v in variants if v.variant_product_id == product_id), None)
+                    current_variant = next((v for v in matrix['variants'] if v['variant_product_id'] == product_id), None)
                     if current_variant:
-                        product_dict['current_variant_attributes'] = current_variant.attribute_combination
+                        product_dict['current_variant_attributes'] = current_variant['attributes']
             else:
                 product_dict['has_variants'] = False
                 product_dict['variant_attributes'] = []
@@ -547,6 +504,8 @@ class PublicShopProductController:
                 
                 product_data.append(product_dict)
 
+            PublicShopProductController.apply_translations(product_data, request.args.get('lang'))
+
             return jsonify({
                 'success': True,
                 'shop': shop.serialize(),
@@ -745,26 +704,9 @@ class PublicShopProductController:
             # Find the parent product ID
             parent_id = product.parent_product_id if product.parent_product_id else product_id
 
-            # Find variant by exact attribute combination
-            # First get all variants for this parent, then filter in Python for more flexible matching
-            variants = ShopProductVariant.query.filter(
-                ShopProductVariant.parent_product_id == parent_id,
-                ShopProductVariant.is_active.is_(True)
-            ).join(
-                ShopProduct, ShopProductVariant.variant_product_id == ShopProduct.product_id
-            ).filter(
-                ShopProduct.shop_id == shop_id,
-                ShopProduct.deleted_at.is_(None),
-                ShopProduct.active_flag.is_(True),
-                ShopProduct.is_published.is_(True)
-            ).all()
-
-            # Find matching variant by comparing attributes in Python
-            variant = None
-            for v in variants:
-                if v.attribute_combination and set(v.attribute_combination.items()) == set(attributes.items()):
-                    variant = v
-                    break
+            # Find variant by exact attribute combination (hash lookup in the parent's matrix)
+            variant_id = ShopVariantMatrixService.find_variant_id(parent_id, attributes)
+            variant = db.session.get(ShopProductVariant, variant_id) if variant_id else None
 
             if not variant:
                 return jsonify({
@@ -839,41 +781,13 @@ class PublicShopProductController:
             # Find the parent product ID
             parent_id = product.parent_product_id if product.parent_product_id else product_id
 
-            # Get all variants for this parent product
-            variants = ShopProductVariant.query.filter(
-                ShopProductVariant.parent_product_id == parent_id,
-                ShopProductVariant.is_active.is_(True)
-            ).join(
-                ShopProduct, ShopProductVariant.variant_product_id == ShopProduct.product_id
-            ).filter(
-                ShopProduct.shop_id == shop_id,
-                ShopProduct.deleted_at.is_(None),
-                ShopProduct.active_flag.is_(True),
-                ShopProduct.is_published.is_(True)
-            ).all()
-
-            # Aggregate all available attributes and their values
-            attributes_map = {}
-            for variant in variants:
-                if variant.attribute_combination:
-                    for attr_name, attr_value in variant.attribute_combination.items():
-                        if attr_name not in attributes_map:
-                            attributes_map[attr_name] = set()
-                        attributes_map[attr_name].add(attr_value)
-
-            # Convert to list format
-            attributes_list = []
-            for attr_name, values in attributes_map.items():
-                attributes_list.append({
-                    'name': attr_name,
-                    'values': sorted(list(values))
-                })
+            matrix = ShopVariantMatrixService.get_matrix(parent_id)
 
             return jsonify({
                 'success': True,
                 'parent_product_id': parent_id,
-                'attributes': attributes_list,
-                'total_variants': len(variants)
+                'attributes': matrix['attributes'],
+                'total_variants': matrix['total_variants']
             }), 200
 
         except Exception as e:
@@ -8,6 +8,7 @@ from sqlalchemy import desc, or_
 import re
 import cloudinary.uploader
 from http import HTTPStatus
+from services.gst_rule_engine import gst_rule_engine
 
 class ShopCategoryController:
     
@@ -199,6 +200,8 @@ class ShopCategoryController:
             
             db.session.add(category)
             db.session.commit()
+            # Shop GST rules resolve through the shop category lineage
+            gst_rule_engine.invalidate()
             
             return jsonify({
                 'status': 'success',
@@ -352,6 +355,7 @@ class ShopCategoryController:
             category.updated_at = datetime.now(timezone.utc)
             
             db.session.commit()
+            gst_rule_engine.invalidate()
             
             return jsonify({
                 'status': 'success',
@@ -404,6 +408,7 @@ class ShopCategoryController:
             category.is_active = False
             
             db.session.commit()
+            gst_rule_engine.invalidate()
             
             return jsonify({
                 'status': 'success',
@@ -14,6 +14,8 @@ from models.shop.shop_attribute import ShopAttribute, ShopAttributeValue
 from models.enums import MediaType
 from sqlalchemy import desc, or_, func
 from common.decorators import superadmin_required
+from services.catalog_translation_service import CatalogTranslationService, CATALOG_SHOP_PRODUCT
+from services.shop_variant_matrix_service import ShopVariantMatrixService
 from datetime import datetime, timezone
 import random
 import string
@@ -310,6 +312,7 @@ class ShopProductController:
             
             db.session.add(new_product)
             db.session.commit()
+            CatalogTranslationService.schedule_product(CATALOG_SHOP_PRODUCT, new_product)
             
             return jsonify({
                 'status': 'success',
@@ -416,6 +419,8 @@ class ShopProductController:
             product.updated_at = datetime.now(timezone.utc)
             
             db.session.commit()
+            CatalogTranslationService.schedule_product(CATALOG_SHOP_PRODUCT, product)
+            ShopVariantMatrixService.invalidate_for_product(product)
             
             return jsonify({
                 'status': 'success',
@@ -450,6 +455,7 @@ class ShopProductController:
             product.active_flag = False
             
             db.session.commit()
+            ShopVariantMatrixService.invalidate_for_product(product)
             
             return jsonify({
                 'status': 'success',
@@ -1060,6 +1066,8 @@ class ShopProductController:
             
             db.session.add(meta)
             db.session.commit()
+            CatalogTranslationService.schedule_product(CATALOG_SHOP_PRODUCT, product)
+            ShopVariantMatrixService.invalidate_for_product(product)
             
             # Get complete product data with all relationships
             complete_product = ShopProduct.query.filter_by(product_id=product_id).first()
@@ -1121,6 +1129,8 @@ class ShopProductController:
                 
             product.updated_at = datetime.now(timezone.utc)
             db.session.commit()
+            CatalogTranslationService.schedule_product(CATALOG_SHOP_PRODUCT, product)
+            ShopVariantMatrixService.invalidate_for_product(product)
             
             return jsonify({
                 'status': 'success',
@@ -1174,6 +1184,8 @@ class ShopProductController:
 
             product.updated_at = datetime.now(timezone.utc)
             db.session.commit()
+            CatalogTranslationService.schedule_product(CATALOG_SHOP_PRODUCT, product)
+            ShopVariantMatrixService.invalidate_for_product(product)
 
             return jsonify({
                 'status': 'success',
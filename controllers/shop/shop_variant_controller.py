@@ -2,18 +2,30 @@
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.shop.shop_product import ShopProduct
-from models.shop.shop_product_variant import ShopProductVariant, ShopVariantAttributeValue
+from models.shop.shop_product_variant import ShopProductVariant, ShopVariantAttributeValue, attribute_combination_hash
 from models.shop.shop_product_stock import ShopProductStock
 from models.shop.shop_product_media import ShopProductMedia
 from models.shop.shop_attribute import ShopAttribute, ShopAttributeValue
 from models.enums import MediaType
 from common.database import db
 from common.response import success_response, error_response
+from services.shop_variant_matrix_service import ShopVariantMatrixService
 import json
 from datetime import datetime, timezone
 
 class ShopVariantController:
     
+    @staticmethod
+    def _combination_taken(parent_id, attributes, exclude_variant_id=None):
+        """Whether another variant of `parent_id` already has this attribute combination."""
+        query = ShopProductVariant.query.filter(
+            ShopProductVariant.parent_product_id == parent_id,
+            ShopProductVariant.attribute_hash == attribute_combination_hash(attributes)
+        )
+        if exclude_variant_id is not None:
+            query = query.filter(ShopProductVariant.variant_id != exclude_variant_id)
+        return db.session.query(query.exists()).scalar()
+    
     @staticmethod
     @jwt_required()
     def create_variant(parent_id):
@@ -46,6 +58,9 @@ class ShopVariantController:
             if not isinstance(attributes, dict) or not attributes:
                 return error_response("Attributes must be a non-empty object", 400)
             
+            if ShopVariantController._combination_taken(parent_id, attributes):
+                return error_response("A variant with these attributes already exists", 400)
+            
             try:
                 # Create variant product (inherits most from parent)
                 variant_product = ShopProduct(
@@ -129,6 +144,7 @@ class ShopVariantController:
                     variant_relation.is_default = True
                 
                 db.session.commit()
+                ShopVariantMatrixService.invalidate([parent_id])
                 
                 # Return created variant data
                 variant_product.stock = stock
@@ -256,6 +272,11 @@ class ShopVariantController:
                 
                 # Update attributes if provided
                 if 'attributes' in data:
+                    if ShopVariantController._combination_taken(
+                        variant_relation.parent_product_id, data['attributes'], exclude_variant_id=variant_id
+                    ):
+                        return error_response("A variant with these attributes already exists", 400)
+                    
                     # Delete existing variant attributes
                     ShopVariantAttributeValue.query.filter_by(
                         variant_id=variant_id
@@ -293,6 +314,7 @@ class ShopVariantController:
                 variant_product.updated_at = datetime.now(timezone.utc)
                 
                 db.session.commit()
+                ShopVariantMatrixService.invalidate([variant_relation.parent_product_id])
                 
                 return success_response({
                     "variant": variant_relation.serialize(),
@@ -316,6 +338,7 @@ class ShopVariantController:
                 return error_response("Variant not found", 404)
             
             variant_product = variant_relation.variant_product
+            parent_id = variant_relation.parent_product_id
             
             try:
                 # Soft delete the variant product
@@ -331,6 +354,7 @@ class ShopVariantController:
                 ).delete()
                 
                 db.session.commit()
+                ShopVariantMatrixService.invalidate([parent_id])
                 
                 return success_response({"message": "Variant deleted successfully"})
                 
@@ -401,10 +425,21 @@ class ShopVariantController:
             
             created_variants = []
             errors = []
+            # Combinations already taken under this parent, plus those created in this batch
+            taken_hashes = {
+                row.attribute_hash for row in ShopProductVariant.query.with_entities(
+                    ShopProductVariant.attribute_hash
+                ).filter_by(parent_product_id=parent_id).all()
+            }
             
             try:
                 for i, combination in enumerate(attribute_combinations):
                     try:
+                        attribute_hash = attribute_combination_hash(combination.get('attributes', {}))
+                        if attribute_hash in taken_hashes:
+                            errors.append(f"Combination {i+1}: a variant with these attributes already exists")
+                            continue
+                        
                         # Use provided SKU or generate one
                         if 'sku' in combination and combination['sku']:
                             variant_sku = combination['sku']
@@ -490,6 +525,7 @@ class ShopVariantController:
                                     )
                                     db.session.add(variant_media)
                         
+                        taken_hashes.add(attribute_hash)
                         created_variants.append(variant_relation.serialize())
                         
                     except Exception as e:
@@ -499,6 +535,7 @@ class ShopVariantController:
                 
                 if created_variants:
                     db.session.commit()
+                    ShopVariantMatrixService.invalidate([parent_id])
                 else:
                     db.session.rollback()
                     return error_response("No variants created due to errors", 400)
@@ -543,6 +580,11 @@ class ShopVariantController:
             if not attribute_combination:
                 return error_response("No attributes provided", 400)
             
+            if ShopVariantController._combination_taken(
+                variant_relation.parent_product_id, attribute_combination, exclude_variant_id=variant_id
+            ):
+                return error_response("A variant with these attributes already exists", 400)
+            
             try:
                 # Delete existing variant attributes
                 ShopVariantAttributeValue.query.filter_by(
@@ -580,6 +622,7 @@ class ShopVariantController:
                 variant_relation.updated_at = datetime.now(timezone.utc)
                 
                 db.session.commit()
+                ShopVariantMatrixService.invalidate([variant_relation.parent_product_id])
                 
                 return success_response({
                     "variant": variant_relation.serialize(),
@@ -1,6 +1,7 @@
 from models.brand import Brand
 from models.category import Category
 from common.database import db
+from services.search import ProductSearchService
 from datetime import datetime, timezone 
 
 class BrandController:
@@ -36,6 +37,7 @@ class BrandController:
             description=f"Brand with ID {brand_pk_id} not found or has been deleted for update."
         )
 
+        old_name = brand.name
         brand.name = data.get('name', brand.name)
         brand.slug = data.get('slug', brand.slug)
         brand.icon_url = data.get('icon_url', brand.icon_url)
@@ -48,6 +50,9 @@ class BrandController:
         
        
         db.session.commit()
+        if brand.name != old_name:
+            # The brand name is part of each product's search document
+            ProductSearchService.index_products_in(brand_id=brand.brand_id)
         return brand
 
    
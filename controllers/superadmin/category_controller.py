@@ -1,6 +1,8 @@
 from models.category import Category
 from common.database import db
 from sqlalchemy.exc import IntegrityError
+from services.category_tree_service import category_tree
+from services.search import ProductSearchService
 
 class CategoryController:
     @staticmethod
@@ -27,16 +29,22 @@ class CategoryController:
             icon_url=data.get('icon_url')  
         )
         cat.save()
+        category_tree.invalidate()
         return cat
 
     @staticmethod
     def update(category_id, data):
         cat = Category.query.get_or_404(category_id)
+        old_name = cat.name
         cat.name = data.get('name', cat.name)
         cat.slug = data.get('slug', cat.slug)
         cat.parent_id = data.get('parent_id', cat.parent_id)
         cat.icon_url = data.get('icon_url', cat.icon_url)  
         db.session.commit()
+        category_tree.invalidate()
+        if cat.name != old_name:
+            # The category name is part of each product's search document
+            ProductSearchService.index_products_in(category_id=cat.category_id)
         return cat
 
     @staticmethod
@@ -44,4 +52,5 @@ class CategoryController:
         cat = Category.query.get_or_404(category_id)
         db.session.delete(cat)
         db.session.commit()
+        category_tree.invalidate()
         return cat
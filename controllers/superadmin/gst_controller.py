@@ -6,6 +6,7 @@ from models.enums import ProductPriceConditionType # For validation
 from sqlalchemy.exc import IntegrityError
 from werkzeug.exceptions import NotFound, BadRequest
 from decimal import Decimal
+from services.gst_rule_engine import gst_rule_engine
 
 class GSTManagementController:
     @staticmethod
@@ -50,6 +51,7 @@ class GSTManagementController:
             )
             db.session.add(new_rule)
             db.session.commit()
+            gst_rule_engine.invalidate()
             # TODO: Trigger background task to update affected products
             return new_rule.serialize()
         except IntegrityError as e:
@@ -116,6 +118,7 @@ class GSTManagementController:
         
         try:
             db.session.commit()
+            gst_rule_engine.invalidate()
             # TODO: Trigger background task to update affected products
             return rule.serialize()
         except IntegrityError as e:
@@ -136,6 +139,7 @@ class GSTManagementController:
         try:
             db.session.delete(rule)
             db.session.commit()
+            gst_rule_engine.invalidate()
             # TODO: Trigger background task to update affected products (they would revert to next applicable rule or no GST)
             return True # Or some confirmation
         except Exception as e:
@@ -7,6 +7,8 @@ from models.brand import Brand
 from models.category import Category
 from sqlalchemy.orm import joinedload
 from sqlalchemy import and_
+from services.search import ProductSearchService
+from services.catalog_translation_service import CatalogTranslationService, CATALOG_PRODUCT
 
 class ProductMonitoringController:
     @staticmethod
@@ -84,6 +86,8 @@ class ProductMonitoringController:
             variant.rejection_reason = None
 
         db.session.commit()
+        ProductSearchService.index_products([product.product_id] + [variant.product_id for variant in variants])
+        CatalogTranslationService.schedule_products(CATALOG_PRODUCT, [product.product_id] + [variant.product_id for variant in variants])
         return product
 
     @staticmethod
@@ -113,6 +117,7 @@ class ProductMonitoringController:
             variant.rejection_reason = reason.strip()
 
         db.session.commit()
+        ProductSearchService.index_products([product.product_id] + [variant.product_id for variant in variants])
         return product
 
     @staticmethod
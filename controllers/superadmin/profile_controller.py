@@ -1,8 +1,9 @@
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, g
 from common.database import db
 from auth.models.models import User, UserRole
 from common.response import success_response, error_response
 from common.decorators import superadmin_required
+from auth.principal import invalidate_principal, revoke_principal
 import bcrypt
 
 def get_superadmin_profile(user_id):
@@ -35,10 +36,10 @@ def update_superadmin_profile(user_id):
     """Update superadmin profile."""
     try:
         # Get the current user from the request context
-        current_user = request.current_user
+        current_user = g.principal
         
         # Only allow updating own profile or if current user is a superadmin
-        if current_user.id != user_id:
+        if current_user.user_id != user_id:
             return error_response("You can only update your own profile", 403)
         
         superadmin = User.query.filter_by(
@@ -230,10 +231,10 @@ def delete_superadmin(user_id):
     """Delete a superadmin user."""
     try:
         # Get the current user from the request context
-        current_user = request.current_user
+        current_user = g.principal
         
         # Prevent self-deletion
-        if current_user.id == user_id:
+        if current_user.user_id == user_id:
             return error_response("You cannot delete your own account", 400)
         
         superadmin = User.query.filter_by(
@@ -247,6 +248,7 @@ def delete_superadmin(user_id):
         # Soft delete by setting is_active to False
         superadmin.is_active = False
         db.session.commit()
+        revoke_principal(superadmin.id)
         
         return success_response({
             "message": "Superadmin deleted successfully",
@@ -280,6 +282,7 @@ def reactivate_superadmin(user_id):
         # Reactivate by setting is_active to True
         superadmin.is_active = True
         db.session.commit()
+        invalidate_principal(superadmin.id)
         
         return success_response({
             "message": "Superadmin reactivated successfully",
@@ -1,5 +1,6 @@
 from models.review import Review
 from common.database import db
+from services.product_rating_service import ProductRatingService
 
 class ReviewController:
     @staticmethod
@@ -9,6 +10,8 @@ class ReviewController:
     @staticmethod
     def delete(review_id):
         r = Review.query.get_or_404(review_id)
+        if r.deleted_at is None:
+            ProductRatingService.review_removed(r.product_id, r.rating)
         r.deleted_at = db.func.current_timestamp()
         db.session.commit()
         return r
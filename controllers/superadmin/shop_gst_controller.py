@@ -7,6 +7,7 @@ from models.enums import ProductPriceConditionType
 from sqlalchemy.exc import IntegrityError
 from werkzeug.exceptions import NotFound, BadRequest
 from decimal import Decimal
+from services.gst_rule_engine import gst_rule_engine
 
 class ShopGSTManagementController:
     
@@ -105,6 +106,7 @@ class ShopGSTManagementController:
 
             db.session.add(new_rule)
             db.session.commit()
+            gst_rule_engine.invalidate()
 
             current_app.logger.info(f"Shop GST Rule '{new_rule.name}' created successfully by admin {admin_id}")
             return new_rule.serialize()
@@ -177,6 +179,7 @@ class ShopGSTManagementController:
             rule.updated_by = admin_id
 
             db.session.commit()
+            gst_rule_engine.invalidate()
 
             current_app.logger.info(f"Shop GST Rule ID {rule_id} updated successfully by admin {admin_id}")
             return rule.serialize()
@@ -205,6 +208,7 @@ class ShopGSTManagementController:
             
             db.session.delete(rule)
             db.session.commit()
+            gst_rule_engine.invalidate()
 
             current_app.logger.info(f"Shop GST Rule '{rule_name}' from {shop_name} deleted successfully by admin {admin_id}")
             return {"message": f"Shop GST Rule '{rule_name}' deleted successfully."}
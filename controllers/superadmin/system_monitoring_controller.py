@@ -5,6 +5,17 @@ from sqlalchemy import func, desc, and_, case
 import psutil
 import time
 
+# Aggregated rows carry the number of requests they represent in request_count;
+# legacy per-request rows and error records count as one request each.
+REQUEST_WEIGHT = func.coalesce(func.nullif(SystemMonitoring.request_count, 0), 1)
+# Requests that failed; a record of dropped errors stands for request_count of them.
+ERROR_COUNT = func.sum(case((SystemMonitoring.status == 'error', REQUEST_WEIGHT), else_=0))
+# Request-weighted mean latency; rows without a response time (error records) are left out.
+AVG_RESPONSE_TIME = (
+    func.sum(SystemMonitoring.response_time * REQUEST_WEIGHT)
+    / func.nullif(func.sum(case((SystemMonitoring.response_time.isnot(None), REQUEST_WEIGHT), else_=0)), 0)
+)
+
 class SystemMonitoringController:
     @staticmethod
     def get_system_status():
@@ -57,7 +68,7 @@ class SystemMonitoringController:
             # Get average response time by service
             avg_response_times = db.session.query(
                 SystemMonitoring.service_name,
-                func.avg(SystemMonitoring.response_time).label('avg_response_time'),
+                AVG_RESPONSE_TIME.label('avg_response_time'),
                 func.min(SystemMonitoring.response_time).label('min_response_time'),
                 func.max(SystemMonitoring.response_time).label('max_response_time')
             ).filter(
@@ -73,7 +84,7 @@ class SystemMonitoringController:
                     func.convert_tz(SystemMonitoring.timestamp, '+00:00', '+05:30'),
                     '%Y-%m-%d %H:00:00'
                 ).label('hour'),
-                func.avg(SystemMonitoring.response_time).label('avg_response_time')
+                AVG_RESPONSE_TIME.label('avg_response_time')
             ).filter(
                 SystemMonitoring.timestamp >= time_threshold,
                 SystemMonitoring.response_time.isnot(None)
@@ -119,7 +130,7 @@ class SystemMonitoringController:
             # Get error count by type
             error_counts = db.session.query(
                 SystemMonitoring.error_type,
-                func.count(SystemMonitoring.monitoring_id).label('count')
+                func.sum(REQUEST_WEIGHT).label('count')
             ).filter(
                 SystemMonitoring.timestamp >= time_threshold,
                 SystemMonitoring.status == 'error'
@@ -142,7 +153,7 @@ class SystemMonitoringController:
                 'data': {
                     'error_distribution': [{
                         'error_type': error.error_type,
-                        'count': error.count
+                        'count': int(error.count or 0)
                     } for error in error_counts],
                     'recent_errors': [{
                         'timestamp': error.timestamp.isoformat(),
@@ -166,11 +177,11 @@ class SystemMonitoringController:
 
             # Get service metrics
             service_metrics = db.session.query(
-                func.avg(SystemMonitoring.response_time).label('avg_response_time'),
+                AVG_RESPONSE_TIME.label('avg_response_time'),
                 func.min(SystemMonitoring.response_time).label('min_response_time'),
                 func.max(SystemMonitoring.response_time).label('max_response_time'),
-                func.count(SystemMonitoring.monitoring_id).label('total_requests'),
-                func.sum(case((SystemMonitoring.status == 'error', 1), else_=0)).label('error_count'),
+                func.sum(REQUEST_WEIGHT).label('total_requests'),
+                ERROR_COUNT.label('error_count'),
                 func.avg(SystemMonitoring.cpu_usage).label('avg_cpu_usage'),
                 func.avg(SystemMonitoring.memory_usage).label('avg_memory_usage')
             ).filter(
@@ -184,11 +195,11 @@ class SystemMonitoringController:
                     func.convert_tz(SystemMonitoring.timestamp, '+00:00', '+05:30'),
                     '%Y-%m-%d %H:00:00'
                 ).label('hour'),
-                func.avg(SystemMonitoring.response_time).label('avg_response_time'),
+                AVG_RESPONSE_TIME.label('avg_response_time'),
                 func.avg(SystemMonitoring.cpu_usage).label('avg_cpu_usage'),
                 func.avg(SystemMonitoring.memory_usage).label('avg_memory_usage'),
-                func.count(case((SystemMonitoring.status == 'error', 1), else_=0)).label('error_count'),
-                func.count(SystemMonitoring.monitoring_id).label('request_count')
+                ERROR_COUNT.label('error_count'),
+                func.sum(REQUEST_WEIGHT).label('request_count')
             ).filter(
                 SystemMonitoring.service_name == service_name,
                 SystemMonitoring.timestamp >= time_threshold
@@ -216,8 +227,8 @@ class SystemMonitoringController:
             ).limit(10).all()
 
             # Calculate metrics
-            total_requests = service_metrics.total_requests or 0
-            error_count = service_metrics.error_count or 0
+            total_requests = int(service_metrics.total_requests or 0)
+            error_count = int(service_metrics.error_count or 0)
             error_rate = (error_count / total_requests * 100) if total_requests > 0 else 0
             uptime_percentage = ((total_requests - error_count) / total_requests * 100) if total_requests > 0 else 100
 
@@ -256,8 +267,8 @@ class SystemMonitoringController:
                         'response_time': round(metric.avg_response_time or 0, 2),
                         'cpu_usage': round(metric.avg_cpu_usage or 0, 2),
                         'memory_usage': round(metric.avg_memory_usage or 0, 2),
-                        'error_count': metric.error_count,
-                        'request_count': metric.request_count
+                        'error_count': int(metric.error_count or 0),
+                        'request_count': int(metric.request_count or 0)
                     } for metric in hourly_metrics],
                     'recent_errors': [{
                         'timestamp': error.timestamp.isoformat(),
@@ -288,9 +299,9 @@ class SystemMonitoringController:
             # Get service health metrics
             service_health = db.session.query(
                 SystemMonitoring.service_name,
-                func.avg(SystemMonitoring.response_time).label('avg_response_time'),
-                func.count(case((SystemMonitoring.status == 'error', 1), else_=0)).label('error_count'),
-                func.count(SystemMonitoring.monitoring_id).label('total_requests'),
+                AVG_RESPONSE_TIME.label('avg_response_time'),
+                ERROR_COUNT.label('error_count'),
+                func.sum(REQUEST_WEIGHT).label('total_requests'),
                 func.avg(SystemMonitoring.memory_usage).label('avg_memory_usage'),
                 func.avg(SystemMonitoring.cpu_usage).label('avg_cpu_usage')
             ).filter(
@@ -302,7 +313,7 @@ class SystemMonitoringController:
             # Calculate health scores
             health_scores = []
             for service in service_health:
-                error_rate = (service.error_count / service.total_requests * 100) if service.total_requests > 0 else 0
+                error_rate = (int(service.error_count or 0) / int(service.total_requests) * 100) if service.total_requests else 0
                 response_score = 100 - (service.avg_response_time / 1000 * 10) if service.avg_response_time else 100
                 memory_score = 100 - ((service.avg_memory_usage or 0) / system_memory.total * 100)
                 cpu_score = 100 - (service.avg_cpu_usage or 0)
@@ -1,6 +1,8 @@
 from flask import jsonify, request
 from auth.models.models import User, UserRole
+from auth.principal import invalidate_principal, revoke_principal
 from common.database import db
+from common.pagination import CursorError, SortKey, cursor_requested, paginate_keyset, requested_count_mode
 from datetime import datetime
 from sqlalchemy import or_
 from sqlalchemy.exc import SQLAlchemyError
@@ -37,8 +39,32 @@ def get_all_users():
                     'message': 'Invalid role filter'
                 }), 400
         
-        # Execute query
-        users = query.all()
+        # Paging: keyset with `cursor`, page number with `page`; without either the
+        # full list is returned as before
+        pagination = None
+        if cursor_requested():
+            per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+            page_result = paginate_keyset(
+                query, [SortKey('id', User.id, descending=True)], per_page,
+                cursor=request.args.get('cursor'), count=requested_count_mode()
+            )
+            users = page_result.items
+            pagination = page_result.pagination()
+        elif 'page' in request.args:
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+            paged = query.order_by(User.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            users = paged.items
+            pagination = {
+                'total': paged.total,
+                'pages': paged.pages,
+                'current_page': page,
+                'per_page': per_page,
+                'has_next': paged.has_next,
+                'has_prev': paged.has_prev
+            }
+        else:
+            users = query.all()
         
         # Format response
         user_list = []
@@ -59,11 +85,19 @@ def get_all_users():
             }
             user_list.append(user_data)
         
-        return jsonify({
+        response = {
             'status': 'success',
             'data': user_list
-        }), 200
+        }
+        if pagination is not None:
+            response['pagination'] = pagination
+        return jsonify(response), 200
         
+    except CursorError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({
@@ -103,6 +137,10 @@ def update_user_status(user_id):
         user.is_active = new_status == 'Active'
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        if user.is_active:
+            invalidate_principal(user.id)
+        else:
+            revoke_principal(user.id)
         
         return jsonify({
             'status': 'success',
@@ -56,6 +56,12 @@ from models.product_shipping import ProductShipping
 from models.product_media import ProductMedia
 from models.product_stock import ProductStock
 from models.review import Review
+from models.product_rating_stats import ProductRatingStats
+from models.product_search_document import ProductSearchDocument
+from models.product_translation import ProductTranslation, ProductTranslationFailure
+from models.merchant_daily_sales import MerchantDailySales
+from models.trending_product import TrendingProduct
+from models.stock_reservation import StockReservation
 from models.product_attribute import ProductAttribute
 from models.recently_viewed import RecentlyViewed
 
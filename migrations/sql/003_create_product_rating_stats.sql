@@ -0,0 +1,23 @@
+-- Migration: Create product rating aggregates table
+-- Date: 2026-10-17
+-- Description: Materialized per-product rating count/sum/average and star histogram,
+--              maintained on review writes. Populate with `flask reconcile-ratings`.
+
+CREATE TABLE product_rating_stats (
+    product_id INT NOT NULL PRIMARY KEY,
+    rating_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_avg DECIMAL(3,2) NOT NULL DEFAULT 0,
+    star_1 INT NOT NULL DEFAULT 0,
+    star_2 INT NOT NULL DEFAULT 0,
+    star_3 INT NOT NULL DEFAULT 0,
+    star_4 INT NOT NULL DEFAULT 0,
+    star_5 INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_product_rating_avg (rating_avg),
+    INDEX idx_product_rating_count (rating_count),
+
+    CONSTRAINT fk_product_rating_stats_product
+        FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE
+);
@@ -0,0 +1,18 @@
+-- Migration: Create product search documents table
+-- Date: 2026-10-17
+-- Description: Denormalized product search text with FULLTEXT indexes for the
+--              MySQL search backend. Populate with `flask rebuild-search-index`.
+
+CREATE TABLE product_search_documents (
+    product_id INT NOT NULL PRIMARY KEY,
+    title VARCHAR(255) NOT NULL DEFAULT '',
+    keywords TEXT NULL,
+    body TEXT NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    FULLTEXT INDEX ft_product_search_title (title),
+    FULLTEXT INDEX ft_product_search_all (title, keywords, body),
+
+    CONSTRAINT fk_product_search_documents_product
+        FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1,26 @@
+-- Migration: Create trending products leaderboard
+-- Date: 2026-10-17
+-- Description: Precomputed product rankings by units ordered. Rows with a NULL
+--              category_id form the global board; other rows rank a category
+--              subtree. Refreshed by the app scheduler or `flask refresh-trending`.
+
+CREATE TABLE trending_products (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    category_id INT NULL,
+    product_id INT NOT NULL,
+    `rank` INT NOT NULL,
+    total_ordered INT NOT NULL DEFAULT 0,
+    window_days INT NULL,
+    computed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_trending_scope_rank (category_id, `rank`),
+    INDEX idx_trending_product (product_id),
+
+    CONSTRAINT fk_trending_products_category
+        FOREIGN KEY (category_id) REFERENCES categories(category_id) ON DELETE CASCADE,
+    CONSTRAINT fk_trending_products_product
+        FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE
+);
+
+-- Speeds up the grouped ranking join over recent orders
+CREATE INDEX idx_orders_status_date ON orders (order_status, order_date);
@@ -0,0 +1,22 @@
+-- Migration: Create stock reservations table
+-- Date: 2026-10-17
+-- Description: Stock held for orders awaiting online payment. Held rows are
+--              confirmed on payment or released (stock restored, order cancelled)
+--              once expires_at passes; see `flask release-expired-reservations`.
+
+CREATE TABLE stock_reservations (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id VARCHAR(50) NOT NULL,
+    product_id INT NOT NULL,
+    quantity INT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'held',
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    INDEX idx_stock_reservation_order (order_id, status),
+    INDEX idx_stock_reservation_expiry (status, expires_at),
+
+    CONSTRAINT fk_stock_reservations_product
+        FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE
+);
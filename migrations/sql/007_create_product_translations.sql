@@ -0,0 +1,21 @@
+-- Migration: Create product translations table
+-- Date: 2026-10-17
+-- Description: Catalog text pre-translated into each configured locale
+--              (TRANSLATION_LOCALES), served by the listings for ?lang=.
+--              catalog is 'product' or 'shop_product'. Populate with
+--              `flask translate-catalog`.
+
+CREATE TABLE product_translations (
+    catalog VARCHAR(20) NOT NULL,
+    locale VARCHAR(10) NOT NULL,
+    product_id INT NOT NULL,
+    name VARCHAR(255) NOT NULL DEFAULT '',
+    description TEXT NULL,
+    short_desc VARCHAR(255) NULL,
+    full_desc TEXT NULL,
+    source_hash CHAR(40) NOT NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (catalog, locale, product_id),
+    INDEX idx_product_translations_product (catalog, product_id)
+) ENGINE=InnoDB;
@@ -0,0 +1,23 @@
+-- Migration: Create merchant daily sales rollup
+-- Date: 2026-10-17
+-- Description: Units, revenue and orders per merchant, product and day for
+--              the merchant reports and dashboard. product_id 0 holds each
+--              merchant's daily totals. Maintained on order status changes;
+--              backfill with `flask rebuild-sales-rollup`.
+
+CREATE TABLE merchant_daily_sales (
+    merchant_id INT NOT NULL,
+    sale_date DATE NOT NULL,
+    product_id INT NOT NULL,
+    category_id INT NULL,
+    units INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    orders INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (merchant_id, sale_date, product_id),
+    INDEX idx_merchant_daily_sales_category (merchant_id, category_id, sale_date)
+) ENGINE=InnoDB;
+
+-- Lets a rollup refresh read one day of orders by range
+CREATE INDEX idx_orders_order_date ON orders (order_date);
@@ -0,0 +1,50 @@
+-- Migration: Add stored effective price to products and shop products
+-- Date: 2026-10-17
+-- Description: effective_price is the current listed price (special price while
+--              its window is open, selling price otherwise) and
+--              effective_discount the percentage off the selling price, so
+--              price filters and sorts can use an index. Kept current on edits
+--              and by the effective_price_refresh job
+--              (`flask refresh-effective-prices`).
+
+ALTER TABLE products
+    ADD COLUMN effective_price DECIMAL(10, 2) NULL AFTER special_end,
+    ADD COLUMN effective_discount DECIMAL(5, 2) NOT NULL DEFAULT 0 AFTER effective_price;
+
+ALTER TABLE shop_products
+    ADD COLUMN effective_price DECIMAL(10, 2) NULL AFTER special_end,
+    ADD COLUMN effective_discount DECIMAL(5, 2) NOT NULL DEFAULT 0 AFTER effective_price;
+
+-- Backfill; updated_at is kept so the change does not look like an edit
+UPDATE products
+SET effective_price = CASE
+        WHEN special_price IS NOT NULL
+             AND (special_start IS NULL OR special_start <= UTC_DATE())
+             AND (special_end IS NULL OR special_end >= UTC_DATE())
+        THEN special_price ELSE selling_price END,
+    effective_discount = CASE
+        WHEN special_price IS NOT NULL
+             AND (special_start IS NULL OR special_start <= UTC_DATE())
+             AND (special_end IS NULL OR special_end >= UTC_DATE())
+             AND selling_price > 0 AND special_price < selling_price
+        THEN ROUND((selling_price - special_price) * 100 / selling_price, 2) ELSE 0 END,
+    updated_at = updated_at;
+
+UPDATE shop_products
+SET effective_price = CASE
+        WHEN special_price IS NOT NULL
+             AND (special_start IS NULL OR special_start <= UTC_TIMESTAMP())
+             AND (special_end IS NULL OR special_end >= UTC_TIMESTAMP())
+        THEN special_price ELSE selling_price END,
+    effective_discount = CASE
+        WHEN special_price IS NOT NULL
+             AND (special_start IS NULL OR special_start <= UTC_TIMESTAMP())
+             AND (special_end IS NULL OR special_end >= UTC_TIMESTAMP())
+             AND selling_price > 0 AND special_price < selling_price
+        THEN ROUND((selling_price - special_price) * 100 / selling_price, 2) ELSE 0 END,
+    updated_at = updated_at;
+
+CREATE INDEX idx_products_approval_effective_price ON products (approval_status, effective_price);
+CREATE INDEX idx_products_category_effective_price ON products (category_id, effective_price);
+CREATE INDEX idx_shop_products_shop_effective_price ON shop_products (shop_id, effective_price);
+CREATE INDEX idx_shop_products_shop_effective_discount ON shop_products (shop_id, effective_discount);
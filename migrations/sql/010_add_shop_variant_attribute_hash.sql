@@ -0,0 +1,13 @@
+-- Migration: Add attribute-combination hash to shop product variants
+-- Date: 2026-10-17
+-- Description: attribute_hash is the SHA-1 of a variant's canonical attribute
+--              combination (names and values trimmed and case-folded, sorted by
+--              name), unique per parent product, so variant selection is a
+--              single lookup. Existing rows are hashed by
+--              `flask hash-variant-attributes`, which reports any duplicate
+--              combinations instead of failing on them.
+
+ALTER TABLE shop_product_variants
+    ADD COLUMN attribute_hash VARCHAR(40) NULL AFTER attribute_combination;
+
+CREATE UNIQUE INDEX uq_parent_attribute_hash ON shop_product_variants (parent_product_id, attribute_hash);
@@ -0,0 +1,23 @@
+-- Migration: Snapshot the product thumbnail on order items
+-- Date: 2026-10-17
+-- Description: product_image_url holds the product's primary image at the time
+--              of purchase (thumbnail, then main image, then first image by
+--              sort_order), so order history shows the image the customer saw
+--              and does not look up product media per item. Existing items are
+--              backfilled from the product's current media.
+
+ALTER TABLE order_items
+    ADD COLUMN product_image_url VARCHAR(512) NULL AFTER selected_attributes;
+
+UPDATE order_items oi
+SET oi.product_image_url = (
+    SELECT pm.url
+    FROM product_media pm
+    WHERE pm.product_id = oi.product_id
+      AND pm.type = 'IMAGE'
+      AND pm.deleted_at IS NULL
+    ORDER BY pm.is_thumbnail DESC, pm.is_main_image DESC, pm.sort_order, pm.created_at
+    LIMIT 1
+)
+WHERE oi.product_id IS NOT NULL
+  AND oi.product_image_url IS NULL;
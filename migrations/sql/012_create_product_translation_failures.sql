@@ -0,0 +1,18 @@
+-- Migration: Create product translation failures table
+-- Date: 2026-10-17
+-- Description: Products whose text failed to translate into a locale. The
+--              catalog translation sweep skips them until retry_after (which
+--              backs off per attempt) or until the product is edited, so one
+--              untranslatable product no longer blocks the products after it.
+
+CREATE TABLE product_translation_failures (
+    catalog VARCHAR(20) NOT NULL,
+    locale VARCHAR(10) NOT NULL,
+    product_id INT NOT NULL,
+    attempts INT NOT NULL DEFAULT 1,
+    last_error VARCHAR(500) NULL,
+    retry_after DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (catalog, locale, product_id)
+) ENGINE=InnoDB;
@@ -0,0 +1,12 @@
+-- Migration: Index special-price window bounds
+-- Date: 2026-10-17
+-- Description: The effective_price_refresh job only visits products whose
+--              special_start or special_end was crossed since its previous
+--              run; these indexes let it find them with range scans instead
+--              of reading (and locking) every row. `flask
+--              refresh-effective-prices --full` still checks every product.
+
+CREATE INDEX idx_products_special_start ON products (special_start);
+CREATE INDEX idx_products_special_end ON products (special_end);
+CREATE INDEX idx_shop_products_special_start ON shop_products (special_start);
+CREATE INDEX idx_shop_products_special_end ON shop_products (special_end);
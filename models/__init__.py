@@ -18,6 +18,12 @@ from .product_shipping import ProductShipping
 from .promotion import Promotion
 from .product_promotion import ProductPromotion
 from .review import Review
+from .product_rating_stats import ProductRatingStats
+from .product_search_document import ProductSearchDocument
+from .product_translation import ProductTranslation, ProductTranslationFailure
+from .merchant_daily_sales import MerchantDailySales
+from .trending_product import TrendingProduct
+from .stock_reservation import StockReservation
 from .brand_request import BrandRequest
 from .customer_profile import CustomerProfile
 from .user_address import UserAddress
@@ -48,6 +54,13 @@ __all__ = [
     'ProductMeta',
     'ProductPromotion',
     'ProductPlacement',
+    'ProductRatingStats',
+    'ProductSearchDocument',
+    'ProductTranslation',
+    'ProductTranslationFailure',
+    'MerchantDailySales',
+    'TrendingProduct',
+    'StockReservation',
     'SubscriptionPlan',
     'SubscriptionHistory',
     'GSTRule', 
@@ -44,7 +44,10 @@ class Brand(BaseModel):
         """Check if brand has a specific category"""
         return self.categories.filter(brand_categories.c.category_id == category.category_id).count() > 0
 
-    def serialize(self):
+    def serialize(self, categories=None):
+        """`categories`: the brand's categories when already loaded (see ProductListingService.serialize_brands)"""
+        if categories is None:
+            categories = self.categories
         return {
             'brand_id': self.brand_id,
             'name': self.name,
@@ -55,7 +58,7 @@ class Brand(BaseModel):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None,
-            'categories': [category.serialize() for category in self.categories]
+            'categories': [category.serialize() for category in categories]
         }
 
     def serialize_with_categories(self):
@@ -58,25 +58,13 @@ class GSTRule(BaseModel):
     def _get_category_lineage_ids(category_id, db_session):
         """Helper to get category lineage (current, parent, grandparent, etc.)
            Returns an ordered list: [specific_cat_id, parent_id, grandparent_id, ...]
+           Served from the in-memory category tree, so no queries per ancestor.
         """
         if not category_id:
             return []
-        
-        lineage_ids = []
-        current_cat_id = category_id
-        
-        max_depth = 10 
-        count = 0
-
-        while current_cat_id and count < max_depth:
-            lineage_ids.append(current_cat_id)
-            category_obj = db_session.query(Category.parent_id).filter(Category.category_id == current_cat_id).first()
-            if category_obj:
-                current_cat_id = category_obj.parent_id
-            else: # Should not happen if data is consistent, but good to break
-                current_cat_id = None
-            count += 1
-        return lineage_ids
+        # Imported here: the service imports models at module load
+        from services.category_tree_service import category_tree
+        return category_tree.ancestor_ids(category_id)
 
     @staticmethod
     def find_applicable_rule(db_session, product_category_id, product_inclusive_price: Decimal): # price is now inclusive
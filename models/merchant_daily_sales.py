@@ -0,0 +1,33 @@
+from datetime import datetime
+from common.database import db
+
+
+class MerchantDailySales(db.Model):
+    """
+    Pre-aggregated sales per merchant, product and day for merchant reports.
+
+    Each (merchant, day) is recomputed as a whole from orders and order_items
+    by MerchantSalesRollupService whenever one of that day's orders changes
+    status. Rows with product_id 0 hold the merchant's totals for the day
+    (including items whose product was deleted), so `orders` there counts
+    distinct orders; product rows count the orders containing the product.
+    category_id is the product's category when the day was last rolled up, so
+    revenue by category keeps sales in the category they were made in after a
+    product moves; reports that show the product itself use its current one.
+    """
+    __tablename__ = 'merchant_daily_sales'
+
+    TOTAL_PRODUCT_ID = 0
+
+    merchant_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    sale_date   = db.Column(db.Date, primary_key=True)
+    product_id  = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 = all products
+    category_id = db.Column(db.Integer, nullable=True)
+    units       = db.Column(db.Integer, nullable=False, default=0)
+    revenue     = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    orders      = db.Column(db.Integer, nullable=False, default=0)
+    updated_at  = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_merchant_daily_sales_category', 'merchant_id', 'category_id', 'sale_date'),
+    )
@@ -52,6 +52,11 @@ class Order(BaseModel):
     shipping_address_obj = db.relationship('UserAddress', foreign_keys=[shipping_address_id], lazy='joined')
     billing_address_obj = db.relationship('UserAddress', foreign_keys=[billing_address_id], lazy='joined')
 
+    __table_args__ = (
+        db.Index('idx_orders_status_date', 'order_status', 'order_date'),
+        db.Index('idx_orders_order_date', 'order_date'),
+    )
+
     def __repr__(self):
         return f"<Order id={self.order_id} user_id={self.user_id} status='{self.order_status.value}'>"
 
@@ -111,6 +116,9 @@ class OrderItem(BaseModel):
     # NEW: Store selected attributes as JSON
     selected_attributes = db.Column(db.Text, nullable=True)  # JSON string of selected attributes
 
+    # Product thumbnail URL at purchase time, so order history never reads the live catalog
+    product_image_url = db.Column(db.String(512), nullable=True)
+
     item_status = db.Column(db.Enum(OrderItemStatusEnum), nullable=False, default=OrderItemStatusEnum.PENDING_FULFILLMENT)
     # created_at, updated_at from BaseModel
 
@@ -137,12 +145,19 @@ class OrderItem(BaseModel):
                 return {}
         return {}
 
-    def serialize(self):
+    def serialize(self, thumbnails=None):
+        """
+        `thumbnails` ({product_id: url}) supplies images for items bought before
+        product_image_url was recorded; without it such items fall back to the
+        product's current media.
+        """
         total_gst_for_line_item = (self.gst_amount_per_unit or Decimal(0)) * self.quantity
         
         # Get product image
-        product_image = None
-        if self.product and hasattr(self.product, 'media') and self.product.media:
+        product_image = self.product_image_url
+        if product_image is None and thumbnails is not None:
+            product_image = thumbnails.get(self.product_id)
+        elif product_image is None and self.product and hasattr(self.product, 'media') and self.product.media:
             # Find the first image media, ordered by sort_order
             from models.enums import MediaType
             image_media = sorted([m for m in self.product.media if m.type == MediaType.IMAGE], key=lambda m: m.sort_order)
@@ -0,0 +1,95 @@
+# models/pricing.py
+"""
+Current listed price of a product: its special price while the special
+window is open, its selling price otherwise.
+
+Product and ShopProduct store the result in `effective_price` (with the
+percentage off the selling price in `effective_discount`) so listings can
+filter and sort on an indexed column. The stored values are recomputed
+whenever a product row is inserted or updated, and
+EffectivePriceService.refresh() catches windows that opened or closed since.
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import and_, case, event, func, or_
+
+
+def window_reference(column_or_value, now=None):
+    """`now` as a datetime for DateTime windows, as a date for Date windows."""
+    now = now or datetime.utcnow()
+    is_datetime = isinstance(column_or_value, datetime) or (
+        hasattr(column_or_value, 'type') and column_or_value.type.python_type is datetime
+    )
+    return now if is_datetime else now.date()
+
+
+def _as_bound(value):
+    """Window bound as stored: ISO strings parsed, aware datetimes made naive UTC."""
+    if isinstance(value, str):
+        value = value.strip()
+        if len(value) == 10:
+            return date.fromisoformat(value)
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def current_listed_price(selling_price, special_price, special_start, special_end, now=None):
+    """(price, is_on_special) for the given price fields at `now` (UTC)."""
+    special_start, special_end = _as_bound(special_start), _as_bound(special_end)
+    if special_price is None:
+        return selling_price, False
+    if special_start is not None and special_start > window_reference(special_start, now):
+        return selling_price, False
+    if special_end is not None and special_end < window_reference(special_end, now):
+        return selling_price, False
+    return special_price, True
+
+
+def discount_percentage(selling_price, price):
+    """Percentage off `selling_price`, rounded to 2 places (0 when not discounted)."""
+    if not selling_price or price is None or price >= selling_price:
+        return Decimal('0.00')
+    off = (Decimal(str(selling_price)) - Decimal(str(price))) * 100 / Decimal(str(selling_price))
+    return off.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def on_special_clause(model, now=None):
+    """SQL condition: the model's special window is open at `now`."""
+    reference = window_reference(model.special_start, now)
+    return and_(
+        model.special_price.isnot(None),
+        or_(model.special_start.is_(None), model.special_start <= reference),
+        or_(model.special_end.is_(None), model.special_end >= reference)
+    )
+
+
+def effective_price_expression(model, now=None):
+    """SQL expression for the model's current listed price (mirrors current_listed_price)."""
+    return case((on_special_clause(model, now), model.special_price), else_=model.selling_price)
+
+
+def effective_discount_expression(model, now=None):
+    """SQL expression for the percentage off the selling price (mirrors discount_percentage)."""
+    return case(
+        (and_(on_special_clause(model, now), model.selling_price > 0, model.special_price < model.selling_price),
+         func.round((model.selling_price - model.special_price) * 100 / model.selling_price, 2)),
+        else_=0
+    )
+
+
+def _sync_effective_price(mapper, connection, target):
+    selling_price = Decimal(str(target.selling_price)) if target.selling_price is not None else None
+    special_price = Decimal(str(target.special_price)) if target.special_price is not None else None
+    price, _ = current_listed_price(selling_price, special_price, target.special_start, target.special_end)
+    target.effective_price = price
+    target.effective_discount = discount_percentage(selling_price, price)
+
+
+def track_effective_price(model):
+    """Keep `effective_price`/`effective_discount` in step with every insert and update of `model`."""
+    event.listen(model, 'before_insert', _sync_effective_price)
+    event.listen(model, 'before_update', _sync_effective_price)
+    return model
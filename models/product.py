@@ -4,6 +4,7 @@ from common.database import db, BaseModel
 from auth.models.models import MerchantProfile
 from models.category import Category
 from models.brand import Brand
+from models.pricing import current_listed_price, track_effective_price
 
 from decimal import Decimal
 
@@ -35,6 +36,11 @@ class Product(BaseModel):
     special_price = db.Column(db.Numeric(10,2), nullable=True) 
     special_start = db.Column(db.Date)
     special_end   = db.Column(db.Date)
+
+    # Current listed price (special while its window is open, selling otherwise) and the
+    # percentage off selling_price; maintained by models.pricing for price filters and sorts.
+    effective_price    = db.Column(db.Numeric(10,2), nullable=True)
+    effective_discount = db.Column(db.Numeric(5,2), nullable=False, default=0)
     
     active_flag   = db.Column(db.Boolean, default=True, nullable=False)
     
@@ -60,21 +66,19 @@ class Product(BaseModel):
     
     parent = db.relationship('Product', remote_side=[product_id], backref='variants')
 
+    __table_args__ = (
+        db.Index('idx_products_approval_effective_price', 'approval_status', 'effective_price'),
+        db.Index('idx_products_category_effective_price', 'category_id', 'effective_price'),
+        db.Index('idx_products_special_start', 'special_start'),
+        db.Index('idx_products_special_end', 'special_end'),
+    )
+
     # REMOVED: update_base_price_and_gst_details() method
     # REMOVED: get_effective_inclusive_price_and_base() - this logic moves to checkout/invoice calculation
 
     def get_current_listed_inclusive_price(self):
         """Returns the current GST-inclusive price (special or regular) listed by the merchant."""
-        today = datetime.now(timezone.utc).date()
-        is_on_special = False
-        current_price = self.selling_price
-
-        if self.special_price is not None and \
-           (self.special_start is None or self.special_start <= today) and \
-           (self.special_end is None or self.special_end >= today):
-            current_price = self.special_price
-            is_on_special = True
-        return current_price, is_on_special
+        return current_listed_price(self.selling_price, self.special_price, self.special_start, self.special_end)
 
     def serialize(self):
 
@@ -162,3 +166,6 @@ class Product(BaseModel):
             "variants": [variant.serialize() for variant in self.variants] if self.variants else [],
             "stock": self.stock.stock_qty if self.stock else 0
         }
+
+
+track_effective_price(Product)
@@ -0,0 +1,55 @@
+from datetime import datetime
+from common.database import db
+from models.product import Product
+
+
+class ProductRatingStats(db.Model):
+    """
+    Denormalized rating aggregates per product (non-deleted reviews only).
+
+    Maintained incrementally by ProductRatingService whenever a review is
+    created, edited or deleted, and rebuilt by `flask reconcile-ratings`.
+    """
+    __tablename__ = 'product_rating_stats'
+
+    product_id   = db.Column(db.Integer, db.ForeignKey('products.product_id'), primary_key=True)
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum   = db.Column(db.Integer, default=0, nullable=False)
+    rating_avg   = db.Column(db.Numeric(3, 2), default=0, nullable=False)
+
+    # Star histogram
+    star_1 = db.Column(db.Integer, default=0, nullable=False)
+    star_2 = db.Column(db.Integer, default=0, nullable=False)
+    star_3 = db.Column(db.Integer, default=0, nullable=False)
+    star_4 = db.Column(db.Integer, default=0, nullable=False)
+    star_5 = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationship
+    product = db.relationship('Product', backref=db.backref('rating_stats', uselist=False))
+
+    __table_args__ = (
+        db.Index('idx_product_rating_avg', 'rating_avg'),
+        db.Index('idx_product_rating_count', 'rating_count'),
+    )
+
+    @property
+    def distribution(self):
+        return {
+            '1': self.star_1,
+            '2': self.star_2,
+            '3': self.star_3,
+            '4': self.star_4,
+            '5': self.star_5
+        }
+
+    def serialize(self):
+        return {
+            'product_id': self.product_id,
+            'rating_count': self.rating_count,
+            'rating_sum': self.rating_sum,
+            'average_rating': float(self.rating_avg or 0),
+            'rating_distribution': self.distribution,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,22 @@
+from datetime import datetime
+from common.database import db
+
+
+class ProductSearchDocument(db.Model):
+    """
+    Denormalized search text per approved product, backing the MySQL FULLTEXT
+    search backend. Rows are written by ProductSearchService on product
+    create/update/approval and rebuilt by `flask rebuild-search-index`.
+    """
+    __tablename__ = 'product_search_documents'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id'), primary_key=True)
+    title      = db.Column(db.String(255), nullable=False, default='')
+    keywords   = db.Column(db.Text, nullable=True)  # sku, category and brand names
+    body       = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ft_product_search_title', 'title', mysql_prefix='FULLTEXT'),
+        db.Index('ft_product_search_all', 'title', 'keywords', 'body', mysql_prefix='FULLTEXT'),
+    )
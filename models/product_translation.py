@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from common.database import db
+
+
+class ProductTranslation(db.Model):
+    """
+    Pre-translated catalog text per product and locale.
+
+    `catalog` tells the id space apart: 'product' rows belong to products,
+    'shop_product' rows to shop_products (which also carry the meta
+    descriptions). Rows are written by CatalogTranslationService after a
+    product is approved/published or edited, and `source_hash` lets unchanged
+    text skip retranslation.
+    """
+    __tablename__ = 'product_translations'
+
+    catalog     = db.Column(db.String(20), primary_key=True)
+    locale      = db.Column(db.String(10), primary_key=True)
+    product_id  = db.Column(db.Integer, primary_key=True)
+    name        = db.Column(db.String(255), nullable=False, default='')
+    description = db.Column(db.Text, nullable=True)
+    short_desc  = db.Column(db.String(255), nullable=True)  # shop_product only
+    full_desc   = db.Column(db.Text, nullable=True)  # shop_product only
+    source_hash = db.Column(db.String(40), nullable=False)
+    updated_at  = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_product_translations_product', 'catalog', 'product_id'),
+    )
+
+
+class ProductTranslationFailure(db.Model):
+    """
+    A product whose text could not be translated into `locale`. The sweep
+    leaves it alone until `retry_after` (backing off with each attempt) or
+    until the product is edited; a successful translation deletes the row.
+    """
+    __tablename__ = 'product_translation_failures'
+
+    catalog     = db.Column(db.String(20), primary_key=True)
+    locale      = db.Column(db.String(10), primary_key=True)
+    product_id  = db.Column(db.Integer, primary_key=True)
+    attempts    = db.Column(db.Integer, nullable=False, default=1)
+    last_error  = db.Column(db.String(500), nullable=True)
+    retry_after = db.Column(db.DateTime, nullable=False)
+    updated_at  = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
@@ -4,6 +4,7 @@
 from datetime import datetime, timezone
 from common.database import db, BaseModel
 from auth.models.models import User  # Assuming superadmins are in the User table
+from models.pricing import current_listed_price, track_effective_price
 
 from decimal import Decimal
 import json
@@ -28,6 +29,10 @@ class ShopProduct(BaseModel):
     special_price = db.Column(db.Numeric(10,2), nullable=True) 
     special_start = db.Column(db.DateTime, nullable=True)
     special_end   = db.Column(db.DateTime, nullable=True)
+
+    # Current listed price and percentage off selling_price, maintained by models.pricing
+    effective_price    = db.Column(db.Numeric(10,2), nullable=True)
+    effective_discount = db.Column(db.Numeric(5,2), nullable=False, default=0)
     
     active_flag   = db.Column(db.Boolean, default=True, nullable=False)
     
@@ -51,18 +56,16 @@ class ShopProduct(BaseModel):
     # Relationship to get variant relationships for this product as parent
     variant_relations = db.relationship('ShopProductVariant', foreign_keys='ShopProductVariant.parent_product_id', back_populates='parent_product')
 
+    __table_args__ = (
+        db.Index('idx_shop_products_shop_effective_price', 'shop_id', 'effective_price'),
+        db.Index('idx_shop_products_shop_effective_discount', 'shop_id', 'effective_discount'),
+        db.Index('idx_shop_products_special_start', 'special_start'),
+        db.Index('idx_shop_products_special_end', 'special_end'),
+    )
+
     def get_current_listed_inclusive_price(self):
         """Returns the current GST-inclusive price (special or regular)."""
-        today = datetime.now(timezone.utc).date()
-        is_on_special = False
-        current_price = self.selling_price
-
-        if self.special_price is not None and \
-           (self.special_start is None or self.special_start <= today) and \
-           (self.special_end is None or self.special_end >= today):
-            current_price = self.special_price
-            is_on_special = True
-        return current_price, is_on_special
+        return current_listed_price(self.selling_price, self.special_price, self.special_start, self.special_end)
 
     def is_parent_product(self):
         """Check if this product is a parent (has variants)"""
@@ -332,3 +335,5 @@ class ShopProduct(BaseModel):
         
         return data
 
+
+track_effective_price(ShopProduct)
@@ -1,8 +1,25 @@
 # models/shop/shop_product_variant.py
 from datetime import datetime, timezone
+from sqlalchemy import event, inspect
 from common.database import db, BaseModel
+import hashlib
 import json
 
+
+def normalize_attributes(attributes):
+    """Canonical form of an attribute combination: trimmed, case-folded names and values, sorted by name."""
+    return sorted(
+        (str(name).strip().casefold(), str(value).strip().casefold())
+        for name, value in (attributes or {}).items()
+    )
+
+
+def attribute_combination_hash(attributes):
+    """SHA-1 of the canonical combination; equal for the same attributes in any key order or case."""
+    canonical = json.dumps(normalize_attributes(attributes), separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
 class ShopProductVariant(BaseModel):
     """
     Enhanced variant model for better performance and industry best practices.
@@ -20,6 +37,8 @@ class ShopProductVariant(BaseModel):
     
     # Attribute combination (JSON for flexible storage)
     attribute_combination = db.Column(db.JSON, nullable=False)  # {"color": "red", "size": "L", "storage": "32GB"}
+    # attribute_combination_hash() of the combination, unique per parent; set on insert/update
+    attribute_hash = db.Column(db.String(40), nullable=True)
     
     # Variant-specific overrides (only if different from parent)
     price_override = db.Column(db.Numeric(10,2), nullable=True)
@@ -45,6 +64,7 @@ class ShopProductVariant(BaseModel):
         db.Index('idx_variant_product', 'variant_product_id'),
         db.Index('idx_variant_sku', 'variant_sku'),
         db.Index('idx_attribute_combination', 'attribute_combination'),
+        db.UniqueConstraint('parent_product_id', 'attribute_hash', name='uq_parent_attribute_hash'),
     )
     
     def generate_variant_sku(self, parent_sku, attributes):
@@ -125,6 +145,19 @@ class ShopProductVariant(BaseModel):
         return data
 
 
+@event.listens_for(ShopProductVariant, 'before_insert')
+def _set_attribute_hash(mapper, connection, target):
+    target.attribute_hash = attribute_combination_hash(target.attribute_combination)
+
+
+@event.listens_for(ShopProductVariant, 'before_update')
+def _refresh_attribute_hash(mapper, connection, target):
+    # Only when the combination itself changed: duplicates left unhashed by
+    # backfill_hashes must stay NULL through unrelated edits
+    if inspect(target).attrs.attribute_combination.history.has_changes():
+        target.attribute_hash = attribute_combination_hash(target.attribute_combination)
+
+
 class ShopVariantAttributeValue(BaseModel):
     """
     Normalized table for variant attribute values - better for filtering and queries
@@ -0,0 +1,44 @@
+from datetime import datetime
+from common.database import db
+
+
+class StockReservation(db.Model):
+    """
+    Stock held for an order that is still waiting for payment.
+
+    The stock is already decremented when the row is created. A held row is
+    either confirmed when the payment arrives, or released (and the stock put
+    back) when the order is cancelled or the hold expires. Orders that never
+    had a hold get released rows when their stock is put back, so it is only
+    put back once.
+    """
+    __tablename__ = 'stock_reservations'
+
+    STATUS_HELD = 'held'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_RELEASED = 'released'
+
+    id         = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    order_id   = db.Column(db.String(50), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False)
+    quantity   = db.Column(db.Integer, nullable=False)
+    status     = db.Column(db.String(20), nullable=False, default=STATUS_HELD)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_stock_reservation_order', 'order_id', 'status'),
+        db.Index('idx_stock_reservation_expiry', 'status', 'expires_at'),
+    )
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'status': self.status,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,36 @@
+from datetime import datetime
+from common.database import db
+
+
+class TrendingProduct(db.Model):
+    """
+    Precomputed "trending products" leaderboard.
+
+    One row per (scope, product). Rows with category_id NULL form the global
+    leaderboard; rows with a category_id rank the products of that category
+    and all of its descendants. Rebuilt periodically by TrendingService.
+    """
+    __tablename__ = 'trending_products'
+
+    id            = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    category_id   = db.Column(db.Integer, db.ForeignKey('categories.category_id', ondelete='CASCADE'), nullable=True)
+    product_id    = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False)
+    rank          = db.Column(db.Integer, nullable=False)
+    total_ordered = db.Column(db.Integer, nullable=False, default=0)
+    window_days   = db.Column(db.Integer, nullable=True)  # NULL when ranked over all time
+    computed_at   = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_trending_scope_rank', 'category_id', 'rank'),
+        db.Index('idx_trending_product', 'product_id'),
+    )
+
+    def serialize(self):
+        return {
+            'category_id': self.category_id,
+            'product_id': self.product_id,
+            'rank': self.rank,
+            'total_ordered': self.total_ordered,
+            'window_days': self.window_days,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
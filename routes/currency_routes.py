@@ -1,13 +1,10 @@
 from flask import Blueprint, jsonify, request
-import requests
-from common.cache import cached, get_redis_client
-from config import get_config
+from services.exchange_rate_service import exchange_rates, ExchangeRateUnavailable
 
 currency_bp = Blueprint('currency', __name__)
 
-# Cache exchange rates for 1 hour to avoid hitting API limits
+# Rates are refreshed in the background (see ExchangeRateService); requests never call the upstream API
 @currency_bp.route('/api/exchange-rates', methods=['GET'])
-@cached(timeout=3600, key_prefix='exchange_rates')
 def get_exchange_rates():
     """
     Get current exchange rates for all supported currencies
@@ -43,63 +40,56 @@ def get_exchange_rates():
               type: string
               format: date-time
               example: "2024-03-20T10:30:00Z"
-      401:
-        description: Invalid API key
+            stale:
+              type: boolean
+              description: True when the upstream has not been reachable for EXCHANGE_RATE_STALE_SECONDS
+      400:
+        description: Unsupported base currency
         schema:
           type: object
           properties:
             error:
               type: string
-              example: Invalid API key
+              example: Unsupported currency
+            message:
+              type: string
+      503:
+        description: No exchange rates have been fetched yet
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+              example: Exchange rates unavailable
             message:
               type: string
-              example: The provided FreeCurrencyAPI key is invalid or expired.
       500:
-        description: Internal server error or API request failed
+        description: Internal server error
         schema:
           type: object
           properties:
             error:
               type: string
-              example: API request failed
             message:
               type: string
     """
     try:
-        base_currency = request.args.get('base', 'INR')
-        api_key = 'fca_live_aFAdTe4CWvzK9T5gYKYaujiesHUctsg7caoBWZ3J'
-        
-        response = requests.get(
-            f'https://api.freecurrencyapi.com/v1/latest?apikey={api_key}&base_currency={base_currency}',
-            headers={'Accept': 'application/json'}
-        )
-        
-        if response.status_code == 401:
-            return jsonify({
-                'error': 'Invalid API key',
-                'message': 'The provided FreeCurrencyAPI key is invalid or expired.'
-            }), 401
-        elif response.status_code != 200:
+        base_currency = request.args.get('base', 'INR').upper()
+        rates = exchange_rates.get_rates(base_currency)
+        if rates is None:
             return jsonify({
-                'error': 'Failed to fetch exchange rates',
-                'status': response.status_code,
-                'message': response.text
-            }), response.status_code
-            
-        data = response.json()
-        return jsonify({
-            'base_currency': base_currency,
-            'conversion_rates': data['data'],
-            'last_updated': data.get('meta', {}).get('last_updated_at', '')
-        })
-        
-    except requests.exceptions.RequestException as e:
+                'error': 'Unsupported currency',
+                'message': f'No exchange rates for base currency {base_currency}.'
+            }), 400
+        return jsonify(rates)
+
+    except ExchangeRateUnavailable as e:
         return jsonify({
-            'error': 'API request failed',
+            'error': 'Exchange rates unavailable',
             'message': str(e)
-        }), 500
+        }), 503
     except Exception as e:
         return jsonify({
             'error': 'Internal server error',
             'message': str(e)
-        }), 500 
\ No newline at end of file
+        }), 500
@@ -3,6 +3,7 @@ from controllers.feature_product_controller import FeatureProductController
 from flask_cors import cross_origin
 from common.cache import cached
 from common.response import success_response
+from common.pagination import CursorError, cursor_requested, requested_count_mode
 
 feature_product_bp = Blueprint('feature_product', __name__, url_prefix='/api/featured-products')
 
@@ -28,6 +29,17 @@ def get_featured_products():
         required: false
         default: 12
         description: Items per page (max 50)
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: Keyset pagination cursor (next_cursor of the previous page; empty for the first page). Replaces page when present.
+      - in: query
+        name: count
+        type: string
+        enum: [none, capped, exact]
+        required: false
+        description: Total to report in cursor mode (default capped on the first page, none afterwards)
       - in: query
         name: category_id
         type: integer
@@ -217,9 +229,17 @@ def get_featured_products():
             brand_id=brand_id,
             min_price=min_price,
             max_price=max_price,
-            search=search
+            search=search,
+            cursor=request.args.get('cursor') if cursor_requested() else None,
+            count=requested_count_mode()
         )
         return success_response(result)
+    except CursorError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'data': None
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
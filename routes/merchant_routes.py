@@ -4,6 +4,7 @@ from controllers.merchant.merchant_settings_controller import MerchantSettingsCo
 from http import HTTPStatus
 from auth.utils import merchant_role_required, super_admin_role_required
 from common.database import db
+from common.pagination import cursor_requested, requested_count_mode
 import cloudinary
 import cloudinary.uploader
 from werkzeug.exceptions import NotFound
@@ -2670,6 +2671,10 @@ def get_merchant_orders():
         type: integer
         default: 20
         description: Number of items per page
+      - name: cursor
+        in: query
+        type: string
+        description: Keyset pagination cursor (next_cursor of the previous page; empty for the first page). Replaces page when present.
       - name: status
         in: query
         type: string
@@ -2755,7 +2760,9 @@ def get_merchant_orders():
             per_page=per_page,
             status=status,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            cursor=request.args.get('cursor') if cursor_requested() else None,
+            count=requested_count_mode()
         )
         return jsonify(result), 200
     except ValueError as e:
@@ -3,6 +3,7 @@ from controllers.promo_product_controller import PromoProductController
 from flask_cors import cross_origin
 from common.cache import cached
 from common.response import success_response
+from common.pagination import CursorError, cursor_requested, requested_count_mode
 
 promo_product_bp = Blueprint('promo_product', __name__, url_prefix='/api/promo-products')
 
@@ -28,6 +29,17 @@ def get_promo_products():
         required: false
         default: 12
         description: Items per page (max 50)
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: Keyset pagination cursor (next_cursor of the previous page; empty for the first page). Replaces page when present.
+      - in: query
+        name: count
+        type: string
+        enum: [none, capped, exact]
+        required: false
+        description: Total to report in cursor mode (default capped on the first page, none afterwards)
       - in: query
         name: category_id
         type: integer
@@ -216,9 +228,17 @@ def get_promo_products():
             brand_id=brand_id,
             min_price=min_price,
             max_price=max_price,
-            search=search
+            search=search,
+            cursor=request.args.get('cursor') if cursor_requested() else None,
+            count=requested_count_mode()
         )
         return success_response(result)
+    except CursorError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'data': None
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
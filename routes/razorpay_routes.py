@@ -169,6 +169,9 @@ def verify_razorpay_payment():
                         order.razorpay_payment_id = razorpay_payment_id
                         order.payment_gateway_transaction_id = razorpay_payment_id
                         order.payment_gateway_name = 'Razorpay'
+                        # Payment arrived: keep the stock held for this order
+                        from services.stock_reservation_service import StockReservationService
+                        StockReservationService.confirm(order.order_id)
                         db = current_app.extensions['sqlalchemy'].db
                         db.session.commit()
                 # else we just return success for verification
@@ -292,6 +292,87 @@ def get_user_reviews():
             'message': 'An unexpected error occurred while retrieving user reviews'
         }), 500
 
+@review_bp.route('/<int:review_id>', methods=['PUT'])
+@jwt_required()
+@role_required([UserRole.USER.value])
+def update_review(review_id):
+    """
+    Edit a review's rating, title or body.
+    ---
+    tags:
+      - Reviews
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: review_id
+        type: integer
+        required: true
+        description: "ID of the review to edit."
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            rating:
+              type: integer
+            title:
+              type: string
+            body:
+              type: string
+    responses:
+      200:
+        description: "Review updated successfully."
+      400:
+        description: "Invalid review data."
+      401:
+        description: "Unauthorized."
+      500:
+        description: "Internal server error."
+    """
+    try:
+        user_id = get_jwt_identity()
+        review_data = request.get_json()
+        
+        if not review_data:
+            raise BadRequest('No review data provided')
+            
+        # Validate rating
+        if 'rating' in review_data and (not isinstance(review_data['rating'], int) or review_data['rating'] < 1 or review_data['rating'] > 5):
+            raise BadRequest('Rating must be an integer between 1 and 5')
+            
+        # Validate title and body length
+        if 'title' in review_data and len(str(review_data['title']).strip()) < 3:
+            raise BadRequest('Title must be at least 3 characters long')
+        if 'body' in review_data and len(str(review_data['body']).strip()) < 10:
+            raise BadRequest('Review body must be at least 10 characters long')
+            
+        result = ReviewController.update_review(review_id, user_id, review_data)
+        return jsonify({
+            'status': 'success',
+            'data': result
+        })
+        
+    except BadRequest as e:
+        logger.warning(f"Bad request updating review: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except ValueError as ve:
+        logger.error(f"Validation error updating review: {str(ve)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(ve)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error updating review: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'An unexpected error occurred while updating the review'
+        }), 500
+
 @review_bp.route('/<int:review_id>', methods=['DELETE'])
 @jwt_required()
 @role_required([UserRole.USER.value])
@@ -1,9 +1,9 @@
 from flask import Blueprint, request, jsonify
-from controllers.shiprocket_controller import ShipRocketController
+from controllers.shiprocket_controller import shiprocket_controller
 from auth.utils import super_admin_role_required , merchant_role_required 
 from common.response import success_response, error_response
 import traceback
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import current_app
 
 shiprocket_bp = Blueprint('shiprocket', __name__, url_prefix='/api/shiprocket')
@@ -104,8 +104,7 @@ def check_serviceability():
         # If cod is True, use cod_amount, otherwise use 0
         shiprocket_cod = cod_amount if cod else 0
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.check_serviceability(
+        response = shiprocket_controller.check_serviceability(
             pickup_pincode=pickup_pincode,
             delivery_pincode=delivery_pincode,
             weight=weight,
@@ -121,6 +120,65 @@ def check_serviceability():
         current_app.logger.error(f"Serviceability check failed: {str(e)}")
         return error_response(f"Serviceability check failed: {str(e)}", 500)
 
+@shiprocket_bp.route('/serviceability/cart', methods=['POST'])
+@jwt_required()
+def check_cart_serviceability():
+    """
+    Courier options for every merchant in the current user's cart
+    ---
+    tags:
+      - ShipRocket
+    security:
+      - Bearer: []
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            type: object
+            required:
+              - delivery_pincode
+            properties:
+              delivery_pincode:
+                type: string
+                description: Delivery location pincode
+              cod:
+                type: boolean
+                description: Cash on delivery (quotes include COD charges for each merchant's subtotal)
+    responses:
+      200:
+        description: Serviceability per merchant (cached quotes, misses resolved in parallel)
+      400:
+        description: Invalid request data
+      500:
+        description: Internal server error
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('delivery_pincode'):
+            return error_response("Missing required field: delivery_pincode", 400)
+        
+        user_id = int(get_jwt_identity())
+        quotes = shiprocket_controller.check_cart_serviceability(
+            user_id=user_id,
+            delivery_pincode=data['delivery_pincode'],
+            cod=bool(data.get('cod', False))
+        )
+        
+        return success_response("Serviceability check successful", {
+            'merchants': [
+                {'merchant_id': merchant_id, **response}
+                for merchant_id, response in quotes.items()
+            ]
+        })
+        
+    except ValueError as e:
+        return error_response(f"Invalid data format: {str(e)}", 400)
+    except Exception as e:
+        current_app.logger.error(f"Cart serviceability check failed: {str(e)}")
+        return error_response(f"Cart serviceability check failed: {str(e)}", 500)
+
 @shiprocket_bp.route('/create-order', methods=['POST'])
 @jwt_required()
 def create_shiprocket_order():
@@ -232,8 +290,7 @@ def create_shiprocket_order():
         if courier_id is not None and courier_id <= 0:
             return error_response("Invalid courier_id", 400)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.create_shiprocket_order_from_db_order(
+        response = shiprocket_controller.create_shiprocket_order_from_db_order(
             order_id=order_id,
             merchant_id=merchant_id,
             pickup_address_id=pickup_address_id,
@@ -308,8 +365,7 @@ def assign_awb():
         shipment_id = int(data['shipment_id'])
         courier_id = int(data['courier_id'])
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.assign_awb(shipment_id, courier_id)
+        response = shiprocket_controller.assign_awb(shipment_id, courier_id)
         
         return success_response("AWB assigned successfully", response)
         
@@ -369,8 +425,7 @@ def generate_pickup():
         
         shipment_id = int(data['shipment_id'])
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.generate_pickup(shipment_id)
+        response = shiprocket_controller.generate_pickup(shipment_id)
         
         return success_response("Pickup generated successfully", response)
         
@@ -414,8 +469,7 @@ def get_tracking_details(awb_code):
         if not awb_code:
             return error_response("AWB code is required", 400)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.get_tracking_details(awb_code)
+        response = shiprocket_controller.get_tracking_details(awb_code)
         
         return success_response("Tracking details retrieved successfully", response)
         
@@ -468,8 +522,7 @@ def get_tracking_by_order_id(order_id):
         # Get channel_id from query parameters
         channel_id = request.args.get('channel_id', type=int)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.get_tracking_by_order_id(order_id, channel_id)
+        response = shiprocket_controller.get_tracking_by_order_id(order_id, channel_id)
         
         return success_response("Tracking details retrieved successfully", response)
         
@@ -516,8 +569,7 @@ def get_shipment_tracking(shipment_id):
         if not shipment_id:
             return error_response("Shipment ID is required", 400)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.get_shipment_tracking(shipment_id)
+        response = shiprocket_controller.get_shipment_tracking(shipment_id)
         
         return success_response("Tracking details retrieved successfully", response)
         
@@ -583,8 +635,7 @@ def get_tracking_by_db_order_id(order_id):
         if not order_id:
             return error_response("Order ID is required", 400)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.get_tracking_by_db_order_id(order_id)
+        response = shiprocket_controller.get_tracking_by_db_order_id(order_id)
         
         return success_response("Tracking details retrieved successfully", response)
         
@@ -648,7 +699,6 @@ def bulk_create_shiprocket_orders():
         if not order_ids:
             return error_response("At least one order ID is required", 400)
         
-        shiprocket = ShipRocketController()
         successful = []
         failed = []
         
@@ -656,7 +706,7 @@ def bulk_create_shiprocket_orders():
             try:
                 # This would need to be implemented based on your business logic
                 # For now, we'll just track the attempt
-                response = shiprocket.create_shiprocket_order_from_db_order(
+                response = shiprocket_controller.create_shiprocket_order_from_db_order(
                     order_id=order_id,
                     merchant_id=merchant_id,
                     pickup_address_id=None,  # Would need to be determined
@@ -772,8 +822,7 @@ def create_shiprocket_orders_for_all_merchants():
         if courier_id is not None and courier_id <= 0:
             return error_response("Invalid courier_id", 400)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.create_shiprocket_orders_for_all_merchants(
+        response = shiprocket_controller.create_shiprocket_orders_for_all_merchants(
             order_id=order_id,
             delivery_address_id=delivery_address_id,
             courier_id=courier_id
@@ -803,8 +852,7 @@ def get_pickup_locations():
         description: Internal server error
     """
     try:
-        shiprocket = ShipRocketController()
-        response = shiprocket.get_pickup_locations()
+        response = shiprocket_controller.get_pickup_locations()
         return success_response("Pickup locations retrieved successfully", response)
         
     except Exception as e:
@@ -835,8 +883,7 @@ def create_merchant_pickup_location(merchant_id):
         description: Internal server error
     """
     try:
-        shiprocket = ShipRocketController()
-        pickup_location_name = shiprocket.create_merchant_pickup_location(merchant_id)
+        pickup_location_name = shiprocket_controller.create_merchant_pickup_location(merchant_id)
         return success_response("Pickup location created successfully", {
             "pickup_location_name": pickup_location_name,
             "merchant_id": merchant_id
@@ -870,8 +917,7 @@ def get_merchant_pickup_location(merchant_id):
         description: Internal server error
     """
     try:
-        shiprocket = ShipRocketController()
-        pickup_location_name = shiprocket.get_or_create_merchant_pickup_location(merchant_id)
+        pickup_location_name = shiprocket_controller.get_or_create_merchant_pickup_location(merchant_id)
         return success_response("Pickup location retrieved/created successfully", {
             "pickup_location_name": pickup_location_name,
             "merchant_id": merchant_id
@@ -979,8 +1025,7 @@ def create_shiprocket_shop_order():
         if courier_id is not None and courier_id <= 0:
             return error_response("Invalid courier_id", 400)
         
-        shiprocket = ShipRocketController()
-        response = shiprocket.create_shiprocket_order_for_shop(
+        response = shiprocket_controller.create_shiprocket_order_for_shop(
             shop_order_id=shop_order_id,
             shop_id=shop_id,
             delivery_address_id=delivery_address_id,
@@ -1019,8 +1064,7 @@ def create_shop_pickup_location(shop_id):
         description: Internal server error
     """
     try:
-        shiprocket = ShipRocketController()
-        pickup_location_name = shiprocket.create_shop_pickup_location(shop_id)
+        pickup_location_name = shiprocket_controller.create_shop_pickup_location(shop_id)
         return success_response("Shop pickup location created successfully", {
             "pickup_location_name": pickup_location_name,
             "shop_id": shop_id
@@ -1054,8 +1098,7 @@ def get_shop_pickup_location(shop_id):
         description: Internal server error
     """
     try:
-        shiprocket = ShipRocketController()
-        pickup_location_name = shiprocket.get_or_create_shop_pickup_location(shop_id)
+        pickup_location_name = shiprocket_controller.get_or_create_shop_pickup_location(shop_id)
         return success_response("Shop pickup location retrieved/created successfully", {
             "pickup_location_name": pickup_location_name,
             "shop_id": shop_id
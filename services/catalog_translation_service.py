@@ -0,0 +1,311 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, exists
+from sqlalchemy.orm import selectinload
+
+from common.database import db
+from common.executor import AppContextExecutor
+from models.product import Product
+from models.product_translation import ProductTranslation, ProductTranslationFailure
+from models.shop.shop_product import ShopProduct
+from services.translate_service import AmazonTranslateService
+
+CATALOG_PRODUCT = 'product'
+CATALOG_SHOP_PRODUCT = 'shop_product'
+
+# Translated fields per catalog
+CATALOG_FIELDS = {
+    CATALOG_PRODUCT: ('name', 'description'),
+    CATALOG_SHOP_PRODUCT: ('name', 'description', 'short_desc', 'full_desc'),
+}
+FIELD_LENGTHS = {'name': 255, 'short_desc': 255}
+
+_executor = AppContextExecutor('catalog-translation', 'CATALOG_TRANSLATION_WORKERS', 2)
+
+
+class CatalogTranslationService:
+    """
+    Keeps per-locale translations of catalog text in product_translations.
+
+    Products are translated in the background after they are approved,
+    published or edited (schedule_products), a periodic sweep picks up
+    anything whose text changed since its last translation, and listings
+    read the rows for a whole page in one query (get_translation_map), so
+    ?lang= never calls Amazon Translate on the read path.
+
+    A product whose text fails to translate fails alone: the others are
+    written, and it is recorded in product_translation_failures so the sweep
+    moves past it, retrying with a growing delay or as soon as it is edited.
+    """
+
+    @staticmethod
+    def locales():
+        """Configured target locales, without the source language."""
+        config = current_app.config
+        source = config.get('TRANSLATION_SOURCE_LANG', 'en')
+        value = config.get('TRANSLATION_LOCALES') or ''
+        if isinstance(value, str):
+            value = value.split(',')
+        return [locale.strip() for locale in value if locale.strip() and locale.strip() != source]
+
+    @staticmethod
+    def is_enabled():
+        return bool(current_app.config.get('FEATURE_TRANSLATION')) and bool(CatalogTranslationService.locales())
+
+    @staticmethod
+    def _model(catalog):
+        return Product if catalog == CATALOG_PRODUCT else ShopProduct
+
+    @staticmethod
+    def _eligible_filter(catalog):
+        """Products whose text is visible on the storefront and worth translating."""
+        if catalog == CATALOG_PRODUCT:
+            return and_(Product.deleted_at.is_(None), Product.approval_status == 'approved')
+        return and_(
+            ShopProduct.deleted_at.is_(None),
+            ShopProduct.active_flag.is_(True),
+            ShopProduct.is_published.is_(True)
+        )
+
+    @staticmethod
+    def _load_sources(catalog, product_ids):
+        """{product_id: {field: source text}} for the eligible products among `product_ids`."""
+        model = CatalogTranslationService._model(catalog)
+        query = model.query.filter(
+            model.product_id.in_(product_ids),
+            CatalogTranslationService._eligible_filter(catalog)
+        )
+        if catalog == CATALOG_SHOP_PRODUCT:
+            query = query.options(selectinload(ShopProduct.meta))
+        return {product.product_id: CatalogTranslationService._source_of(catalog, product) for product in query.all()}
+
+    @staticmethod
+    def _source_of(catalog, product):
+        """{field: source text} of a loaded product (shop products with their meta)."""
+        source = {'name': product.product_name or '', 'description': product.product_description or ''}
+        if catalog == CATALOG_SHOP_PRODUCT:
+            meta = product.meta
+            source['short_desc'] = (meta.short_desc if meta else None) or ''
+            source['full_desc'] = (meta.full_desc if meta else None) or ''
+        return source
+
+    @staticmethod
+    def _source_hash(source):
+        h = hashlib.sha1()
+        for field in sorted(source):
+            h.update(f"{field}\x00{source[field]}\x00".encode('utf-8'))
+        return h.hexdigest()
+
+    @staticmethod
+    def _record_failure(failure, catalog, locale, product_id, error, now):
+        """Record (or extend) the backoff of a product that failed to translate."""
+        config = current_app.config
+        if failure is None:
+            failure = ProductTranslationFailure(catalog=catalog, locale=locale, product_id=product_id, attempts=0)
+            db.session.add(failure)
+        failure.attempts += 1
+        delay = min(
+            config.get('CATALOG_TRANSLATION_RETRY_SECONDS', 3600) * 2 ** (failure.attempts - 1),
+            config.get('CATALOG_TRANSLATION_RETRY_MAX_SECONDS', 7 * 24 * 3600)
+        )
+        failure.retry_after = now + timedelta(seconds=delay)
+        failure.last_error = str(error)[:500]
+        failure.updated_at = now
+        current_app.logger.warning(
+            f"Could not translate {catalog} {product_id} into {locale} (attempt {failure.attempts}, "
+            f"retrying in {delay}s): {str(error)}"
+        )
+
+    @staticmethod
+    def translate_products(catalog, product_ids):
+        """
+        Translate the given products into every configured locale and upsert
+        their rows. Text that has not changed since the last run is only
+        re-stamped; products that fail are recorded for a later retry.
+        Returns the number of rows (re)translated.
+        """
+        product_ids = [product_id for product_id in set(product_ids or []) if product_id]
+        if not product_ids or not CatalogTranslationService.is_enabled():
+            return 0
+        sources = CatalogTranslationService._load_sources(catalog, product_ids)
+        if not sources:
+            return 0
+        hashes = {product_id: CatalogTranslationService._source_hash(source) for product_id, source in sources.items()}
+        source_lang = current_app.config.get('TRANSLATION_SOURCE_LANG', 'en')
+        translator = AmazonTranslateService()
+        now = datetime.now(timezone.utc)
+        written = 0
+
+        for locale in CatalogTranslationService.locales():
+            existing = {
+                row.product_id: row for row in ProductTranslation.query.filter(
+                    ProductTranslation.catalog == catalog,
+                    ProductTranslation.locale == locale,
+                    ProductTranslation.product_id.in_(list(sources))
+                ).all()
+            }
+            failures = {
+                row.product_id: row for row in ProductTranslationFailure.query.filter(
+                    ProductTranslationFailure.catalog == catalog,
+                    ProductTranslationFailure.locale == locale,
+                    ProductTranslationFailure.product_id.in_(list(sources))
+                ).all()
+            }
+            stale = []
+            for product_id in sources:
+                row = existing.get(product_id)
+                if row is not None and row.source_hash == hashes[product_id]:
+                    row.updated_at = now
+                    if product_id in failures:
+                        db.session.delete(failures[product_id])
+                else:
+                    stale.append(product_id)
+            if not stale:
+                db.session.commit()
+                continue
+
+            # One batch per locale: identical strings are translated once and short ones packed
+            items = [
+                (f"{product_id}:{field}", sources[product_id][field])
+                for product_id in stale for field in CATALOG_FIELDS[catalog]
+            ]
+            translated, errors = translator.translate_batch_settled(items, locale, source_lang)
+
+            for product_id in stale:
+                error = next(
+                    (errors[f"{product_id}:{field}"] for field in CATALOG_FIELDS[catalog] if f"{product_id}:{field}" in errors),
+                    None
+                )
+                if error is not None:
+                    CatalogTranslationService._record_failure(
+                        failures.get(product_id), catalog, locale, product_id, error, now
+                    )
+                    continue
+                if product_id in failures:
+                    db.session.delete(failures[product_id])
+                row = existing.get(product_id)
+                if row is None:
+                    row = ProductTranslation(catalog=catalog, locale=locale, product_id=product_id)
+                    db.session.add(row)
+                for field in CATALOG_FIELDS[catalog]:
+                    value = translated.get(f"{product_id}:{field}", '')
+                    if field in FIELD_LENGTHS:
+                        value = value[:FIELD_LENGTHS[field]]
+                    setattr(row, field, value)
+                row.source_hash = hashes[product_id]
+                row.updated_at = now
+                written += 1
+            # Commit per locale, so a later failure never loses these rows
+            db.session.commit()
+
+        return written
+
+    @staticmethod
+    def _translate_in_background(catalog, product_ids):
+        try:
+            CatalogTranslationService.translate_products(catalog, product_ids)
+        except Exception as e:
+            # The sweep retries anything left untranslated
+            current_app.logger.error(f"Error pre-translating {catalog} {sorted(product_ids)}: {str(e)}")
+
+    @staticmethod
+    def schedule_products(catalog, product_ids):
+        """
+        Queue products for translation after they were approved, published or
+        edited. Call after the change has been committed; returns immediately.
+        """
+        product_ids = [product_id for product_id in set(product_ids or []) if product_id]
+        if not product_ids or not CatalogTranslationService.is_enabled():
+            return
+        try:
+            _executor.submit(CatalogTranslationService._translate_in_background, catalog, product_ids)
+        except Exception as e:
+            current_app.logger.error(f"Error scheduling catalog translation: {str(e)}")
+
+    @staticmethod
+    def schedule_product(catalog, product):
+        if product is not None:
+            CatalogTranslationService.schedule_products(catalog, [product.product_id])
+
+    @staticmethod
+    def pending_product_ids(catalog, locale, limit):
+        """
+        Eligible products with no translation for `locale`, or one older than
+        their last edit, leaving out failed products still backing off.
+        """
+        model = CatalogTranslationService._model(catalog)
+        up_to_date = exists().where(
+            ProductTranslation.catalog == catalog,
+            ProductTranslation.locale == locale,
+            ProductTranslation.product_id == model.product_id,
+            ProductTranslation.updated_at >= model.updated_at
+        )
+        backing_off = exists().where(
+            ProductTranslationFailure.catalog == catalog,
+            ProductTranslationFailure.locale == locale,
+            ProductTranslationFailure.product_id == model.product_id,
+            ProductTranslationFailure.retry_after > datetime.now(timezone.utc),
+            # An edit since the failure makes it worth trying again now
+            ProductTranslationFailure.updated_at >= model.updated_at
+        )
+        rows = db.session.query(model.product_id).filter(
+            CatalogTranslationService._eligible_filter(catalog),
+            ~up_to_date,
+            ~backing_off
+        ).order_by(model.product_id).limit(limit).all()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def sweep(batch_size=None):
+        """
+        Bring up to `batch_size` pending products per catalog up to date
+        (scheduled job). Returns the number of products processed.
+        """
+        if not CatalogTranslationService.is_enabled():
+            return 0
+        if batch_size is None:
+            batch_size = current_app.config.get('CATALOG_TRANSLATION_BATCH_SIZE', 100)
+        processed = 0
+        for catalog in CATALOG_FIELDS:
+            product_ids = set()
+            for locale in CatalogTranslationService.locales():
+                product_ids.update(CatalogTranslationService.pending_product_ids(catalog, locale, batch_size))
+            if product_ids:
+                product_ids = sorted(product_ids)[:batch_size]
+                CatalogTranslationService.translate_products(catalog, product_ids)
+                processed += len(product_ids)
+        return processed
+
+    @staticmethod
+    def get_translation_map(catalog, product_ids, locale, products=None):
+        """
+        Return {product_id: ProductTranslation} for a page of products, or {}
+        when `locale` is not a configured target locale. Rows translated from
+        text that has since been edited are left out, so callers fall back to
+        the source text until the product is retranslated. Pass the loaded
+        `products` to check that without reloading them.
+        """
+        if not locale or not product_ids or not current_app.config.get('FEATURE_TRANSLATION'):
+            return {}
+        if locale not in CatalogTranslationService.locales():
+            return {}
+        rows = ProductTranslation.query.filter(
+            ProductTranslation.catalog == catalog,
+            ProductTranslation.locale == locale,
+            ProductTranslation.product_id.in_(product_ids)
+        ).all()
+        if not rows:
+            return {}
+        if products is not None:
+            sources = {
+                product.product_id: CatalogTranslationService._source_of(catalog, product) for product in products
+            }
+        else:
+            sources = CatalogTranslationService._load_sources(catalog, [row.product_id for row in rows])
+        return {
+            row.product_id: row for row in rows
+            if row.product_id in sources
+            and row.source_hash == CatalogTranslationService._source_hash(sources[row.product_id])
+        }
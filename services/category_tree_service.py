@@ -0,0 +1,111 @@
+from common.cache import VersionedLocalCache
+from common.database import db
+from models.category import Category
+
+VERSION_CACHE_KEY = 'category_tree:version'
+
+
+class CategoryTree:
+    """
+    Immutable snapshot of the categories table.
+
+    Built from (category_id, parent_id) pairs with descendant sets, ancestor
+    chains and depth precomputed for every node, so lookups never touch the
+    database.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.parents = {}
+        self.children = {}
+        for category_id, parent_id in rows:
+            self.parents[category_id] = parent_id
+            self.children.setdefault(category_id, [])
+        for category_id, parent_id in self.parents.items():
+            if parent_id is not None and parent_id in self.parents:
+                self.children[parent_id].append(category_id)
+
+        # Ancestor chains: [self, parent, grandparent, ...] (stops on cycles/missing parents)
+        self.ancestors = {}
+        for category_id in self.parents:
+            chain = [category_id]
+            seen = {category_id}
+            parent_id = self.parents.get(category_id)
+            while parent_id is not None and parent_id not in seen:
+                chain.append(parent_id)
+                seen.add(parent_id)
+                parent_id = self.parents.get(parent_id)
+            self.ancestors[category_id] = tuple(chain)
+
+        self.depths = {category_id: len(chain) - 1 for category_id, chain in self.ancestors.items()}
+
+        # Every node is a descendant of each entry in its ancestor chain
+        descendants = {category_id: [] for category_id in self.parents}
+        for category_id in sorted(self.parents, key=lambda cid: (self.depths[cid], cid)):
+            for ancestor_id in self.ancestors[category_id]:
+                descendants[ancestor_id].append(category_id)
+        self.descendants = {category_id: tuple(ids) for category_id, ids in descendants.items()}
+
+    def __contains__(self, category_id):
+        return category_id in self.parents
+
+    def descendant_ids(self, category_id, include_self=True):
+        """Ids of the category's whole subtree, shallowest first."""
+        ids = self.descendants.get(category_id)
+        if ids is None:
+            return [category_id] if include_self else []
+        return list(ids) if include_self else list(ids[1:])
+
+    def ancestor_ids(self, category_id, include_self=True):
+        """Ordered lineage: [category_id, parent_id, grandparent_id, ...]."""
+        chain = self.ancestors.get(category_id)
+        if chain is None:
+            return [category_id] if include_self else []
+        return list(chain) if include_self else list(chain[1:])
+
+    def child_ids(self, category_id):
+        return list(self.children.get(category_id, []))
+
+    def depth(self, category_id):
+        return self.depths.get(category_id)
+
+
+class CategoryTreeCache:
+    """
+    Per-process cache of the CategoryTree.
+
+    Mutations call invalidate(), which drops the local copy and bumps a version
+    stamp in the shared cache (Redis) so every gunicorn worker reloads; see
+    VersionedLocalCache for the check interval and max age.
+    """
+
+    def __init__(self):
+        self._cache = VersionedLocalCache(
+            VERSION_CACHE_KEY, self._load,
+            'CATEGORY_TREE_VERSION_CHECK_SECONDS', 'CATEGORY_TREE_MAX_AGE'
+        )
+
+    @staticmethod
+    def _load(version):
+        rows = db.session.query(Category.category_id, Category.parent_id).all()
+        return CategoryTree(rows, version=version)
+
+    def get_tree(self):
+        return self._cache.get()
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    # Shortcuts for the common lookups
+
+    def descendant_ids(self, category_id, include_self=True):
+        return self.get_tree().descendant_ids(category_id, include_self)
+
+    def ancestor_ids(self, category_id, include_self=True):
+        return self.get_tree().ancestor_ids(category_id, include_self)
+
+    def depth(self, category_id):
+        return self.get_tree().depth(category_id)
+
+
+category_tree = CategoryTreeCache()
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import redis
+from flask import current_app
+from sqlalchemy import and_, or_, update
+
+from common.cache import get_redis_client
+from common.database import db
+from models.pricing import effective_discount_expression, effective_price_expression, window_reference
+from models.product import Product
+from models.shop.shop_product import ShopProduct
+
+# Time of the last successful refresh (ISO, UTC)
+LAST_REFRESH_KEY = 'effective_price:refreshed_at'
+
+
+class EffectivePriceService:
+    """
+    Keeps products.effective_price / shop_products.effective_price (and the
+    matching effective_discount) current as special-price windows open and
+    close. Edits are covered by the model listeners in models.pricing; the
+    periodic pass only visits rows whose special_start or special_end was
+    crossed since the previous pass, through the indexes on those columns.
+    """
+
+    MODELS = (Product, ShopProduct)
+
+    @staticmethod
+    def _crossed_boundary(model, since, now):
+        """Rows whose window opened or closed in (since, now]."""
+        since_ref, now_ref = window_reference(model.special_start, since), window_reference(model.special_start, now)
+        return or_(
+            # Opens once special_start <= now
+            and_(model.special_start > since_ref, model.special_start <= now_ref),
+            # Closes once special_end < now
+            and_(model.special_end >= since_ref, model.special_end < now_ref)
+        )
+
+    @staticmethod
+    def _refresh_model(model, now, since=None):
+        price = effective_price_expression(model, now)
+        discount = effective_discount_expression(model, now)
+        stale = or_(
+            model.effective_price.is_(None) & model.selling_price.isnot(None),
+            model.effective_price != price,
+            model.effective_discount != discount
+        )
+        if since is not None:
+            stale = and_(EffectivePriceService._crossed_boundary(model, since, now), stale)
+        result = db.session.execute(
+            update(model).where(stale).values(
+                effective_price=price,
+                effective_discount=discount,
+                # A window boundary is not an edit of the product
+                updated_at=model.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    def _last_refresh(now):
+        """When the previous pass ran; EFFECTIVE_PRICE_LOOKBACK_SECONDS ago when unknown."""
+        client = get_redis_client(current_app)
+        if client is not None:
+            try:
+                raw = client.get(LAST_REFRESH_KEY)
+                if raw:
+                    return min(datetime.fromisoformat(raw.decode() if isinstance(raw, bytes) else raw), now)
+            except (redis.RedisError, ValueError) as e:
+                current_app.logger.warning(f"Could not read the last effective price refresh: {str(e)}")
+        return now - timedelta(seconds=current_app.config.get('EFFECTIVE_PRICE_LOOKBACK_SECONDS', 86400))
+
+    @staticmethod
+    def _store_last_refresh(now):
+        client = get_redis_client(current_app)
+        if client is not None:
+            try:
+                client.set(LAST_REFRESH_KEY, now.isoformat())
+            except redis.RedisError as e:
+                current_app.logger.warning(f"Could not store the last effective price refresh: {str(e)}")
+
+    @staticmethod
+    def refresh(now=None, full=False):
+        """
+        Scheduled job: recompute effective prices whose special window opened
+        or closed since the last run. `full` checks every row instead (after a
+        bulk import or a long outage). Returns the number of rows updated.
+        """
+        now = now or datetime.utcnow()
+        since = None if full else EffectivePriceService._last_refresh(now)
+        try:
+            updated = sum(
+                EffectivePriceService._refresh_model(model, now, since) for model in EffectivePriceService.MODELS
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error refreshing effective prices: {str(e)}")
+            return 0
+        EffectivePriceService._store_last_refresh(now)
+        return updated
@@ -0,0 +1,191 @@
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+
+import redis
+import requests
+from flask import current_app
+
+from common.cache import VersionedLocalCache, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = 'https://api.freecurrencyapi.com/v1/latest'
+SNAPSHOT_KEY = 'exchange_rates:snapshot'
+VERSION_CACHE_KEY = 'exchange_rates:version'
+
+
+class ExchangeRateUnavailable(Exception):
+    """Raised when no exchange rates have ever been fetched."""
+
+
+class ExchangeRateSnapshot:
+    """
+    Rates of every currency against one pivot currency, as fetched upstream.
+
+    Rates for any other base are derived locally: base -> X is
+    rate(pivot -> X) / rate(pivot -> base).
+    """
+
+    def __init__(self, pivot, rates, last_updated, fetched_at):
+        self.pivot = pivot
+        self.rates = rates
+        self.last_updated = last_updated
+        self.fetched_at = fetched_at
+
+    def rates_for(self, base):
+        """{currency: rate} with `base` as the base currency, or None if it is not supported."""
+        base_rate = self.rates.get(base)
+        if not base_rate:
+            return None
+        return {currency: float(f"{rate / base_rate:.10g}") for currency, rate in self.rates.items()}
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def to_json(self):
+        return json.dumps({
+            'pivot': self.pivot,
+            'rates': self.rates,
+            'last_updated': self.last_updated,
+            'fetched_at': self.fetched_at
+        })
+
+    @classmethod
+    def from_json(cls, raw):
+        data = json.loads(raw)
+        return cls(data['pivot'], data['rates'], data.get('last_updated', ''), data['fetched_at'])
+
+
+class ExchangeRateService:
+    """
+    Exchange rates refreshed in the background and served without upstream calls.
+
+    A scheduler job fetches every currency against EXCHANGE_RATE_PIVOT from
+    FreeCurrencyAPI once per EXCHANGE_RATE_REFRESH_SECONDS (whichever worker
+    runs first; the others see a fresh snapshot and skip the call) and stores
+    it in Redis without an expiry. Each worker keeps an in-process copy via
+    VersionedLocalCache. When the upstream fails the last known good snapshot
+    keeps being served, and Redis being down falls back to this worker's copy.
+    """
+
+    def __init__(self):
+        self._cache = VersionedLocalCache(
+            VERSION_CACHE_KEY, self._load,
+            'EXCHANGE_RATE_VERSION_CHECK_SECONDS', 'EXCHANGE_RATE_MAX_AGE'
+        )
+        self._last_good = None
+        self._cold_start_lock = threading.Lock()
+        self._cold_start_at = 0.0
+
+    def _load(self, version=None):
+        client = get_redis_client(current_app)
+        if client is not None:
+            try:
+                raw = client.get(SNAPSHOT_KEY)
+                if raw:
+                    self._last_good = ExchangeRateSnapshot.from_json(raw)
+            except (redis.RedisError, ValueError, KeyError) as e:
+                logger.warning(f"Could not read exchange rates from Redis: {str(e)}")
+        return self._last_good
+
+    def _store(self, snapshot):
+        self._last_good = snapshot
+        client = get_redis_client(current_app)
+        if client is not None:
+            try:
+                client.set(SNAPSHOT_KEY, snapshot.to_json())
+            except redis.RedisError as e:
+                logger.warning(f"Could not store exchange rates in Redis: {str(e)}")
+        self._cache.invalidate()
+
+    @staticmethod
+    def fetch():
+        """Fetch all rates against the pivot currency; raises on any upstream failure."""
+        config = current_app.config
+        api_key = config.get('FREECURRENCY_API_KEY')
+        if not api_key:
+            raise ExchangeRateUnavailable('FREECURRENCY_API_KEY is not set')
+        pivot = config.get('EXCHANGE_RATE_PIVOT', 'USD')
+        params = {'base_currency': pivot}
+        currencies = config.get('EXCHANGE_RATE_CURRENCIES')
+        if currencies:
+            params['currencies'] = ','.join(sorted({code.strip() for code in currencies.split(',') if code.strip()} | {pivot}))
+        response = requests.get(
+            config.get('FREECURRENCY_API_URL', DEFAULT_API_URL),
+            params=params,
+            # Key in a header so it never shows up in logged URLs
+            headers={'Accept': 'application/json', 'apikey': api_key},
+            timeout=(
+                config.get('EXCHANGE_RATE_CONNECT_TIMEOUT', 3),
+                config.get('EXCHANGE_RATE_READ_TIMEOUT', 10)
+            )
+        )
+        response.raise_for_status()
+        data = response.json()
+        rates = {code: float(rate) for code, rate in data['data'].items() if rate}
+        if pivot not in rates:
+            rates[pivot] = 1.0
+        return ExchangeRateSnapshot(
+            pivot, rates,
+            data.get('meta', {}).get('last_updated_at') or datetime.now(timezone.utc).isoformat(),
+            time.time()
+        )
+
+    def refresh(self, force=False):
+        """
+        Scheduled job: fetch new rates unless another worker did so within
+        half the refresh interval. Returns the number of currencies stored
+        (0 when skipped or when the upstream failed).
+        """
+        if not current_app.config.get('FREECURRENCY_API_KEY'):
+            logger.warning("FREECURRENCY_API_KEY is not set; skipping the exchange rate refresh")
+            return 0
+        interval = current_app.config.get('EXCHANGE_RATE_REFRESH_SECONDS', 3600)
+        current = self._load()
+        if not force and current is not None and current.age() < interval / 2:
+            return 0
+        try:
+            snapshot = self.fetch()
+        except Exception as e:
+            age = f"{int(current.age())}s old" if current is not None else "none available"
+            logger.error(f"Exchange rate refresh failed, keeping last known good rates ({age}): {str(e)}")
+            return 0
+        self._store(snapshot)
+        return len(snapshot.rates)
+
+    def get_snapshot(self):
+        snapshot = self._cache.get()
+        if snapshot is None:
+            # Nothing in Redis or in this worker yet (first start-up): fetch once,
+            # and not again for a while if the upstream is down
+            with self._cold_start_lock:
+                snapshot = self._cache.get()
+                if snapshot is None and time.monotonic() - self._cold_start_at > 30:
+                    self._cold_start_at = time.monotonic()
+                    self.refresh(force=True)
+                    snapshot = self._last_good
+        if snapshot is None:
+            raise ExchangeRateUnavailable('Exchange rates are not available yet')
+        return snapshot
+
+    def get_rates(self, base):
+        """
+        Rates for `base` with their metadata, or None if the currency is not
+        supported. Raises ExchangeRateUnavailable before the first refresh.
+        """
+        snapshot = self.get_snapshot()
+        rates = snapshot.rates_for(base)
+        if rates is None:
+            return None
+        return {
+            'base_currency': base,
+            'conversion_rates': rates,
+            'last_updated': snapshot.last_updated,
+            'stale': snapshot.age() > current_app.config.get('EXCHANGE_RATE_STALE_SECONDS', 6 * 3600)
+        }
+
+
+exchange_rates = ExchangeRateService()
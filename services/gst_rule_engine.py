@@ -0,0 +1,261 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from datetime import date as DDate, timedelta
+from decimal import Decimal, InvalidOperation
+
+from common.cache import VersionedLocalCache
+from common.database import db
+from models.enums import ProductPriceConditionType
+from models.gst_rule import GSTRule
+from models.shop.shop_category import ShopCategory
+from models.shop.shop_gst_rule import ShopGSTRule
+from services.category_tree_service import category_tree
+
+VERSION_CACHE_KEY = 'gst_rules:version'
+
+# Detached copy of a rule row; exposes the attributes callers read from GSTRule/ShopGSTRule
+CompiledGSTRule = namedtuple('CompiledGSTRule', [
+    'id', 'name', 'shop_id', 'category_id', 'price_condition_type',
+    'price_condition_value', 'gst_rate_percentage', 'start_date', 'end_date'
+])
+
+
+def _matches(rule, segment, value_positions):
+    """Whether `rule` matches every price in `segment` (see _PriceTable for positions)."""
+    if rule.price_condition_type == ProductPriceConditionType.ANY:
+        return True
+    if rule.price_condition_value is None:
+        return False
+    position = value_positions[rule.price_condition_value]
+    condition = rule.price_condition_type
+    if condition == ProductPriceConditionType.LESS_THAN:
+        return segment < position
+    if condition == ProductPriceConditionType.LESS_THAN_OR_EQUAL_TO:
+        return segment <= position
+    if condition == ProductPriceConditionType.GREATER_THAN:
+        return segment > position
+    if condition == ProductPriceConditionType.GREATER_THAN_OR_EQUAL_TO:
+        return segment >= position
+    if condition == ProductPriceConditionType.EQUAL_TO:
+        return segment == position
+    return False
+
+
+def _marketplace_priority(rule):
+    # Specific price rules beat ANY rules, then the newest rule wins
+    return (rule.price_condition_type != ProductPriceConditionType.ANY, rule.id)
+
+
+def _shop_priority(rule):
+    # Shop rules: the newest matching rule wins
+    return rule.id
+
+
+class _PriceTable:
+    """
+    Winning rule for every price, for one set of rules.
+
+    The distinct condition values p0 < p1 < ... < pn-1 split the price line into
+    2n+1 segments: segment 2i is the open interval (p[i-1], p[i]) and segment
+    2i+1 is the single price p[i]. The winner of every segment is decided at
+    compile time, so a lookup is one bisect.
+    """
+
+    __slots__ = ('points', 'winners')
+
+    def __init__(self, rules, priority):
+        self.points = sorted({
+            rule.price_condition_value for rule in rules
+            if rule.price_condition_type != ProductPriceConditionType.ANY
+            and rule.price_condition_value is not None
+        })
+        value_positions = {value: 2 * i + 1 for i, value in enumerate(self.points)}
+        self.winners = []
+        for segment in range(2 * len(self.points) + 1):
+            matched = [rule for rule in rules if _matches(rule, segment, value_positions)]
+            self.winners.append(max(matched, key=priority) if matched else None)
+
+    def lookup(self, price):
+        i = bisect_left(self.points, price)
+        if i < len(self.points) and self.points[i] == price:
+            return self.winners[2 * i + 1]
+        return self.winners[2 * i]
+
+
+class _RuleLevel:
+    """
+    Rules attached to one category, split into date epochs.
+
+    Rule start dates and end dates (+1 day) cut the calendar into epochs in
+    which the set of live rules is constant; each epoch has its own _PriceTable.
+    """
+
+    __slots__ = ('bounds', 'tables')
+
+    def __init__(self, rules, priority):
+        bounds = set()
+        for rule in rules:
+            if rule.start_date is not None:
+                bounds.add(rule.start_date)
+            # An end date of date.max ("never expires") has no following day to cut at
+            if rule.end_date is not None and rule.end_date < DDate.max:
+                bounds.add(rule.end_date + timedelta(days=1))
+        self.bounds = sorted(bounds)
+        self.tables = []
+        for epoch_start in [DDate.min] + self.bounds:
+            live = [
+                rule for rule in rules
+                if (rule.start_date is None or rule.start_date <= epoch_start)
+                and (rule.end_date is None or rule.end_date >= epoch_start)
+            ]
+            self.tables.append(_PriceTable(live, priority) if live else None)
+
+    def lookup(self, price, on_date):
+        table = self.tables[bisect_right(self.bounds, on_date)]
+        return table.lookup(price) if table is not None else None
+
+
+class GSTRuleTable:
+    """Compiled snapshot of all active GSTRule and ShopGSTRule rows."""
+
+    def __init__(self, rules, shop_rules, shop_category_parents, version=None):
+        self.version = version
+        self.levels = {}
+        by_category = defaultdict(list)
+        for rule in rules:
+            by_category[rule.category_id].append(rule)
+        for category_id, category_rules in by_category.items():
+            self.levels[category_id] = _RuleLevel(category_rules, _marketplace_priority)
+
+        self.shop_levels = {}
+        by_shop_category = defaultdict(list)
+        for rule in shop_rules:
+            by_shop_category[(rule.shop_id, rule.category_id)].append(rule)
+        for key, category_rules in by_shop_category.items():
+            self.shop_levels[key] = _RuleLevel(category_rules, _shop_priority)
+        self.shop_category_parents = shop_category_parents
+
+    @staticmethod
+    def _to_price(price):
+        if isinstance(price, Decimal):
+            return price
+        try:
+            return Decimal(price)
+        except (TypeError, InvalidOperation, ValueError):
+            return None
+
+    def resolve(self, category_id, inclusive_price, lineage, on_date=None):
+        """Most specific matching marketplace rule along `lineage`, or None."""
+        price = self._to_price(inclusive_price)
+        if price is None or not category_id:
+            return None
+        on_date = on_date or DDate.today()
+        for lineage_category_id in lineage:
+            level = self.levels.get(lineage_category_id)
+            if level is None:
+                continue
+            rule = level.lookup(price, on_date)
+            if rule is not None:
+                return rule
+        return None
+
+    def shop_lineage(self, shop_category_id):
+        if shop_category_id not in self.shop_category_parents:
+            return []
+        lineage = [shop_category_id]
+        parent_id = self.shop_category_parents.get(shop_category_id)
+        while parent_id is not None and parent_id in self.shop_category_parents and parent_id not in lineage:
+            lineage.append(parent_id)
+            parent_id = self.shop_category_parents.get(parent_id)
+        return lineage
+
+    def resolve_shop(self, shop_id, shop_category_id, inclusive_price, on_date=None):
+        """Matching shop rule for the category or its nearest ancestor, or None."""
+        price = self._to_price(inclusive_price)
+        if price is None:
+            return None
+        on_date = on_date or DDate.today()
+        for lineage_category_id in self.shop_lineage(shop_category_id):
+            level = self.shop_levels.get((shop_id, lineage_category_id))
+            if level is None:
+                continue
+            rule = level.lookup(price, on_date)
+            if rule is not None:
+                return rule
+        return None
+
+
+class GSTRuleEngine:
+    """
+    Resolves GST rules from a compiled, per-process copy of the rule tables.
+
+    Same precedence as GSTRule.find_applicable_rule and
+    ShopGSTRule.find_applicable_rule, without touching the database per line.
+    The superadmin GST controllers call invalidate() after every change.
+    """
+
+    def __init__(self):
+        self._cache = VersionedLocalCache(
+            VERSION_CACHE_KEY, self._load,
+            'GST_RULES_VERSION_CHECK_SECONDS', 'GST_RULES_MAX_AGE'
+        )
+
+    @staticmethod
+    def _compile(row):
+        return CompiledGSTRule(
+            id=row.id,
+            name=row.name,
+            shop_id=getattr(row, 'shop_id', None),
+            category_id=row.category_id,
+            price_condition_type=row.price_condition_type,
+            price_condition_value=Decimal(row.price_condition_value) if row.price_condition_value is not None else None,
+            gst_rate_percentage=Decimal(row.gst_rate_percentage),
+            start_date=row.start_date,
+            end_date=row.end_date
+        )
+
+    @staticmethod
+    def _load(version):
+        rules = [GSTRuleEngine._compile(row) for row in GSTRule.query.filter(GSTRule.is_active == True).all()]
+        shop_rules = [GSTRuleEngine._compile(row) for row in ShopGSTRule.query.filter(ShopGSTRule.is_active == True).all()]
+        shop_category_parents = dict(db.session.query(ShopCategory.category_id, ShopCategory.parent_id).all())
+        return GSTRuleTable(rules, shop_rules, shop_category_parents, version=version)
+
+    def get_table(self):
+        return self._cache.get()
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def resolve_rule(self, category_id, inclusive_price, on_date=None):
+        """Applicable marketplace rule for one (category, inclusive price, date)."""
+        lineage = category_tree.ancestor_ids(category_id) if category_id else []
+        return self.get_table().resolve(category_id, inclusive_price, lineage, on_date)
+
+    def resolve_rules(self, lines, on_date=None):
+        """
+        Resolve a whole cart at once.
+
+        `lines` is an iterable of (category_id, inclusive_price); returns the
+        applicable rule (or None) for each line, in order.
+        """
+        table = self.get_table()
+        tree = category_tree.get_tree()
+        return [
+            table.resolve(category_id, price, tree.ancestor_ids(category_id) if category_id else [], on_date)
+            for category_id, price in lines
+        ]
+
+    def resolve_shop_rule(self, shop_id, shop_category_id, inclusive_price, on_date=None):
+        return self.get_table().resolve_shop(shop_id, shop_category_id, inclusive_price, on_date)
+
+    def resolve_shop_rules(self, shop_id, lines, on_date=None):
+        """Shop counterpart of resolve_rules(); `lines` are (shop_category_id, inclusive_price)."""
+        table = self.get_table()
+        return [
+            table.resolve_shop(shop_id, shop_category_id, price, on_date)
+            for shop_category_id, price in lines
+        ]
+
+
+gst_rule_engine = GSTRuleEngine()
@@ -0,0 +1,252 @@
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from common.database import db
+from models.enums import OrderStatusEnum
+from models.merchant_daily_sales import MerchantDailySales
+from models.order import Order, OrderItem
+from models.product import Product
+
+# Orders that are not (or no longer) a sale. Everything else counts, including
+# pending_payment, which is where cash-on-delivery orders stay until fulfilment;
+# unpaid online orders leave the rollup when their stock hold expires.
+NON_SALE_ORDER_STATUSES = (
+    OrderStatusEnum.CANCELLED_BY_CUSTOMER,
+    OrderStatusEnum.CANCELLED_BY_MERCHANT,
+    OrderStatusEnum.CANCELLED_BY_ADMIN,
+    OrderStatusEnum.REFUNDED,
+    OrderStatusEnum.RETURN_COMPLETED,
+)
+
+TOTAL_PRODUCT_ID = MerchantDailySales.TOTAL_PRODUCT_ID
+
+# MySQL lock wait timeout and deadlock: a concurrent refresh of the same days won, so the rebuild is redone
+RETRYABLE_MYSQL_ERRORS = (1205, 1213)
+REBUILD_ATTEMPTS = 3
+
+
+def _is_retryable(error):
+    if isinstance(error, IntegrityError):
+        # A concurrent refresh of the same merchant-day inserted first
+        return True
+    args = getattr(error.orig, 'args', None) or (None,)
+    return args[0] in RETRYABLE_MYSQL_ERRORS
+
+
+def _as_date(value):
+    """DATE() comes back as a string on SQLite and as a date elsewhere."""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def month_start(today, months_back):
+    """First day of the month `months_back` months before `today`'s month."""
+    month_index = today.year * 12 + today.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+class MerchantSalesRollupService:
+    """
+    Maintains merchant_daily_sales, the per merchant/product/day sales rollup
+    behind the merchant reports and dashboard.
+
+    A (merchant, day) is always recomputed as a whole from its orders, so the
+    rollup is correct whatever the order of status changes: refresh_orders()
+    runs after an order is created or changes status, a periodic reconcile
+    re-derives the last few days to catch writes that bypassed the hooks, and
+    backfill() rebuilds any history. Reports read day rows by date range only.
+    """
+
+    @staticmethod
+    def _sale_filters(start, end, merchant_ids=None):
+        filters = [
+            Order.order_date >= datetime.combine(start, datetime.min.time()),
+            Order.order_date < datetime.combine(end, datetime.min.time()),
+            Order.order_status.notin_(NON_SALE_ORDER_STATUSES),
+            OrderItem.merchant_id.isnot(None)
+        ]
+        if merchant_ids is not None:
+            filters.append(OrderItem.merchant_id.in_(merchant_ids))
+        return filters
+
+    @staticmethod
+    def _aggregate(start, end, merchant_ids=None):
+        """Rollup rows for orders dated in [start, end), optionally for some merchants only."""
+        sale_day = func.date(Order.order_date)
+        filters = MerchantSalesRollupService._sale_filters(start, end, merchant_ids)
+        now = datetime.utcnow()
+
+        by_product = db.session.query(
+            OrderItem.merchant_id,
+            sale_day.label('sale_date'),
+            OrderItem.product_id,
+            Product.category_id,
+            func.sum(OrderItem.quantity).label('units'),
+            func.sum(OrderItem.line_item_total_inclusive_gst).label('revenue'),
+            func.count(func.distinct(Order.order_id)).label('orders')
+        ).join(
+            Order, Order.order_id == OrderItem.order_id
+        ).outerjoin(
+            Product, Product.product_id == OrderItem.product_id
+        ).filter(
+            *filters, OrderItem.product_id.isnot(None)
+        ).group_by(
+            OrderItem.merchant_id, sale_day, OrderItem.product_id, Product.category_id
+        )
+
+        totals = db.session.query(
+            OrderItem.merchant_id,
+            sale_day.label('sale_date'),
+            func.sum(OrderItem.quantity).label('units'),
+            func.sum(OrderItem.line_item_total_inclusive_gst).label('revenue'),
+            func.count(func.distinct(Order.order_id)).label('orders')
+        ).join(
+            Order, Order.order_id == OrderItem.order_id
+        ).filter(
+            *filters
+        ).group_by(
+            OrderItem.merchant_id, sale_day
+        )
+
+        rows = [{
+            'merchant_id': row.merchant_id,
+            'sale_date': _as_date(row.sale_date),
+            'product_id': row.product_id,
+            'category_id': row.category_id,
+            'units': int(row.units or 0),
+            'revenue': row.revenue or 0,
+            'orders': int(row.orders or 0),
+            'updated_at': now
+        } for row in by_product]
+        rows.extend({
+            'merchant_id': row.merchant_id,
+            'sale_date': _as_date(row.sale_date),
+            'product_id': TOTAL_PRODUCT_ID,
+            'category_id': None,
+            'units': int(row.units or 0),
+            'revenue': row.revenue or 0,
+            'orders': int(row.orders or 0),
+            'updated_at': now
+        } for row in totals)
+        return rows
+
+    @staticmethod
+    def _rebuild(start, end, merchant_ids=None):
+        """
+        Replace the rollup rows for [start, end) (for `merchant_ids`, or every
+        merchant) with a fresh aggregate, in one transaction. Returns the
+        number of rows written.
+        """
+        start, end = _as_date(start), _as_date(end)
+        for attempt in range(REBUILD_ATTEMPTS):
+            try:
+                query = MerchantDailySales.query.filter(
+                    MerchantDailySales.sale_date >= start,
+                    MerchantDailySales.sale_date < end
+                )
+                if merchant_ids is not None:
+                    query = query.filter(MerchantDailySales.merchant_id.in_(merchant_ids))
+                query.delete(synchronize_session=False)
+                rows = MerchantSalesRollupService._aggregate(start, end, merchant_ids)
+                if rows:
+                    db.session.execute(insert(MerchantDailySales), rows)
+                db.session.commit()
+                return len(rows)
+            except (IntegrityError, OperationalError) as e:
+                db.session.rollback()
+                if attempt == REBUILD_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+        return 0
+
+    @staticmethod
+    def refresh_orders(order_ids):
+        """
+        Recompute the merchant-days touched by these orders. Call after the
+        order change has been committed; errors are logged, not raised, and
+        the periodic reconcile repairs anything missed.
+        """
+        order_ids = [order_id for order_id in set(order_ids or []) if order_id]
+        if not order_ids:
+            return
+        try:
+            touched = db.session.query(
+                OrderItem.merchant_id, Order.order_date
+            ).join(
+                Order, Order.order_id == OrderItem.order_id
+            ).filter(
+                Order.order_id.in_(order_ids),
+                OrderItem.merchant_id.isnot(None)
+            ).distinct().all()
+
+            merchants_by_day = defaultdict(set)
+            for merchant_id, order_date in touched:
+                merchants_by_day[order_date.date()].add(merchant_id)
+            for day, merchant_ids in merchants_by_day.items():
+                MerchantSalesRollupService._rebuild(day, day + timedelta(days=1), sorted(merchant_ids))
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error refreshing sales rollup for orders {sorted(order_ids)}: {str(e)}")
+
+    @staticmethod
+    def refresh_order(order):
+        if order is not None:
+            MerchantSalesRollupService.refresh_orders([order.order_id])
+
+    @staticmethod
+    def reconcile(days=None):
+        """Scheduled job: rebuild the last `days` days for every merchant. Returns rows written."""
+        if days is None:
+            days = current_app.config.get('SALES_ROLLUP_RECONCILE_DAYS', 2)
+        today = datetime.utcnow().date()
+        return MerchantSalesRollupService._rebuild(today - timedelta(days=days - 1), today + timedelta(days=1))
+
+    @staticmethod
+    def backfill(since=None, chunk_days=31):
+        """
+        Rebuild the rollup from `since` (default: the first order) up to today,
+        one chunk of days per transaction. Returns the number of rows written.
+        """
+        if since is None:
+            first = db.session.query(func.min(Order.order_date)).scalar()
+            if first is None:
+                return 0
+            since = first.date()
+        end = datetime.utcnow().date() + timedelta(days=1)
+        written = 0
+        start = since
+        while start < end:
+            chunk_end = min(start + timedelta(days=chunk_days), end)
+            written += MerchantSalesRollupService._rebuild(start, chunk_end)
+            start = chunk_end
+        return written
+
+    @staticmethod
+    def month_totals(merchant_id, since):
+        """{(year, month): {'units', 'revenue', 'orders'}} for the merchant's days from `since`."""
+        rows = db.session.query(
+            MerchantDailySales.sale_date,
+            MerchantDailySales.units,
+            MerchantDailySales.revenue,
+            MerchantDailySales.orders
+        ).filter(
+            MerchantDailySales.merchant_id == merchant_id,
+            MerchantDailySales.product_id == TOTAL_PRODUCT_ID,
+            MerchantDailySales.sale_date >= _as_date(since)
+        ).all()
+        months = defaultdict(lambda: {'units': 0, 'revenue': Decimal('0'), 'orders': 0})
+        for sale_date, units, revenue, orders in rows:
+            month = months[(sale_date.year, sale_date.month)]
+            month['units'] += units or 0
+            month['revenue'] += Decimal(str(revenue or 0))
+            month['orders'] += orders or 0
+        return months
@@ -0,0 +1,99 @@
+from collections import defaultdict
+
+from sqlalchemy import exists
+
+from common.database import db
+from common.pagination import COUNT_NONE, SortKey, paginate_keyset
+from models.order import Order, OrderItem, OrderStatusHistory
+from services.product_listing_service import ProductListingService
+
+# Newest first; order_id breaks ties between orders placed in the same second
+ORDER_KEYS = [
+    SortKey('order_date', Order.order_date, descending=True),
+    SortKey('order_id', Order.order_id, descending=True)
+]
+
+
+class OrderHistoryService:
+    """
+    Read path for order history listings (customer, admin and merchant).
+
+    A page is resolved as order ids first, from the orders table alone, so
+    no join multiplies rows or needs DISTINCT. The orders, their items and
+    (optionally) their status history are then loaded with one query each.
+    Item images come from the thumbnail snapshotted at purchase. Only items
+    bought before the snapshot existed are looked up, in one media query.
+    """
+
+    @staticmethod
+    def merchant_filter(merchant_id):
+        """Orders containing at least one item sold by `merchant_id`."""
+        return exists().where(OrderItem.order_id == Order.order_id, OrderItem.merchant_id == merchant_id)
+
+    @staticmethod
+    def _ids_query(filters):
+        return db.session.query(Order.order_id).filter(*filters)
+
+    @staticmethod
+    def page_order_ids(filters, page, per_page):
+        """(order ids of `page`, total) for orders matching `filters`, newest first."""
+        query = OrderHistoryService._ids_query(filters)
+        total = query.order_by(None).count()
+        rows = query.order_by(*[key.ordering() for key in ORDER_KEYS])\
+            .offset((page - 1) * per_page).limit(per_page).all()
+        return [row.order_id for row in rows], total
+
+    @staticmethod
+    def cursor_order_ids(filters, per_page, cursor=None, count=COUNT_NONE):
+        """A CursorPage of order ids matching `filters`, newest first."""
+        return paginate_keyset(OrderHistoryService._ids_query(filters), ORDER_KEYS, per_page, cursor=cursor, count=count)
+
+    @staticmethod
+    def get_thumbnail_map(product_ids):
+        """{product_id: thumbnail url} for the given products."""
+        media_map = ProductListingService.get_primary_media_map(list(product_ids))
+        return {product_id: media.url for product_id, media in media_map.items()}
+
+    @staticmethod
+    def summaries(order_ids, merchant_id=None, include_history=False):
+        """
+        Serialized orders for `order_ids`, in that order, each with its items
+        (only `merchant_id`'s items when given) and optionally its status history.
+        """
+        if not order_ids:
+            return []
+        orders = Order.query.options(db.lazyload(Order.items)).filter(Order.order_id.in_(order_ids)).all()
+
+        item_query = OrderItem.query.filter(OrderItem.order_id.in_(order_ids))
+        if merchant_id is not None:
+            item_query = item_query.filter(OrderItem.merchant_id == merchant_id)
+        items_by_order = defaultdict(list)
+        for item in item_query.order_by(OrderItem.order_item_id).all():
+            items_by_order[item.order_id].append(item)
+
+        missing = {
+            item.product_id for items in items_by_order.values() for item in items
+            if item.product_image_url is None and item.product_id is not None
+        }
+        thumbnails = OrderHistoryService.get_thumbnail_map(missing) if missing else {}
+
+        history_by_order = defaultdict(list)
+        if include_history:
+            history = OrderStatusHistory.query.filter(
+                OrderStatusHistory.order_id.in_(order_ids)
+            ).order_by(OrderStatusHistory.changed_at.desc()).all()
+            for entry in history:
+                history_by_order[entry.order_id].append(entry)
+
+        orders_by_id = {order.order_id: order for order in orders}
+        serialized = []
+        for order_id in order_ids:
+            order = orders_by_id.get(order_id)
+            if order is None:
+                continue
+            data = order.serialize(include_items=False)
+            data['items'] = [item.serialize(thumbnails=thumbnails) for item in items_by_order[order_id]]
+            if include_history:
+                data['status_history'] = [entry.serialize() for entry in history_by_order[order_id]]
+            serialized.append(data)
+        return serialized
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from sqlalchemy.orm import selectinload
+from common.database import db
+from models.brand import brand_categories
+from models.category import Category
+from models.product import Product
+from models.product_attribute import ProductAttribute
+from models.product_media import ProductMedia
+from models.enums import MediaType
+from models.review import Review
+from services.product_rating_service import ProductRatingService
+from services.catalog_translation_service import CatalogTranslationService, CATALOG_PRODUCT
+
+
+class ProductListingService:
+    """
+    Builds product listing cards for a whole page in a fixed number of queries.
+
+    Related rows (category, brand, stock, attributes, variants) are eager loaded
+    with selectinload, and ratings, reviews and primary media are fetched with
+    one grouped query each for all product ids on the page. The cards are then
+    assembled from in-memory maps, so the query count does not depend on the
+    page size.
+    """
+
+    @staticmethod
+    def eager_load_options():
+        """Loader options covering everything Product.serialize() touches."""
+        def attributes():
+            return selectinload(Product.product_attributes).options(
+                selectinload(ProductAttribute.attribute),
+                selectinload(ProductAttribute.attribute_value)
+            )
+
+        return [
+            selectinload(Product.category),
+            selectinload(Product.brand),
+            selectinload(Product.stock),
+            attributes(),
+            selectinload(Product.variants).options(
+                selectinload(Product.category),
+                selectinload(Product.brand),
+                selectinload(Product.stock),
+                attributes(),
+                selectinload(Product.variants)
+            )
+        ]
+
+    @staticmethod
+    def get_rating_map(product_ids):
+        """Return {product_id: (avg_rating, review_count)} from the materialized aggregates."""
+        return ProductRatingService.get_stats_map(product_ids)
+
+    @staticmethod
+    def get_reviews_map(product_ids):
+        """Return {product_id: [Review, ...]} (newest first) with users and images loaded."""
+        reviews_map = defaultdict(list)
+        if not product_ids:
+            return reviews_map
+        reviews = Review.query.options(
+            selectinload(Review.user),
+            selectinload(Review.images)
+        ).filter(
+            Review.product_id.in_(product_ids),
+            Review.deleted_at.is_(None)
+        ).order_by(
+            Review.created_at.desc()
+        ).all()
+        for review in reviews:
+            reviews_map[review.product_id].append(review)
+        return reviews_map
+
+    @staticmethod
+    def serialize_brands(brands):
+        """Return {brand_id: Brand.serialize()} with every brand's categories loaded in one query."""
+        brands = {brand.brand_id: brand for brand in brands if brand is not None}
+        categories = defaultdict(list)
+        if brands:
+            rows = db.session.query(brand_categories.c.brand_id, Category).join(
+                Category, Category.category_id == brand_categories.c.category_id
+            ).filter(
+                brand_categories.c.brand_id.in_(list(brands))
+            ).all()
+            for brand_id, category in rows:
+                categories[brand_id].append(category)
+        return {
+            brand_id: brand.serialize(categories=categories[brand_id])
+            for brand_id, brand in brands.items()
+        }
+
+    @staticmethod
+    def get_primary_media_map(product_ids):
+        """
+        Return {product_id: ProductMedia} for the primary image of each product.
+
+        Same precedence as ProductController.get_product_media: thumbnail, then
+        main image, then the first image by sort_order and created_at.
+        """
+        if not product_ids:
+            return {}
+        media_rows = ProductMedia.query.filter(
+            ProductMedia.product_id.in_(product_ids),
+            ProductMedia.deleted_at.is_(None),
+            ProductMedia.type == MediaType.IMAGE
+        ).order_by(
+            ProductMedia.product_id,
+            ProductMedia.is_thumbnail.desc(),
+            ProductMedia.is_main_image.desc(),
+            ProductMedia.sort_order.asc(),
+            ProductMedia.created_at.asc()
+        ).all()
+        media_map = {}
+        for media in media_rows:
+            media_map.setdefault(media.product_id, media)
+        return media_map
+
+    @staticmethod
+    def serialize_review(review):
+        return {
+            "id": review.review_id,
+            "user": {
+                "id": review.user.id,
+                "first_name": review.user.first_name if hasattr(review.user, 'first_name') else 'Anonymous',
+                "last_name": review.user.last_name if hasattr(review.user, 'last_name') else '',
+                "email": review.user.email if hasattr(review.user, 'email') else None,
+                "avatar": review.user.avatar_url if hasattr(review.user, 'avatar_url') else None
+            },
+            "rating": review.rating,
+            "title": review.title,
+            "body": review.body,
+            "created_at": review.created_at.isoformat(),
+            "images": [img.serialize() for img in review.images] if review.images else []
+        }
+
+    @staticmethod
+    def build_product_cards(products, include_rating=True, include_reviews=False, lang=None):
+        """
+        Serialize a page of products into listing cards.
+
+        `products` should be loaded with eager_load_options() so serialize()
+        does not lazy load per row. With `lang`, names and descriptions come
+        from the pre-translated rows for that locale where they exist.
+        """
+        product_ids = [product.product_id for product in products]
+        rating_map = ProductListingService.get_rating_map(product_ids) if include_rating else {}
+        reviews_map = ProductListingService.get_reviews_map(product_ids) if include_reviews else {}
+        media_map = ProductListingService.get_primary_media_map(product_ids)
+        translation_map = CatalogTranslationService.get_translation_map(CATALOG_PRODUCT, product_ids, lang, products=products)
+
+        cards = []
+        for product in products:
+            product_dict = product.serialize()
+            product_dict.update({
+                'id': str(product.product_id),  # Convert to string for frontend
+                'name': product.product_name,
+                'description': product.product_description,
+                'stock': product.stock.stock_qty if product.stock else 0,
+                'isNew': True,
+                'isBuiltIn': False,
+            })
+
+            translation = translation_map.get(product.product_id)
+            if translation is not None:
+                product_dict.update({
+                    'name': translation.name or product.product_name,
+                    'product_name': translation.name or product.product_name,
+                    'description': translation.description or product.product_description,
+                    'product_description': translation.description or product.product_description,
+                    'lang': lang,
+                })
+
+            if include_rating:
+                avg_rating, review_count = rating_map.get(product.product_id, (0.0, 0))
+                product_dict.update({
+                    'rating': round(avg_rating, 1),
+                    'review_count': review_count,
+                    'discount_pct': float(product.discount_pct or 0),
+                })
+
+            if include_reviews:
+                product_dict['reviews'] = [
+                    ProductListingService.serialize_review(review)
+                    for review in reviews_map.get(product.product_id, [])
+                ]
+
+            media = media_map.get(product.product_id)
+            if media:
+                product_dict['primary_image'] = media.url
+                product_dict['image'] = media.url  # For backward compatibility
+
+            cards.append(product_dict)
+        return cards
@@ -0,0 +1,170 @@
+from datetime import datetime
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
+from common.database import db
+from models.product import Product
+from models.review import Review
+from models.product_rating_stats import ProductRatingStats
+
+STAR_COLUMNS = {
+    1: ProductRatingStats.star_1,
+    2: ProductRatingStats.star_2,
+    3: ProductRatingStats.star_3,
+    4: ProductRatingStats.star_4,
+    5: ProductRatingStats.star_5,
+}
+
+
+class ProductRatingService:
+    """
+    Maintains ProductRatingStats alongside review writes.
+
+    The update methods only stage atomic UPDATE statements on the current
+    session; the caller commits them together with the review change.
+    """
+
+    @staticmethod
+    def _ensure_row(product_id):
+        exists = db.session.query(ProductRatingStats.product_id).filter_by(
+            product_id=product_id
+        ).first()
+        if exists:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(ProductRatingStats(
+                    product_id=product_id,
+                    rating_count=0,
+                    rating_sum=0,
+                    rating_avg=0,
+                    star_1=0, star_2=0, star_3=0, star_4=0, star_5=0
+                ))
+        except IntegrityError:
+            # Another request created the row first
+            pass
+
+    @staticmethod
+    def _apply(product_id, count_delta, sum_delta, star_deltas):
+        ProductRatingService._ensure_row(product_id)
+
+        values = {
+            ProductRatingStats.rating_count: ProductRatingStats.rating_count + count_delta,
+            ProductRatingStats.rating_sum: ProductRatingStats.rating_sum + sum_delta,
+            ProductRatingStats.updated_at: datetime.utcnow()
+        }
+        for star, delta in star_deltas.items():
+            column = STAR_COLUMNS.get(star)
+            if column is not None and delta:
+                values[column] = column + delta
+
+        stats_query = db.session.query(ProductRatingStats).filter(
+            ProductRatingStats.product_id == product_id
+        )
+        stats_query.update(values, synchronize_session=False)
+        # Recompute the average from the (now locked) row in a second statement
+        stats_query.update({
+            ProductRatingStats.rating_avg: case(
+                (ProductRatingStats.rating_count > 0,
+                 ProductRatingStats.rating_sum * 1.0 / ProductRatingStats.rating_count),
+                else_=0
+            )
+        }, synchronize_session=False)
+
+    @staticmethod
+    def review_added(product_id, rating):
+        ProductRatingService._apply(product_id, 1, rating, {rating: 1})
+
+    @staticmethod
+    def review_removed(product_id, rating):
+        ProductRatingService._apply(product_id, -1, -rating, {rating: -1})
+
+    @staticmethod
+    def review_rating_changed(product_id, old_rating, new_rating):
+        if old_rating == new_rating:
+            return
+        ProductRatingService._apply(
+            product_id, 0, new_rating - old_rating, {old_rating: -1, new_rating: 1}
+        )
+
+    @staticmethod
+    def get_stats_map(product_ids):
+        """Return {product_id: (avg_rating, review_count)} for the given products."""
+        if not product_ids:
+            return {}
+        rows = db.session.query(
+            ProductRatingStats.product_id,
+            ProductRatingStats.rating_avg,
+            ProductRatingStats.rating_count
+        ).filter(
+            ProductRatingStats.product_id.in_(product_ids)
+        ).all()
+        return {
+            product_id: (float(rating_avg or 0), int(rating_count or 0))
+            for product_id, rating_avg, rating_count in rows
+        }
+
+    @staticmethod
+    def get_stats(product_id):
+        return ProductRatingStats.query.get(product_id)
+
+    @staticmethod
+    def average_rating_column():
+        """Rating expression for filters/sorts; requires an outer join to ProductRatingStats."""
+        return func.coalesce(ProductRatingStats.rating_avg, 0)
+
+    @staticmethod
+    def reconcile(batch_size=500):
+        """
+        Rebuild every product's aggregates from the reviews table.
+
+        Returns the number of products whose stats were written.
+        """
+        star_sums = [
+            func.sum(case((Review.rating == star, 1), else_=0)) for star in range(1, 6)
+        ]
+        written = 0
+        last_id = 0
+        while True:
+            product_ids = [row[0] for row in db.session.query(Product.product_id).filter(
+                Product.product_id > last_id
+            ).order_by(Product.product_id).limit(batch_size).all()]
+            if not product_ids:
+                break
+            last_id = product_ids[-1]
+
+            aggregates = {
+                row[0]: row for row in db.session.query(
+                    Review.product_id,
+                    func.count(Review.review_id),
+                    func.coalesce(func.sum(Review.rating), 0),
+                    *star_sums
+                ).filter(
+                    Review.product_id.in_(product_ids),
+                    Review.deleted_at.is_(None)
+                ).group_by(Review.product_id).all()
+            }
+            existing = {
+                stats.product_id: stats for stats in ProductRatingStats.query.filter(
+                    ProductRatingStats.product_id.in_(product_ids)
+                ).all()
+            }
+
+            for product_id in product_ids:
+                row = aggregates.get(product_id)
+                stats = existing.get(product_id)
+                if row is None and stats is None:
+                    continue
+                if stats is None:
+                    stats = ProductRatingStats(product_id=product_id)
+                    db.session.add(stats)
+                count, total = (int(row[1]), int(row[2])) if row else (0, 0)
+                stars = [int(value or 0) for value in row[3:]] if row else [0] * 5
+                stats.rating_count = count
+                stats.rating_sum = total
+                stats.rating_avg = round(total / count, 2) if count else 0
+                stats.star_1, stats.star_2, stats.star_3, stats.star_4, stats.star_5 = stars
+                stats.updated_at = datetime.utcnow()
+                written += 1
+
+            db.session.commit()
+        return written
@@ -0,0 +1,9 @@
+from services.search.service import ProductSearchService
+from services.search.memory_backend import InMemorySearchBackend
+from services.search.mysql_backend import MySQLFullTextSearchBackend
+
+__all__ = [
+    'ProductSearchService',
+    'InMemorySearchBackend',
+    'MySQLFullTextSearchBackend',
+]
@@ -0,0 +1,32 @@
+import re
+
+TAG_RE = re.compile(r'<[^>]+>')
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Relative weight of each indexed field when computing term frequencies
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'sku': 2.0,
+    'category': 1.5,
+    'brand': 1.5,
+    'description': 1.0,
+}
+
+
+def tokenize(text):
+    """Lower-case word tokens with HTML tags stripped."""
+    if not text:
+        return []
+    return TOKEN_RE.findall(TAG_RE.sub(' ', str(text)).lower())
+
+
+def build_document(product):
+    """Flatten a Product (with category and brand loaded) into indexable fields."""
+    return {
+        'product_id': product.product_id,
+        'name': product.product_name or '',
+        'sku': product.sku or '',
+        'category': product.category.name if product.category else '',
+        'brand': product.brand.name if product.brand else '',
+        'description': product.product_description or '',
+    }
@@ -0,0 +1,181 @@
+import math
+import time
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from services.search.documents import FIELD_WEIGHTS, tokenize
+
+
+class InMemorySearchBackend:
+    """
+    Pure-Python inverted index with BM25 ranking and prefix matching.
+
+    Intended for tests and small deployments. Each worker holds its own copy,
+    built lazily from `load_documents` and rebuilt every `refresh_interval`
+    seconds so changes made by other workers are picked up; changes made by
+    this worker are applied immediately through upsert()/remove().
+
+    Documents are loaded and indexed without holding the lock: searches keep
+    using the previous index meanwhile, and writes made during the reload are
+    replayed onto the new one before it is swapped in.
+    """
+
+    name = 'memory'
+
+    K1 = 1.2
+    B = 0.75
+    PREFIX_WEIGHT = 0.8       # score factor for prefix (non-exact) term matches
+    MIN_PREFIX_LENGTH = 2
+    MAX_PREFIX_EXPANSIONS = 50
+
+    def __init__(self, load_documents, refresh_interval=300):
+        self._load_documents = load_documents
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()   # one reload at a time
+        self._pending = None                  # writes made while a reload runs
+        self._built_at = None
+        self._reset()
+
+    def _reset(self):
+        self._postings = defaultdict(dict)   # term -> {product_id: weighted tf}
+        self._doc_terms = {}                 # product_id -> set(terms)
+        self._doc_len = {}                   # product_id -> weighted length
+        self._total_len = 0.0
+        self._terms = []                     # sorted vocabulary for prefix lookups
+
+    def _is_stale(self):
+        return self._built_at is None or bool(
+            self.refresh_interval and time.time() - self._built_at > self.refresh_interval
+        )
+
+    def _ensure_built(self):
+        if not self._is_stale():
+            return
+        # Until the first build every search must wait; after that, whoever
+        # finds the index stale while another thread reloads it keeps using it
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if not self._is_stale():
+                return
+            with self._lock:
+                self._pending = []
+            self.rebuild(self._load_documents())
+        finally:
+            with self._lock:
+                self._pending = None
+            self._build_lock.release()
+
+    def rebuild(self, documents):
+        fresh = InMemorySearchBackend(self._load_documents, self.refresh_interval)
+        for document in documents:
+            fresh._add(document)
+        fresh._terms = sorted(fresh._postings)
+        with self._lock:
+            self._postings, self._doc_terms, self._doc_len = fresh._postings, fresh._doc_terms, fresh._doc_len
+            self._total_len, self._terms = fresh._total_len, fresh._terms
+            self._built_at = time.time()
+            for apply, argument in self._pending or ():
+                apply(argument)
+
+    def _add(self, document):
+        product_id = document['product_id']
+        frequencies = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(document.get(field)):
+                frequencies[token] += weight
+        for term, tf in frequencies.items():
+            postings = self._postings[term]
+            if not postings and self._built_at is not None:
+                insort(self._terms, term)
+            postings[product_id] = tf
+        self._doc_terms[product_id] = set(frequencies)
+        self._doc_len[product_id] = sum(frequencies.values())
+        self._total_len += self._doc_len[product_id]
+
+    def _remove(self, product_id):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(product_id, 0.0)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                index = bisect_left(self._terms, term)
+                if index < len(self._terms) and self._terms[index] == term:
+                    self._terms.pop(index)
+
+    def _replace(self, document):
+        self._remove(document['product_id'])
+        self._add(document)
+
+    def upsert(self, documents):
+        with self._lock:
+            for document in documents:
+                if self._pending is not None:
+                    self._pending.append((self._replace, document))
+                if self._built_at is not None:
+                    # Before the first build there is nothing to patch; that build loads everything
+                    self._replace(document)
+
+    def remove(self, product_ids):
+        with self._lock:
+            for product_id in product_ids:
+                if self._pending is not None:
+                    self._pending.append((self._remove, product_id))
+                self._remove(product_id)
+
+    def _prefix_terms(self, prefix):
+        index = bisect_left(self._terms, prefix)
+        matches = []
+        while index < len(self._terms) and len(matches) < self.MAX_PREFIX_EXPANSIONS:
+            term = self._terms[index]
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+            index += 1
+        return matches
+
+    def search(self, text, limit=None):
+        """Return [(product_id, score), ...] ordered by BM25 score."""
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens:
+            return []
+
+        self._ensure_built()
+        with self._lock:
+            doc_count = len(self._doc_len)
+            if not doc_count:
+                return []
+            avg_len = self._total_len / doc_count or 1.0
+
+            scores = defaultdict(float)
+            for token in tokens:
+                expansions = [(token, 1.0)] if token in self._postings else []
+                if len(token) >= self.MIN_PREFIX_LENGTH:
+                    expansions.extend(
+                        (term, self.PREFIX_WEIGHT) for term in self._prefix_terms(token) if term != token
+                    )
+
+                # A query term scores once per document, via its best matching index term
+                token_scores = {}
+                for term, factor in expansions:
+                    postings = self._postings[term]
+                    df = len(postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    for product_id, tf in postings.items():
+                        norm = self.K1 * (1 - self.B + self.B * self._doc_len[product_id] / avg_len)
+                        score = factor * idf * tf * (self.K1 + 1) / (tf + norm)
+                        if score > token_scores.get(product_id, 0.0):
+                            token_scores[product_id] = score
+                for product_id, score in token_scores.items():
+                    scores[product_id] += score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
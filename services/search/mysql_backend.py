@@ -0,0 +1,141 @@
+from datetime import datetime
+
+from sqlalchemy import case, or_, select
+from sqlalchemy.dialects.mysql import match
+
+from common.database import db
+from models.product_search_document import ProductSearchDocument
+from services.search.documents import TAG_RE, tokenize
+
+# InnoDB's default FULLTEXT stopwords (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD)
+INNODB_STOPWORDS = frozenset((
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www'
+))
+
+
+class MySQLFullTextSearchBackend:
+    """
+    Search backend using InnoDB FULLTEXT indexes on product_search_documents.
+
+    Query terms are OR-ed with a trailing `*` for prefix matching in BOOLEAN
+    MODE. Ranking uses InnoDB's own relevance (a BM25 variant) with title
+    matches weighted higher.
+
+    The index drops tokens shorter than innodb_ft_min_token_size and
+    stopwords, so such query terms ("tv", "4k", "pc") are matched with
+    LIKE on title and keywords instead, as is the whole query when FULLTEXT
+    finds nothing. SEARCH_MYSQL_MIN_TOKEN_SIZE must match the server setting.
+    """
+
+    name = 'mysql'
+
+    TITLE_WEIGHT = 3
+
+    def __init__(self, min_token_size=3):
+        self.min_token_size = min_token_size
+
+    @staticmethod
+    def _rows(documents, now):
+        return [{
+            'product_id': document['product_id'],
+            'title': document['name'][:255],
+            'keywords': ' '.join(filter(None, [document['sku'], document['category'], document['brand']])),
+            'body': TAG_RE.sub(' ', document['description']),
+            # Stamped even when the text is unchanged: ProductSearchService.sync_changed compares it
+            'updated_at': now
+        } for document in documents]
+
+    def _write(self, documents, remove_ids=(), replace_all=False):
+        """
+        Replace documents in a transaction of their own, so indexing never
+        commits or rolls back the caller's session.
+        """
+        table = ProductSearchDocument.__table__
+        rows = self._rows(documents, datetime.utcnow())
+        stale_ids = list(remove_ids) + [row['product_id'] for row in rows]
+        with db.engine.begin() as connection:
+            if replace_all:
+                connection.execute(table.delete())
+            elif stale_ids:
+                connection.execute(table.delete().where(table.c.product_id.in_(stale_ids)))
+            if rows:
+                connection.execute(table.insert(), rows)
+
+    def upsert(self, documents):
+        if documents:
+            self._write(documents)
+
+    def remove(self, product_ids):
+        if product_ids:
+            self._write([], remove_ids=product_ids)
+
+    def rebuild(self, documents):
+        self._write(documents, replace_all=True)
+
+    def ranked_query(self, text):
+        """
+        Select of (product_id, score) over every matching document, for
+        joining against product queries; None when `text` has no terms.
+        """
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens:
+            return None
+        indexed = [token for token in tokens if len(token) >= self.min_token_size and token not in INNODB_STOPWORDS]
+        unindexed = [token for token in tokens if token not in indexed]
+        if not indexed:
+            return self._like_query(unindexed, word_start=True)
+
+        query = self._fulltext_query(indexed, unindexed)
+        if db.session.execute(query.limit(1)).first() is None:
+            # Nothing at word starts; substrings can still match ("phone" in "headphones")
+            query = self._like_query(tokens)
+        return query
+
+    def search(self, text, limit=None):
+        """Return [(product_id, score), ...] ordered by FULLTEXT relevance."""
+        query = self.ranked_query(text)
+        if query is None:
+            return []
+        query = query.order_by(query.selected_columns.score.desc(), ProductSearchDocument.product_id)
+        if limit:
+            query = query.limit(limit)
+        return [(product_id, float(relevance)) for product_id, relevance in db.session.execute(query)]
+
+    def _like_terms(self, tokens, word_start=False):
+        """
+        (condition, score) of tokens matched in the title or keywords, as
+        substrings or, with `word_start`, at the start of a word like `token*`.
+        """
+        conditions, score = [], 0
+        for token in tokens:
+            escaped = token.replace('/', '//').replace('%', '/%').replace('_', '/_')
+            patterns = [escaped + '%', '% ' + escaped + '%'] if word_start else ['%' + escaped + '%']
+            in_title = or_(*[ProductSearchDocument.title.ilike(pattern, escape='/') for pattern in patterns])
+            in_keywords = or_(*[ProductSearchDocument.keywords.ilike(pattern, escape='/') for pattern in patterns])
+            conditions.append(or_(in_title, in_keywords))
+            score = score + case((in_title, self.TITLE_WEIGHT), else_=0) + case((in_keywords, 1), else_=0)
+        return or_(*conditions), score
+
+    def _like_query(self, tokens, word_start=False):
+        condition, score = self._like_terms(tokens, word_start)
+        return select(ProductSearchDocument.product_id, score.label('score')).where(condition)
+
+    def _fulltext_query(self, tokens, unindexed):
+        boolean_query = ' '.join(f'{token}*' for token in tokens)
+
+        all_fields = match(
+            ProductSearchDocument.title,
+            ProductSearchDocument.keywords,
+            ProductSearchDocument.body,
+            against=boolean_query
+        ).in_boolean_mode()
+        title_only = match(ProductSearchDocument.title, against=boolean_query).in_boolean_mode()
+        score = title_only * self.TITLE_WEIGHT + all_fields
+        condition = all_fields > 0
+        if unindexed:
+            like_condition, like_score = self._like_terms(unindexed, word_start=True)
+            condition = or_(condition, like_condition)
+            score = score + like_score
+        return select(ProductSearchDocument.product_id, score.label('score')).where(condition)
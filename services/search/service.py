@@ -0,0 +1,195 @@
+import math
+
+from flask import current_app
+from sqlalchemy import and_, false, or_, select
+from sqlalchemy.orm import selectinload
+
+from common.database import db
+from models.product import Product
+from models.product_search_document import ProductSearchDocument
+from services.search.documents import build_document
+from services.search.memory_backend import InMemorySearchBackend
+from services.search.mysql_backend import MySQLFullTextSearchBackend
+
+
+class SearchPage:
+    """One page of search results, shaped like a Flask-SQLAlchemy Pagination."""
+
+    def __init__(self, items, total, page, per_page, scores):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.scores = scores      # product_id -> relevance score
+        self.pages = math.ceil(total / per_page) if per_page else 0
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+
+
+class ProductSearchService:
+    """
+    Entry point for product search.
+
+    The backend is chosen by SEARCH_BACKEND ('mysql' or 'memory'); when unset,
+    MySQL databases use the FULLTEXT backend and anything else (e.g. sqlite in
+    tests) uses the in-process index. One backend instance is kept per app.
+    """
+
+    @staticmethod
+    def _load_documents(product_ids=None):
+        query = Product.query.options(
+            selectinload(Product.category),
+            selectinload(Product.brand)
+        ).filter(
+            Product.deleted_at.is_(None),
+            Product.approval_status == 'approved'
+        )
+        if product_ids is not None:
+            query = query.filter(Product.product_id.in_(product_ids))
+        return [build_document(product) for product in query.all()]
+
+    @staticmethod
+    def get_backend(app=None):
+        app = app or current_app._get_current_object()
+        backend = app.extensions.get('product_search')
+        if backend is None:
+            backend_name = app.config.get('SEARCH_BACKEND')
+            if not backend_name:
+                uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+                backend_name = 'mysql' if uri.startswith('mysql') else 'memory'
+            if backend_name == 'mysql':
+                backend = MySQLFullTextSearchBackend(app.config.get('SEARCH_MYSQL_MIN_TOKEN_SIZE', 3))
+            else:
+                backend = InMemorySearchBackend(
+                    ProductSearchService._load_documents,
+                    refresh_interval=app.config.get('SEARCH_INDEX_REFRESH_SECONDS', 300)
+                )
+            app.extensions['product_search'] = backend
+        return backend
+
+    @staticmethod
+    def search(text, limit=None):
+        """Return [(product_id, score), ...] best match first (all matches unless `limit`)."""
+        return ProductSearchService.get_backend().search(text, limit=limit)
+
+    @staticmethod
+    def filter_query(query, text):
+        """Restrict a Product query to products matching `text`, in no particular order."""
+        backend = ProductSearchService.get_backend()
+        if hasattr(backend, 'ranked_query'):
+            ranked = backend.ranked_query(text)
+            if ranked is None:
+                return query.filter(false())
+            return query.filter(Product.product_id.in_(select(ranked.subquery().c.product_id)))
+        return query.filter(Product.product_id.in_([product_id for product_id, _ in backend.search(text)]))
+
+    @staticmethod
+    def paginate(query, text, page, per_page, options=()):
+        """
+        One page of the products in `query` matching `text`, best match first,
+        with the total number of matches. The MySQL backend joins its ranked
+        matches into the query so the database filters, counts and pages them;
+        the memory backend ranks every match and pages the filtered ids here.
+        """
+        backend = ProductSearchService.get_backend()
+        if hasattr(backend, 'ranked_query'):
+            ranked = backend.ranked_query(text)
+            if ranked is None:
+                return SearchPage([], 0, page, per_page, {})
+            ranked = ranked.subquery()
+            pagination = query.join(
+                ranked, ranked.c.product_id == Product.product_id
+            ).add_columns(
+                ranked.c.score
+            ).options(*options).order_by(
+                ranked.c.score.desc(),
+                Product.product_id
+            ).paginate(page=page, per_page=per_page, error_out=False)
+            return SearchPage(
+                [product for product, _ in pagination.items], pagination.total, page, per_page,
+                {product.product_id: float(score) for product, score in pagination.items}
+            )
+
+        scores = dict(backend.search(text))
+        matching = [product_id for product_id, in query.with_entities(Product.product_id).filter(
+            Product.product_id.in_(list(scores))
+        ).distinct()]
+        matching.sort(key=lambda product_id: (-scores[product_id], product_id))
+        page_ids = matching[(page - 1) * per_page:page * per_page]
+        items = query.options(*options).filter(Product.product_id.in_(page_ids)).all() if page_ids else []
+        items.sort(key=lambda product: page_ids.index(product.product_id))
+        return SearchPage(
+            items, len(matching), page, per_page,
+            {product_id: scores[product_id] for product_id in page_ids}
+        )
+
+    @staticmethod
+    def index_products(product_ids):
+        """
+        Re-index the given products after they were created, edited, approved,
+        rejected or deleted. Call after the change has been committed; the
+        backend writes in a transaction of its own.
+        """
+        product_ids = [product_id for product_id in set(product_ids or []) if product_id]
+        if not product_ids:
+            return
+        try:
+            backend = ProductSearchService.get_backend()
+            documents = ProductSearchService._load_documents(product_ids)
+            indexed_ids = {document['product_id'] for document in documents}
+            backend.upsert(documents)
+            backend.remove([product_id for product_id in product_ids if product_id not in indexed_ids])
+        except Exception as e:
+            # Search indexing must never fail the write that triggered it
+            current_app.logger.error(f"Error updating product search index: {str(e)}")
+
+    @staticmethod
+    def index_product(product):
+        if product is not None:
+            ProductSearchService.index_products([product.product_id])
+
+    @staticmethod
+    def index_products_in(category_id=None, brand_id=None):
+        """Re-index the products of a category or brand after it was renamed."""
+        query = db.session.query(Product.product_id).filter(Product.deleted_at.is_(None))
+        if category_id is not None:
+            query = query.filter(Product.category_id == category_id)
+        if brand_id is not None:
+            query = query.filter(Product.brand_id == brand_id)
+        ProductSearchService.index_products([product_id for product_id, in query])
+
+    @staticmethod
+    def sync_changed(batch_size=None):
+        """
+        Re-index products edited since their search document was written, and
+        approved products without one (scheduled job). This catches writes made
+        outside the app, such as the description agent's bulk write-back. The
+        memory backend reloads itself every SEARCH_INDEX_REFRESH_SECONDS
+        instead. Returns the number of products re-indexed.
+        """
+        if ProductSearchService.get_backend().name != 'mysql':
+            return 0
+        if batch_size is None:
+            batch_size = current_app.config.get('SEARCH_INDEX_SYNC_BATCH_SIZE', 500)
+        rows = db.session.query(Product.product_id).outerjoin(
+            ProductSearchDocument, ProductSearchDocument.product_id == Product.product_id
+        ).filter(
+            or_(
+                and_(
+                    ProductSearchDocument.product_id.is_(None),
+                    Product.deleted_at.is_(None),
+                    Product.approval_status == 'approved'
+                ),
+                ProductSearchDocument.updated_at < Product.updated_at
+            )
+        ).order_by(Product.product_id).limit(batch_size).all()
+        product_ids = [row[0] for row in rows]
+        ProductSearchService.index_products(product_ids)
+        return len(product_ids)
+
+    @staticmethod
+    def rebuild():
+        """Rebuild the whole index from the products table; returns the document count."""
+        documents = ProductSearchService._load_documents()
+        ProductSearchService.get_backend().rebuild(documents)
+        return len(documents)
@@ -0,0 +1,157 @@
+import json
+import math
+import time
+import logging
+import threading
+from collections import namedtuple
+
+import redis
+from flask import current_app
+
+from common.cache import get_redis_client
+from common.executor import AppContextExecutor
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'shiprocket:quote'
+
+# Normalised serviceability question; quotes are cached per distinct query
+QuoteQuery = namedtuple('QuoteQuery', ['pickup_pincode', 'delivery_pincode', 'weight', 'cod_amount'])
+
+
+class ServiceabilityQuoteCache:
+    """
+    Courier serviceability quotes cached in Redis.
+
+    Weights are rounded up to SHIPROCKET_QUOTE_WEIGHT_BAND_KG (couriers bill in
+    slabs anyway) and COD amounts up to SHIPROCKET_QUOTE_COD_BAND, and the
+    rounded values are what ShipRocket is asked, so one cached quote is exact
+    for its whole band. A quote is fresh for SHIPROCKET_QUOTE_TTL_SECONDS; for
+    SHIPROCKET_QUOTE_STALE_SECONDS after that it is still served while a
+    background refresh fetches a new one. Cache misses of a batch are fetched
+    in parallel.
+    """
+
+    def __init__(self):
+        self._executor = AppContextExecutor('shiprocket-quote', 'SHIPROCKET_QUOTE_WORKERS', 8)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _setting(key, default):
+        return current_app.config.get(key, default)
+
+    @staticmethod
+    def _round_up(value, band):
+        if band <= 0:
+            return value
+        return round(math.ceil(round(value / band, 6)) * band, 2)
+
+    def normalize(self, pickup_pincode, delivery_pincode, weight, cod_amount=0):
+        """QuoteQuery with the weight and COD amount rounded up to their bands."""
+        weight = self._round_up(float(weight), float(self._setting('SHIPROCKET_QUOTE_WEIGHT_BAND_KG', 0.5)))
+        cod_amount = float(cod_amount or 0)
+        if cod_amount > 0:
+            cod_amount = self._round_up(cod_amount, float(self._setting('SHIPROCKET_QUOTE_COD_BAND', 500)))
+        return QuoteQuery(str(pickup_pincode).strip(), str(delivery_pincode).strip(), weight, int(cod_amount))
+
+    @staticmethod
+    def available():
+        """Whether quotes can be shared right now (Redis reachable)."""
+        return get_redis_client(current_app) is not None
+
+    @staticmethod
+    def cache_key(query):
+        return f"{KEY_PREFIX}:{query.pickup_pincode}:{query.delivery_pincode}:{query.weight}:{query.cod_amount}"
+
+    def _store(self, client, query, response):
+        ttl = int(self._setting('SHIPROCKET_QUOTE_TTL_SECONDS', 900))
+        stale = int(self._setting('SHIPROCKET_QUOTE_STALE_SECONDS', 3600))
+        try:
+            client.set(self.cache_key(query), json.dumps({'fetched_at': time.time(), 'response': response}), ex=ttl + stale)
+        except (redis.RedisError, TypeError, ValueError) as e:
+            logger.warning(f"Could not cache serviceability quote {self.cache_key(query)}: {str(e)}")
+
+    def _refresh(self, fetch, query):
+        key = self.cache_key(query)
+        try:
+            response = fetch(query)
+            client = get_redis_client(current_app)
+            if client is not None:
+                self._store(client, query, response)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, fetch, query):
+        key = self.cache_key(query)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, fetch, query)
+
+    def get_quotes(self, queries, fetch):
+        """
+        Resolve many QuoteQuery at once; returns the responses in order.
+
+        `fetch(query)` performs the live call and raises on failure. A failed
+        query gets its exception in place of a response and is never cached.
+        Cached entries are read with one MGET and every miss is fetched
+        concurrently.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        unique = list(dict.fromkeys(queries))
+        results = {}
+        client = get_redis_client(current_app)
+
+        if client is not None:
+            ttl = int(self._setting('SHIPROCKET_QUOTE_TTL_SECONDS', 900))
+            try:
+                raw_values = client.mget([self.cache_key(query) for query in unique])
+            except redis.RedisError as e:
+                logger.warning(f"Serviceability quote cache unavailable: {str(e)}")
+                raw_values = [None] * len(unique)
+                client = None
+            now = time.time()
+            for query, raw in zip(unique, raw_values):
+                if not raw:
+                    continue
+                try:
+                    entry = json.loads(raw)
+                except (TypeError, ValueError):
+                    continue
+                results[query] = entry['response']
+                if now - entry.get('fetched_at', 0) > ttl:
+                    # Stale but within the grace period: serve it and refresh behind the scenes
+                    self._schedule_refresh(fetch, query)
+
+        missing = [query for query in unique if query not in results]
+        if len(missing) == 1:
+            try:
+                results[missing[0]] = fetch(missing[0])
+            except Exception as e:
+                results[missing[0]] = e
+        elif missing:
+            results.update(zip(missing, self._executor.map_settled(fetch, missing)))
+
+        if client is not None:
+            for query in missing:
+                if not isinstance(results[query], Exception):
+                    self._store(client, query, results[query])
+
+        return [results[query] for query in queries]
+
+    def get_quote(self, query, fetch):
+        """Single quote; raises the fetch error instead of returning it."""
+        result = self.get_quotes([query], fetch)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+serviceability_quotes = ServiceabilityQuoteCache()
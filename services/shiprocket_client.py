@@ -0,0 +1,217 @@
+import os
+import time
+import logging
+import threading
+
+import redis
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://apiv2.shiprocket.in/v1/external'
+TOKEN_CACHE_KEY = 'shiprocket:token'
+TOKEN_LOCK_KEY = 'shiprocket:token:lock'
+# How long a worker waits for another worker's login, and how often it looks
+LOGIN_WAIT_SECONDS = 5
+LOGIN_POLL_SECONDS = 0.25
+
+
+class ShipRocketAuthError(Exception):
+    """Raised when logging in to ShipRocket fails."""
+
+
+class ShipRocketClient:
+    """
+    Per-worker ShipRocket API client.
+
+    Requests go through one keep-alive requests.Session with a pooled adapter,
+    connect/read timeouts and retries (connection errors always; 429/5xx only
+    for GET, so order creation is never sent twice). The auth token is shared
+    by all workers through Redis and cached in-process, so a login happens
+    about once a day instead of before every call. A 401 drops the token and
+    retries the call once with a fresh login.
+    """
+
+    def __init__(self):
+        self._session = None
+        self._pid = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._lock = threading.Lock()
+        self._session_lock = threading.Lock()
+
+    @staticmethod
+    def _config(key, default=None):
+        value = current_app.config.get(key)
+        if value is None:
+            value = os.getenv(key)
+        return default if value is None else value
+
+    @property
+    def base_url(self):
+        return self._config('SHIPROCKET_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+
+    def _timeout(self):
+        return (
+            float(self._config('SHIPROCKET_CONNECT_TIMEOUT', 5)),
+            float(self._config('SHIPROCKET_READ_TIMEOUT', 30))
+        )
+
+    def _get_session(self):
+        # Sessions hold sockets, so each forked worker builds its own
+        if self._session is None or self._pid != os.getpid():
+            with self._session_lock:
+                if self._session is None or self._pid != os.getpid():
+                    retries = Retry(
+                        total=int(self._config('SHIPROCKET_MAX_RETRIES', 3)),
+                        backoff_factor=0.3,
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=frozenset(['GET']),
+                        raise_on_status=False
+                    )
+                    pool_size = int(self._config('SHIPROCKET_POOL_SIZE', 10))
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+                    session = requests.Session()
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update({'Content-Type': 'application/json'})
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def _token_ttl(self):
+        # ShipRocket tokens are valid for 24 hours; refresh an hour early
+        return int(self._config('SHIPROCKET_TOKEN_TTL_SECONDS', 23 * 3600))
+
+    def _redis(self):
+        try:
+            return get_redis_client(current_app)
+        except Exception:
+            return None
+
+    def _read_shared_token(self, client):
+        try:
+            token = client.get(TOKEN_CACHE_KEY)
+            ttl = client.ttl(TOKEN_CACHE_KEY) if token else None
+        except redis.RedisError as e:
+            logger.warning(f"Could not read the shared ShipRocket token: {str(e)}")
+            return None, 0
+        if not token:
+            return None, 0
+        return token.decode('utf-8') if isinstance(token, bytes) else token, max(ttl or 0, 0)
+
+    def _login(self):
+        response = self._get_session().post(
+            f"{self.base_url}/auth/login",
+            json={
+                'email': self._config('SHIPROCKET_EMAIL'),
+                'password': self._config('SHIPROCKET_PASSWORD')
+            },
+            timeout=self._timeout()
+        )
+        response.raise_for_status()
+        token = response.json().get('token')
+        if not token:
+            raise ShipRocketAuthError("ShipRocket login returned no token")
+        return token
+
+    def _share_token(self, client, token, ttl, release_lock):
+        try:
+            pipe = client.pipeline()
+            pipe.set(TOKEN_CACHE_KEY, token, ex=ttl)
+            if release_lock:
+                pipe.delete(TOKEN_LOCK_KEY)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not share the ShipRocket token: {str(e)}")
+
+    def get_token(self):
+        """Current auth token: in-process copy, then the shared Redis copy, then a login."""
+        now = time.monotonic()
+        if self._token and now < self._token_expires_at:
+            return self._token
+
+        # Only one worker logs in; the others wait up to LOGIN_WAIT_SECONDS for its token
+        deadline = now + LOGIN_WAIT_SECONDS
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._token and now < self._token_expires_at:
+                    return self._token
+
+                client = self._redis()
+                have_lock = True
+                if client is not None:
+                    token, ttl = self._read_shared_token(client)
+                    if token and ttl > 60:
+                        self._token, self._token_expires_at = token, now + ttl
+                        return token
+                    try:
+                        have_lock = bool(client.set(TOKEN_LOCK_KEY, os.getpid(), nx=True, ex=30))
+                    except redis.RedisError:
+                        have_lock = True
+
+                if have_lock or now >= deadline:
+                    try:
+                        token = self._login()
+                    except requests.exceptions.RequestException as e:
+                        raise ShipRocketAuthError(f"Failed to authenticate with ShipRocket: {str(e)}")
+
+                    ttl = self._token_ttl()
+                    self._token, self._token_expires_at = token, time.monotonic() + ttl
+                    if client is not None:
+                        self._share_token(client, token, ttl, have_lock)
+                    return token
+
+            # Wait outside the lock, so threads of this worker are not held up behind the sleep
+            time.sleep(LOGIN_POLL_SECONDS)
+
+    def invalidate_token(self, token=None):
+        """Forget the token (after a 401), locally and in Redis if it is still the shared one."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token, self._token_expires_at = None, 0.0
+        client = self._redis()
+        if client is not None:
+            try:
+                shared, _ = self._read_shared_token(client)
+                if shared and (token is None or shared == token):
+                    client.delete(TOKEN_CACHE_KEY)
+            except redis.RedisError:
+                pass
+
+    def request(self, method, endpoint, data=None, params=None):
+        """
+        Authenticated call to the ShipRocket API; returns the requests.Response.
+
+        Raises ShipRocketAuthError when no token can be obtained and
+        requests exceptions for transport errors.
+        """
+        method = method.upper()
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        session = self._get_session()
+
+        for attempt in range(2):
+            token = self.get_token()
+            response = session.request(
+                method, url,
+                headers={'Authorization': f'Bearer {token}'},
+                params=params,
+                json=data if method == 'POST' else None,
+                timeout=self._timeout()
+            )
+            if response.status_code != 401 or attempt:
+                return response
+            logger.info("ShipRocket token rejected; logging in again")
+            self.invalidate_token(token)
+        return response
+
+
+shiprocket_client = ShipRocketClient()
@@ -0,0 +1,172 @@
+import json
+import logging
+
+import redis
+from flask import current_app
+from sqlalchemy import bindparam
+
+from common.cache import get_redis_client
+from common.database import db
+from models.shop.shop_product import ShopProduct
+from models.shop.shop_product_variant import ShopProductVariant, attribute_combination_hash
+
+logger = logging.getLogger(__name__)
+
+MATRIX_KEY = 'shop_variant_matrix:{}'
+
+
+class ShopVariantMatrixService:
+    """
+    Per-parent variant "attribute matrix" for the storefront: the attribute
+    names with their available values, every sellable combination keyed by
+    its attribute hash, and the default variant.
+
+    Built in one query from the active, published variants of a parent and
+    cached in Redis for SHOP_VARIANT_MATRIX_TTL_SECONDS. Variant and shop
+    product writes call invalidate(); the TTL bounds anything that bypasses
+    them.
+    """
+
+    @staticmethod
+    def _build(parent_id):
+        rows = db.session.query(
+            ShopProductVariant.variant_id,
+            ShopProductVariant.variant_product_id,
+            ShopProductVariant.attribute_combination,
+            ShopProductVariant.attribute_hash,
+            ShopProductVariant.is_default
+        ).join(
+            ShopProduct, ShopProductVariant.variant_product_id == ShopProduct.product_id
+        ).filter(
+            ShopProductVariant.parent_product_id == parent_id,
+            ShopProductVariant.is_active.is_(True),
+            ShopProduct.deleted_at.is_(None),
+            ShopProduct.active_flag.is_(True),
+            ShopProduct.is_published.is_(True)
+        ).order_by(ShopProductVariant.sort_order, ShopProductVariant.created_at).all()
+
+        attributes_map = {}
+        variants = []
+        combinations = {}
+        default_variant_id = None
+        for variant_id, variant_product_id, attributes, attribute_hash, is_default in rows:
+            attributes = attributes or {}
+            for attr_name, attr_value in attributes.items():
+                attributes_map.setdefault(attr_name, set()).add(attr_value)
+            # Rows written before the hash column existed are hashed here
+            attribute_hash = attribute_hash or attribute_combination_hash(attributes)
+            variants.append({
+                'variant_id': variant_id,
+                'variant_product_id': variant_product_id,
+                'attributes': attributes
+            })
+            combinations.setdefault(attribute_hash, variant_id)
+            if is_default and default_variant_id is None:
+                default_variant_id = variant_id
+
+        return {
+            'parent_product_id': parent_id,
+            'attributes': [
+                {'name': attr_name, 'values': sorted(values)}
+                for attr_name, values in attributes_map.items()
+            ],
+            'variants': variants,
+            'combinations': combinations,
+            'default_variant_id': default_variant_id or (variants[0]['variant_id'] if variants else None),
+            'total_variants': len(variants)
+        }
+
+    @staticmethod
+    def get_matrix(parent_id):
+        """The attribute matrix of `parent_id`, from Redis or built and cached."""
+        client = get_redis_client(current_app)
+        key = MATRIX_KEY.format(parent_id)
+        if client is not None:
+            try:
+                raw = client.get(key)
+                if raw:
+                    return json.loads(raw)
+            except (redis.RedisError, ValueError) as e:
+                logger.warning(f"Could not read variant matrix {parent_id} from Redis: {str(e)}")
+
+        matrix = ShopVariantMatrixService._build(parent_id)
+        if client is not None:
+            try:
+                client.setex(key, current_app.config.get('SHOP_VARIANT_MATRIX_TTL_SECONDS', 300), json.dumps(matrix))
+            except (redis.RedisError, TypeError) as e:
+                logger.warning(f"Could not cache variant matrix {parent_id}: {str(e)}")
+        return matrix
+
+    @staticmethod
+    def find_variant_id(parent_id, attributes):
+        """Variant id for an exact attribute combination (any key order or case), or None."""
+        matrix = ShopVariantMatrixService.get_matrix(parent_id)
+        return matrix['combinations'].get(attribute_combination_hash(attributes))
+
+    @staticmethod
+    def invalidate(parent_ids):
+        """Drop the cached matrices of these parents. Call after the change has been committed."""
+        parent_ids = {parent_id for parent_id in (parent_ids or []) if parent_id}
+        if not parent_ids:
+            return
+        client = get_redis_client(current_app)
+        if client is None:
+            return
+        try:
+            client.delete(*[MATRIX_KEY.format(parent_id) for parent_id in parent_ids])
+        except redis.RedisError as e:
+            logger.warning(f"Could not invalidate variant matrices {sorted(parent_ids)}: {str(e)}")
+
+    @staticmethod
+    def invalidate_for_product(product):
+        """Drop the matrix a shop product belongs to, as a parent or as a variant."""
+        if product is not None:
+            ShopVariantMatrixService.invalidate([product.parent_product_id or product.product_id])
+
+    @staticmethod
+    def backfill_hashes(batch_size=500):
+        """
+        Set attribute_hash on variants written before the column existed.
+        A combination repeated under one parent keeps its first variant (by id);
+        the later duplicates are left without a hash and returned for review.
+        Returns (hashed count, [duplicate variant ids]).
+        """
+        taken = {
+            (parent_id, attribute_hash) for parent_id, attribute_hash in db.session.query(
+                ShopProductVariant.parent_product_id, ShopProductVariant.attribute_hash
+            ).filter(ShopProductVariant.attribute_hash.isnot(None))
+        }
+        hashed, duplicates = 0, []
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                ShopProductVariant.variant_id,
+                ShopProductVariant.parent_product_id,
+                ShopProductVariant.attribute_combination
+            ).filter(
+                ShopProductVariant.attribute_hash.is_(None),
+                ShopProductVariant.variant_id > last_id
+            ).order_by(ShopProductVariant.variant_id).limit(batch_size).all()
+            if not rows:
+                break
+            updates = []
+            for variant_id, parent_id, attributes in rows:
+                key = (parent_id, attribute_combination_hash(attributes))
+                if key in taken:
+                    duplicates.append(variant_id)
+                    continue
+                taken.add(key)
+                updates.append({'b_variant_id': variant_id, 'b_attribute_hash': key[1]})
+            if updates:
+                # Core UPDATE: leaves updated_at alone and skips the ORM listener
+                table = ShopProductVariant.__table__
+                db.session.execute(
+                    table.update().where(table.c.variant_id == bindparam('b_variant_id')).values(
+                        attribute_hash=bindparam('b_attribute_hash')
+                    ),
+                    updates
+                )
+            db.session.commit()
+            hashed += len(updates)
+            last_id = rows[-1].variant_id
+        return hashed, duplicates
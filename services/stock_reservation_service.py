@@ -0,0 +1,252 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case
+
+from common.database import db
+from models.enums import OrderStatusEnum, PaymentStatusEnum
+from models.order import Order, OrderStatusHistory
+from models.product_stock import ProductStock
+from models.stock_reservation import StockReservation
+from services.merchant_sales_rollup_service import MerchantSalesRollupService
+
+
+class InsufficientStockError(ValueError):
+    """
+    Raised when a reservation cannot be satisfied.
+
+    `available` is None when the product has no stock row. The caller's
+    transaction must be rolled back.
+    """
+
+    def __init__(self, product_id, requested, available, message=None):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        if message is None:
+            if available is None:
+                message = f"Stock record not found for product ID {product_id}."
+            else:
+                message = f"Insufficient stock for product ID {product_id}. Available: {available}, Requested: {requested}"
+        super().__init__(message)
+
+
+class StockReservationService:
+    """
+    Atomic, batched stock decrements for checkout.
+
+    reserve() locks every stock row the cart needs with one SELECT ... FOR
+    UPDATE ordered by product_id (so concurrent checkouts always lock in the
+    same order and cannot deadlock), checks availability, and decrements all
+    rows with one conditional UPDATE. Works for any stock model keyed by
+    product_id with a stock_qty column (ProductStock, ShopProductStock).
+
+    For orders that wait on an online payment, hold() records the decrement
+    with an expiry; release_expired() puts the stock back for orders whose
+    payment never arrived.
+    """
+
+    @staticmethod
+    def _merge(quantities):
+        """Accept {product_id: qty} or [(product_id, qty), ...]; merge duplicate products."""
+        items = quantities.items() if isinstance(quantities, dict) else quantities
+        merged = defaultdict(int)
+        for product_id, quantity in items:
+            merged[int(product_id)] += int(quantity)
+        return dict(merged)
+
+    @staticmethod
+    def reserve(quantities, stock_model=ProductStock):
+        """
+        Decrement stock for a whole cart inside the caller's transaction.
+
+        Raises InsufficientStockError when any line cannot be satisfied (the
+        caller rolls back). Returns {product_id: stock row}.
+        """
+        wanted = StockReservationService._merge(quantities)
+        if not wanted:
+            return {}
+        product_ids = sorted(wanted)
+
+        rows = db.session.query(stock_model).filter(
+            stock_model.product_id.in_(product_ids)
+        ).order_by(
+            stock_model.product_id
+        ).with_for_update().populate_existing().all()
+        stock_by_product = {row.product_id: row for row in rows}
+
+        for product_id in product_ids:
+            row = stock_by_product.get(product_id)
+            if row is None:
+                raise InsufficientStockError(product_id, wanted[product_id], None)
+            if (row.stock_qty or 0) < wanted[product_id]:
+                raise InsufficientStockError(product_id, wanted[product_id], row.stock_qty or 0)
+
+        # One conditional UPDATE for all rows; the guard also protects databases without row locks
+        delta = case(wanted, value=stock_model.product_id)
+        updated = db.session.query(stock_model).filter(
+            stock_model.product_id.in_(product_ids),
+            stock_model.stock_qty >= delta
+        ).update({stock_model.stock_qty: stock_model.stock_qty - delta}, synchronize_session=False)
+        if updated != len(product_ids):
+            # Only reachable without row locks: a concurrent checkout changed the stock in between
+            raise InsufficientStockError(
+                None, None, None, message="Stock changed while placing the order. Please try again."
+            )
+
+        for row in rows:
+            db.session.expire(row, ['stock_qty'])
+        return stock_by_product
+
+    @staticmethod
+    def restock(quantities, stock_model=ProductStock):
+        """
+        Atomically add quantities back. This does no bookkeeping: callers
+        returning stock for an order go through release(), which restocks each
+        reservation only once.
+        """
+        returned = StockReservationService._merge(quantities)
+        returned = {product_id: quantity for product_id, quantity in returned.items() if quantity}
+        if not returned:
+            return 0
+        delta = case(returned, value=stock_model.product_id)
+        return db.session.query(stock_model).filter(
+            stock_model.product_id.in_(sorted(returned))
+        ).update({stock_model.stock_qty: stock_model.stock_qty + delta}, synchronize_session=False)
+
+    @staticmethod
+    def hold(order_id, quantities, ttl_seconds=None):
+        """Record reserved quantities for an order awaiting payment."""
+        if ttl_seconds is None:
+            ttl_seconds = current_app.config.get('STOCK_RESERVATION_TTL_MINUTES', 30) * 60
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        for product_id, quantity in StockReservationService._merge(quantities).items():
+            db.session.add(StockReservation(
+                order_id=order_id,
+                product_id=product_id,
+                quantity=quantity,
+                status=StockReservation.STATUS_HELD,
+                expires_at=expires_at
+            ))
+
+    @staticmethod
+    def _set_status(order_id, status):
+        return StockReservation.query.filter(
+            StockReservation.order_id == order_id,
+            StockReservation.status == StockReservation.STATUS_HELD
+        ).update({
+            StockReservation.status: status,
+            StockReservation.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+
+    @staticmethod
+    def confirm(order_id):
+        """Payment arrived: the held stock is now sold."""
+        return StockReservationService._set_status(order_id, StockReservation.STATUS_CONFIRMED)
+
+    @staticmethod
+    def release(order_id, quantities, stock_model=ProductStock):
+        """
+        Order cancelled or payment failed: put its stock back, once.
+
+        Held and confirmed reservations are released and their quantities
+        restocked; reservations already released put nothing back, so a second
+        failure or cancel path for the same order is a no-op. An order without
+        reservations (cash on delivery) restocks `quantities` and records them
+        as released for the same reason. Returns the number of stock rows updated.
+        """
+        reservations = StockReservation.query.filter(
+            StockReservation.order_id == order_id
+        ).with_for_update().all()
+        now = datetime.utcnow()
+        if reservations:
+            returned = defaultdict(int)
+            for reservation in reservations:
+                if reservation.status == StockReservation.STATUS_RELEASED:
+                    continue
+                returned[reservation.product_id] += reservation.quantity
+                reservation.status = StockReservation.STATUS_RELEASED
+                reservation.updated_at = now
+        else:
+            returned = StockReservationService._merge(quantities)
+            for product_id, quantity in returned.items():
+                db.session.add(StockReservation(
+                    order_id=order_id,
+                    product_id=product_id,
+                    quantity=quantity,
+                    status=StockReservation.STATUS_RELEASED,
+                    expires_at=now
+                ))
+        return StockReservationService.restock(returned, stock_model)
+
+    @staticmethod
+    def _payment_received(order):
+        return (
+            order.payment_status in (PaymentStatusEnum.SUCCESSFUL, PaymentStatusEnum.AWAITING_CAPTURE)
+            or bool(order.razorpay_payment_id)
+            or bool(order.payment_gateway_transaction_id)
+        )
+
+    @staticmethod
+    def release_expired(batch_size=200):
+        """
+        Cancel orders whose payment hold expired and put their stock back.
+
+        Orders that were paid (or moved on) in the meantime only have their
+        holds confirmed. Returns the number of orders expired.
+        """
+        expired_orders = 0
+        while True:
+            held = StockReservation.query.filter(
+                StockReservation.status == StockReservation.STATUS_HELD,
+                StockReservation.expires_at <= datetime.utcnow()
+            ).order_by(
+                StockReservation.expires_at
+            ).limit(batch_size).with_for_update(skip_locked=True).all()
+            if not held:
+                break
+
+            by_order = defaultdict(list)
+            for reservation in held:
+                by_order[reservation.order_id].append(reservation)
+            orders = {
+                order.order_id: order for order in
+                Order.query.filter(Order.order_id.in_(list(by_order))).with_for_update().all()
+            }
+
+            to_restock = defaultdict(int)
+            cancelled = []
+            now = datetime.utcnow()
+            for order_id, reservations in by_order.items():
+                order = orders.get(order_id)
+                expire = order is None or (
+                    order.order_status == OrderStatusEnum.PENDING_PAYMENT
+                    and not StockReservationService._payment_received(order)
+                )
+                for reservation in reservations:
+                    reservation.updated_at = now
+                    if expire:
+                        reservation.status = StockReservation.STATUS_RELEASED
+                        to_restock[reservation.product_id] += reservation.quantity
+                    else:
+                        reservation.status = StockReservation.STATUS_CONFIRMED
+                if expire and order is not None:
+                    order.order_status = OrderStatusEnum.CANCELLED_BY_ADMIN
+                    order.payment_status = PaymentStatusEnum.EXPIRED
+                    db.session.add(OrderStatusHistory(
+                        order_id=order_id,
+                        status=OrderStatusEnum.CANCELLED_BY_ADMIN,
+                        changed_by_user_id=None,
+                        notes="Order cancelled automatically: payment not received before the stock reservation expired."
+                    ))
+                    cancelled.append(order_id)
+                if expire:
+                    expired_orders += 1
+
+            StockReservationService.restock(to_restock)
+            db.session.commit()
+            MerchantSalesRollupService.refresh_orders(cancelled)
+            if len(held) < batch_size:
+                break
+        return expired_orders
@@ -1,15 +1,160 @@
+import os
+import re
 import hashlib
+import logging
+import threading
 from typing import List, Dict, Tuple
 from flask import current_app
 from common.cache import get_redis_client
+from common.executor import AppContextExecutor
+from common.rate_limit import rate_limiter
 import boto3
+import redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60*60*24*30
+RATE_LIMIT_KEY = 'translate:aws:requests'
+# Packed segments are joined with a line break; texts that contain one are sent alone
+SEGMENT_DELIMITER = '\n'
+TAG_RE = re.compile(r'(<[^>]*>)')
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'))
+
+_clients: Dict[str, object] = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+_executor = AppContextExecutor('translate', 'TRANSLATE_WORKERS', 4)
+
+
+def get_translate_client(region: str):
+    """boto3 Translate client shared by every request in this process (clients are thread-safe)."""
+    global _clients_pid
+    if _clients_pid != os.getpid() or region not in _clients:
+        with _clients_lock:
+            if _clients_pid != os.getpid():
+                _clients.clear()
+                _clients_pid = os.getpid()
+            if region not in _clients:
+                _clients[region] = boto3.client('translate', region_name=region)
+    return _clients[region]
+
+
+def pack_segments(texts: List[str], max_bytes: int, max_segments: int) -> List[List[str]]:
+    """
+    Group texts into requests of at most `max_bytes` (UTF-8, delimiters
+    included) and `max_segments` texts. A text containing the delimiter, or
+    one that is too large to share a request, gets a request of its own.
+    """
+    packs: List[List[str]] = []
+    current: List[str] = []
+    current_bytes = 0
+    for text in texts:
+        size = len(text.encode('utf-8'))
+        if SEGMENT_DELIMITER in text or '\r' in text or size >= max_bytes:
+            packs.append([text])
+            continue
+        if current and (current_bytes + 1 + size > max_bytes or len(current) >= max_segments):
+            packs.append(current)
+            current, current_bytes = [], 0
+        current_bytes += size + (1 if current else 0)
+        current.append(text)
+    if current:
+        packs.append(current)
+    return packs
+
+
+def split_text(text: str, max_bytes: int, separators=('\n', '. ', ' ')) -> List[str]:
+    """
+    Split `text` into pieces of at most `max_bytes` (UTF-8), breaking at line
+    breaks, then sentence ends, then spaces, and only as a last resort inside
+    a word. ''.join(pieces) == text.
+    """
+    if len(text.encode('utf-8')) <= max_bytes:
+        return [text]
+    separators = [sep for sep in separators if sep in text]
+    if not separators:
+        pieces, current, current_bytes = [], '', 0
+        for char in text:
+            size = len(char.encode('utf-8'))
+            if current and current_bytes + size > max_bytes:
+                pieces.append(current)
+                current, current_bytes = '', 0
+            current += char
+            current_bytes += size
+        return pieces + ([current] if current else [])
+
+    sep, finer = separators[0], separators[1:]
+    parts = text.split(sep)
+    parts = [part + sep for part in parts[:-1]] + [parts[-1]]
+    pieces, current = [], ''
+    for part in parts:
+        if len(part.encode('utf-8')) > max_bytes:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.extend(split_text(part, max_bytes, finer))
+        elif len((current + part).encode('utf-8')) > max_bytes:
+            pieces.append(current)
+            current = part
+        else:
+            current += part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_markup(text: str, max_bytes: int) -> List[str]:
+    """
+    split_text for text/html: break only between top-level elements, so every
+    piece is well-formed markup (text between elements is split like plain
+    text). Raises ValueError when a single element is over `max_bytes`.
+    ''.join(pieces) == text.
+    """
+    if len(text.encode('utf-8')) <= max_bytes:
+        return [text]
+    blocks, current, depth = [], '', 0
+    for token in TAG_RE.split(text):
+        if not token:
+            continue
+        current += token
+        if token.startswith('</'):
+            depth = max(depth - 1, 0)
+        elif token.startswith('<') and not token.startswith('<!') and not token.endswith('/>'):
+            name = token[1:-1].split(None, 1)[0].lower() if len(token) > 2 else ''
+            if name not in VOID_TAGS:
+                depth += 1
+        if depth == 0:
+            blocks.append(current)
+            current = ''
+    if current:
+        blocks.append(current)
+
+    pieces, current = [], ''
+    for block in blocks:
+        size = len(block.encode('utf-8'))
+        if size > max_bytes:
+            if '<' in block:
+                raise ValueError(f"HTML element of {size} bytes is over the {max_bytes} byte request limit")
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.extend(split_text(block, max_bytes))
+        elif len((current + block).encode('utf-8')) > max_bytes:
+            pieces.append(current)
+            current = block
+        else:
+            current += block
+    if current:
+        pieces.append(current)
+    return pieces
 
 
 class AmazonTranslateService:
     def __init__(self):
-        region = current_app.config.get('AWS_REGION')
-        self.client = boto3.client('translate', region_name=region)
+        config = current_app.config
+        self.client = get_translate_client(config.get('AWS_REGION'))
         self.redis = get_redis_client(current_app)
+        self.ttl_seconds = int(config.get('TRANSLATE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
 
     @staticmethod
     def _cache_key(text: str, src: str, tgt: str, content_type: str) -> str:
@@ -18,13 +163,13 @@ class AmazonTranslateService:
         key_hash = h.hexdigest()
         return f"translate:{src}:{tgt}:{content_type}:{key_hash}"
 
-    def translate_text(self, text: str, target_lang: str, source_lang: str = 'en', content_type: str = 'text/plain', ttl_seconds: int = 60*60*24*30) -> str:
-        if not text:
-            return ''
-        key = self._cache_key(text, source_lang, target_lang, content_type)
-        cached = self.redis.get(key)
-        if cached:
-            return cached.decode('utf-8')
+    def _call(self, text: str, target_lang: str, source_lang: str, content_type: str) -> str:
+        # Wait for a slot in the request budget shared by all workers, up to a deadline
+        config = current_app.config
+        per_second = int(config.get('TRANSLATE_REQUESTS_PER_SECOND', 20))
+        wait_seconds = float(config.get('TRANSLATE_RATE_LIMIT_WAIT_SECONDS', 10))
+        if not rate_limiter.acquire(RATE_LIMIT_KEY, per_second, 1, wait_seconds).allowed:
+            raise TimeoutError(f"No Amazon Translate request slot within {wait_seconds}s")
 
         resp = self.client.translate_text(
             Text=text,
@@ -42,15 +187,81 @@ class AmazonTranslateService:
                 'Formality': 'INFORMAL'
             },
         )
+        return resp.get('TranslatedText', '')
+
+    def _translate_pack(self, pack: List[str], target_lang: str, source_lang: str, content_type: str) -> List[str]:
+        if len(pack) == 1:
+            return [self._call(pack[0], target_lang, source_lang, content_type)]
+        translated = self._call(SEGMENT_DELIMITER.join(pack), target_lang, source_lang, content_type)
+        segments = translated.split(SEGMENT_DELIMITER)
+        if len(segments) == len(pack):
+            return segments
+        # The translation merged or split lines, so segments can't be matched back up
+        logger.warning(f"Translate returned {len(segments)} segments for {len(pack)}; retranslating one by one")
+        return [self._call(text, target_lang, source_lang, content_type) for text in pack]
+
+    def _cache_get_many(self, keys: List[str]) -> List:
+        if self.redis is None or not keys:
+            return [None] * len(keys)
+        try:
+            return self.redis.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f"Translate cache read failed: {str(e)}")
+            return [None] * len(keys)
 
-        translated = resp.get('TranslatedText', '')
-        if translated:
-            self.redis.setex(key, ttl_seconds, translated)
+    def _cache_set_many(self, values: Dict[str, str]):
+        if self.redis is None or not values:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.set(key, value, ex=self.ttl_seconds)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Translate cache write failed: {str(e)}")
+
+    def translate_text(self, text: str, target_lang: str, source_lang: str = 'en', content_type: str = 'text/plain', ttl_seconds: int = None) -> str:
+        if not text:
+            return ''
+        key = self._cache_key(text, source_lang, target_lang, content_type)
+        cached = self._cache_get_many([key])[0]
+        if cached:
+            return cached.decode('utf-8')
+
+        translated = self._call(text, target_lang, source_lang, content_type)
+        if translated and self.redis is not None:
+            try:
+                self.redis.set(key, translated, ex=ttl_seconds or self.ttl_seconds)
+            except redis.RedisError as e:
+                logger.warning(f"Translate cache write failed: {str(e)}")
         return translated
 
     def translate_batch(self, items: List[Tuple[str, str]], target_lang: str, source_lang: str = 'en', content_type: str = 'text/plain') -> Dict[str, str]:
-        # items is list of (id, text)
+        """
+        Translate (id, text) pairs; returns {id: translated text}.
+
+        Identical texts are translated once. Cached translations come back in
+        one MGET; short plain-text misses are packed into size-bounded
+        requests which run concurrently under the shared request budget, and
+        new translations are cached with one pipeline of SET ... EX. If a request
+        fails, the translations that succeeded are cached and the error is
+        raised.
+        """
+        result, errors = self.translate_batch_settled(items, target_lang, source_lang, content_type)
+        if errors:
+            raise next(iter(errors.values()))
+        return result
+
+    def translate_batch_settled(self, items: List[Tuple[str, str]], target_lang: str, source_lang: str = 'en', content_type: str = 'text/plain') -> Tuple[Dict[str, str], Dict[str, Exception]]:
+        """
+        translate_batch without the raise: returns ({id: translated text},
+        {id: error}), so a text that fails only fails its own ids (a failed
+        packed request is retried text by text). Texts over
+        TRANSLATE_MAX_REQUEST_BYTES are split (see split_text and, for
+        markup, split_markup) and their pieces translated separately.
+        """
         result: Dict[str, str] = {}
+        failed: Dict[str, Exception] = {}
         # dedupe identical texts
         unique_map: Dict[str, List[str]] = {}
         for id_, text in items:
@@ -59,25 +270,88 @@ class AmazonTranslateService:
                 continue
             unique_map.setdefault(text, []).append(id_)
 
-        # first fetch from cache
-        missing_texts: List[str] = []
-        cached_pairs: Dict[str, str] = {}
-        for text, ids in unique_map.items():
-            key = self._cache_key(text, source_lang, target_lang, content_type)
-            cached = self.redis.get(key)
+        texts = list(unique_map)
+        keys = [self._cache_key(text, source_lang, target_lang, content_type) for text in texts]
+        translations: Dict[str, str] = {}
+        missing: List[str] = []
+        for text, cached in zip(texts, self._cache_get_many(keys)):
             if cached:
-                translated = cached.decode('utf-8')
-                cached_pairs[text] = translated
+                translations[text] = cached.decode('utf-8')
+            else:
+                missing.append(text)
+
+        errors: Dict[str, Exception] = {}
+        if missing:
+            config = current_app.config
+            max_bytes = int(config.get('TRANSLATE_MAX_REQUEST_BYTES', 5000))
+            # Texts over the request size go as pieces; each piece's trailing
+            # whitespace is kept aside, since Translate drops it
+            pieces: Dict[str, List[Tuple[str, str]]] = {}
+            units: List[str] = []
+            splitter = split_text if content_type == 'text/plain' else split_markup
+            for text in list(missing):
+                try:
+                    text_pieces = splitter(text, max_bytes)
+                except ValueError as e:
+                    errors[text] = e
+                    missing.remove(text)
+                    continue
+                pieces[text] = []
+                for piece in text_pieces:
+                    body = piece.rstrip()
+                    pieces[text].append((body, piece[len(body):]))
+                    if body:
+                        units.append(body)
+            units = list(dict.fromkeys(units))
+            if content_type == 'text/plain':
+                packs = pack_segments(units, max_bytes, int(config.get('TRANSLATE_MAX_SEGMENTS', 50)))
             else:
-                missing_texts.append(text)
+                # Markup can't be split safely on line breaks
+                packs = [[text] for text in units]
+            outcomes = _executor.map_settled(
+                lambda pack: self._translate_pack(pack, target_lang, source_lang, content_type), packs
+            )
+            unit_translations: Dict[str, str] = {}
+            unit_errors: Dict[str, Exception] = {}
+            retry: List[str] = []
+            for pack, outcome in zip(packs, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Translating {len(pack)} texts to {target_lang} failed: {str(outcome)}")
+                    if len(pack) > 1:
+                        # Find the text at fault: the rest of its pack should not fail with it
+                        retry.extend(pack)
+                    else:
+                        unit_errors[pack[0]] = outcome
+                    continue
+                unit_translations.update(zip(pack, outcome))
+            if retry:
+                outcomes = _executor.map_settled(
+                    lambda text: self._call(text, target_lang, source_lang, content_type), retry
+                )
+                for text, outcome in zip(retry, outcomes):
+                    if isinstance(outcome, Exception):
+                        unit_errors[text] = outcome
+                    else:
+                        unit_translations[text] = outcome
 
-        # translate missing one by one
-        for text in missing_texts:
-            translated = self.translate_text(text, target_lang, source_lang, content_type)
-            cached_pairs[text] = translated
+            new_entries: Dict[str, str] = {}
+            for text in missing:
+                error = next((unit_errors[body] for body, _ in pieces[text] if body in unit_errors), None)
+                if error is not None:
+                    errors[text] = error
+                    continue
+                translated = ''.join(unit_translations.get(body, '') + tail for body, tail in pieces[text])
+                translations[text] = translated
+                if translated:
+                    new_entries[self._cache_key(text, source_lang, target_lang, content_type)] = translated
+            # Keep what did translate
+            self._cache_set_many(new_entries)
 
         # map back
         for text, ids in unique_map.items():
             for id_ in ids:
-                result[id_] = cached_pairs.get(text, '')
-        return result
+                if text in errors:
+                    failed[id_] = errors[text]
+                else:
+                    result[id_] = translations.get(text, '')
+        return result, failed
@@ -0,0 +1,156 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert
+
+from common.database import db
+from models.category import Category
+from models.enums import OrderStatusEnum
+from models.order import Order, OrderItem
+from models.product import Product
+from models.trending_product import TrendingProduct
+
+# Orders that represent a completed purchase (paid and not cancelled/refunded/returned)
+TRENDING_ORDER_STATUSES = (
+    OrderStatusEnum.AWAITING_FULFILLMENT,
+    OrderStatusEnum.PROCESSING,
+    OrderStatusEnum.PENDING_SHIPMENT,
+    OrderStatusEnum.SHIPPED,
+    OrderStatusEnum.IN_TRANSIT,
+    OrderStatusEnum.OUT_FOR_DELIVERY,
+    OrderStatusEnum.DELIVERED,
+)
+
+
+class TrendingService:
+    """
+    Ranks products by units ordered.
+
+    The ranking is a single grouped join of order_items and orders, ordered and
+    limited in the database. `refresh()` materializes it into the
+    trending_products leaderboard (a global board plus one board per category
+    covering its whole subtree); `ranking_subquery()` serves reads from the
+    leaderboard and falls back to the live aggregate when no board exists yet.
+
+    The boards are refreshed by the `trending_refresh` job of the shared
+    AppScheduler (common.scheduler, registered in create_app() every
+    TRENDING_REFRESH_MINUTES) and on demand by `flask refresh-trending`.
+    """
+
+    @staticmethod
+    def _window_start(window_days):
+        """Start of the ranking window, or None for all time when the window has no orders."""
+        since = datetime.utcnow() - timedelta(days=window_days)
+        has_recent = db.session.query(Order.order_id).filter(
+            Order.order_status.in_(TRENDING_ORDER_STATUSES),
+            Order.order_date >= since
+        ).first()
+        return since if has_recent else None
+
+    @staticmethod
+    def order_totals_query(since=None):
+        """(product_id, total_ordered) grouped over qualifying orders since `since`."""
+        query = db.session.query(
+            OrderItem.product_id.label('product_id'),
+            func.sum(OrderItem.quantity).label('total_ordered')
+        ).join(
+            Order, Order.order_id == OrderItem.order_id
+        ).filter(
+            Order.order_status.in_(TRENDING_ORDER_STATUSES),
+            OrderItem.product_id.isnot(None)
+        )
+        if since is not None:
+            query = query.filter(Order.order_date >= since)
+        return query.group_by(OrderItem.product_id)
+
+    @staticmethod
+    def ranking_subquery(category_id=None):
+        """
+        Subquery with `product_id` and `total_ordered` columns to join products on.
+
+        Reads the leaderboard for the scope (global when category_id is None);
+        when the scope has no rows, ranks live from the order tables instead.
+        """
+        scope = TrendingProduct.category_id == category_id if category_id else TrendingProduct.category_id.is_(None)
+        if db.session.query(TrendingProduct.id).filter(scope).first():
+            return db.session.query(
+                TrendingProduct.product_id.label('product_id'),
+                TrendingProduct.total_ordered.label('total_ordered')
+            ).filter(scope).subquery()
+
+        window_days = current_app.config.get('TRENDING_WINDOW_DAYS', 30)
+        since = TrendingService._window_start(window_days)
+        return TrendingService.order_totals_query(since).subquery()
+
+    @staticmethod
+    def _category_parents():
+        return dict(db.session.query(Category.category_id, Category.parent_id).filter(
+            Category.deleted_at.is_(None)
+        ).all())
+
+    @staticmethod
+    def refresh(window_days=None, size=None):
+        """
+        Recompute every leaderboard in one transaction.
+
+        Returns the number of leaderboard rows written.
+        """
+        window_days = window_days or current_app.config.get('TRENDING_WINDOW_DAYS', 30)
+        size = size or current_app.config.get('TRENDING_LEADERBOARD_SIZE', 200)
+        since = TrendingService._window_start(window_days)
+
+        totals = TrendingService.order_totals_query(since).subquery()
+        ranked = db.session.query(
+            Product.product_id,
+            Product.category_id,
+            totals.c.total_ordered
+        ).join(
+            totals, totals.c.product_id == Product.product_id
+        ).filter(
+            Product.deleted_at.is_(None),
+            Product.active_flag.is_(True),
+            Product.approval_status == 'approved',
+            Product.parent_product_id.is_(None)
+        ).order_by(
+            totals.c.total_ordered.desc(),
+            Product.product_id
+        ).all()
+
+        # Rows arrive ranked, so appending keeps every board in order
+        parents = TrendingService._category_parents()
+        boards = defaultdict(list)
+        for product_id, category_id, total_ordered in ranked:
+            entry = (product_id, int(total_ordered or 0))
+            if len(boards[None]) < size:
+                boards[None].append(entry)
+            seen = set()
+            while category_id is not None and category_id not in seen:
+                seen.add(category_id)
+                if len(boards[category_id]) < size:
+                    boards[category_id].append(entry)
+                category_id = parents.get(category_id)
+
+        computed_at = datetime.utcnow()
+        rows = [
+            {
+                'category_id': category_id,
+                'product_id': product_id,
+                'rank': rank,
+                'total_ordered': total_ordered,
+                'window_days': window_days if since is not None else None,
+                'computed_at': computed_at
+            }
+            for category_id, entries in boards.items()
+            for rank, (product_id, total_ordered) in enumerate(entries, start=1)
+        ]
+
+        try:
+            db.session.query(TrendingProduct).delete(synchronize_session=False)
+            if rows:
+                db.session.execute(insert(TrendingProduct), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
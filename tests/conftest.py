@@ -0,0 +1,130 @@
+"""
+Shared fixtures: a bare Flask app on a throwaway SQLite file (the full
+create_app() needs MySQL and external services) and an in-process fakeredis
+server registered with the shared Redis registry.
+
+Run with `python -m pytest` from the repository root after
+`pip install -r requirements-dev.txt`. Set TEST_MYSQL_URI to a throwaway
+MySQL database (its tables are created and dropped by the run) to also run
+the modules that override `database_uri` against MySQL.
+"""
+import pytest
+import fakeredis
+from flask import Flask
+from flask_jwt_extended import JWTManager
+
+from common.database import db
+from common.redis_registry import redis_registry, RegistryConnectionPool
+
+# Every mapped model has to be imported before the mappers are configured
+import models  # noqa: F401
+import models.shop, models.shop.shop_product_variant  # noqa: F401,E401
+import models.system_monitoring, models.recently_viewed, models.live_stream  # noqa: F401,E401
+import models.newsletter_subscription, models.tax_category, models.homepage, models.merchant_transaction  # noqa: F401,E401
+import auth.models.models, auth.models.merchant_document, auth.models.country_config  # noqa: F401,E401
+
+FAKE_REDIS_URL = 'redis://fake/0'
+
+
+def _engine_options(database_uri):
+    if database_uri.startswith('sqlite'):
+        # Threads get their own connections; wait instead of failing on SQLite's write lock
+        return {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    # Enough connections for every thread of the concurrency tests at once
+    return {'pool_size': 25, 'max_overflow': 0}
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def app(database_uri):
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        JWT_SECRET_KEY='test-secret-key-with-enough-bytes',
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SQLALCHEMY_ENGINE_OPTIONS=_engine_options(database_uri),
+    )
+    db.init_app(app)
+    JWTManager(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def fake_redis(app):
+    """A fakeredis server behind REDIS_URL; yields the FakeServer (set `.connected = False` to fail)."""
+    server = fakeredis.FakeServer()
+    key = (FAKE_REDIS_URL, ())
+    redis_registry._pools[key] = RegistryConnectionPool(connection_class=fakeredis.FakeRedisConnection, server=server)
+    app.config['REDIS_URL'] = FAKE_REDIS_URL
+    yield server
+    redis_registry._pools.pop(key, None)
+
+
+@pytest.fixture
+def merchant(app):
+    """A merchant user with its MerchantProfile."""
+    from auth.models.models import MerchantProfile, User, UserRole
+
+    user = User(email='merchant@example.com', first_name='Test', last_name='Merchant', role=UserRole.MERCHANT)
+    db.session.add(user)
+    db.session.flush()
+    profile = MerchantProfile(
+        user_id=user.id, business_name='Test Store', business_description='Test',
+        business_email='store@example.com', business_phone='9999999999', business_address='Street 1',
+        country_code='IN', state_province='KA', city='Bengaluru', postal_code='560001'
+    )
+    db.session.add(profile)
+    db.session.commit()
+    return profile
+
+
+@pytest.fixture
+def make_products(app, merchant):
+    """make_products(n, stock=10) -> approved products with stock, two images and three reviews each."""
+    from models.brand import Brand
+    from models.category import Category
+    from models.enums import MediaType
+    from models.product import Product
+    from models.product_media import ProductMedia
+    from models.product_stock import ProductStock
+    from models.review import Review
+    from services.product_rating_service import ProductRatingService
+
+    def make(n, stock=10):
+        category = Category(name='Shirts', slug='shirts')
+        brand = Brand(name='Acme', slug='acme')
+        db.session.add_all([category, brand])
+        db.session.flush()
+        products = []
+        for i in range(n):
+            product = Product(
+                merchant_id=merchant.id, category_id=category.category_id, brand_id=brand.brand_id,
+                sku=f'SKU-{i}', product_name=f'Cotton shirt {i}', product_description='Soft cotton',
+                cost_price=10, selling_price=100 + i, approval_status='approved'
+            )
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(ProductStock(product_id=product.product_id, stock_qty=stock))
+            db.session.add(ProductMedia(product_id=product.product_id, type=MediaType.IMAGE,
+                                        url=f'https://img.example.com/{i}.jpg', sort_order=1))
+            db.session.add(ProductMedia(product_id=product.product_id, type=MediaType.IMAGE,
+                                        url=f'https://img.example.com/{i}-thumb.jpg', sort_order=2, is_thumbnail=True))
+            for rating in (3, 4, 5):
+                db.session.add(Review(product_id=product.product_id, user_id=merchant.user_id,
+                                      order_id='ORD-1', rating=rating, title='Nice', body='Fits well'))
+            products.append(product)
+        db.session.commit()
+        ProductRatingService.reconcile()
+        return products
+
+    return make
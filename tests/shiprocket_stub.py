@@ -0,0 +1,104 @@
+"""
+Local stand-in for the ShipRocket API, for tests.
+
+Serves POST /v1/external/auth/login (a new token per login) and answers any
+other authenticated GET/POST with a canned body: one courier for
+serviceability, a new order/shipment id per order create, an AWB per
+assignment and anything else echoes its path. Tokens passed to revoke() get
+a 401 like an expired ShipRocket token, and requests whose path or query
+contains a string passed to fail() get a 500.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ShipRocketStub:
+    def __init__(self):
+        self.logins = 0
+        self.calls = []
+        self.revoked = set()
+        self.failing = set()
+        self.orders = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/external"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def revoke(self, token):
+        self.revoked.add(token)
+
+    def fail(self, text):
+        self.failing.add(text)
+
+    def _login(self):
+        with self._lock:
+            self.logins += 1
+            return f"token-{self.logins}"
+
+    def _authorized(self, method, path, token):
+        with self._lock:
+            if not token.startswith('token-') or token in self.revoked:
+                return False
+            self.calls.append((method, path, token))
+            return True
+
+    def _body(self, path):
+        if path.endswith('/courier/serviceability/'):
+            courier = {'courier_company_id': 10, 'courier_name': 'Delhivery', 'rate': 80, 'rating': 4.5}
+            return {'status': 200, 'data': {'available_courier_companies': [courier]}}
+        if path.endswith('/orders/create/adhoc'):
+            with self._lock:
+                self.orders += 1
+                return {'status': 200, 'data': {'order_id': 1000 + self.orders, 'shipment_id': 2000 + self.orders}}
+        if path.endswith('/courier/assign/awb'):
+            return {'status': 200, 'data': {'awb_code': 'AWB-1', 'courier_name': 'Delhivery'}}
+        return {'status': 200, 'data': {'path': path}}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _respond(self, method):
+                path = self.path.split('?', 1)[0]
+                if method == 'POST' and path.endswith('/auth/login'):
+                    return self._send(200, {'token': stub._login()})
+                token = self.headers.get('Authorization', '').rpartition(' ')[2]
+                if not stub._authorized(method, path, token):
+                    return self._send(401, {'message': 'Token has expired', 'status_code': 401})
+                if any(text in self.path for text in stub.failing):
+                    return self._send(500, {'message': 'Internal server error', 'status_code': 500})
+                self._send(200, stub._body(path))
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self._respond('POST')
+
+        return Handler
@@ -0,0 +1,78 @@
+"""
+Listings overlay pre-translated text for ?lang= and fall back to the source
+text when a product was edited after its translation was written.
+"""
+from decimal import Decimal
+
+import pytest
+
+from common.database import db
+from models.product_translation import ProductTranslation
+from models.shop.shop_product import ShopProduct
+from services.catalog_translation_service import (
+    CATALOG_PRODUCT, CATALOG_SHOP_PRODUCT, CatalogTranslationService
+)
+from services.product_listing_service import ProductListingService
+
+
+@pytest.fixture
+def translations(app):
+    app.config.update(FEATURE_TRANSLATION=True, TRANSLATION_SOURCE_LANG='en', TRANSLATION_LOCALES='hi')
+
+
+def _translate(catalog, product, name, description):
+    """Store a Hindi translation of the product's current text."""
+    source = CatalogTranslationService._source_of(catalog, product)
+    db.session.add(ProductTranslation(
+        catalog=catalog, locale='hi', product_id=product.product_id, name=name, description=description,
+        source_hash=CatalogTranslationService._source_hash(source)
+    ))
+    db.session.commit()
+
+
+def _cards(products, lang):
+    return {card['product_id']: card for card in ProductListingService.build_product_cards(products, lang=lang)}
+
+
+def test_cards_use_current_translations(translations, make_products):
+    translated, untranslated = make_products(2)
+    _translate(CATALOG_PRODUCT, translated, 'सूती शर्ट', 'मुलायम सूती')
+
+    cards = _cards([translated, untranslated], 'hi')
+
+    assert (cards[translated.product_id]['name'], cards[translated.product_id]['description']) == ('सूती शर्ट', 'मुलायम सूती')
+    assert cards[translated.product_id]['lang'] == 'hi'
+    assert cards[untranslated.product_id]['name'] == untranslated.product_name
+    assert 'lang' not in cards[untranslated.product_id]
+    # Unconfigured locales and no ?lang= serve the source text
+    assert _cards([translated], 'fr')[translated.product_id]['name'] == translated.product_name
+    assert _cards([translated], None)[translated.product_id]['name'] == translated.product_name
+
+
+def test_edited_products_fall_back_to_the_source_text(translations, make_products):
+    product, = make_products(1)
+    _translate(CATALOG_PRODUCT, product, 'सूती शर्ट', 'मुलायम सूती')
+
+    product.product_name = 'Linen shirt'
+    db.session.commit()
+
+    card = _cards([product], 'hi')[product.product_id]
+    assert (card['name'], card['description']) == ('Linen shirt', 'Soft cotton')
+    assert 'lang' not in card
+    # Without the loaded products the map reloads their text to compare
+    assert CatalogTranslationService.get_translation_map(CATALOG_PRODUCT, [product.product_id], 'hi') == {}
+
+
+def test_shop_translations_are_stale_after_an_edit(translations):
+    product = ShopProduct(shop_id=1, category_id=1, sku='SP-1', product_name='Desk lamp', product_description='Warm light',
+                          cost_price=10, selling_price=Decimal('100.00'), is_published=True)
+    db.session.add(product)
+    db.session.commit()
+    _translate(CATALOG_SHOP_PRODUCT, product, 'डेस्क लैंप', 'गर्म रोशनी')
+
+    translation_map = CatalogTranslationService.get_translation_map(CATALOG_SHOP_PRODUCT, [product.product_id], 'hi')
+    assert translation_map[product.product_id].name == 'डेस्क लैंप'
+
+    product.product_description = 'Cool light'
+    db.session.commit()
+    assert CatalogTranslationService.get_translation_map(CATALOG_SHOP_PRODUCT, [product.product_id], 'hi') == {}
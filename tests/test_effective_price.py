@@ -0,0 +1,92 @@
+"""
+EffectivePriceService.refresh only rewrites rows whose special-price window
+opened or closed since the previous run; `full` checks every row.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from common.cache import get_redis_client
+from common.database import db
+from models.product import Product
+from models.shop.shop_product import ShopProduct
+from services.effective_price_service import LAST_REFRESH_KEY, EffectivePriceService
+
+TODAY = datetime(2026, 3, 10, 12, 0)
+
+
+def _set_window(product, start, end, price='80.00'):
+    product.special_price = Decimal(price)
+    product.special_start, product.special_end = start, end
+    db.session.commit()
+
+
+def _effective(model, product_id):
+    db.session.expire_all()
+    return db.session.get(model, product_id).effective_price
+
+
+def _shop_product(sku, **fields):
+    product = ShopProduct(shop_id=1, category_id=1, sku=sku, product_name=sku, product_description='',
+                          cost_price=10, selling_price=Decimal('100.00'), **fields)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def test_windows_crossed_since_the_last_run_are_refreshed(app, fake_redis, make_products):
+    opening, closing, unaffected = make_products(3)
+    # Listeners price each row at write time (the real clock), so use windows around TODAY
+    _set_window(opening, date(2026, 3, 11), None)
+    _set_window(closing, date(2026, 3, 1), date(2026, 3, 10))
+    _set_window(unaffected, date(2026, 3, 1), date(2026, 3, 31))
+    assert EffectivePriceService.refresh(now=TODAY, full=True) == 3
+
+    assert _effective(Product, opening.product_id) == opening.selling_price
+    assert _effective(Product, closing.product_id) == Decimal('80.00')
+    # A stale value nowhere near a boundary is left for the full pass
+    db.session.execute(Product.__table__.update().where(Product.product_id == unaffected.product_id).values(
+        effective_price=Decimal('1.00')
+    ))
+    db.session.commit()
+
+    assert EffectivePriceService.refresh(now=TODAY + timedelta(days=1)) == 2
+
+    assert _effective(Product, opening.product_id) == Decimal('80.00')
+    assert _effective(Product, closing.product_id) == closing.selling_price
+    assert _effective(Product, unaffected.product_id) == Decimal('1.00')
+    # Nothing else is crossed later that day
+    assert EffectivePriceService.refresh(now=TODAY + timedelta(days=1, hours=1)) == 0
+    assert EffectivePriceService.refresh(now=TODAY + timedelta(days=1, hours=2), full=True) == 1
+    assert _effective(Product, unaffected.product_id) == Decimal('80.00')
+
+
+def test_datetime_windows_are_refreshed_to_the_minute(app, fake_redis):
+    product = _shop_product('SP-1', special_price=Decimal('70.00'),
+                            special_start=TODAY + timedelta(minutes=3), special_end=TODAY + timedelta(minutes=7))
+    EffectivePriceService.refresh(now=TODAY, full=True)
+    assert _effective(ShopProduct, product.product_id) == Decimal('100.00')
+
+    assert EffectivePriceService.refresh(now=TODAY + timedelta(minutes=5)) == 1
+    assert _effective(ShopProduct, product.product_id) == Decimal('70.00')
+    assert EffectivePriceService.refresh(now=TODAY + timedelta(minutes=6)) == 0
+    assert EffectivePriceService.refresh(now=TODAY + timedelta(minutes=10)) == 1
+    assert _effective(ShopProduct, product.product_id) == Decimal('100.00')
+
+
+def test_unknown_last_run_falls_back_to_the_lookback(app, fake_redis):
+    product = _shop_product('SP-2', special_price=Decimal('70.00'),
+                            special_start=TODAY - timedelta(hours=2), special_end=None)
+    db.session.execute(ShopProduct.__table__.update().values(effective_price=Decimal('100.00')))
+    db.session.commit()
+    client = get_redis_client(app)
+
+    # Opened two hours ago: outside a one hour lookback...
+    app.config['EFFECTIVE_PRICE_LOOKBACK_SECONDS'] = 3600
+    assert EffectivePriceService.refresh(now=TODAY) == 0
+    assert client.get(LAST_REFRESH_KEY).decode() == TODAY.isoformat()
+
+    # ...inside a three hour one
+    client.delete(LAST_REFRESH_KEY)
+    app.config['EFFECTIVE_PRICE_LOOKBACK_SECONDS'] = 3 * 3600
+    assert EffectivePriceService.refresh(now=TODAY) == 1
+    assert _effective(ShopProduct, product.product_id) == Decimal('70.00')
@@ -0,0 +1,81 @@
+"""
+Merchant sales rollup: revenue by category keeps a sale in the category it
+was rolled up under, the detailed monthly report shows the product's
+current category, and a rebuild that loses a lock race is redone.
+"""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from common.database import db
+from controllers.merchant.report_controller import MerchantReportController
+from models.category import Category
+from models.merchant_daily_sales import MerchantDailySales
+from models.order import Order, OrderItem
+from services.merchant_sales_rollup_service import MerchantSalesRollupService
+
+
+def _sell(product, quantity=2):
+    order = Order(subtotal_amount=Decimal('200.00'), total_amount=Decimal('200.00'), currency='INR')
+    order.items.append(OrderItem(
+        product_id=product.product_id, merchant_id=product.merchant_id,
+        product_name_at_purchase=product.product_name, quantity=quantity,
+        final_base_price_for_gst_calc=Decimal('100.00'), unit_price_inclusive_gst=Decimal('100.00'),
+        line_item_total_inclusive_gst=Decimal('100.00') * quantity
+    ))
+    db.session.add(order)
+    db.session.commit()
+    MerchantSalesRollupService.refresh_order(order)
+
+
+def test_reports_after_a_product_changes_category(merchant, make_products):
+    product, = make_products(1)
+    _sell(product)
+
+    trousers = Category(name='Trousers', slug='trousers')
+    db.session.add(trousers)
+    db.session.flush()
+    product.category_id = trousers.category_id
+    db.session.commit()
+
+    detailed, = MerchantReportController.get_detailed_monthly_sales(merchant.user_id)
+    assert (detailed['product'], detailed['category'], detailed['quantity']) == (product.product_name, 'Trousers', 2)
+    assert MerchantReportController.get_revenue_by_category(merchant.user_id) == [{'name': 'Shirts', 'value': 100}]
+
+
+def _deadlock():
+    return OperationalError('INSERT INTO merchant_daily_sales ...', {}, Exception(1213, 'Deadlock found'))
+
+
+def test_rebuild_is_redone_after_a_deadlock(merchant, make_products, monkeypatch):
+    product, = make_products(1)
+    _sell(product)
+    aggregate = MerchantSalesRollupService._aggregate
+    calls = []
+
+    def deadlock_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise _deadlock()
+        return aggregate(*args)
+
+    monkeypatch.setattr(MerchantSalesRollupService, '_aggregate', staticmethod(deadlock_once))
+
+    assert MerchantSalesRollupService.reconcile() == 2
+    assert len(calls) == 2
+    assert MerchantDailySales.query.count() == 2
+
+
+def test_other_database_errors_are_not_retried(app, monkeypatch):
+    calls = []
+
+    def broken(*args):
+        calls.append(args)
+        raise OperationalError('SELECT ...', {}, Exception(1146, "Table doesn't exist"))
+
+    monkeypatch.setattr(MerchantSalesRollupService, '_aggregate', staticmethod(broken))
+
+    with pytest.raises(OperationalError):
+        MerchantSalesRollupService.reconcile()
+    assert len(calls) == 1
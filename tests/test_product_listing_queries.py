@@ -0,0 +1,133 @@
+"""
+Product listings build their cards through ProductListingService with a fixed
+number of queries per page (products, count, media, ratings, reviews, ...),
+so the statement count must not grow with the page size.
+"""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from common.database import db
+from controllers.product_controller import ProductController
+from models.enums import OrderStatusEnum
+from models.order import Order, OrderItem
+from services.trending_service import TrendingService
+
+
+class QueryCounter:
+    """Counts SQL statements sent to the database while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+def _count_queries(app, path, call):
+    with app.test_request_context(path):
+        db.session.expunge_all()
+        with QueryCounter() as counter:
+            response = call()
+    response = response[0] if isinstance(response, tuple) else response
+    return counter.count, response.get_json()
+
+
+LISTINGS = [
+    ('all products', '', lambda category_id: ProductController.get_all_products()),
+    ('search', '&search=shirt', lambda category_id: ProductController.get_all_products()),
+    ('new products', '', lambda category_id: ProductController.get_new_products()),
+    ('by brand', '', lambda category_id: ProductController.get_products_by_brand('acme')),
+    ('by category', '', lambda category_id: ProductController.get_products_by_category(category_id)),
+    ('by category with search', '&search=shirt',
+     lambda category_id: ProductController.get_products_by_category(category_id)),
+]
+
+
+def _assert_constant_queries(app, name, extra, call):
+    # Warm-up: builds the in-memory search index and other per-process caches
+    _count_queries(app, f'/?per_page=1{extra}', call)
+
+    small_count, small = _count_queries(app, f'/?per_page=5{extra}', call)
+    large_count, large = _count_queries(app, f'/?per_page=25{extra}', call)
+
+    assert len(small['products']) == 5
+    assert len(large['products']) == 25
+    assert large_count == small_count, f"{name}: {small_count} queries for 5 products, {large_count} for 25"
+    return large
+
+
+@pytest.mark.parametrize('name,extra,call', LISTINGS, ids=[listing[0] for listing in LISTINGS])
+def test_listing_queries_do_not_grow_with_page_size(app, make_products, name, extra, call):
+    products = make_products(30)
+    category_id = products[0].category_id
+
+    _assert_constant_queries(app, name, extra, lambda: call(category_id))
+
+
+def _order_all(products):
+    """One delivered order with product i ordered i + 1 times."""
+    order = Order(subtotal_amount=Decimal('100.00'), total_amount=Decimal('100.00'), currency='INR',
+                  order_status=OrderStatusEnum.DELIVERED)
+    for i, product in enumerate(products):
+        order.items.append(OrderItem(
+            product_id=product.product_id, merchant_id=product.merchant_id,
+            product_name_at_purchase=product.product_name, quantity=i + 1,
+            final_base_price_for_gst_calc=Decimal('100.00'), unit_price_inclusive_gst=Decimal('100.00'),
+            line_item_total_inclusive_gst=Decimal('100.00') * (i + 1)
+        ))
+    db.session.add(order)
+    db.session.commit()
+
+
+TRENDY = [
+    # No qualifying orders: the filtered catalogue instead
+    ('no orders', False, False, ''),
+    ('live ranking', True, False, ''),
+    ('leaderboard', True, True, ''),
+    ('leaderboard in category', True, True, '&category_id={category_id}'),
+]
+
+
+@pytest.mark.parametrize('name,ordered,refreshed,extra', TRENDY, ids=[trendy[0] for trendy in TRENDY])
+def test_trendy_deal_queries_do_not_grow_with_page_size(app, make_products, name, ordered, refreshed, extra):
+    products = make_products(30)
+    products[0].brand.add_category(products[0].category)
+    db.session.commit()
+    if ordered:
+        _order_all(products)
+    if refreshed:
+        TrendingService.refresh()
+
+    extra = extra.format(category_id=products[0].category_id)
+    data = _assert_constant_queries(app, name, extra, ProductController.get_trendy_deals)
+
+    if ordered:
+        # Most ordered first
+        assert [card['orderCount'] for card in data['products'][:3]] == [30, 29, 28]
+    assert data['products'][0]['category']['name'] == 'Shirts'
+    assert data['products'][0]['brand']['name'] == 'Acme'
+    assert [category['name'] for category in data['products'][0]['brand']['categories']] == ['Shirts']
+
+
+def test_listing_cards_carry_image_rating_and_reviews(app, make_products):
+    make_products(3)
+
+    _, data = _count_queries(app, '/?per_page=3', lambda: ProductController.get_all_products())
+
+    for card in data['products']:
+        assert card['image'].endswith('-thumb.jpg')
+        assert card['rating'] == 4.0
+        assert len(card['reviews']) == 3
@@ -0,0 +1,146 @@
+"""
+Product search paging and index maintenance. The MySQL backend's documents
+table and LIKE matching are exercised on SQLite (only its FULLTEXT queries
+need MySQL).
+"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from common.database import db
+from models.product import Product
+from models.product_search_document import ProductSearchDocument
+from services.search import InMemorySearchBackend, ProductSearchService
+
+
+@pytest.fixture
+def mysql_backend(app):
+    app.config['SEARCH_BACKEND'] = 'mysql'
+    app.extensions.pop('product_search', None)
+    yield ProductSearchService.get_backend()
+    app.extensions.pop('product_search', None)
+
+
+@pytest.fixture
+def like_only(mysql_backend):
+    """Every term below the FULLTEXT token size, so the backend runs on SQLite."""
+    mysql_backend.min_token_size = 100
+    return mysql_backend
+
+
+def _document(product_id):
+    db.session.expire_all()
+    return db.session.get(ProductSearchDocument, product_id)
+
+
+def test_sync_reindexes_products_edited_outside_the_app(mysql_backend, make_products):
+    edited, untouched = make_products(2)
+    assert ProductSearchService.rebuild() == 2
+    assert ProductSearchService.sync_changed() == 0
+
+    # What the description agent's bulk write-back does: a Core UPDATE with a new updated_at
+    products = Product.__table__
+    db.session.execute(products.update().where(products.c.product_id == edited.product_id).values(
+        product_description='<p>Linen blend</p>', updated_at=datetime.utcnow()
+    ))
+    db.session.commit()
+
+    assert ProductSearchService.sync_changed() == 1
+    assert _document(edited.product_id).body.strip() == 'Linen blend'
+    assert _document(untouched.product_id).body == 'Soft cotton'
+    assert ProductSearchService.sync_changed() == 0
+
+
+def test_sync_indexes_new_approvals_and_drops_rejections(mysql_backend, make_products):
+    approved, rejected = make_products(2)
+    ProductSearchService.rebuild()
+    db.session.execute(ProductSearchDocument.__table__.delete().where(
+        ProductSearchDocument.product_id == approved.product_id
+    ))
+    db.session.execute(Product.__table__.update().where(Product.product_id == rejected.product_id).values(
+        approval_status='rejected', updated_at=datetime.utcnow()
+    ))
+    db.session.commit()
+
+    assert ProductSearchService.sync_changed() == 2
+    assert _document(approved.product_id) is not None
+    assert _document(rejected.product_id) is None
+    assert ProductSearchService.sync_changed() == 0
+
+
+def _listing(min_price=None):
+    query = Product.query.filter(Product.deleted_at.is_(None))
+    if min_price is not None:
+        query = query.filter(Product.selling_price >= min_price)
+    return query
+
+
+@pytest.mark.parametrize('backend', ['memory', 'like_only'])
+def test_pages_cover_every_filtered_match_in_rank_order(backend, request, make_products):
+    if backend == 'like_only':
+        request.getfixturevalue(backend)
+    products = make_products(7)
+    ProductSearchService.rebuild()
+    products[4].sku = 'COTTON-5'
+    db.session.commit()
+    ProductSearchService.index_product(products[4])
+
+    first = ProductSearchService.paginate(_listing(min_price=101), 'cotton', 1, 4)
+    second = ProductSearchService.paginate(_listing(min_price=101), 'cotton', 2, 4)
+
+    # Six of the seven pass the price filter; the total is the filtered count
+    assert (first.total, first.pages, first.has_next, second.has_next, second.has_prev) == (6, 2, True, False, True)
+    assert first.items[0].product_id == products[4].product_id
+    paged = [product.product_id for product in first.items + second.items]
+    assert sorted(paged) == sorted(product.product_id for product in products[1:])
+    assert set(first.scores) == {product.product_id for product in first.items}
+    assert ProductSearchService.paginate(_listing(), 'linen', 1, 4).total == 0
+    assert ProductSearchService.filter_query(_listing(min_price=105), 'cotton').count() == 2
+
+
+def test_renaming_a_category_or_brand_reindexes_its_products(like_only, make_products):
+    from controllers.superadmin.brand_controller import BrandController
+    from controllers.superadmin.category_controller import CategoryController
+
+    product, = make_products(1)
+    ProductSearchService.rebuild()
+    assert ProductSearchService.search('tops') == []
+
+    CategoryController.update(product.category_id, {'name': 'Tops'})
+    BrandController.update(product.brand_id, {'name': 'Zenith'})
+
+    assert [product_id for product_id, _ in ProductSearchService.search('tops')] == [product.product_id]
+    assert [product_id for product_id, _ in ProductSearchService.search('zenith')] == [product.product_id]
+
+
+def _doc(product_id, name):
+    return {'product_id': product_id, 'name': name, 'sku': '', 'category': '', 'brand': '', 'description': ''}
+
+
+def test_memory_backend_keeps_serving_while_it_reloads():
+    catalogue = [_doc(1, 'Cotton shirt')]
+    loading, release = threading.Event(), threading.Event()
+
+    def load_documents():
+        if backend._built_at is not None:
+            loading.set()
+            release.wait(5)
+        return list(catalogue)
+
+    backend = InMemorySearchBackend(load_documents, refresh_interval=60)
+    assert backend.search('cotton') and backend._built_at is not None
+    backend._built_at -= 120
+
+    reload = threading.Thread(target=backend.search, args=('cotton',))
+    reload.start()
+    assert loading.wait(5)
+    # The lock is free during the load: searches use the old index, writes go through
+    assert [product_id for product_id, _ in backend.search('cotton')] == [1]
+    assert reload.is_alive()
+    backend.upsert([_doc(2, 'Cotton socks')])
+    release.set()
+    reload.join(5)
+
+    # The write made during the reload survives the swap
+    assert sorted(product_id for product_id, _ in backend.search('cotton')) == [1, 2]
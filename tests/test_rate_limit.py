@@ -0,0 +1,103 @@
+"""
+The sliding-window limiter admits exactly `limit` requests per window however
+many threads hit it at once: through the Lua script in Redis (fakeredis here),
+and through the in-process fallback while Redis is failing.
+"""
+import threading
+import time
+
+import fakeredis
+import pytest
+from flask import jsonify
+
+from common.decorators import rate_limit
+from common.rate_limit import RateLimiter
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def limiter(redis_server):
+    limiter = RateLimiter()
+    limiter.use_client(fakeredis.FakeRedis(server=redis_server))
+    return limiter
+
+
+def _hit_concurrently(app, limiter, key, limit, per, threads=16, hits_per_thread=20):
+    """Returns how many of threads * hits_per_thread hits were admitted."""
+    barrier = threading.Barrier(threads)
+    admitted = []
+    lock = threading.Lock()
+
+    def worker():
+        with app.app_context():
+            barrier.wait()
+            allowed = sum(limiter.hit(key, limit, per).allowed for _ in range(hits_per_thread))
+        with lock:
+            admitted.append(allowed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(admitted)
+
+
+def test_concurrent_hits_admit_exactly_the_limit(app, limiter, redis_server):
+    assert _hit_concurrently(app, limiter, 'rl:test:user:1', limit=50, per=60) == 50
+    # Every admission is one sorted-set member in Redis
+    assert fakeredis.FakeRedis(server=redis_server).zcard('rl:test:user:1') == 50
+
+
+def test_window_slides(app, limiter):
+    results = [limiter.hit('rl:slide', 3, 0.3) for _ in range(4)]
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results[:3]] == [2, 1, 0]
+    assert 0 < results[3].retry_after <= 0.3
+
+    time.sleep(0.35)
+    assert limiter.hit('rl:slide', 3, 0.3).allowed
+
+
+def test_keys_are_limited_independently(app, limiter):
+    assert sum(limiter.hit('rl:a', 2, 60).allowed for _ in range(5)) == 2
+    assert sum(limiter.hit('rl:b', 2, 60).allowed for _ in range(5)) == 2
+
+
+def test_falls_back_to_in_process_windows_when_redis_fails(app, limiter, redis_server):
+    app.config['RATE_LIMIT_REDIS_RETRY_SECONDS'] = 60
+    redis_server.connected = False
+
+    assert _hit_concurrently(app, limiter, 'rl:test:ip:1', limit=40, per=60) == 40
+
+
+def test_returns_to_redis_after_the_retry_period(app, limiter, redis_server):
+    app.config['RATE_LIMIT_REDIS_RETRY_SECONDS'] = 0.2
+    redis_server.connected = False
+    assert limiter.hit('rl:retry', 5, 60).allowed
+
+    redis_server.connected = True
+    time.sleep(0.25)
+    assert limiter.hit('rl:retry', 5, 60).allowed
+    assert fakeredis.FakeRedis(server=redis_server).zcard('rl:retry') == 1
+
+
+def test_decorator_answers_429_with_retry_after(app, limiter, monkeypatch):
+    monkeypatch.setattr('common.decorators.rate_limiter', limiter)
+
+    @app.route('/limited')
+    @rate_limit(limit=2, per=60)
+    def limited():
+        return jsonify(ok=True)
+
+    client = app.test_client()
+    responses = [client.get('/limited') for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert responses[1].headers['X-RateLimit-Remaining'] == '0'
+    assert int(responses[2].headers['Retry-After']) >= 1
+    assert responses[2].get_json()['error'] == 'Rate limit exceeded'
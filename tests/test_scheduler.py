@@ -0,0 +1,45 @@
+"""
+Scheduled jobs are claimed per wall-clock slot: one worker runs each slot,
+and the next slot can be claimed as soon as it starts.
+"""
+from common.scheduler import AppScheduler
+
+
+def _workers(app, count=2):
+    workers = []
+    for _ in range(count):
+        worker = AppScheduler()
+        worker.init_app(app)
+        workers.append(worker)
+    return workers
+
+
+def test_one_worker_claims_each_slot(app, fake_redis):
+    first, second = _workers(app)
+
+    assert first._claim('trending_refresh', 60, now=600.5)
+    assert not second._claim('trending_refresh', 60, now=659.9)
+    # The next slot is free as soon as it starts, though the last claim is still held
+    assert second._claim('trending_refresh', 60, now=660.1)
+    assert not first._claim('trending_refresh', 60, now=661)
+    # Jobs are claimed independently
+    assert first._claim('search_index_sync', 60, now=661)
+
+
+def test_a_job_runs_once_per_slot(app, fake_redis):
+    runs = []
+    workers = _workers(app, 3)
+    for worker in workers:
+        worker.add_interval_job('sweep', lambda: runs.append(1), 86400)
+
+    for worker in workers:
+        func, seconds = worker._jobs['sweep']
+        worker._wrap('sweep', func, seconds)()
+
+    assert runs == [1]
+
+
+def test_every_worker_runs_without_redis(app):
+    workers = _workers(app)
+
+    assert all(worker._claim('sweep', 60) for worker in workers)
@@ -0,0 +1,122 @@
+"""
+Serviceability quotes are shared through Redis: a batch reads every cached
+quote with one MGET and fetches only the misses, a stale quote is served
+while a background refresh replaces it, and failed lookups are never cached.
+"""
+import json
+import time
+
+import pytest
+
+from controllers.shiprocket_controller import ShipRocketController
+from services import serviceability_quote_cache
+from services.serviceability_quote_cache import serviceability_quotes
+from shiprocket_stub import ShipRocketStub
+
+
+class CommandLog:
+    """Redis client proxy that records the commands sent through it."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        self.commands.append(name)
+        return getattr(self.client, name)
+
+
+@pytest.fixture
+def shiprocket(app, fake_redis, monkeypatch):
+    stub = ShipRocketStub().start()
+    app.config.update(
+        SHIPROCKET_BASE_URL=stub.base_url,
+        SHIPROCKET_EMAIL='ops@example.com',
+        SHIPROCKET_PASSWORD='secret',
+        SHIPROCKET_MAX_RETRIES=0
+    )
+    log = CommandLog(None)
+    get_client = serviceability_quote_cache.get_redis_client
+
+    def logged_client(app):
+        log.client = get_client(app)
+        return log
+
+    monkeypatch.setattr(serviceability_quote_cache, 'get_redis_client', logged_client)
+    stub.redis = log
+    yield stub
+    stub.stop()
+
+
+def _quote(pickup, delivery, weight, cod=0):
+    return {'pickup_pincode': pickup, 'delivery_pincode': delivery, 'weight': weight, 'cod': cod}
+
+
+def _fetched_at(stub, key):
+    return json.loads(stub.redis.client.get(key))['fetched_at']
+
+
+def _wait_for_refresh():
+    deadline = time.monotonic() + 5
+    while serviceability_quotes._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _lookups(stub):
+    return [call for call in stub.calls if call[1].endswith('/courier/serviceability/')]
+
+
+def test_a_batch_reads_the_cache_once_and_fetches_each_band_once(shiprocket):
+    controller = ShipRocketController()
+    # 0.3 kg and 0.4 kg fall in the same 0.5 kg band
+    batch = [_quote('560001', '110001', 0.3), _quote('560001', '110001', 0.4), _quote('560001', '400001', 1.2)]
+
+    responses = controller.check_serviceability_bulk(batch)
+    assert all(response['status'] == 200 for response in responses)
+    assert len(_lookups(shiprocket)) == 2
+    assert shiprocket.redis.commands == ['mget', 'set', 'set']
+
+    shiprocket.redis.commands.clear()
+    assert controller.check_serviceability_bulk(batch + [_quote('560001', '400001', 1.5)]) == responses + responses[2:]
+    assert len(_lookups(shiprocket)) == 2
+    assert shiprocket.redis.commands == ['mget']
+
+
+def test_failed_lookups_are_not_cached(shiprocket):
+    controller = ShipRocketController()
+    shiprocket.fail('delivery_postcode=400001')
+    batch = [_quote('560001', '110001', 1), _quote('560001', '400001', 1)]
+
+    served, failed = controller.check_serviceability_bulk(batch)
+    assert served['status'] == 200
+    assert failed['data']['available_courier_companies'] == [] and '500' in failed['message']
+
+    shiprocket.failing.clear()
+    served_again, recovered = controller.check_serviceability_bulk(batch)
+    assert served_again == served and recovered['status'] == 200
+    # Only the failed band was asked again
+    assert len(_lookups(shiprocket)) == 3
+
+
+def test_stale_quotes_are_served_while_they_refresh(app, shiprocket):
+    controller = ShipRocketController()
+    app.config['SHIPROCKET_QUOTE_TTL_SECONDS'] = 0
+    query = serviceability_quotes.normalize('560001', '110001', 1)
+    key = serviceability_quotes.cache_key(query)
+    first = controller.check_serviceability('560001', '110001', 1)
+    fetched_at = _fetched_at(shiprocket, key)
+
+    # Stale at once with a zero TTL: served from the cache, refreshed in the background
+    shiprocket.fail('delivery_postcode=110001')
+    assert controller.check_serviceability('560001', '110001', 1) == first
+
+    _wait_for_refresh()
+    # The refresh failed: the stale quote stays until a refresh succeeds
+    assert len(_lookups(shiprocket)) == 2
+    assert _fetched_at(shiprocket, key) == fetched_at
+
+    shiprocket.failing.clear()
+    assert controller.check_serviceability('560001', '110001', 1) == first
+    _wait_for_refresh()
+    assert len(_lookups(shiprocket)) == 3
+    assert _fetched_at(shiprocket, key) > fetched_at
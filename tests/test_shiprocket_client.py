@@ -0,0 +1,124 @@
+"""
+ShipRocketClient logs in once and shares the token through Redis, so fresh
+clients (other workers) reuse it, waiting for a login already in progress
+without blocking their other threads; a 401 drops the token and retries the
+call once after a new login.
+"""
+import threading
+import time
+
+import pytest
+
+from common.cache import get_redis_client
+from services import shiprocket_client
+from services.shiprocket_client import TOKEN_CACHE_KEY, TOKEN_LOCK_KEY, ShipRocketClient
+from shiprocket_stub import ShipRocketStub
+
+
+@pytest.fixture
+def shiprocket(app, fake_redis):
+    stub = ShipRocketStub().start()
+    app.config.update(
+        SHIPROCKET_BASE_URL=stub.base_url,
+        SHIPROCKET_EMAIL='ops@example.com',
+        SHIPROCKET_PASSWORD='secret',
+        SHIPROCKET_MAX_RETRIES=0
+    )
+    yield stub
+    stub.stop()
+
+
+def test_one_login_is_shared_across_clients(app, shiprocket):
+    first = ShipRocketClient()
+    for _ in range(5):
+        assert first.request('GET', 'courier/serviceability/', params={'weight': 1}).status_code == 200
+
+    # Fresh clients stand in for other workers: they pick up the token from Redis
+    others = [ShipRocketClient() for _ in range(4)]
+    errors = []
+
+    def worker(client):
+        with app.app_context():
+            for _ in range(5):
+                if client.request('GET', 'orders').status_code != 200:
+                    errors.append(client)
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in others]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert shiprocket.logins == 1
+    assert len(shiprocket.calls) == 25
+    assert {token for _, _, token in shiprocket.calls} == {'token-1'}
+
+
+def _get_token_in_thread(app, client):
+    result = {}
+
+    def worker():
+        with app.app_context():
+            result['token'] = client.get_token()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    return thread, result
+
+
+def test_waiting_for_another_login_does_not_hold_the_lock(app, shiprocket):
+    redis_client = get_redis_client(app)
+    # Another worker is logging in
+    redis_client.set(TOKEN_LOCK_KEY, 'other-worker', ex=30)
+    client = ShipRocketClient()
+
+    thread, result = _get_token_in_thread(app, client)
+    time.sleep(0.1)
+    assert client._lock.acquire(timeout=0.1)
+    client._lock.release()
+
+    redis_client.set(TOKEN_CACHE_KEY, 'token-shared', ex=3600)
+    thread.join(timeout=2)
+    assert result == {'token': 'token-shared'}
+    assert shiprocket.logins == 0
+
+
+def test_a_login_that_never_lands_is_not_waited_for_forever(app, shiprocket, monkeypatch):
+    monkeypatch.setattr(shiprocket_client, 'LOGIN_WAIT_SECONDS', 0.3)
+    redis_client = get_redis_client(app)
+    redis_client.set(TOKEN_LOCK_KEY, 'other-worker', ex=30)
+
+    thread, result = _get_token_in_thread(app, ShipRocketClient())
+    thread.join(timeout=2)
+
+    assert result == {'token': 'token-1'}
+    # The other worker's lock is left for it to release
+    assert redis_client.get(TOKEN_LOCK_KEY) == b'other-worker'
+
+
+def test_401_logs_in_again_and_retries_once(app, shiprocket, fake_redis):
+    client = ShipRocketClient()
+    assert client.request('GET', 'orders').status_code == 200
+    shiprocket.revoke('token-1')
+
+    response = client.request('POST', 'orders/create/adhoc', data={'order_id': 'ORD-1'})
+
+    assert response.status_code == 200
+    assert shiprocket.logins == 2
+    assert shiprocket.calls[-1] == ('POST', '/v1/external/orders/create/adhoc', 'token-2')
+    # The fresh token replaced the rejected one for every worker
+    assert get_redis_client(app).get(TOKEN_CACHE_KEY).decode() == 'token-2'
+    assert ShipRocketClient().get_token() == 'token-2'
+
+
+def test_persistent_401_is_returned_after_one_retry(app, shiprocket, monkeypatch):
+    client = ShipRocketClient()
+    client.get_token()
+    # Every token the stub hands out is rejected
+    monkeypatch.setattr(shiprocket, '_authorized', lambda *args: False)
+
+    response = client.request('GET', 'orders')
+
+    assert response.status_code == 401
+    assert shiprocket.logins == 2
@@ -0,0 +1,177 @@
+"""
+Shipment creation: merchants of one order are shipped concurrently, each in
+its own app context and session; a retry resumes at the step that failed
+instead of creating the ShipRocket order twice, and a call never runs while
+another one holds the shipment's claim.
+"""
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from auth.models.models import MerchantProfile, User, UserRole
+from common.cache import get_redis_client
+from common.database import db
+from common.executor import AppContextExecutor
+from controllers.shiprocket_controller import SHIPMENT_CLAIM_KEY, ShipRocketController
+from models.brand import Brand
+from models.enums import PaymentMethodEnum
+from models.order import Order, OrderItem
+from models.shipment import Shipment
+from models.user_address import UserAddress
+from shiprocket_stub import ShipRocketStub
+
+
+@pytest.fixture
+def shiprocket(app, fake_redis):
+    stub = ShipRocketStub().start()
+    app.config.update(
+        SHIPROCKET_BASE_URL=stub.base_url,
+        SHIPROCKET_EMAIL='ops@example.com',
+        SHIPROCKET_PASSWORD='secret',
+        SHIPROCKET_MAX_RETRIES=0
+    )
+    yield stub
+    stub.stop()
+
+
+def _merchant(index, postal_code):
+    user = User(email=f'merchant{index}@example.com', first_name='Second', last_name='Merchant', role=UserRole.MERCHANT)
+    db.session.add(user)
+    db.session.flush()
+    profile = MerchantProfile(
+        user_id=user.id, business_name=f'Store {index}', business_description='Test',
+        business_email=f'store{index}@example.com', business_phone='9999999999', business_address='Street 2',
+        country_code='IN', state_province='MH', city='Mumbai', postal_code=postal_code
+    )
+    db.session.add(profile)
+    db.session.flush()
+    return profile
+
+
+def _place_order(products_by_merchant):
+    """A paid order with one item per (merchant, product) pair, delivered to Delhi."""
+    buyer = User(email='buyer@example.com', first_name='Asha', last_name='Rao', phone='9876543210', role=UserRole.USER)
+    db.session.add(buyer)
+    db.session.flush()
+    address = UserAddress(
+        user_id=buyer.id, contact_name='Asha Rao', contact_phone='9876543210', address_line1='1 Main Road',
+        city='New Delhi', state_province='DL', postal_code='110001', country_code='IN'
+    )
+    order = Order(
+        user_id=buyer.id, subtotal_amount=Decimal('200.00'), total_amount=Decimal('200.00'), currency='INR',
+        payment_method=PaymentMethodEnum.UPI
+    )
+    for merchant, product in products_by_merchant:
+        merchant.shiprocket_pickup_location_name = f'Merchant_{merchant.id}'
+        order.items.append(OrderItem(
+            product_id=product.product_id, merchant_id=merchant.id, product_name_at_purchase=product.product_name,
+            sku_at_purchase=product.sku, quantity=1, final_base_price_for_gst_calc=Decimal('100.00'),
+            unit_price_inclusive_gst=Decimal('100.00'), line_item_total_inclusive_gst=Decimal('100.00')
+        ))
+    db.session.add_all([address, order])
+    db.session.commit()
+    return order.order_id, address.address_id
+
+
+def _create(order_id, merchant, address_id):
+    return ShipRocketController().create_shiprocket_order_from_db_order(order_id, merchant.id, None, address_id)
+
+
+def _calls(stub, endpoint):
+    return [call for call in stub.calls if call[1].endswith(endpoint)]
+
+
+def test_tasks_run_in_their_own_session(app):
+    executor = AppContextExecutor('test-executor', 'TEST_WORKERS', 2)
+    caller_session = db.session()
+
+    def add_brand(name, fail=False):
+        db.session.add(Brand(name=name, slug=name.lower()))
+        if fail:
+            raise ValueError(name)
+        db.session.commit()
+        return db.session()
+
+    task_session = executor.submit(add_brand, 'Kept').result()
+    assert task_session is not caller_session
+    with pytest.raises(ValueError):
+        executor.submit(add_brand, 'Dropped', fail=True).result()
+
+    # The failed task's pending row was rolled back, not left for the caller's session to flush
+    assert [brand.name for brand in Brand.query.all()] == ['Kept']
+
+
+def test_map_settled_keeps_order_and_returns_exceptions(app):
+    executor = AppContextExecutor('test-executor', 'TEST_WORKERS', 3)
+    threads = set()
+
+    def work(item):
+        threads.add(threading.get_ident())
+        # Later items finish first
+        time.sleep(0.05 * (3 - item))
+        if item == 1:
+            raise ValueError('item 1')
+        return item * 10
+
+    started = time.monotonic()
+    zero, failed, two = executor.map_settled(work, [0, 1, 2])
+
+    assert (zero, two) == (0, 20)
+    assert isinstance(failed, ValueError) and str(failed) == 'item 1'
+    assert len(threads) == 3 and time.monotonic() - started < 0.25
+
+
+def test_a_retry_resumes_after_the_failed_step(shiprocket, make_products, merchant):
+    product, = make_products(1)
+    order_id, address_id = _place_order([(merchant, product)])
+
+    shiprocket.fail('assign/awb')
+    first = _create(order_id, merchant, address_id)
+    assert first['shipment_id'] == 2001 and first['awb_code'] is None
+
+    shiprocket.failing.clear()
+    second = _create(order_id, merchant, address_id)
+    assert (second['shipment_id'], second['awb_code']) == (2001, 'AWB-1')
+    assert len(_calls(shiprocket, '/orders/create/adhoc')) == 1
+    assert len(_calls(shiprocket, '/courier/generate/pickup')) == 1
+
+    # Finished shipments are returned without calling ShipRocket
+    calls = len(shiprocket.calls)
+    assert _create(order_id, merchant, address_id)['already_created'] is True
+    assert len(shiprocket.calls) == calls
+    assert Shipment.query.filter_by(order_id=order_id).count() == 1
+
+
+def test_a_held_claim_blocks_the_shipment(app, shiprocket, make_products, merchant):
+    product, = make_products(1)
+    order_id, address_id = _place_order([(merchant, product)])
+    key = SHIPMENT_CLAIM_KEY.format(order_id, merchant.id)
+    client = get_redis_client(app)
+    client.set(key, 'other-call', ex=60)
+
+    with pytest.raises(Exception, match='already being created'):
+        _create(order_id, merchant, address_id)
+    assert shiprocket.calls == []
+    # The blocked call leaves the holder's claim alone
+    assert client.get(key) == b'other-call'
+
+    client.delete(key)
+    assert _create(order_id, merchant, address_id)['awb_code'] == 'AWB-1'
+    assert client.get(key) is None
+
+
+def test_merchants_are_shipped_concurrently_and_fail_alone(shiprocket, make_products, merchant):
+    first, second = make_products(2)
+    other = _merchant(2, '400001')
+    order_id, address_id = _place_order([(merchant, first), (other, second)])
+
+    shiprocket.fail('pickup_postcode=400001')
+    result = ShipRocketController().create_shiprocket_orders_for_all_merchants(order_id, address_id)
+
+    assert result['successful_merchants'] == [merchant.id]
+    assert result['failed_merchants'] == [other.id]
+    assert 'No courier services' in result['merchant_responses'][other.id]['error']
+    db.session.expire_all()
+    assert [shipment.merchant_id for shipment in Shipment.query.filter_by(order_id=order_id)] == [merchant.id]
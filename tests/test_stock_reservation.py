@@ -0,0 +1,185 @@
+"""
+Concurrent checkouts must never oversell: StockReservationService.reserve()
+either decrements every line of a cart or raises InsufficientStockError.
+Held stock is confirmed by the payment, released by the expiry sweep, and
+put back at most once however many cancel or failure paths run.
+
+SQLite serialises every writer, so it never exercises the row locks; with
+TEST_MYSQL_URI set the module runs against MySQL as well, where
+SELECT ... FOR UPDATE really has to hold the concurrent checkouts apart.
+"""
+import os
+import threading
+from decimal import Decimal
+
+import pytest
+
+from common.database import db
+from controllers.order_controller import OrderController
+from models.enums import OrderStatusEnum, PaymentMethodEnum, PaymentStatusEnum
+from models.order import Order, OrderItem
+from models.product_stock import ProductStock
+from models.stock_reservation import StockReservation
+from services.stock_reservation_service import InsufficientStockError, StockReservationService
+
+
+@pytest.fixture(params=['sqlite', 'mysql'])
+def database_uri(request, tmp_path):
+    if request.param == 'mysql':
+        if not os.getenv('TEST_MYSQL_URI'):
+            pytest.skip('TEST_MYSQL_URI is not set')
+        return os.getenv('TEST_MYSQL_URI')
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def _checkout_concurrently(app, carts):
+    """Reserve each cart in its own thread, all released at once; returns (reserved, rejected, errors)."""
+    barrier = threading.Barrier(len(carts))
+    outcomes = []
+    lock = threading.Lock()
+
+    def checkout(cart):
+        with app.app_context():
+            barrier.wait()
+            try:
+                StockReservationService.reserve(cart)
+                db.session.commit()
+                outcome = 'reserved'
+            except InsufficientStockError:
+                db.session.rollback()
+                outcome = 'rejected'
+            except Exception as e:
+                db.session.rollback()
+                outcome = e
+            finally:
+                db.session.remove()
+            with lock:
+                outcomes.append(outcome)
+
+    threads = [threading.Thread(target=checkout, args=(cart,)) for cart in carts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    return outcomes.count('reserved'), outcomes.count('rejected'), errors
+
+
+def _stock(product_id):
+    db.session.expire_all()
+    return db.session.get(ProductStock, product_id).stock_qty
+
+
+def test_last_units_are_sold_exactly_once(app, make_products):
+    product = make_products(1, stock=5)[0]
+
+    reserved, rejected, errors = _checkout_concurrently(app, [{product.product_id: 1}] * 20)
+
+    assert errors == []
+    assert (reserved, rejected) == (5, 15)
+    assert _stock(product.product_id) == 0
+
+
+def test_multi_line_carts_are_all_or_nothing(app, make_products):
+    scarce, plenty = make_products(2, stock=3)
+    db.session.get(ProductStock, plenty.product_id).stock_qty = 10
+    db.session.commit()
+    cart = [(scarce.product_id, 1), (plenty.product_id, 2)]
+
+    reserved, rejected, errors = _checkout_concurrently(app, [cart] * 12)
+
+    assert errors == []
+    assert (reserved, rejected) == (3, 9)
+    # The rejected carts took nothing from the product that still had stock
+    assert _stock(scarce.product_id) == 0
+    assert _stock(plenty.product_id) == 10 - 3 * 2
+
+
+def test_insufficient_stock_reports_what_is_available(app, make_products):
+    product = make_products(1, stock=2)[0]
+
+    with pytest.raises(InsufficientStockError) as excinfo:
+        StockReservationService.reserve({product.product_id: 3})
+    db.session.rollback()
+
+    assert (excinfo.value.product_id, excinfo.value.requested, excinfo.value.available) == (product.product_id, 3, 2)
+    assert _stock(product.product_id) == 2
+
+
+def _place_order(product, quantity, payment_method=PaymentMethodEnum.UPI, hold_seconds=-1):
+    """An order awaiting payment with its stock reserved; the hold has already expired by default."""
+    order = Order(
+        subtotal_amount=Decimal('100.00'), total_amount=Decimal('100.00'), currency='INR',
+        payment_method=payment_method, order_status=OrderStatusEnum.PENDING_PAYMENT
+    )
+    order.items.append(OrderItem(
+        product_id=product.product_id, merchant_id=product.merchant_id,
+        product_name_at_purchase=product.product_name, quantity=quantity,
+        final_base_price_for_gst_calc=Decimal('100.00'), unit_price_inclusive_gst=Decimal('100.00'),
+        line_item_total_inclusive_gst=Decimal('100.00') * quantity
+    ))
+    db.session.add(order)
+    db.session.flush()
+    StockReservationService.reserve({product.product_id: quantity})
+    if payment_method != PaymentMethodEnum.COD:
+        StockReservationService.hold(order.order_id, {product.product_id: quantity}, ttl_seconds=hold_seconds)
+    db.session.commit()
+    return order.order_id
+
+
+def _reservation_statuses(order_id):
+    return [reservation.status for reservation in StockReservation.query.filter_by(order_id=order_id)]
+
+
+def test_paid_order_survives_the_expiry_sweep(app, make_products):
+    product = make_products(1, stock=5)[0]
+    order_id = _place_order(product, 2)
+
+    OrderController.update_payment_status(order_id, PaymentStatusEnum.SUCCESSFUL, transaction_id='TXN-1')
+
+    assert StockReservationService.release_expired() == 0
+    order = db.session.get(Order, order_id)
+    assert order.order_status == OrderStatusEnum.PROCESSING
+    assert order.payment_status == PaymentStatusEnum.SUCCESSFUL
+    assert _reservation_statuses(order_id) == [StockReservation.STATUS_CONFIRMED]
+    assert _stock(product.product_id) == 3
+
+
+def test_unpaid_order_is_cancelled_by_the_expiry_sweep(app, make_products):
+    product = make_products(1, stock=5)[0]
+    order_id = _place_order(product, 2)
+
+    assert StockReservationService.release_expired() == 1
+
+    order = db.session.get(Order, order_id)
+    assert order.order_status == OrderStatusEnum.CANCELLED_BY_ADMIN
+    assert order.payment_status == PaymentStatusEnum.EXPIRED
+    assert _stock(product.product_id) == 5
+
+
+def test_failed_payment_then_cancel_restocks_once(app, make_products):
+    product = make_products(1, stock=5)[0]
+    order_id = _place_order(product, 2, hold_seconds=600)
+
+    OrderController.update_payment_status(order_id, PaymentStatusEnum.FAILED)
+    assert db.session.get(Order, order_id).order_status == OrderStatusEnum.CANCELLED_BY_ADMIN
+    assert _stock(product.product_id) == 5
+
+    # A late second release of the same order (another failure or cancel path) puts nothing back
+    StockReservationService.release(order_id, [(product.product_id, 2)])
+    db.session.commit()
+    assert _stock(product.product_id) == 5
+    assert StockReservationService.release_expired() == 0
+    assert _reservation_statuses(order_id) == [StockReservation.STATUS_RELEASED]
+
+
+def test_cash_on_delivery_cancel_restocks_once(app, make_products):
+    product = make_products(1, stock=5)[0]
+    order_id = _place_order(product, 2, payment_method=PaymentMethodEnum.COD)
+
+    OrderController.cancel_order(order_id, None)
+    assert _stock(product.product_id) == 5
+
+    StockReservationService.release(order_id, [(product.product_id, 2)])
+    db.session.commit()
+    assert _stock(product.product_id) == 5
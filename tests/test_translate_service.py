@@ -0,0 +1,95 @@
+"""
+Amazon Translate batching: markup is only split between top-level elements,
+an element too large for one request fails alone, and requests wait for the
+shared budget only up to TRANSLATE_RATE_LIMIT_WAIT_SECONDS.
+"""
+import re
+import time
+
+import fakeredis
+import pytest
+
+from common.rate_limit import RateLimiter
+from services import translate_service
+from services.translate_service import AmazonTranslateService, split_markup
+
+PARAGRAPHS = ''.join(f'<p>Paragraph {i} with <b>bold</b> text<br>and a break</p>\n' for i in range(12))
+
+
+def _balanced(markup):
+    opened = re.findall(r'<(p|b|div)\b', markup)
+    closed = re.findall(r'</(p|b|div)>', markup)
+    return sorted(opened) == sorted(closed)
+
+
+class StubTranslate:
+    """translate_text of the boto3 client: prefixes every line with the target language."""
+
+    def __init__(self):
+        self.requests = []
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode, **kwargs):
+        self.requests.append(Text)
+        return {'TranslatedText': '\n'.join(f'{TargetLanguageCode}:{line}' for line in Text.split('\n'))}
+
+
+@pytest.fixture
+def translate(app, fake_redis, monkeypatch):
+    client = StubTranslate()
+    limiter = RateLimiter()
+    limiter.use_client(fakeredis.FakeRedis(server=fake_redis))
+    monkeypatch.setattr(translate_service, 'get_translate_client', lambda region: client)
+    monkeypatch.setattr(translate_service, 'rate_limiter', limiter)
+    app.config.update(TRANSLATE_MAX_REQUEST_BYTES=200, TRANSLATE_REQUESTS_PER_SECOND=100)
+    return client
+
+
+def test_markup_is_split_between_top_level_elements():
+    pieces = split_markup(PARAGRAPHS, 200)
+
+    assert len(pieces) > 1 and ''.join(pieces) == PARAGRAPHS
+    assert all(len(piece.encode('utf-8')) <= 200 and _balanced(piece) for piece in pieces)
+    # Text between elements is split like plain text
+    loose = '<p>Intro</p>' + ' '.join(['word'] * 100)
+    assert ''.join(split_markup(loose, 60)) == loose
+    assert all(len(piece) <= 60 for piece in split_markup(loose, 60))
+
+
+def test_an_element_over_the_request_size_is_rejected():
+    with pytest.raises(ValueError):
+        split_markup('<div>' + 'long ' * 100 + '</div>', 200)
+
+
+def test_oversize_markup_fails_only_its_own_ids(translate):
+    oversize = '<div>' + 'long ' * 100 + '</div>'
+    result, errors = AmazonTranslateService().translate_batch_settled(
+        [('short', '<p>Hello</p>'), ('long', PARAGRAPHS), ('oversize', oversize)], 'hi', content_type='text/html'
+    )
+
+    assert set(errors) == {'oversize'} and isinstance(errors['oversize'], ValueError)
+    assert result['short'] == 'hi:<p>Hello</p>'
+    assert result['long'].count('hi:<p>Paragraph') == 12
+    assert all(_balanced(text) for text in translate.requests)
+    assert oversize not in ''.join(translate.requests)
+
+
+def test_requests_wait_for_the_budget_only_until_the_deadline(app, translate):
+    app.config.update(TRANSLATE_REQUESTS_PER_SECOND=1, TRANSLATE_RATE_LIMIT_WAIT_SECONDS=0.2)
+    service = AmazonTranslateService()
+    assert service.translate_text('Hello', 'hi') == 'hi:Hello'
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        service.translate_text('Goodbye', 'hi')
+    assert 0.15 <= time.monotonic() - started < 0.9
+    assert translate.requests == ['Hello']
+
+
+def test_acquire_waits_for_the_next_slot(app, fake_redis):
+    limiter = RateLimiter()
+    limiter.use_client(fakeredis.FakeRedis(server=fake_redis))
+    assert limiter.acquire('translate:test', 1, 0.3, timeout=2).allowed
+
+    started = time.monotonic()
+    assert limiter.acquire('translate:test', 1, 0.3, timeout=2).allowed
+    assert 0.2 <= time.monotonic() - started < 1.5